@@ -6,5 +6,6 @@ __all__ = ["Agent"]
 
 # adk/api/__init__.py
 from .tool import Tool
+from .executor import ToolExecutor
 
-__all__ = ["Agent", "Tool"]  # add all your public classes here
+__all__ = ["Agent", "Tool", "ToolExecutor"]  # add all your public classes here
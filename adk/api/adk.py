@@ -15,4 +15,8 @@ class ADK:
         result = agent_instance.act(user_input)
         return result
     
+    async def run_async(self, agent_instance, user_input):
+        # Lets several agents run concurrently on one event loop
+        return await agent_instance.act_async(user_input)
+    
 
@@ -1,8 +1,11 @@
 # adk/api/agent.py
 from types import SimpleNamespace
-import os
 import json
 import re
+import asyncio
+
+from . import llm
+from .executor import ToolExecutor, run_sync
 
 class Agent:
     
@@ -92,81 +95,86 @@ class Agent:
         
         return tool_calls
     
-    def act(self, observation):
+    async def execute_tool_calls(self, tool_calls):
+        """
+        Execute independent tool calls concurrently (thread or process pool,
+        per-call timeout). Returns "<tool> result: ..." lines in call order.
+        """
+        executor = self._get_executor()
+        calls, results = [], {}
+        for i, tool_call in enumerate(tool_calls):
+            tool = next((t for t in self.tools or [] if t.name == tool_call['tool_name']), None)
+            if tool is None:
+                results[i] = f"Tool '{tool_call['tool_name']}' not found"
+            else:
+                print(f"Executing tool: {tool.name}")
+                calls.append((i, tool, tool_call['args'], tool_call['kwargs']))
+        outputs = await executor.run_calls([(tool, args, kwargs) for _, tool, args, kwargs in calls])
+        for (i, tool, _, _), output in zip(calls, outputs):
+            print(f"Tool result: {output}")
+            results[i] = output
+        return [f"{tool_call['tool_name']} result: {results[i]}" for i, tool_call in enumerate(tool_calls)]
+    
+    def _get_executor(self):
+        if getattr(self, "_executor", None) is None:
+            self._executor = ToolExecutor(
+                max_workers=getattr(self.config, 'tool_workers', None),
+                mode=getattr(self.config, 'tool_executor', 'thread'),
+                timeout=getattr(self.config, 'tool_timeout', None),
+            )
+        return self._executor
+    
+    async def _generate(self, prompt):
+        """Call the LLM through the process-wide client pool and response cache."""
+        return await llm.agenerate(
+            prompt,
+            model=getattr(self.config, 'model', None) or 'gemini-1.5-flash-latest',
+            backend=getattr(self.config, 'llm_backend', 'gemini'),
+            use_cache=getattr(self.config, 'llm_cache', True),
+        )
+    
+    async def act_async(self, observation):
         # use self.config here if needed
         # In a real implementation, this would call the LLM and execute tools
-        
-        # Try to use Gemini API if available
         try:
-            import google.generativeai as genai
+            # Prepare tools information for the LLM
+            tools_info = ""
+            if self.tools:
+                tools_info = "\n\nAvailable tools:\n"
+                for tool in self.tools:
+                    tools_info += f"- {tool.name}: {tool.description}\n"
+                    if tool.parameters:
+                        tools_info += f"  Parameters: {tool.parameters}\n"
             
-            # Get API key from environment or config
-            api_key = os.environ.get("GEMINI_API_KEY")
-            if not api_key:
-                # Try to get from config files
-                try:
-                    import yaml
-                    with open("run_all_test.yaml", "r") as f:
-                        config_data = yaml.safe_load(f)
-                        api_key = config_data.get("gemini_api_key")
-                except:
-                    pass
+            # Enhanced system prompt with tool information
+            enhanced_system_prompt = self.system_prompt + tools_info + "\n\nTo use a tool, write: tool_name(arg1, arg2, param1='value1')"
             
-            if api_key:
-                # Configure Gemini
-                genai.configure(api_key=api_key)
-                
-                # Get model from config or use default
-                model_name = getattr(self.config, 'model', 'gemini-1.5-flash-latest')
-                
-                # Prepare tools information for the LLM
-                tools_info = ""
-                if self.tools:
-                    tools_info = "\n\nAvailable tools:\n"
-                    for tool in self.tools:
-                        tools_info += f"- {tool.name}: {tool.description}\n"
-                        if tool.parameters:
-                            tools_info += f"  Parameters: {tool.parameters}\n"
-                
-                # Enhanced system prompt with tool information
-                enhanced_system_prompt = self.system_prompt + tools_info + "\n\nTo use a tool, write: tool_name(arg1, arg2, param1='value1')"
-                
-                # Create Gemini model
-                model = genai.GenerativeModel(model_name)
-                
-                # Prepare the prompt
-                prompt = f"{enhanced_system_prompt}\n\nUser request: {observation}"
-                
-                # Call the LLM
-                response = model.generate_content(prompt)
-                llm_response = response.text
-                
-                # Check for tool calls in the response
-                tool_calls = self.parse_tool_calls(llm_response)
+            # Prepare the prompt
+            prompt = f"{enhanced_system_prompt}\n\nUser request: {observation}"
+            
+            # Call the LLM
+            llm_response = await self._generate(prompt)
+            
+            # Check for tool calls in the response
+            tool_calls = self.parse_tool_calls(llm_response)
+            
+            if tool_calls:
+                # Execute tools concurrently and get results
+                tool_results = await self.execute_tool_calls(tool_calls)
                 
-                if tool_calls:
-                    # Execute tools and get results
-                    tool_results = []
-                    for tool_call in tool_calls:
-                        result = self.execute_tool(
-                            tool_call['tool_name'], 
-                            *tool_call['args'], 
-                            **tool_call['kwargs']
-                        )
-                        tool_results.append(f"{tool_call['tool_name']} result: {result}")
-                    
-                    # Send tool results back to LLM for final response
-                    tool_results_text = "\n".join(tool_results)
-                    follow_up_prompt = f"Tool execution results:\n{tool_results_text}\n\nPlease provide a final response based on these results."
-                    
-                    final_response = model.generate_content(follow_up_prompt)
-                    llm_response = final_response.text
+                # Send tool results back to LLM for final response
+                tool_results_text = "\n".join(tool_results)
+                follow_up_prompt = f"Tool execution results:\n{tool_results_text}\n\nPlease provide a final response based on these results."
                 
-                # Create response object
-                response_obj = SimpleNamespace()
-                response_obj.agent_response = llm_response
-                return response_obj
+                llm_response = await self._generate(follow_up_prompt)
+            
+            # Create response object
+            response_obj = SimpleNamespace()
+            response_obj.agent_response = llm_response
+            return response_obj
                 
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             print(f"LLM call failed: {e}")
         
@@ -174,3 +182,7 @@ class Agent:
         response = SimpleNamespace()
         response.agent_response = f"Agent {self.name} received: {observation}"
         return response
+    
+    def act(self, observation):
+        """Synchronous entry point; runs act_async on an event loop."""
+        return run_sync(self.act_async(observation))
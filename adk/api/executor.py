@@ -0,0 +1,111 @@
+# adk/api/executor.py
+import asyncio
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def _call_tool_by_reference(module_name, tool_name, args, kwargs):
+    """Process-pool entry point: look the tool up in the worker (Tool objects wrap closures and do not pickle)."""
+    tool = getattr(importlib.import_module(module_name), tool_name)
+    func = getattr(tool, "func", tool)
+    return func(*args, **kwargs)
+
+
+class ToolExecutor:
+    """
+    Runs tool calls concurrently from asyncio.
+    - mode="thread": calls share the process (cheap, good for I/O and LLM calls).
+    - mode="process": each call runs in a worker process (CPU-bound simulations);
+      the tool is re-imported there by module and name.
+    Every call gets an optional timeout; on timeout an error string is
+    returned in its place, like Tool.execute does for exceptions. A call that
+    has not started yet is cancelled. A call that is already running cannot
+    be interrupted (neither threads nor pool workers can be stopped): it is
+    abandoned and finishes in the background, and its pool is retired so
+    later calls get fresh workers instead of queueing behind it.
+    """
+
+    def __init__(self, max_workers=None, mode="thread", timeout=None, mp_context=None):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode '{mode}'")
+        self.mode = mode
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.mp_context = mp_context
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.mode == "process":
+                context = multiprocessing.get_context(self.mp_context) if self.mp_context else None
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def _retire_pool(self, pool):
+        """Stop handing work to pool; its running calls finish in the background."""
+        if self._pool is pool:
+            self._pool = None
+        pool.shutdown(wait=False)
+
+    def _submit(self, tool, args, kwargs):
+        pool = self._get_pool()
+        if self.mode == "process":
+            func = getattr(tool, "func", tool)
+            return pool.submit(_call_tool_by_reference, func.__module__, getattr(tool, "name", func.__name__),
+                               tuple(args), dict(kwargs))
+        return pool.submit(getattr(tool, "func", tool), *args, **kwargs)
+
+    async def run_call(self, tool, args=(), kwargs=None, timeout=None):
+        """Run one tool call; returns its result or an error string."""
+        name = getattr(tool, "name", getattr(tool, "__name__", str(tool)))
+        timeout = self.timeout if timeout is None else timeout
+        pool = self._get_pool()
+        call = self._submit(tool, args, kwargs or {})
+        future = asyncio.wrap_future(call)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            if not call.cancel():
+                self._retire_pool(pool)
+                return f"Error executing {name}: timed out after {timeout:g}s (call abandoned, still running)"
+            return f"Error executing {name}: timed out after {timeout:g}s"
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            return f"Error executing {name}: {str(e)}"
+
+    async def run_calls(self, calls, timeout=None):
+        """
+        Run independent calls concurrently.
+        calls: iterable of (tool, args, kwargs). Results keep the input order.
+        """
+        return await asyncio.gather(*(self.run_call(tool, args, kwargs, timeout) for tool, args, kwargs in calls))
+
+    def run_calls_sync(self, calls, timeout=None):
+        """Blocking wrapper around run_calls for synchronous callers."""
+        return run_sync(self.run_calls(calls, timeout))
+
+    def shutdown(self, cancel_pending=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=cancel_pending)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+def run_sync(coro):
+    """Run a coroutine to completion, also when called from inside a running event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
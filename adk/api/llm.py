@@ -0,0 +1,217 @@
+# adk/api/llm.py
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = ".llm_cache"
+DEFAULT_CACHE_TTL_S = 7 * 24 * 3600
+STUB_BACKEND = "stub"
+
+
+class ResponseCache:
+    """
+    On-disk LLM response cache keyed by (backend, model, system prompt, prompt)
+    hash. Entries older than ttl_s are ignored and overwritten.
+    Settings: LLM_CACHE=0 disables it, LLM_CACHE_DIR / LLM_CACHE_TTL override
+    the location and the TTL (seconds).
+    """
+
+    def __init__(self, cache_dir=None, ttl_s=None, enabled=None):
+        self.cache_dir = Path(cache_dir or os.environ.get("LLM_CACHE_DIR", DEFAULT_CACHE_DIR))
+        self.ttl_s = float(ttl_s if ttl_s is not None else os.environ.get("LLM_CACHE_TTL", DEFAULT_CACHE_TTL_S))
+        self.enabled = enabled if enabled is not None else os.environ.get("LLM_CACHE", "1") != "0"
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(backend, model, prompt, system=None):
+        payload = json.dumps([backend, model, system or "", prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        if time.time() - entry.get("created", 0) > self.ttl_s:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["response"]
+
+    def put(self, key, response, model=None):
+        if not self.enabled:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "model": model, "response": response}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+class GeminiBackend:
+    """
+    google.generativeai, configured once per process; models are created once
+    per name. The async client binds to the event loop of its first call, and
+    Agent.act runs every call on a new loop, so agenerate runs the blocking
+    call in a worker thread instead.
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key=None):
+        import google.generativeai as genai
+
+        api_key = api_key or os.environ.get("GEMINI_API_KEY") or _config_value("gemini_api_key")
+        if not api_key:
+            raise RuntimeError("No Gemini API key (set GEMINI_API_KEY)")
+        genai.configure(api_key=api_key)
+        self._genai = genai
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model):
+        with self._lock:
+            if model not in self._models:
+                self._models[model] = self._genai.GenerativeModel(model)
+            return self._models[model]
+
+    def generate(self, model, prompt, system=None):
+        text = f"{system}\n\n{prompt}" if system else prompt
+        return self._model(model).generate_content(text).text
+
+    async def agenerate(self, model, prompt, system=None):
+        return await asyncio.to_thread(self.generate, model, prompt, system)
+
+
+class OpenAIBackend:
+    """One OpenAI client per process (the client keeps its HTTP connection pool)."""
+
+    name = "openai"
+
+    def __init__(self, api_key=None):
+        import openai
+
+        self._client = openai.OpenAI(api_key=api_key or os.environ.get("OPENAI_API_KEY"))
+
+    def generate(self, model, prompt, system=None):
+        messages = ([{"role": "system", "content": system}] if system else []) + [{"role": "user", "content": prompt}]
+        response = self._client.chat.completions.create(model=model, messages=messages)
+        return response.choices[0].message.content
+
+    async def agenerate(self, model, prompt, system=None):
+        return await asyncio.to_thread(self.generate, model, prompt, system)
+
+
+class StubBackend:
+    """
+    Offline backend for benchmarking agent loops: returns a canned response
+    after an optional simulated latency (LLM_STUB_LATENCY_S). The response is
+    LLM_STUB_RESPONSE if set, otherwise a short echo of the prompt.
+    """
+
+    name = STUB_BACKEND
+
+    def __init__(self, api_key=None, response=None, latency_s=None):
+        self.response = response if response is not None else os.environ.get("LLM_STUB_RESPONSE")
+        self.latency_s = float(latency_s if latency_s is not None else os.environ.get("LLM_STUB_LATENCY_S", 0))
+        self.calls = 0
+
+    def _reply(self, model, prompt):
+        self.calls += 1
+        if self.response is not None:
+            return self.response
+        last_line = prompt.strip().splitlines()[-1] if prompt.strip() else ""
+        return f"[stub {model}] {last_line[:200]}"
+
+    def generate(self, model, prompt, system=None):
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return self._reply(model, prompt)
+
+    async def agenerate(self, model, prompt, system=None):
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        return self._reply(model, prompt)
+
+
+BACKENDS = {"gemini": GeminiBackend, "openai": OpenAIBackend, STUB_BACKEND: StubBackend}
+
+_pool = {}
+_pool_lock = threading.Lock()
+_cache = None
+
+
+def _config_value(key, config_file="run_all_test.yaml"):
+    """Value from the local run config, read on every call (backends call it once when pooled)."""
+    try:
+        import yaml
+        with open(config_file, "r") as f:
+            return (yaml.safe_load(f) or {}).get(key)
+    except Exception:
+        return None
+
+
+def get_backend(backend="gemini", api_key=None):
+    """
+    Process-wide client pool: one backend instance per (backend, api key).
+    LLM_BACKEND=stub in the environment switches every caller to the stub.
+    """
+    backend = os.environ.get("LLM_BACKEND") or backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{backend}' (expected one of {sorted(BACKENDS)})")
+    key = (backend, api_key)
+    with _pool_lock:
+        if key not in _pool:
+            _pool[key] = BACKENDS[backend](api_key=api_key)
+        return _pool[key]
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
+
+
+def generate(prompt, model, backend="gemini", system=None, api_key=None, use_cache=True):
+    """Cached, pooled LLM call. Returns the response text."""
+    client = get_backend(backend, api_key)
+    cache = get_cache()
+    key = cache.key(client.name, model, prompt, system)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    response = client.generate(model, prompt, system)
+    if use_cache:
+        cache.put(key, response, model)
+    return response
+
+
+async def agenerate(prompt, model, backend="gemini", system=None, api_key=None, use_cache=True):
+    """Async variant of generate(); the request does not block the event loop."""
+    client = get_backend(backend, api_key)
+    cache = get_cache()
+    key = cache.key(client.name, model, prompt, system)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    response = await client.agenerate(model, prompt, system)
+    if use_cache:
+        cache.put(key, response, model)
+    return response
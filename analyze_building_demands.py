@@ -11,13 +11,14 @@ import numpy as np
 from pathlib import Path
 import geopandas as gpd
 
+from src.profile_store import load_phase_profiles
+
 def load_building_data():
     """Load building demand and load profile data."""
     print("📊 Loading Building Data...")
     
     # Load load profiles
-    with open('../thesis-data-2/power-sim/gebaeude_lastphasenV2.json', 'r') as f:
-        load_profiles = json.load(f)
+    load_profiles = load_phase_profiles('../thesis-data-2/power-sim/gebaeude_lastphasenV2.json')
     
     # Load building demands
     with open('../thesis-data-2/power-sim/gebaeude_lastphasenV2_verbrauch.json', 'r') as f:
@@ -73,7 +74,10 @@ def analyze_load_profiles(load_profiles):
     print(f"\nPeak Load Analysis:")
     peak_loads = {}
     for scenario in scenarios:
-        loads = [load_profiles[building][scenario] for building in load_profiles.keys()]
+        if hasattr(load_profiles, 'phase_values'):
+            loads = load_profiles.phase_values(scenario)
+        else:
+            loads = [load_profiles[building][scenario] for building in load_profiles.keys()]
         peak_loads[scenario] = {
             'max': max(loads),
             'min': min(loads),
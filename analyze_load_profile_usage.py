@@ -8,6 +8,8 @@ import json
 import pandas as pd
 import numpy as np
 
+from src.profile_store import load_phase_profiles
+
 def analyze_load_profile_usage():
     """Analyze how load profiles are used in HP vs DH comparison."""
     
@@ -15,8 +17,7 @@ def analyze_load_profile_usage():
     print("=" * 60)
     
     # Load load profiles
-    with open('../thesis-data-2/power-sim/gebaeude_lastphasenV2.json', 'r') as f:
-        load_profiles = json.load(f)
+    load_profiles = load_phase_profiles('../thesis-data-2/power-sim/gebaeude_lastphasenV2.json')
     
     # Load building demands
     with open('../thesis-data-2/power-sim/gebaeude_lastphasenV2_verbrauch.json', 'r') as f:
@@ -138,8 +139,7 @@ def show_comparison_example():
     print(f"=" * 60)
     
     # Load data
-    with open('../thesis-data-2/power-sim/gebaeude_lastphasenV2.json', 'r') as f:
-        load_profiles = json.load(f)
+    load_profiles = load_phase_profiles('../thesis-data-2/power-sim/gebaeude_lastphasenV2.json')
     
     with open('../thesis-data-2/power-sim/gebaeude_lastphasenV2_verbrauch.json', 'r') as f:
         building_demands = json.load(f)
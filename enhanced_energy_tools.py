@@ -5,52 +5,74 @@ import subprocess
 import sys
 import yaml
 from adk.api.tool import tool
-import geopandas as gpd
-import matplotlib.pyplot as plt
-from shapely.ops import nearest_points
-from shapely.geometry import LineString, Point
-import networkx as nx
-from scipy.spatial import distance_matrix
-import pandas as pd
 import glob
-import numpy as np
-import folium
 from pathlib import Path
-from pyproj import Transformer
 import random
 import time
-from shapely.strtree import STRtree
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
-# Import comprehensive analysis functions from street_final_copy_3
-try:
-    # Add the street_final_copy_3 directory to the path
-    sys.path.append('../street_final_copy_3')
-    
-    # Import HP feasibility functions
-    from branitz_hp_feasibility import (
-        compute_proximity,
-        compute_service_lines_street_following,
-        compute_power_feasibility,
-        create_hp_dashboard,
-        load_power_infrastructure,
-        load_buildings,
-        load_load_profiles,
-        output_results_table,
-        visualize as visualize_hp
-    )
-    
-    # Import DH network functions
-    from create_complete_dual_pipe_dh_network_improved import ImprovedDualPipeDHNetwork
-    from simulate_dual_pipe_dh_network_final import FinalDualPipeDHSimulation
-    
-    COMPREHENSIVE_ANALYSIS_AVAILABLE = True
-    print("✅ Comprehensive analysis modules imported successfully")
-except ImportError as e:
-    COMPREHENSIVE_ANALYSIS_AVAILABLE = False
-    print(f"⚠️ Comprehensive analysis modules not available: {e}")
+from tools.lazy_imports import lazy_import
+
+# Heavy dependencies are imported on first use inside the tool bodies
+gpd = lazy_import("geopandas")
+plt = lazy_import("matplotlib.pyplot")
+nx = lazy_import("networkx")
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+folium = lazy_import("folium")
+
+# Comprehensive analysis functions from street_final_copy_3 (pandapower, pandapipes, ...)
+# are imported on first use into this dict; None = not tried yet
+COMPREHENSIVE_ANALYSIS_AVAILABLE = None
+analysis_modules = {}
+
+def load_comprehensive_analysis_modules():
+    """Import the street_final_copy_3 analysis functions into analysis_modules once; returns availability."""
+    global COMPREHENSIVE_ANALYSIS_AVAILABLE
+    if COMPREHENSIVE_ANALYSIS_AVAILABLE is not None:
+        return COMPREHENSIVE_ANALYSIS_AVAILABLE
+    try:
+        # Add the street_final_copy_3 directory to the path
+        sys.path.append('../street_final_copy_3')
+        
+        # Import HP feasibility functions
+        from branitz_hp_feasibility import (
+            compute_proximity,
+            compute_service_lines_street_following,
+            compute_power_feasibility,
+            create_hp_dashboard,
+            load_power_infrastructure,
+            load_buildings,
+            load_load_profiles,
+            output_results_table,
+            visualize as visualize_hp
+        )
+        
+        # Import DH network functions
+        from create_complete_dual_pipe_dh_network_improved import ImprovedDualPipeDHNetwork
+        from simulate_dual_pipe_dh_network_final import FinalDualPipeDHSimulation
+        
+        analysis_modules.update({
+            'compute_proximity': compute_proximity,
+            'compute_service_lines_street_following': compute_service_lines_street_following,
+            'compute_power_feasibility': compute_power_feasibility,
+            'create_hp_dashboard': create_hp_dashboard,
+            'load_power_infrastructure': load_power_infrastructure,
+            'load_buildings': load_buildings,
+            'load_load_profiles': load_load_profiles,
+            'output_results_table': output_results_table,
+            'visualize_hp': visualize_hp,
+            'ImprovedDualPipeDHNetwork': ImprovedDualPipeDHNetwork,
+            'FinalDualPipeDHSimulation': FinalDualPipeDHSimulation,
+        })
+        COMPREHENSIVE_ANALYSIS_AVAILABLE = True
+        print("✅ Comprehensive analysis modules imported successfully")
+    except ImportError as e:
+        COMPREHENSIVE_ANALYSIS_AVAILABLE = False
+        print(f"⚠️ Comprehensive analysis modules not available: {e}")
+    return COMPREHENSIVE_ANALYSIS_AVAILABLE
 
 # This file contains enhanced functions that our agents can use as tools.
 
@@ -125,7 +147,7 @@ def run_comprehensive_hp_analysis(street_name: str, scenario: str = "winter_werk
     Returns:
         A comprehensive summary with metrics and dashboard link
     """
-    if not COMPREHENSIVE_ANALYSIS_AVAILABLE:
+    if not load_comprehensive_analysis_modules():
         return "Error: Comprehensive analysis modules not available. Please ensure street_final_copy_3 is accessible."
     
     print(f"TOOL: Running comprehensive HP analysis for '{street_name}' with scenario '{scenario}'...")
@@ -142,7 +164,7 @@ def run_comprehensive_hp_analysis(street_name: str, scenario: str = "winter_werk
         network_json_path = Path("../thesis-data-2/power-sim/branitzer_siedlung_ns_v3_ohne_UW.json")
         
         # Load buildings and filter for street
-        buildings = load_buildings(buildings_file)
+        buildings = analysis_modules['load_buildings'](buildings_file)
         
         # Filter buildings for the specific street
         street_buildings = []
@@ -172,7 +194,7 @@ def run_comprehensive_hp_analysis(street_name: str, scenario: str = "winter_werk
         # Load load profiles
         load_profiles = {}
         if load_profiles_file.exists():
-            load_profiles = load_load_profiles(load_profiles_file)
+            load_profiles = analysis_modules['load_load_profiles'](load_profiles_file)
         
         # Load street data
         streets_gdf = None
@@ -180,17 +202,17 @@ def run_comprehensive_hp_analysis(street_name: str, scenario: str = "winter_werk
             streets_gdf = gpd.read_file(streets_file)
         
         # Compute proximity analysis
-        filtered_buildings = compute_proximity(filtered_buildings, lines, substations, plants, generators)
+        filtered_buildings = analysis_modules['compute_proximity'](filtered_buildings, lines, substations, plants, generators)
         
         # Compute service lines
-        filtered_buildings = compute_service_lines_street_following(
+        filtered_buildings = analysis_modules['compute_service_lines_street_following'](
             filtered_buildings, substations, plants, generators, streets_gdf
         )
         
         # Compute power flow feasibility
         power_metrics = {}
         if network_json_path.exists() and load_profiles:
-            power_metrics = compute_power_feasibility(
+            power_metrics = analysis_modules['compute_power_feasibility'](
                 filtered_buildings, load_profiles, network_json_path, scenario
             )
             
@@ -206,11 +228,11 @@ def run_comprehensive_hp_analysis(street_name: str, scenario: str = "winter_werk
         
         # Generate outputs
         metadata = {'commit_sha': 'unknown', 'run_time': datetime.now().isoformat()}
-        output_results_table(filtered_buildings, output_dir, metadata)
+        analysis_modules['output_results_table'](filtered_buildings, output_dir, metadata)
         
         # Create visualization
         map_path = output_dir / 'hp_feasibility_map.html'
-        visualize_hp(
+        analysis_modules['visualize_hp'](
             filtered_buildings, lines, substations, plants, generators, 
             output_dir, show_building_to_line=False, streets_gdf=streets_gdf, 
             draw_service_lines=True, sample_service_lines=False, metadata=metadata
@@ -266,7 +288,7 @@ def run_comprehensive_hp_analysis(street_name: str, scenario: str = "winter_werk
         
         # Create dashboard
         dashboard_path = output_dir / 'hp_feasibility_dashboard.html'
-        create_hp_dashboard(
+        analysis_modules['create_hp_dashboard'](
             map_path='hp_feasibility_map.html',
             stats_dict=stats,
             chart_paths=chart_paths,
@@ -323,7 +345,7 @@ def run_comprehensive_dh_analysis(street_name: str) -> str:
     Returns:
         A comprehensive summary with metrics and dashboard link
     """
-    if not COMPREHENSIVE_ANALYSIS_AVAILABLE:
+    if not load_comprehensive_analysis_modules():
         return "Error: Comprehensive analysis modules not available. Please ensure street_final_copy_3 is accessible."
     
     print(f"TOOL: Running comprehensive DH analysis for '{street_name}'...")
@@ -366,7 +388,7 @@ def run_comprehensive_dh_analysis(street_name: str) -> str:
             json.dump(street_geojson, f, ensure_ascii=False, indent=2)
         
         # Create dual-pipe network
-        network = ImprovedDualPipeDHNetwork(results_dir=str(output_dir), buildings_file=str(buildings_file))
+        network = analysis_modules['ImprovedDualPipeDHNetwork'](results_dir=str(output_dir), buildings_file=str(buildings_file))
         network.load_data()
         
         # Create network with custom parameters
@@ -382,7 +404,7 @@ def run_comprehensive_dh_analysis(street_name: str) -> str:
         network_stats = network.create_complete_dual_pipe_network(custom_params)
         
         # Run pandapipes simulation
-        simulation = FinalDualPipeDHSimulation(
+        simulation = analysis_modules['FinalDualPipeDHSimulation'](
             network_file=str(output_dir / "pandapipes_network.json"),
             results_dir=str(output_dir)
         )
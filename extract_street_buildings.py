@@ -1,24 +1,8 @@
-import json
+from street_final_copy_3.geojson_stream import get_building_ids
 
 def get_building_ids_for_street(geojson_path, street_name):
-    with open(geojson_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    selected_ids = []
-    for feature in data["features"]:
-        addresses = feature.get("adressen", [])
-        for adr in addresses:
-            street_val = adr.get("str")
-            if street_val is None:
-                continue  # Skip if no street string
-            # Compare street names, ignoring case and leading/trailing spaces
-            if street_val.strip().lower() == street_name.strip().lower():
-                gebaeude = feature.get("gebaeude", {})
-                oi = gebaeude.get("oi")
-                if oi:
-                    selected_ids.append(oi)
-                break  # Move to next feature; no need to check other addresses
-    return selected_ids
+    # Features are streamed and filtered by street (case-insensitive), not loaded all at once
+    return get_building_ids(geojson_path, [street_name])
 
 if __name__ == "__main__":
     geojson_file = "data/geojson/hausumringe_mit_adressenV3.geojson"
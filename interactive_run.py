@@ -1,44 +1,24 @@
 # interactive_run.py
 
-import json
 import os
 import subprocess
 import sys
 import yaml
 import questionary # For creating the interactive user prompt
+from street_final_copy_3.geojson_stream import get_street_names, get_building_ids
 
 def get_all_street_names(geojson_path):
     """Scans the entire GeoJSON file and returns a sorted list of unique street names."""
     print(f"Reading all street names from {geojson_path}...")
-    street_names = set()
-    with open(geojson_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    for feature in data["features"]:
-        for adr in feature.get("adressen", []):
-            street_val = adr.get("str")
-            if street_val:
-                street_names.add(street_val.strip())
+    street_names = get_street_names(geojson_path)
     
     print(f"Found {len(street_names)} unique streets.")
-    return sorted(list(street_names))
+    return street_names
 
 def get_building_ids_for_streets(geojson_path, selected_streets):
     """Gets all building IDs for a given list of street names."""
     print(f"Fetching building IDs for selected streets...")
-    street_set = {s.lower() for s in selected_streets}
-    selected_ids = []
-    with open(geojson_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    for feature in data["features"]:
-        for adr in feature.get("adressen", []):
-            street_val = adr.get("str")
-            if street_val and street_val.strip().lower() in street_set:
-                oi = feature.get("gebaeude", {}).get("oi")
-                if oi:
-                    selected_ids.append(oi)
-                break # Found a matching street, move to the next building feature
+    selected_ids = get_building_ids(geojson_path, selected_streets)
     
     print(f"Found {len(selected_ids)} buildings.")
     return selected_ids
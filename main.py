@@ -15,13 +15,20 @@ from src import (
     building_attributes,
     envelope_and_uvalue,
     demand_calculation,
+    heat_demand,
+    weather,
+    heat_pump_cop,
+    representative_days,
+    profile_store,
     profile_generation,
     network_construction,
     scenario_manager,
     simulation_runner,
     kpi_calculator,
+    kpi_sensitivity,
     llm_reporter,
 )
+from src.pipeline_stages import Stage, run_stages
 
 def load_config(config_file):
     ext = Path(config_file).suffix.lower()
@@ -45,164 +52,285 @@ def filter_buildings_for_test_mode(bldg_gdf, config):
                 raise ValueError("No suitable building ID column found for filtering in test mode.")
     return bldg_gdf
 
-def run_pipeline(config_file):
+def _paths(config):
+    output_dir = config.get("output_dir", "results/")
+    return {
+        "buildings_prepared": os.path.join(output_dir, "buildings_prepared.geojson"),
+        "streets": os.path.join(output_dir, "streets.geojson"),
+        "nodes": os.path.join(output_dir, "nodes.geojson"),
+        "buildings_attributes": os.path.join(output_dir, "buildings_with_demographics.geojson"),
+        "buildings_envelope": os.path.join(output_dir, "buildings_with_envelope.geojson"),
+        "buildings_demand": os.path.join(output_dir, "buildings_with_demand.geojson"),
+        "profiles": os.path.join(output_dir, "building_load_profiles.json"),
+        "graphml": os.path.join(output_dir, "branitz_network.graphml"),
+        "gpickle": os.path.join(output_dir, "branitz_network.gpickle"),
+        "kpi_csv": os.path.join(output_dir, "scenario_kpis.csv"),
+        "kpi_json": os.path.join(output_dir, "scenario_kpis.json"),
+        "kpi_bands_csv": os.path.join(output_dir, "scenario_kpi_bands.csv"),
+        "llm_report": os.path.join(output_dir, "llm_report.md"),
+    }
+
+def _test_mode_params(config):
+    return {
+        "test_mode": config.get("test_mode", False),
+        "selected_buildings": config.get("selected_buildings", []),
+    }
+
+# DH/HP engine modules (street_final_copy_3) that the simulation runner imports
+SIMULATION_ENGINE_CODE = [
+    simulation_runner.ENGINE_DIR / f"{name}.py" for name in (
+        "batch_street_runner", "create_complete_dual_pipe_dh_network_improved",
+        "simulate_dual_pipe_dh_network_final", "branitz_hp_feasibility", "shared_street_network",
+        "street_graph", "pipe_segment_table", "load_aggregation", "plant_siting",
+    )
+]
+SIMULATION_INPUT_SETTINGS = ("streets_file", "load_profiles_file", "building_demands_file", "network_json")
+
+def _simulation_settings(config):
+    return {k: config.get(k, default) for k, default in simulation_runner.DEFAULT_SETTINGS.items()}
+
+def _simulation_params(config):
+    return {
+        **_simulation_settings(config),
+        "simulation_processes": config.get("simulation_processes"),
+        "simulation_resume": config.get("simulation_resume", False),
+    }
+
+# --- 1. Data Preparation ---
+def stage_data_preparation(config, ctx):
+    paths = _paths(config)
+    bldg_gdf = data_preparation.load_buildings(config["buildings_file"])
+    bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
+    G, edges, nodes = data_preparation.load_osm_streets(config["osm_file"])
+    bldg_gdf = data_preparation.preprocess_building_geometries(bldg_gdf)
+    bldg_gdf.to_file(paths["buildings_prepared"], driver="GeoJSON")
+    edges.to_file(paths["streets"], driver="GeoJSON")
+    nodes.to_file(paths["nodes"], driver="GeoJSON")
+    return [paths["buildings_prepared"], paths["streets"], paths["nodes"]]
+
+# --- 2. Merge Demographics/Attributes ---
+def stage_building_attributes(config, ctx):
+    import geopandas as gpd
+    paths = _paths(config)
+    bldg_gdf = gpd.read_file(paths["buildings_prepared"])
+    bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
+    with open(config["demographics_file"], "r", encoding="utf-8") as f:
+        demographics = json.load(f)
+    merged = building_attributes.add_demographics(bldg_gdf, demographics)
+    merged.to_file(paths["buildings_attributes"], driver="GeoJSON")
+    return [paths["buildings_attributes"]]
+
+# --- 3. Envelope/U-value ---
+def stage_envelope_and_uvalue(config, ctx):
+    import geopandas as gpd
+    paths = _paths(config)
+    bldg_gdf = gpd.read_file(paths["buildings_attributes"])
+    bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
+    bldg_gdf = envelope_and_uvalue.assign_renovation_state(bldg_gdf)
+    bldg_gdf = envelope_and_uvalue.calculate_uvalues(bldg_gdf)
+    bldg_gdf = envelope_and_uvalue.compute_building_envelope(bldg_gdf)
+    bldg_gdf.to_file(paths["buildings_envelope"], driver="GeoJSON")
+    return [paths["buildings_envelope"]]
+
+# --- 4. Demand Calculation ---
+def stage_demand_calculation(config, ctx):
+    import geopandas as gpd
+    paths = _paths(config)
+    bldg_gdf = gpd.read_file(paths["buildings_envelope"])
+    bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
+    bldg_gdf = demand_calculation.calculate_heating_load(bldg_gdf, config.get("weather_file"))
+    bldg_gdf = demand_calculation.calculate_annual_heat_demand(bldg_gdf, config.get("weather_file"))
+    bldg_gdf.to_file(paths["buildings_demand"], driver="GeoJSON")
+    return [paths["buildings_demand"]]
+
+# --- 5. Load Profile Generation ---
+def stage_profile_generation(config, ctx):
+    import geopandas as gpd
+    paths = _paths(config)
+    bldg_gdf = gpd.read_file(paths["buildings_demand"])
+    bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
+    profile_type = config.get("profile_type", "H0")
+    profiles = profile_generation.generate_electric_load_profiles(bldg_gdf, profile_type)
+    with open(paths["profiles"], "w", encoding="utf-8") as f:
+        json.dump(profiles, f, indent=2)
+    return [paths["profiles"]]
+
+# --- 6. Network Construction ---
+def stage_network_construction(config, ctx):
+    import geopandas as gpd
+    import pickle
+    paths = _paths(config)
+    bldg_gdf = gpd.read_file(paths["buildings_demand"])
+    bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
+    edges = gpd.read_file(paths["streets"])
+    nodes = gpd.read_file(paths["nodes"])
+    G = network_construction.create_network_graph(bldg_gdf, edges, nodes, output_graphml=paths["graphml"])
+    with open(paths["gpickle"], "wb") as f:
+        pickle.dump(G, f)
+    return [paths["graphml"], paths["gpickle"]]
+
+# --- 7. Scenario Generation ---
+def stage_scenario_manager(config, ctx):
+    import geopandas as gpd
+    paths = _paths(config)
+    bldg_gdf = gpd.read_file(paths["buildings_demand"])
+    bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
+    return scenario_manager.generate_scenarios(
+        buildings=bldg_gdf,
+        network=paths["graphml"],
+        config=load_config(config["scenario_config_file"])
+    )
+
+# --- 8. Simulation Runner ---
+def stage_simulation_runner(config, ctx):
+    scenario_files = ctx["outputs"]["scenario_manager"]
+    settings = {k: config[k] for k in simulation_runner.DEFAULT_SETTINGS if k in config}
+    results = simulation_runner.run_simulation_scenarios(
+        scenario_files,
+        processes=config.get("simulation_processes"),
+        settings=settings,
+        resume=config.get("simulation_resume", False),
+    )
+    return [
+        str(simulation_runner.RESULTS_DIR / f"{res['scenario']}_results.json")
+        for res in results if res.get("scenario")
+    ]
+
+# --- 9. KPI Calculator ---
+def stage_kpi_calculator(config, ctx):
+    paths = _paths(config)
+    results = []
+    for rf in ctx["outputs"]["simulation_runner"]:
+        if not os.path.exists(rf):
+            continue
+        with open(rf, "r", encoding="utf-8") as f:
+            results.append(json.load(f))
+    kpi_df = kpi_calculator.compute_kpis(
+        sim_results=results,
+        cost_params=config.get("cost_params"),
+        emissions_factors=config.get("emissions_factors"),
+    )
+    kpi_df.to_csv(paths["kpi_csv"], index=False)
+    kpi_df.to_json(paths["kpi_json"], orient="records", indent=2)
+    return [paths["kpi_csv"], paths["kpi_json"]]
+
+# --- 9b. KPI Sensitivity (Monte Carlo bands) ---
+def stage_kpi_sensitivity(config, ctx):
+    paths = _paths(config)
+    results = []
+    for rf in ctx["outputs"]["simulation_runner"]:
+        if not os.path.exists(rf):
+            continue
+        with open(rf, "r", encoding="utf-8") as f:
+            results.append(json.load(f))
+    bands_df = kpi_sensitivity.kpi_bands(
+        sim_results=results,
+        uncertainty=config.get("kpi_uncertainty"),
+        n_draws=config.get("kpi_draws", 100_000),
+        seed=config.get("kpi_seed", 0),
+    )
+    bands_df.to_csv(paths["kpi_bands_csv"], index=False)
+    return [paths["kpi_bands_csv"]]
+
+# --- 10. LLM Reporter ---
+def stage_llm_reporter(config, ctx):
+    paths = _paths(config)
+    api_key = config.get("openai_api_key") or os.environ.get("OPENAI_API_KEY")
+    llm_reporter.main([
+        "--kpis", paths["kpi_csv"],
+        "--scenarios", config.get("scenario_config_file", ""),
+        "--output", paths["llm_report"],
+        "--model", config.get("llm_model", "gpt-4o"),
+        "--api_key", api_key or "",
+    ])
+    return [paths["llm_report"]]
+
+def build_stages():
+    """The pipeline as a stage DAG; see src/pipeline_stages.py for how stages are fingerprinted."""
+    return [
+        Stage("data_preparation", stage_data_preparation,
+              inputs=lambda c: [c.get("buildings_file"), c.get("osm_file")],
+              params=_test_mode_params, code=[data_preparation],
+              flag="run_data_preparation", description="Step 1: Data Preparation"),
+        Stage("building_attributes", stage_building_attributes, deps=["data_preparation"],
+              inputs=lambda c: [c.get("demographics_file")],
+              params=_test_mode_params, code=[building_attributes],
+              flag="run_building_attributes", description="Step 2: Add Building Demographics",
+              default_outputs=lambda c: [_paths(c)["buildings_attributes"]]),
+        Stage("envelope_and_uvalue", stage_envelope_and_uvalue, deps=["building_attributes"],
+              params=_test_mode_params, code=[envelope_and_uvalue],
+              flag="run_envelope_and_uvalue", description="Step 3: Calculate U-values/Envelope",
+              default_outputs=lambda c: [_paths(c)["buildings_envelope"]]),
+        Stage("demand_calculation", stage_demand_calculation, deps=["envelope_and_uvalue"],
+              inputs=lambda c: [c.get("weather_file")],
+              params=_test_mode_params, code=[demand_calculation, heat_demand, weather],
+              flag="run_demand_calculation", description="Step 4: Heating Demand Calculation",
+              default_outputs=lambda c: [_paths(c)["buildings_demand"]]),
+        Stage("profile_generation", stage_profile_generation, deps=["demand_calculation"],
+              params=lambda c: {**_test_mode_params(c), "profile_type": c.get("profile_type", "H0")},
+              code=[profile_generation],
+              flag="run_profile_generation", description="Step 5: Load Profile Generation",
+              default_outputs=lambda c: [_paths(c)["profiles"]]),
+        Stage("network_construction", stage_network_construction,
+              deps=["data_preparation", "demand_calculation"],
+              params=_test_mode_params, code=[network_construction],
+              flag="run_network_construction", description="Step 6: Network Construction",
+              default_outputs=lambda c: [_paths(c)["graphml"], _paths(c)["gpickle"]]),
+        Stage("scenario_manager", stage_scenario_manager,
+              deps=["demand_calculation", "network_construction"],
+              inputs=lambda c: [c.get("scenario_config_file")],
+              params=_test_mode_params, code=[scenario_manager],
+              flag="run_scenario_manager", description="Step 7: Scenario Manager",
+              default_outputs=lambda c: c.get("scenario_files", [])),
+        Stage("simulation_runner", stage_simulation_runner, deps=["scenario_manager"],
+              inputs=lambda c: [_simulation_settings(c)[k] for k in SIMULATION_INPUT_SETTINGS],
+              params=_simulation_params,
+              code=[simulation_runner, heat_demand, heat_pump_cop, representative_days, weather, profile_store,
+                    *SIMULATION_ENGINE_CODE],
+              flag="run_simulation_runner", description="Step 8: Simulation Runner",
+              default_outputs=lambda c: c.get("simulation_results_files", [])),
+        Stage("kpi_calculator", stage_kpi_calculator, deps=["simulation_runner"],
+              params=lambda c: {"cost_params": c.get("cost_params"),
+                                "emissions_factors": c.get("emissions_factors")},
+              code=[kpi_calculator],
+              flag="run_kpi_calculator", description="Step 9: KPI Calculator",
+              default_outputs=lambda c: [_paths(c)["kpi_csv"], _paths(c)["kpi_json"]]),
+        Stage("kpi_sensitivity", stage_kpi_sensitivity, deps=["simulation_runner"],
+              params=lambda c: {"kpi_uncertainty": c.get("kpi_uncertainty"),
+                                "kpi_draws": c.get("kpi_draws", 100_000),
+                                "kpi_seed": c.get("kpi_seed", 0)},
+              code=[kpi_sensitivity],
+              flag="run_kpi_sensitivity", description="Step 9b: KPI Sensitivity (Monte Carlo)",
+              default_outputs=lambda c: [_paths(c)["kpi_bands_csv"]]),
+        Stage("llm_reporter", stage_llm_reporter, deps=["kpi_calculator"],
+              inputs=lambda c: [c.get("scenario_config_file")],
+              params=lambda c: {"llm_model": c.get("llm_model", "gpt-4o")},
+              code=[llm_reporter],
+              flag="run_llm_reporter", description="Step 10: LLM Reporter"),
+    ]
+
+def run_pipeline(config_file, dry_run=False, force=None):
+    """
+    Run the pipeline incrementally: only stages whose inputs, parameters,
+    code or upstream stages changed are executed. A run_* flag set to false
+    still disables its stage; `force` lists stages (or "all") to re-run.
+    """
     config = load_config(config_file)
 
     # --- Set up output directory ---
     output_dir = config.get("output_dir", "results/")
     os.makedirs(output_dir, exist_ok=True)
 
-    # --- 1. Data Preparation ---
-    if config.get("run_data_preparation", True):
-        print("\n[Step 1] Data Preparation")
-        bldg_gdf = data_preparation.load_buildings(config["buildings_file"])
-        bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
-        G, edges, nodes = data_preparation.load_osm_streets(config["osm_file"])
-        bldg_gdf = data_preparation.preprocess_building_geometries(bldg_gdf)
-        bldg_prep_file = os.path.join(output_dir, "buildings_prepared.geojson")
-        edges_file = os.path.join(output_dir, "streets.geojson")
-        nodes_file = os.path.join(output_dir, "nodes.geojson")
-        bldg_gdf.to_file(bldg_prep_file, driver="GeoJSON")
-        edges.to_file(edges_file, driver="GeoJSON")
-        nodes.to_file(nodes_file, driver="GeoJSON")
-    else:
-        bldg_prep_file = os.path.join(output_dir, "buildings_prepared.geojson")
-        edges_file = os.path.join(output_dir, "streets.geojson")
-        nodes_file = os.path.join(output_dir, "nodes.geojson")
-
-    # --- 2. Merge Demographics/Attributes ---
-    if config.get("run_building_attributes", True):
-        print("\n[Step 2] Add Building Demographics")
-        import geopandas as gpd
-        bldg_gdf = gpd.read_file(bldg_prep_file)
-        bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
-        with open(config["demographics_file"], "r", encoding="utf-8") as f:
-            demographics = json.load(f)
-        merged = building_attributes.add_demographics(bldg_gdf, demographics)
-        bldg_attr_file = os.path.join(output_dir, "buildings_with_demographics.geojson")
-        merged.to_file(bldg_attr_file, driver="GeoJSON")
-    else:
-        bldg_attr_file = os.path.join(output_dir, "buildings_with_demographics.geojson")
-
-    # --- 3. Envelope/U-value ---
-    if config.get("run_envelope_and_uvalue", True):
-        print("\n[Step 3] Calculate U-values/Envelope")
-        import geopandas as gpd
-        bldg_gdf = gpd.read_file(bldg_attr_file)
-        bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
-        bldg_gdf = envelope_and_uvalue.assign_renovation_state(bldg_gdf)
-        bldg_gdf = envelope_and_uvalue.calculate_uvalues(bldg_gdf)
-        bldg_gdf = envelope_and_uvalue.compute_building_envelope(bldg_gdf)
-        bldg_env_file = os.path.join(output_dir, "buildings_with_envelope.geojson")
-        bldg_gdf.to_file(bldg_env_file, driver="GeoJSON")
-    else:
-        bldg_env_file = os.path.join(output_dir, "buildings_with_envelope.geojson")
-
-    # --- 4. Demand Calculation ---
-    if config.get("run_demand_calculation", True):
-        print("\n[Step 4] Heating Demand Calculation")
-        import geopandas as gpd
-        bldg_gdf = gpd.read_file(bldg_env_file)
-        bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
-        bldg_gdf = demand_calculation.calculate_heating_load(bldg_gdf)
-        bldg_gdf = demand_calculation.calculate_annual_heat_demand(bldg_gdf)
-        bldg_demand_file = os.path.join(output_dir, "buildings_with_demand.geojson")
-        bldg_gdf.to_file(bldg_demand_file, driver="GeoJSON")
-    else:
-        bldg_demand_file = os.path.join(output_dir, "buildings_with_demand.geojson")
-
-    # --- 5. Load Profile Generation ---
-    if config.get("run_profile_generation", True):
-        print("\n[Step 5] Load Profile Generation")
-        import geopandas as gpd
-        bldg_gdf = gpd.read_file(bldg_demand_file)
-        bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
-        profile_type = config.get("profile_type", "H0")
-        profiles = profile_generation.generate_electric_load_profiles(bldg_gdf, profile_type)
-        output_profiles_file = os.path.join(output_dir, "building_load_profiles.json")
-        with open(output_profiles_file, "w", encoding="utf-8") as f:
-            json.dump(profiles, f, indent=2)
-    else:
-        output_profiles_file = os.path.join(output_dir, "building_load_profiles.json")
-
-    # --- 6. Network Construction ---
-    if config.get("run_network_construction", True):
-        print("\n[Step 6] Network Construction")
-        import geopandas as gpd
-        bldg_gdf = gpd.read_file(bldg_demand_file)
-        bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
-        edges = gpd.read_file(edges_file)
-        nodes = gpd.read_file(nodes_file)
-        graphml_file = os.path.join(output_dir, "branitz_network.graphml")
-        gpickle_file = os.path.join(output_dir, "branitz_network.gpickle")
-        G = network_construction.create_network_graph(bldg_gdf, edges, nodes, output_graphml=graphml_file)
-        import pickle
-        with open(gpickle_file, "wb") as f:
-            pickle.dump(G, f)
-    else:
-        graphml_file = os.path.join(output_dir, "branitz_network.graphml")
-        gpickle_file = os.path.join(output_dir, "branitz_network.gpickle")
-
-    # --- 7. Scenario Generation ---
-    if config.get("run_scenario_manager", True):
-        print("\n[Step 7] Scenario Manager")
-        import geopandas as gpd
-        bldg_gdf = gpd.read_file(bldg_demand_file)
-        bldg_gdf = filter_buildings_for_test_mode(bldg_gdf, config)
-        scenario_config_file = config["scenario_config_file"]
-        scenario_files = scenario_manager.generate_scenarios(
-            buildings=bldg_gdf,
-            network=graphml_file,
-            config=load_config(scenario_config_file)
-        )
-    else:
-        scenario_files = config.get("scenario_files", [])
-
-    # --- 8. Simulation Runner ---
-    if config.get("run_simulation_runner", True):
-        print("\n[Step 8] Simulation Runner")
-        results = simulation_runner.run_simulation_scenarios(scenario_files)
-    else:
-        results = []
-        for rf in config.get("simulation_results_files", []):
-            with open(rf, "r", encoding="utf-8") as f:
-                results.append(json.load(f))
-
-    # --- 9. KPI Calculator ---
-    if config.get("run_kpi_calculator", True):
-        print("\n[Step 9] KPI Calculator")
-        kpi_output_csv = os.path.join(output_dir, "scenario_kpis.csv")
-        kpi_output_json = os.path.join(output_dir, "scenario_kpis.json")
-        kpi_df = kpi_calculator.compute_kpis(
-            sim_results=results,
-            cost_params=config.get("cost_params"),
-            emissions_factors=config.get("emissions_factors"),
-        )
-        kpi_df.to_csv(kpi_output_csv, index=False)
-        kpi_df.to_json(kpi_output_json, orient="records", indent=2)
-    else:
-        kpi_output_csv = os.path.join(output_dir, "scenario_kpis.csv")
-        kpi_output_json = os.path.join(output_dir, "scenario_kpis.json")
-
-    # --- 10. LLM Reporter ---
-    if config.get("run_llm_reporter", True):
-        print("\n[Step 10] LLM Reporter")
-        scenarios_file = config.get("scenario_config_file", "")
-        output_report = os.path.join(output_dir, "llm_report.md")
-        llm_model = config.get("llm_model", "gpt-4o")
-        api_key = config.get("openai_api_key") or os.environ.get("OPENAI_API_KEY")
-        llm_reporter.main([
-            "--kpis", kpi_output_csv,
-            "--scenarios", scenarios_file,
-            "--output", output_report,
-            "--model", llm_model,
-            "--api_key", api_key or "",
-        ])
-
-    print("\nPipeline complete!")
+    run_stages(build_stages(), config, output_dir, dry_run=dry_run, force=force)
+
+    if not dry_run:
+        print("\nPipeline complete!")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the full Branitz energy decision AI pipeline.")
     parser.add_argument("--config", required=True, help="YAML or JSON config file for the full pipeline")
+    parser.add_argument("--dry-run", action="store_true", help="Only show which stages would execute")
+    parser.add_argument("--force", nargs="*", default=None,
+                        help="Stages to re-run regardless of fingerprints ('all' for every stage)")
     args = parser.parse_args()
-    run_pipeline(args.config)
+    run_pipeline(args.config, dry_run=args.dry_run, force=args.force)
@@ -0,0 +1,115 @@
+# profile_startup.py
+"""
+Startup import profiler for the agent system.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+summarizes the result: total import time, the slowest top-level packages
+and which heavy scientific packages were imported eagerly. With --budget_ms
+the script exits non-zero when the startup time exceeds the budget, so it
+can be used as a benchmark target.
+
+Usage:
+    python profile_startup.py
+    python profile_startup.py --module simple_enhanced_tools --top 15 --budget_ms 1500
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+DEFAULT_MODULES = ["run_simple_enhanced_system", "simple_enhanced_tools", "enhanced_energy_tools", "tools"]
+HEAVY_PACKAGES = ["geopandas", "matplotlib", "folium", "networkx", "scipy", "pyproj", "shapely",
+                  "pandas", "numpy", "pandapower", "pandapipes", "openai"]
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_import(module, python=sys.executable, cwd=None):
+    """Import `module` under -X importtime; returns a list of (self_us, cumulative_us, depth, name)."""
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd or Path(__file__).parent, capture_output=True, text=True,
+    )
+    records = []
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            records.append((int(self_us), int(cumulative_us), (len(indent) - 1) // 2, name))
+    if proc.returncode != 0:
+        error = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"import {module} failed:\n" + "\n".join(error[-10:]))
+    return records
+
+
+def summarize(module, records, top=10):
+    """Total time, slowest top-level imports and eagerly imported heavy packages."""
+    top_level = [r for r in records if r[2] == 0]
+    total_us = sum(r[1] for r in top_level)
+    loaded = {r[3].split(".")[0] for r in records}
+    heavy = {}
+    for pkg in HEAVY_PACKAGES:
+        if pkg in loaded:
+            # Cumulative time of the outermost import of the package
+            heavy[pkg] = round(max(r[1] for r in records if r[3].split(".")[0] == pkg) / 1000, 1)
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 1),
+        "modules_imported": len(records),
+        "slowest": [
+            {"name": r[3], "cumulative_ms": round(r[1] / 1000, 1)}
+            for r in sorted(top_level, key=lambda r: r[1], reverse=True)[:top]
+        ],
+        "heavy_packages_ms": heavy,
+    }
+
+
+def print_report(summary):
+    print(f"\n📦 import {summary['module']}: {summary['total_ms']:.0f} ms "
+          f"({summary['modules_imported']} modules)")
+    for item in summary["slowest"]:
+        print(f"   {item['cumulative_ms']:>9.1f} ms  {item['name']}")
+    if summary["heavy_packages_ms"]:
+        heavy = ", ".join(f"{k} ({v:.0f} ms)" for k, v in summary["heavy_packages_ms"].items())
+        print(f"   ⚠️ Heavy packages imported at startup: {heavy}")
+    else:
+        print("   ✅ No heavy packages imported at startup")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize `python -X importtime` for the agent entry points.")
+    parser.add_argument("--module", action="append", help="Module to import (repeatable, default: agent entry points)")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest top-level imports to list")
+    parser.add_argument("--budget_ms", type=float, default=None, help="Fail if any module takes longer to import")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the summaries to this JSON file")
+    args = parser.parse_args()
+
+    summaries = []
+    for module in args.module or DEFAULT_MODULES:
+        try:
+            summary = summarize(module, profile_import(module), args.top)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            summaries.append({"module": module, "error": str(e)})
+            continue
+        print_report(summary)
+        summaries.append(summary)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, indent=2)
+        print(f"\n✅ Startup profile saved to {args.json_path}")
+
+    if args.budget_ms is not None:
+        over = [s for s in summaries if "error" in s or s["total_ms"] > args.budget_ms]
+        if over:
+            print(f"\n❌ Over the {args.budget_ms:.0f} ms startup budget: {', '.join(s['module'] for s in over)}")
+            sys.exit(1)
+        print(f"\n✅ All modules within the {args.budget_ms:.0f} ms startup budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,41 +5,57 @@ import subprocess
 import sys
 import yaml
 from adk.api.tool import tool
-import geopandas as gpd
-import matplotlib.pyplot as plt
-from shapely.ops import nearest_points
-from shapely.geometry import LineString, Point
-import networkx as nx
-from scipy.spatial import distance_matrix
-import pandas as pd
+from tools.result_cache import (
+    cached_analysis, HP_INPUT_FILES, DH_INPUT_FILES, HP_CODE_FILES, DH_CODE_FILES, KPI_CODE_FILES
+)
+from street_final_copy_3.geojson_stream import get_street_names, get_building_ids
+from tools.analysis_tools import run_hp_and_dh_parallel
 import glob
-import numpy as np
-import folium
+import importlib
 from pathlib import Path
-from pyproj import Transformer
 import random
 import time
-from shapely.strtree import STRtree
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from tools.lazy_imports import lazy_import, module_available
+
+# Heavy dependencies are imported on first use inside the tool bodies
+gpd = lazy_import("geopandas")
+plt = lazy_import("matplotlib.pyplot")
+nx = lazy_import("networkx")
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+folium = lazy_import("folium")
+
 # This file contains simplified enhanced functions that our agents can use as tools.
 
 # Import modules from street_final_copy_3 for real map generation
 STREET_FINAL_AVAILABLE = False
 
-# Import KPI calculator and LLM reporter modules
-KPI_AND_LLM_AVAILABLE = False
-try:
-    sys.path.append(str(Path(__file__).parent / "src"))
-    from kpi_calculator import compute_kpis, DEFAULT_COST_PARAMS, DEFAULT_EMISSIONS
-    from llm_reporter import create_llm_report
-    KPI_AND_LLM_AVAILABLE = True
-    print("✅ KPI calculator and LLM reporter modules loaded successfully")
-except ImportError as e:
-    print(f"⚠️ Warning: Could not import kpi_calculator or llm_reporter: {e}")
-    KPI_AND_LLM_AVAILABLE = False
+# KPI calculator and LLM reporter modules (imported when a KPI/LLM tool runs)
+sys.path.append(str(Path(__file__).parent / "src"))
+KPI_AND_LLM_AVAILABLE = module_available("kpi_calculator") and module_available("llm_reporter")
+kpi_calculator = lazy_import("kpi_calculator")
+llm_reporter = lazy_import("llm_reporter")
+if not KPI_AND_LLM_AVAILABLE:
+    print("⚠️ Warning: Could not find kpi_calculator or llm_reporter modules")
+
+def load_kpi_and_llm_modules():
+    """
+    Import kpi_calculator and llm_reporter on first use; returns availability.
+    find_spec only says the files exist, the import itself can still fail.
+    """
+    global KPI_AND_LLM_AVAILABLE
+    if KPI_AND_LLM_AVAILABLE:
+        try:
+            importlib.import_module("kpi_calculator")
+            importlib.import_module("llm_reporter")
+        except ImportError as e:
+            KPI_AND_LLM_AVAILABLE = False
+            print(f"⚠️ Warning: Could not import kpi_calculator or llm_reporter modules: {e}")
+    return KPI_AND_LLM_AVAILABLE
 
 def import_street_final_modules():
     """Import street_final_copy_3 modules when needed."""
@@ -56,6 +72,7 @@ def import_street_final_modules():
         )
         from street_final_copy_3.create_complete_dual_pipe_dh_network_improved import ImprovedDualPipeDHNetwork
         from street_final_copy_3.simulate_dual_pipe_dh_network_final import FinalDualPipeDHSimulation
+        from street_final_copy_3.shared_street_network import get_shared_street_network
         
         STREET_FINAL_AVAILABLE = True
         return {
@@ -68,7 +85,8 @@ def import_street_final_modules():
             'visualize': visualize,
             'create_hp_dashboard': create_hp_dashboard,
             'ImprovedDualPipeDHNetwork': ImprovedDualPipeDHNetwork,
-            'FinalDualPipeDHSimulation': FinalDualPipeDHSimulation
+            'FinalDualPipeDHSimulation': FinalDualPipeDHSimulation,
+            'get_shared_street_network': get_shared_street_network
         }
     except ImportError as e:
         print(f"Warning: Could not import street_final_copy_3 modules: {e}")
@@ -649,19 +667,10 @@ def get_all_street_names() -> list[str]:
     print(f"TOOL: Reading all street names from {full_data_geojson}...")
     
     try:
-        with open(full_data_geojson, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        sorted_streets = get_street_names(full_data_geojson)
     except FileNotFoundError:
         return ["Error: The main data file was not found at the specified path."]
 
-    street_names = set()
-    for feature in data["features"]:
-        for adr in feature.get("adressen", []):
-            street_val = adr.get("str")
-            if street_val:
-                street_names.add(street_val.strip())
-    
-    sorted_streets = sorted(list(street_names))
     print(f"TOOL: Found {len(sorted_streets)} unique streets.")
     return sorted_streets
 
@@ -678,26 +687,17 @@ def get_building_ids_for_street(street_name: str) -> list[str]:
     print(f"TOOL: Searching for buildings on '{street_name}' in {full_data_geojson}...")
     
     try:
-        with open(full_data_geojson, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        selected_ids = get_building_ids(full_data_geojson, [street_name])
     except FileNotFoundError:
         return ["Error: The main data file was not found at the specified path."]
-
-    street_set = {street_name.strip().lower()}
-    selected_ids = []
-    for feature in data["features"]:
-        for adr in feature.get("adressen", []):
-            street_val = adr.get("str")
-            if street_val and street_val.strip().lower() in street_set:
-                oi = feature.get("gebaeude", {}).get("oi")
-                if oi:
-                    selected_ids.append(oi)
-                break 
     
     print(f"TOOL: Found {len(selected_ids)} buildings.")
     return selected_ids
 
 @tool
+@cached_analysis("hp", input_files=HP_INPUT_FILES, code_files=HP_CODE_FILES,
+                 output_dirs=["results_test/hp_analysis"],
+                 metrics_fn=lambda result: extract_metrics_from_hp_result(result))
 def run_comprehensive_hp_analysis(street_name: str, scenario: str = "winter_werktag_abendspitze") -> str:
     """
     Runs comprehensive heat pump feasibility analysis for a specific street.
@@ -1096,6 +1096,9 @@ Buildings Analyzed: {len(street_buildings)}
         return f"Error in comprehensive HP analysis: {str(e)}"
 
 @tool
+@cached_analysis("dh", input_files=DH_INPUT_FILES, code_files=DH_CODE_FILES,
+                 output_dirs=["results_test/dh_analysis"],
+                 metrics_fn=lambda result: extract_metrics_from_dh_result(result))
 def run_comprehensive_dh_analysis(street_name: str) -> str:
     """
     Runs comprehensive district heating network analysis for a specific street.
@@ -1162,7 +1165,8 @@ def run_comprehensive_dh_analysis(street_name: str) -> str:
                 results_dir=str(output_dir),
                 load_profiles_file=load_profiles_file,
                 building_demands_file=building_demands_file,
-                buildings_file=buildings_file
+                buildings_file=buildings_file,
+                shared_network=modules['get_shared_street_network']()
             )
             
             # Set scenario for load profile analysis (same as HP analysis)
@@ -1485,6 +1489,10 @@ Buildings Analyzed: {network_stats.get('num_buildings', len(street_buildings))}
         return f"Error in comprehensive DH analysis: {str(e)}"
 
 @tool
+@cached_analysis("comparison", input_files=sorted(set(HP_INPUT_FILES + DH_INPUT_FILES)),
+                 code_files=HP_CODE_FILES + DH_CODE_FILES + KPI_CODE_FILES,
+                 output_dirs=["results_test/comparison_analysis", "results_test/kpi_analysis"],
+                 cost_params_fn=lambda: kpi_calculator.DEFAULT_COST_PARAMS if load_kpi_and_llm_modules() else None)
 def compare_comprehensive_scenarios(street_name: str, hp_scenario: str = "winter_werktag_abendspitze") -> str:
     """
     Runs comprehensive comparison of both HP and DH scenarios for a specific street.
@@ -1499,11 +1507,10 @@ def compare_comprehensive_scenarios(street_name: str, hp_scenario: str = "winter
     print(f"TOOL: Running comprehensive scenario comparison for '{street_name}'...")
     
     try:
-        # Run HP analysis
-        hp_result = run_comprehensive_hp_analysis.func(street_name, hp_scenario)
-        
-        # Run DH analysis
-        dh_result = run_comprehensive_dh_analysis.func(street_name)
+        # Run HP and DH analyses in parallel (both are served from the result cache when unchanged)
+        hp_result, dh_result = run_hp_and_dh_parallel(
+            street_name, hp_scenario, run_comprehensive_hp_analysis, run_comprehensive_dh_analysis
+        )
         
         # Extract key metrics for KPI calculation
         hp_metrics = extract_metrics_from_hp_result(hp_result)
@@ -1512,7 +1519,7 @@ def compare_comprehensive_scenarios(street_name: str, hp_scenario: str = "winter
         # Generate KPI analysis if modules are available
         kpi_analysis = ""
         llm_analysis = ""
-        if KPI_AND_LLM_AVAILABLE:
+        if load_kpi_and_llm_modules():
             print(f"TOOL: Generating KPI and LLM analysis for '{street_name}'...")
             kpi_result = generate_kpi_analysis(street_name, hp_metrics, dh_metrics)
             kpi_analysis = f"\n💰 ECONOMIC & ENVIRONMENTAL ANALYSIS:\n{kpi_result}"
@@ -1693,7 +1700,7 @@ def generate_comprehensive_kpi_report(street_name: str) -> str:
     """
     print(f"TOOL: Generating comprehensive KPI report for '{street_name}'...")
     
-    if not KPI_AND_LLM_AVAILABLE:
+    if not load_kpi_and_llm_modules():
         return "Error: KPI calculator module not available. Please ensure src/kpi_calculator.py is accessible."
     
     try:
@@ -1735,10 +1742,10 @@ def generate_comprehensive_kpi_report(street_name: str) -> str:
         sim_results.append(dh_result)
         
         # Calculate KPIs
-        kpi_df = compute_kpis(
+        kpi_df = kpi_calculator.compute_kpis(
             sim_results=sim_results,
-            cost_params=DEFAULT_COST_PARAMS,
-            emissions_factors=DEFAULT_EMISSIONS
+            cost_params=kpi_calculator.DEFAULT_COST_PARAMS,
+            emissions_factors=kpi_calculator.DEFAULT_EMISSIONS
         )
         
         # Save KPI results
@@ -1759,7 +1766,7 @@ def generate_comprehensive_kpi_report(street_name: str) -> str:
             "extra_prompt": "Focus on the economic and environmental trade-offs between heat pumps and district heating for this specific street."
         }
         
-        llm_report = create_llm_report(
+        llm_report = llm_reporter.create_llm_report(
             kpis=kpi_df.to_dict('records'),
             scenario_metadata=scenario_metadata,
             config=config,
@@ -1884,7 +1891,7 @@ def extract_metrics_from_dh_result(dh_result: str) -> dict:
 
 def generate_kpi_analysis(street_name: str, hp_metrics: dict, dh_metrics: dict) -> str:
     """Generate KPI analysis using the kpi_calculator module."""
-    if not KPI_AND_LLM_AVAILABLE:
+    if not load_kpi_and_llm_modules():
         return "KPI analysis not available - modules not loaded."
     
     try:
@@ -1910,10 +1917,10 @@ def generate_kpi_analysis(street_name: str, hp_metrics: dict, dh_metrics: dict)
         sim_results.append(dh_result)
         
         # Calculate KPIs
-        kpi_df = compute_kpis(
+        kpi_df = kpi_calculator.compute_kpis(
             sim_results=sim_results,
-            cost_params=DEFAULT_COST_PARAMS,
-            emissions_factors=DEFAULT_EMISSIONS
+            cost_params=kpi_calculator.DEFAULT_COST_PARAMS,
+            emissions_factors=kpi_calculator.DEFAULT_EMISSIONS
         )
         
         # Create summary
@@ -1954,7 +1961,7 @@ Street: {street_name}
 
 def generate_llm_analysis(street_name: str, hp_metrics: dict, dh_metrics: dict) -> str:
     """Generate LLM analysis using the llm_reporter module."""
-    if not KPI_AND_LLM_AVAILABLE:
+    if not load_kpi_and_llm_modules():
         return "LLM analysis not available - modules not loaded."
     
     try:
@@ -1992,7 +1999,7 @@ def generate_llm_analysis(street_name: str, hp_metrics: dict, dh_metrics: dict)
             "extra_prompt": f"Focus on the specific technical and economic trade-offs for {street_name}. Consider building density, infrastructure requirements, and local energy market conditions."
         }
         
-        llm_report = create_llm_report(
+        llm_report = llm_reporter.create_llm_report(
             kpis=kpi_data,
             scenario_metadata=scenario_metadata,
             config=config,
@@ -2020,7 +2027,7 @@ def create_enhanced_comparison_dashboard(street_name: str, hp_result: str, dh_re
     
     # Generate KPI data if available
     kpi_section = ""
-    if KPI_AND_LLM_AVAILABLE:
+    if load_kpi_and_llm_modules():
         try:
             # Prepare simulation results for KPI calculation
             sim_results = []
@@ -2044,10 +2051,10 @@ def create_enhanced_comparison_dashboard(street_name: str, hp_result: str, dh_re
             sim_results.append(dh_result_kpi)
             
             # Calculate KPIs
-            kpi_df = compute_kpis(
+            kpi_df = kpi_calculator.compute_kpis(
                 sim_results=sim_results,
-                cost_params=DEFAULT_COST_PARAMS,
-                emissions_factors=DEFAULT_EMISSIONS
+                cost_params=kpi_calculator.DEFAULT_COST_PARAMS,
+                emissions_factors=kpi_calculator.DEFAULT_EMISSIONS
             )
             
             # Create KPI section for HTML
@@ -14,6 +14,7 @@ from tools import (
     generate_comprehensive_kpi_report,
     analyze_kpi_report,
     list_available_results,
+    query_results_store,
     create_comparison_dashboard,
     create_enhanced_comparison_dashboard
 )
@@ -28,6 +29,7 @@ __all__ = [
     'generate_comprehensive_kpi_report',
     'analyze_kpi_report',
     'list_available_results',
+    'query_results_store',
     'create_comparison_dashboard',
     'create_enhanced_comparison_dashboard'
 ] 
\ No newline at end of file
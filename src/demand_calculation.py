@@ -6,6 +6,13 @@ from pathlib import Path
 import geopandas as gpd
 import pandas as pd
 
+try:
+    from .heat_demand import demand_summary, heat_demand_matrix
+    from .weather import get_weather
+except ImportError:
+    from heat_demand import demand_summary, heat_demand_matrix
+    from weather import get_weather
+
 # --- Degree day and temp constants (Berlin/Brandenburg) ---
 # You can expand these or load from config as needed
 T_INDOOR = 20        # [°C] Standard indoor setpoint
@@ -15,17 +22,20 @@ DEGREE_DAYS = 3000      # Heating degree days per year (can refine!)
 # Correction/efficiency factors
 SYSTEM_EFFICIENCY = 0.85    # Typical for heating system (85% efficient)
 
-def calculate_heating_load(buildings):
+def calculate_heating_load(buildings, weather_file=None):
     """
     Calculate design (peak) heating load per building using transmission (simplified DIN EN 12831).
     Adds 'heating_load_kw' column (kW).
     Q_dot = U_wall*A_wall + U_roof*A_roof + U_floor*A_floor + U_window*A_window) * dT
+    With a TRY weather_file the design outdoor temperature is taken from it
+    (weather.WeatherService.design_temperature) instead of T_OUTDOOR_DESIGN.
     """
     # For this, window area is assumed as a share of wall area if not present (commonly ~15-25%)
     WINDOW_SHARE = 0.2
+    t_design = get_weather(weather_file).design_temperature() if weather_file else T_OUTDOOR_DESIGN
 
     def calc_row(row):
-        dT = T_INDOOR - T_OUTDOOR_DESIGN
+        dT = T_INDOOR - t_design
         wall_A = row.get('wall_area', 0)
         roof_A = row.get('roof_area', 0)
         floor_A = row.get('floor_area', 0)
@@ -56,12 +66,21 @@ def calculate_heating_load(buildings):
     buildings['heating_load_kw'] = buildings.apply(calc_row, axis=1)
     return buildings
 
-def calculate_annual_heat_demand(buildings):
+def calculate_annual_heat_demand(buildings, weather_file=None):
     """
     Calculate annual heating demand per building [kWh/a] using degree days.
     Q_annual = (U_wall*A_wall + ...) * HDD * 24 / 1000 * correction
     Adds 'annual_heat_demand_kwh' column.
+    With a TRY weather_file the hourly heat balance of heat_demand.py is
+    summed instead (also adds 'peak_heat_demand_kw').
     """
+    if weather_file:
+        summary = demand_summary(heat_demand_matrix(buildings, weather_file))
+        annual = summary["annual_heat_demand_kwh"] / SYSTEM_EFFICIENCY
+        buildings['annual_heat_demand_kwh'] = annual.clip(min=5000)  # Minimum annual demand 5 MWh
+        buildings['peak_heat_demand_kw'] = summary["peak_heat_demand_kw"]
+        return buildings
+
     WINDOW_SHARE = 0.2
 
     def calc_annual(row):
@@ -98,6 +117,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Calculate design heating load and annual heat demand for each building.")
     parser.add_argument("--buildings", required=True, help="Path to buildings GeoJSON/JSON (with envelope + U-values)")
     parser.add_argument("--output", default="results/buildings_with_demand.geojson", help="Output path")
+    parser.add_argument("--weather", default=None, help="TRY .dat file for the design temperature and hourly heat balance (default: constants / degree days)")
     args = parser.parse_args()
 
     ext = Path(args.buildings).suffix.lower()
@@ -127,9 +147,9 @@ if __name__ == "__main__":
         exit(1)
 
     # Calculate design heating load
-    buildings = calculate_heating_load(buildings)
+    buildings = calculate_heating_load(buildings, args.weather)
     # Calculate annual heating demand
-    buildings = calculate_annual_heat_demand(buildings)
+    buildings = calculate_annual_heat_demand(buildings, args.weather)
 
     # Save results
     Path("results").mkdir(exist_ok=True)
@@ -0,0 +1,135 @@
+# src/heat_demand.py
+
+import argparse
+from pathlib import Path
+import numpy as np
+
+try:
+    from .weather import DEFAULT_TRY_FILE, get_weather, try_column
+except ImportError:
+    from weather import DEFAULT_TRY_FILE, get_weather, try_column
+
+# --- Hourly heat balance parameters (simplified DIN EN ISO 13790 / 12831) ---
+T_INDOOR = 20                 # [°C] indoor setpoint
+HEATING_LIMIT_C = 15          # [°C] no space heating at or above this outdoor temperature
+WINDOW_SHARE = 0.2            # window area as share of wall area if 'window_area' is missing
+STOREY_HEIGHT_M = 2.6         # gross floor area = volume / storey height
+AIR_CHANGE_RATE = 0.5         # [1/h] infiltration + ventilation
+AIR_HEAT_CAPACITY = 0.34      # [Wh/(m³K)]
+INTERNAL_GAINS_W_PER_M2 = 2.5 # [W/m²] of gross floor area (persons, appliances)
+SOLAR_G_VALUE = 0.6           # glazing total solar energy transmittance
+SOLAR_FRAME_SHADING = 0.5     # frame share and shading reduction combined
+VERTICAL_TO_HORIZONTAL = 0.5  # mean facade irradiance / global horizontal, all orientations
+
+DEFAULT_U_VALUES = {"u_wall": 1.3, "u_roof": 1.0, "u_floor": 1.0, "u_window": 2.8}
+
+def _column(buildings, name, default):
+    if name in buildings.columns:
+        return buildings[name].astype(float).fillna(default).to_numpy()
+    return np.full(len(buildings), float(default))
+
+def envelope_arrays(buildings):
+    """
+    Per-building arrays for the heat balance from the envelope columns
+    (wall/roof/floor/window areas, U-values, volume).
+    Returns dict with h_w_per_k (transmission + ventilation loss
+    coefficient), window_area_m2 and floor_area_m2 (gross).
+    """
+    wall = _column(buildings, "wall_area", 0.0)
+    window = _column(buildings, "window_area", np.nan)
+    window = np.where(np.isnan(window), wall * WINDOW_SHARE, window)
+    h_transmission = (
+        _column(buildings, "u_wall", DEFAULT_U_VALUES["u_wall"]) * (wall - window)
+        + _column(buildings, "u_roof", DEFAULT_U_VALUES["u_roof"]) * _column(buildings, "roof_area", 0.0)
+        + _column(buildings, "u_floor", DEFAULT_U_VALUES["u_floor"]) * _column(buildings, "floor_area", 0.0)
+        + _column(buildings, "u_window", DEFAULT_U_VALUES["u_window"]) * window
+    )
+    volume = _column(buildings, "volume", 0.0)
+    h_ventilation = AIR_HEAT_CAPACITY * AIR_CHANGE_RATE * volume
+    return {
+        "h_w_per_k": h_transmission + h_ventilation,
+        "window_area_m2": window,
+        "floor_area_m2": volume / STOREY_HEIGHT_M,
+    }
+
+def heat_demand_matrix(buildings, weather=DEFAULT_TRY_FILE, t_indoor=T_INDOOR, heating_limit=HEATING_LIMIT_C,
+                       dtype=np.float32):
+    """
+    Hourly space-heating demand [kW] of every building, shape
+    (n_buildings, 8760), computed in one broadcast:
+
+        Q = max(H * (T_in - T_out) - Q_internal - Q_solar, 0)
+
+    with H the transmission + ventilation loss coefficient, internal gains
+    proportional to floor area and solar gains through the windows from the
+    TRY global irradiance. Hours at or above the heating limit are zero.
+    weather: TRY file path, TRY variant name (weather.TRY_VARIANTS) or an
+    already loaded TRY array (weather.read_try).
+    """
+    if isinstance(weather, (str, Path)):
+        service = get_weather(weather)
+        t_out, irradiance = service.temperature, service.irradiance
+    else:
+        t_out = try_column(weather, "t")
+        irradiance = try_column(weather, "B") + try_column(weather, "D")
+    env = envelope_arrays(buildings)
+
+    # Coefficients in kW so the matrix is built in its output dtype; the
+    # in-place steps keep the peak memory at about two matrices
+    h_kw = (env["h_w_per_k"] / 1000.0).astype(dtype)
+    internal_kw = (env["floor_area_m2"] * INTERNAL_GAINS_W_PER_M2 / 1000.0).astype(dtype)
+    solar_aperture_kw = (env["window_area_m2"] * SOLAR_G_VALUE * SOLAR_FRAME_SHADING
+                         * VERTICAL_TO_HORIZONTAL / 1000.0).astype(dtype)
+
+    demand = h_kw[:, None] * (t_indoor - t_out).astype(dtype)[None, :]
+    demand -= internal_kw[:, None]
+    demand -= solar_aperture_kw[:, None] * irradiance.astype(dtype)[None, :]
+    np.maximum(demand, 0.0, out=demand)
+    demand[:, t_out >= heating_limit] = 0.0
+    return demand
+
+def demand_summary(matrix):
+    """Annual demand [kWh/a] and peak [kW] per building from the hourly matrix."""
+    return {
+        "annual_heat_demand_kwh": matrix.sum(axis=1, dtype=np.float64),
+        "peak_heat_demand_kw": matrix.max(axis=1),
+    }
+
+def building_ids(buildings):
+    """Building IDs in the convention of the DH/HP engines ('gebaeude', then 'id', then the index)."""
+    for col in ("gebaeude", "id"):
+        if col in buildings.columns:
+            return [str(v) for v in buildings[col]]
+    return [str(i) for i in buildings.index]
+
+def heat_demand_by_building(buildings, weather=DEFAULT_TRY_FILE, matrix=None):
+    """
+    {building_id: {"peak_heat_demand_kw", "annual_heat_demand_kwh"}} for the
+    DH network builder and the HP path.
+    """
+    matrix = heat_demand_matrix(buildings, weather) if matrix is None else matrix
+    summary = demand_summary(matrix)
+    return {
+        bid: {"peak_heat_demand_kw": float(peak), "annual_heat_demand_kwh": float(annual)}
+        for bid, peak, annual in zip(building_ids(buildings), summary["peak_heat_demand_kw"],
+                                     summary["annual_heat_demand_kwh"])
+    }
+
+if __name__ == "__main__":
+    import geopandas as gpd
+
+    parser = argparse.ArgumentParser(description="Hourly heat demand matrix (buildings x 8760) from TRY weather.")
+    parser.add_argument("--buildings", required=True, help="Buildings GeoJSON with envelope and U-value columns")
+    parser.add_argument("--weather", default=DEFAULT_TRY_FILE, help="TRY .dat file")
+    parser.add_argument("--output", default="results/heat_demand_matrix.npy", help="Output .npy (float32 kW)")
+    args = parser.parse_args()
+
+    buildings = gpd.read_file(args.buildings)
+    matrix = heat_demand_matrix(buildings, args.weather)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    np.save(args.output, matrix)
+    summary = demand_summary(matrix)
+    print(f"✅ Heat demand matrix {matrix.shape} written to {args.output}")
+    print(f"   Annual: {summary['annual_heat_demand_kwh'].sum() / 1000:.1f} MWh, "
+          f"coincident peak: {matrix.sum(axis=0).max():.1f} kW, "
+          f"sum of building peaks: {summary['peak_heat_demand_kw'].sum():.1f} kW")
@@ -0,0 +1,116 @@
+# src/heat_pump_cop.py
+
+import argparse
+import numpy as np
+
+try:
+    from .weather import DEFAULT_TRY_FILE, get_weather
+except ImportError:
+    from weather import DEFAULT_TRY_FILE, get_weather
+
+# --- Air-source heat pump defaults ---
+FLOW_TEMPERATURE_C = 55.0    # [°C] space-heating flow temperature at design conditions
+MIN_FLOW_TEMPERATURE_C = 30.0  # [°C] flow temperature at the heating limit (heating curve)
+CARNOT_EFFICIENCY = 0.45     # share of the Carnot COP reached by typical air/water units
+CONDENSER_APPROACH_K = 5.0   # refrigerant condenses above the flow temperature
+EVAPORATOR_APPROACH_K = 5.0  # and evaporates below the outdoor air temperature
+COP_MIN = 1.0                # backup heater limit
+COP_MAX = 7.0
+# Rating point of EN 14511 (outdoor air 2 °C, flow 35 °C) for rated COPs
+RATING_SOURCE_C = 2.0
+RATING_SINK_C = 35.0
+
+def carnot_cop(t_source_c, t_sink_c, efficiency=CARNOT_EFFICIENCY):
+    """
+    Carnot-fraction heating COP for source/sink temperatures [°C] (arrays
+    broadcast): efficiency * T_cond / (T_cond - T_evap), with the condenser
+    and evaporator approach temperatures applied, clipped to [COP_MIN, COP_MAX].
+    """
+    t_cond = np.asarray(t_sink_c, dtype=float) + CONDENSER_APPROACH_K + 273.15
+    t_evap = np.asarray(t_source_c, dtype=float) - EVAPORATOR_APPROACH_K + 273.15
+    lift = np.maximum(t_cond - t_evap, 1.0)
+    return np.clip(efficiency * t_cond / lift, COP_MIN, COP_MAX)
+
+def efficiency_from_rating(rated_cop, t_source_c=RATING_SOURCE_C, t_sink_c=RATING_SINK_C):
+    """Carnot efficiency that reproduces a manufacturer's rated COP (default A2/W35)."""
+    return float(rated_cop) / float(carnot_cop(t_source_c, t_sink_c, efficiency=1.0))
+
+def heating_curve(t_outdoor_c, flow_temperature_c=FLOW_TEMPERATURE_C, t_design_c=-12.0,
+                  t_limit_c=15.0, min_flow_temperature_c=MIN_FLOW_TEMPERATURE_C):
+    """
+    Weather-compensated flow temperature [°C]: linear from the design flow
+    temperature at t_design_c to min_flow_temperature_c at the heating limit.
+    """
+    share = np.clip((t_limit_c - np.asarray(t_outdoor_c, dtype=float)) / (t_limit_c - t_design_c), 0.0, 1.0)
+    return min_flow_temperature_c + share * (flow_temperature_c - min_flow_temperature_c)
+
+def curve_cop(t_outdoor_c, curve):
+    """
+    COP from a manufacturer curve {outdoor temperature [°C]: COP} (one flow
+    temperature), interpolated linearly and held constant outside the range.
+    """
+    points = sorted((float(t), float(c)) for t, c in curve.items())
+    return np.interp(np.asarray(t_outdoor_c, dtype=float), [p[0] for p in points], [p[1] for p in points])
+
+def hourly_cop(t_outdoor_c, flow_temperature_c=FLOW_TEMPERATURE_C, efficiency=CARNOT_EFFICIENCY,
+               weather_compensated=True, t_design_c=-12.0, curve=None):
+    """
+    Hourly COP series for an outdoor temperature series. With a manufacturer
+    curve the COP is interpolated from it; otherwise the Carnot-fraction model
+    is used with a fixed or weather-compensated flow temperature.
+    """
+    if curve:
+        return curve_cop(t_outdoor_c, curve)
+    t_sink = heating_curve(t_outdoor_c, flow_temperature_c, t_design_c) if weather_compensated else flow_temperature_c
+    return carnot_cop(t_outdoor_c, t_sink, efficiency)
+
+def electric_load_matrix(heat_matrix, cop):
+    """
+    Electric load of the heat pumps [kW], same shape and dtype as the heat
+    matrix (buildings x hours): heat divided by the hourly COP in one step.
+    """
+    heat_matrix = np.asarray(heat_matrix)
+    return heat_matrix / np.asarray(cop, dtype=heat_matrix.dtype)[None, :]
+
+def seasonal_cop(heat_matrix, electric_matrix):
+    """Seasonal COP (SCOP): annual heat over annual electricity."""
+    electricity = float(np.sum(electric_matrix, dtype=np.float64))
+    return float(np.sum(heat_matrix, dtype=np.float64)) / electricity if electricity > 0 else float("nan")
+
+def design_cop(weather, params):
+    """COP of a scenario at the design outdoor temperature (peak conditions)."""
+    return float(scenario_cop(weather, params, np.array([weather.design_temperature()]))[0])
+
+def scenario_cop(weather, params, t_outdoor_c=None):
+    """
+    Hourly COP for an HP scenario (or for t_outdoor_c instead of the TRY
+    series). params: flow_temp (design flow temperature), cop (rated COP at
+    A2/W35, scales the Carnot efficiency), cop_curve ({outdoor °C: COP}) and
+    weather_compensated (default True).
+    """
+    efficiency = efficiency_from_rating(params["cop"]) if params.get("cop") else CARNOT_EFFICIENCY
+    return hourly_cop(
+        weather.temperature if t_outdoor_c is None else t_outdoor_c,
+        flow_temperature_c=float(params.get("flow_temp", FLOW_TEMPERATURE_C)),
+        efficiency=efficiency,
+        weather_compensated=params.get("weather_compensated", True),
+        t_design_c=weather.design_temperature(),
+        curve=params.get("cop_curve"),
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hourly heat pump COP from TRY outdoor temperatures.")
+    parser.add_argument("--weather", default=DEFAULT_TRY_FILE, help="TRY .dat file or variant name")
+    parser.add_argument("--flow_temp", type=float, default=FLOW_TEMPERATURE_C, help="Design flow temperature [°C]")
+    parser.add_argument("--rated_cop", type=float, default=None, help="Rated COP at A2/W35")
+    parser.add_argument("--fixed_flow", action="store_true", help="No weather compensation of the flow temperature")
+    args = parser.parse_args()
+
+    weather = get_weather(args.weather)
+    params = {"flow_temp": args.flow_temp, "cop": args.rated_cop, "weather_compensated": not args.fixed_flow}
+    cop = scenario_cop(weather, params)
+    # Heating-hour weighted SCOP with a degree-hour demand shape
+    demand = np.maximum(15.0 - weather.temperature, 0.0)[None, :]
+    print(f"✅ {args.weather}: COP {cop.min():.2f} .. {cop.max():.2f}, "
+          f"{design_cop(weather, params):.2f} at {weather.design_temperature():.1f} °C, "
+          f"SCOP {seasonal_cop(demand, electric_load_matrix(demand, cop)):.2f}")
@@ -90,7 +90,10 @@ def compute_kpis(sim_results, cost_params=None, emissions_factors=None):
         elif res.get("type") == "HP":
             # Heat Pump (pandapower)
             hp_energy_mwh = res['kpi'].get("total_heat_supplied_mwh", 1200)
-            hp_elec_kwh = hp_energy_mwh * 1000 / cost_params["heat_pump_cop"]
+            # Hourly COP model results carry the electricity directly (SCOP as cop)
+            cop = res['kpi'].get("cop") or cost_params["heat_pump_cop"]
+            hp_elec_kwh = (res['kpi']["hp_electricity_mwh"] * 1000 if res['kpi'].get("hp_electricity_mwh")
+                           else hp_energy_mwh * 1000 / cop)
             capex = cost_params["capex_hp_eur"] * res['kpi'].get("n_heat_pumps", 100)
             opex = capex * cost_params["opex_factor"] * cost_params["project_lifetime"]
             energy_costs = hp_elec_kwh * cost_params["elec_price_eur_per_kwh"]
@@ -0,0 +1,188 @@
+# src/kpi_sensitivity.py
+
+import argparse
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+try:
+    from .kpi_calculator import DEFAULT_COST_PARAMS, DEFAULT_EMISSIONS
+except ImportError:
+    from kpi_calculator import DEFAULT_COST_PARAMS, DEFAULT_EMISSIONS
+
+# Uncertainty ranges around the defaults in kpi_calculator. Each entry is a
+# fixed number or {"dist": ..., ...}; supported: uniform (low, high),
+# triangular (low, mode, high), normal (mean, sd), lognormal (mean, sigma of
+# the underlying normal), choice (values, optional p).
+DEFAULT_UNCERTAINTY = {
+    "heat_pump_cop": {"dist": "triangular", "low": 2.8, "mode": 3.5, "high": 4.2},
+    "elec_price_eur_per_kwh": {"dist": "triangular", "low": 0.25, "mode": 0.35, "high": 0.50},
+    "biomass_price_eur_per_kwh": {"dist": "triangular", "low": 0.05, "mode": 0.07, "high": 0.10},
+    "capex_hp_eur": {"dist": "uniform", "low": 11000, "high": 18000},
+    "capex_dh_eur_per_meter": {"dist": "uniform", "low": 600, "high": 1100},
+    "opex_factor": {"dist": "uniform", "low": 0.005, "high": 0.02},
+    "discount_rate": {"dist": "uniform", "low": 0.02, "high": 0.07},
+    "project_lifetime": {"dist": "choice", "values": [15, 20, 25, 30]},
+    "grid_electricity_gco2_per_kwh": {"dist": "uniform", "low": 150, "high": 400},
+    "biomass_gco2_per_kwh": {"dist": "uniform", "low": 30, "high": 110},
+}
+
+DEFAULT_PERCENTILES = (5, 50, 95)
+
+def sample_parameters(uncertainty, n_draws, seed=None):
+    """
+    Draw n_draws samples of every cost/emission parameter.
+    Parameters missing from `uncertainty` are fixed at their defaults.
+    Returns {name: array of shape (n_draws,)}.
+    """
+    rng = np.random.default_rng(seed)
+    specs = {**DEFAULT_COST_PARAMS, **DEFAULT_EMISSIONS, **(uncertainty or {})}
+    draws = {}
+    for name, spec in specs.items():
+        if not isinstance(spec, dict):
+            draws[name] = np.full(n_draws, float(spec))
+            continue
+        dist = spec.get("dist", "uniform")
+        if dist == "uniform":
+            draws[name] = rng.uniform(spec["low"], spec["high"], n_draws)
+        elif dist == "triangular":
+            draws[name] = rng.triangular(spec["low"], spec["mode"], spec["high"], n_draws)
+        elif dist == "normal":
+            draws[name] = rng.normal(spec["mean"], spec["sd"], n_draws)
+        elif dist == "lognormal":
+            draws[name] = rng.lognormal(spec["mean"], spec["sigma"], n_draws)
+        elif dist == "choice":
+            draws[name] = rng.choice(np.asarray(spec["values"], dtype=float), n_draws, p=spec.get("p"))
+        else:
+            raise ValueError(f"Unknown distribution '{dist}' for parameter '{name}'")
+    return draws
+
+def scenario_table(sim_results):
+    """
+    Scenario inputs of compute_kpis as arrays (one entry per result), with the
+    same defaults for missing KPIs.
+    """
+    def kpi(res, key, default):
+        return (res.get("kpi") or {}).get(key, default)
+
+    types = [res.get("type", "") for res in sim_results]
+    ok = np.array([bool(res.get("success", False)) and t in ("DH", "HP") for res, t in zip(sim_results, types)],
+                  dtype=bool)
+    is_dh = np.array([t == "DH" for t in types], dtype=bool)
+    return {
+        "scenario": [res.get("scenario", "") for res in sim_results],
+        "type": types,
+        "valid": ok,
+        "is_dh": is_dh,
+        "heat_mwh": np.array([kpi(r, "total_heat_supplied_mwh", 0 if dh else 1200) for r, dh in zip(sim_results, is_dh)], dtype=float),
+        "pump_energy_kwh": np.array([kpi(r, "pump_energy_kwh", 0) for r in sim_results], dtype=float),
+        "network_length_m": np.array([kpi(r, "network_length_m", 3000) for r in sim_results], dtype=float),
+        "n_heat_pumps": np.array([kpi(r, "n_heat_pumps", 100) for r in sim_results], dtype=float),
+        # Scenario COP (parameter sweeps); NaN = use the sampled COP
+        "cop": np.array([kpi(r, "cop", None) or np.nan for r in sim_results], dtype=float),
+    }
+
+def annuity_factor(discount_rate, lifetime):
+    """Capital recovery factor, elementwise (falls back to 1/lifetime at a zero rate)."""
+    discount_rate = np.asarray(discount_rate, dtype=float)
+    lifetime = np.asarray(lifetime, dtype=float)
+    q_n = (1 + discount_rate) ** lifetime
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = q_n * discount_rate / (q_n - 1)
+    return np.where(discount_rate == 0, 1 / lifetime, factor)
+
+def compute_kpi_draws(sim_results, params):
+    """
+    LCoH (€/MWh) and CO₂ (t/a) for every parameter draw and scenario in one
+    broadcast: parameters are (n_draws, 1) columns against (1, n_scenarios)
+    rows. Uses the same cost model as kpi_calculator.compute_kpis.
+    Returns (lcoh, co2, table), both arrays of shape (n_draws, n_scenarios);
+    invalid scenarios are NaN.
+    """
+    table = scenario_table(sim_results)
+    p = {k: np.asarray(v, dtype=float)[:, None] for k, v in params.items()}
+    heat_mwh = table["heat_mwh"][None, :]
+    is_dh = table["is_dh"][None, :]
+
+    # District heating: network capex, biomass fuel, pump electricity
+    dh_capex = table["network_length_m"][None, :] * p["capex_dh_eur_per_meter"]
+    dh_energy_costs = heat_mwh * 1000 * p["biomass_price_eur_per_kwh"]
+    dh_co2 = (heat_mwh * 1000 * p["biomass_gco2_per_kwh"]
+              + table["pump_energy_kwh"][None, :] * p["grid_electricity_gco2_per_kwh"]) / 1e6
+
+    # Heat pumps: unit capex, electricity at the given COP
+    cop = np.where(np.isnan(table["cop"])[None, :], p["heat_pump_cop"], table["cop"][None, :])
+    hp_elec_kwh = heat_mwh * 1000 / cop
+    hp_capex = table["n_heat_pumps"][None, :] * p["capex_hp_eur"]
+    hp_energy_costs = hp_elec_kwh * p["elec_price_eur_per_kwh"]
+    hp_co2 = hp_elec_kwh * p["grid_electricity_gco2_per_kwh"] / 1e6
+
+    capex = np.where(is_dh, dh_capex, hp_capex)
+    opex = capex * p["opex_factor"] * p["project_lifetime"]
+    total_costs = capex + opex + np.where(is_dh, dh_energy_costs, hp_energy_costs)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lcoh = total_costs * annuity_factor(p["discount_rate"], p["project_lifetime"]) / heat_mwh
+    lcoh = np.where(heat_mwh == 0, np.inf, lcoh)
+    co2 = np.where(is_dh, dh_co2, hp_co2)
+
+    invalid = ~table["valid"][None, :]
+    lcoh = np.where(invalid, np.nan, lcoh)
+    co2 = np.where(invalid, np.nan, co2)
+    return lcoh, co2, table
+
+def kpi_bands(sim_results, uncertainty=None, n_draws=100_000, percentiles=DEFAULT_PERCENTILES, seed=0):
+    """
+    Monte Carlo percentile bands of LCoH and CO₂ per scenario.
+    Also reports how often each scenario has the lowest LCoH / CO₂ across
+    the valid scenarios (same draw = same prices for all scenarios).
+    Returns a DataFrame with one row per scenario (empty without scenarios).
+    """
+    q = np.asarray(percentiles, dtype=float)
+    if not sim_results:
+        columns = ["scenario", "type"]
+        for label in ("lcoh_eur_per_mwh", "co2_t_per_a"):
+            columns += [f"{label}_p{qi:g}" for qi in q] + [f"{label}_mean"]
+        return pd.DataFrame(columns=columns + ["n_draws"])
+    params = sample_parameters(DEFAULT_UNCERTAINTY if uncertainty is None else uncertainty, n_draws, seed)
+    lcoh, co2, table = compute_kpi_draws(sim_results, params)
+
+    bands = pd.DataFrame({"scenario": table["scenario"], "type": table["type"]})
+    valid = table["valid"]
+    for label, values in (("lcoh_eur_per_mwh", lcoh), ("co2_t_per_a", co2)):
+        pct = np.full((len(q), values.shape[1]), np.nan)
+        if valid.any():
+            pct[:, valid] = np.percentile(values[:, valid], q, axis=0)
+        for i, qi in enumerate(q):
+            bands[f"{label}_p{qi:g}"] = np.round(pct[i], 2)
+        bands[f"{label}_mean"] = np.round(np.where(valid, np.nanmean(np.where(valid, values, 0.0), axis=0), np.nan), 2)
+        if valid.sum() > 1:
+            best = np.argmin(np.where(valid, values, np.inf), axis=1)
+            share = np.bincount(best, minlength=values.shape[1]) / values.shape[0]
+            bands[f"p_lowest_{label.split('_')[0]}"] = np.where(valid, np.round(share, 4), np.nan)
+    bands["n_draws"] = n_draws
+    return bands
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo LCoH / CO₂ uncertainty bands for simulated scenarios.")
+    parser.add_argument("--results", nargs='+', required=True, help="List of simulation results JSON files")
+    parser.add_argument("--uncertainty", default=None, help="Parameter distributions JSON (default: built-in ranges)")
+    parser.add_argument("--draws", type=int, default=100_000, help="Number of Monte Carlo draws")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--percentiles", type=float, nargs="+", default=list(DEFAULT_PERCENTILES))
+    parser.add_argument("--output_csv", default="results/scenario_kpi_bands.csv", help="Bands output CSV")
+    args = parser.parse_args()
+
+    sim_results = []
+    for rf in args.results:
+        with open(rf, "r", encoding="utf-8") as f:
+            sim_results.append(json.load(f))
+    uncertainty = None
+    if args.uncertainty:
+        with open(args.uncertainty, "r", encoding="utf-8") as f:
+            uncertainty = json.load(f)
+
+    bands_df = kpi_bands(sim_results, uncertainty, args.draws, args.percentiles, args.seed)
+    Path(args.output_csv).parent.mkdir(parents=True, exist_ok=True)
+    bands_df.to_csv(args.output_csv, index=False)
+    print(f"KPI uncertainty bands ({args.draws} draws) written to {args.output_csv}")
@@ -11,6 +11,14 @@ try:
 except ImportError:
     openai = None
 
+# Process-wide client pool and on-disk response cache (see adk/api/llm.py)
+try:
+    from adk.api import llm as llm_pool
+    LLM_POOL_AVAILABLE = True
+except ImportError:
+    llm_pool = None
+    LLM_POOL_AVAILABLE = False
+
 #client = openai.OpenAI(api_key=openai_api_key)
 SYSTEM_PROMPT = (
     "You are EnergyGPT, an expert AI for municipal energy decision-making. "
@@ -19,24 +27,15 @@ SYSTEM_PROMPT = (
     "Give evidence-based, unbiased, and actionable advice based on the supplied KPI table and scenario information."
 )
 
-def create_llm_report(kpis, scenario_metadata, config, model="gpt-4o", openai_api_key=None):
+def create_llm_report(kpis, scenario_metadata, config, model="gpt-4o", openai_api_key=None, use_cache=True):
     """
     Generates an executive summary report via LLM (OpenAI API by default).
     kpis: DataFrame or list of dicts with KPIs per scenario
     scenario_metadata: dict/list with context about scenarios
     config: dict of extra context, user prompt, etc.
+    use_cache: reuse a cached report for an identical prompt (within the cache TTL).
     Returns report string.
     """
-    
-    import openai
-    if openai is None:
-        raise ImportError("openai Python module not found. Install with `pip install openai`.")
-
-    # --- Call the LLM API ---
-    if not openai_api_key:
-        import os
-        openai_api_key = os.environ.get("OPENAI_API_KEY")
-    client = openai.OpenAI(api_key=openai_api_key)
     # Assemble the prompt for the LLM
     table_md = pd.DataFrame(kpis).to_markdown(index=False)
     prompt = (
@@ -51,11 +50,18 @@ def create_llm_report(kpis, scenario_metadata, config, model="gpt-4o", openai_ap
         prompt += "\n" + config["extra_prompt"]
 
     # --- Call the LLM API ---
+    if not openai_api_key:
+        import os
+        openai_api_key = os.environ.get("OPENAI_API_KEY")
+
+    if LLM_POOL_AVAILABLE:
+        print("Sending prompt to LLM...")
+        return llm_pool.generate(prompt, model=model, backend="openai", system=SYSTEM_PROMPT,
+                                 api_key=openai_api_key, use_cache=use_cache)
+
     if openai is None:
         raise ImportError("openai Python module not found. Install with `pip install openai`.")
-
-    if openai_api_key:
-        openai.api_key = openai_api_key
+    client = openai.OpenAI(api_key=openai_api_key)
 
     print("Sending prompt to LLM...")
     response = client.chat.completions.create(
@@ -85,6 +91,7 @@ def main(args_list=None):
     parser.add_argument("--output", default="reports/llm_report.md", help="Output Markdown file")
     parser.add_argument("--model", default="gpt-4o", help="LLM model name (default: gpt-4o)")
     parser.add_argument("--api_key", default=None, help="OpenAI API key (or set OPENAI_API_KEY env var)")
+    parser.add_argument("--no_cache", action="store_true", help="Always query the LLM, ignoring cached reports")
     if args_list is None:
         args = parser.parse_args()
     else:
@@ -136,6 +143,7 @@ def main(args_list=None):
         config=config,
         model=args.model,
         openai_api_key=api_key,
+        use_cache=not args.no_cache,
     )
 
     # Save output as markdown
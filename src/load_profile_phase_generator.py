@@ -4,6 +4,7 @@ import multiprocessing as mp
 from functools import partial
 from tqdm import tqdm
 import json
+import numpy as np
 from datetime import datetime
 
 from constants import LoadProfileTypes, BUILDING_CODE_TO_PROFILE
@@ -14,6 +15,7 @@ from g0_to_g6_load_profile_generator import G0toG6LoadProfileGenerator
 from g5_load_profile_generator import G5LoadProfileGenerator
 from l0_load_profile_generator import L0LoadProfileGenerator
 from load_profile_phase_utils import TimeDefinitions, Phase, Season
+from profile_store import YEAR_STEPS, ProfileStoreWriter, store_path
 
 class ParallelLoadProfileGenerator:
     EXCLUDED_BUILDING_CODES = {
@@ -47,11 +49,21 @@ class ParallelLoadProfileGenerator:
 
         return True
 
-    def process_building(self, building_tuple: Tuple[str, Optional[Dict]]) -> Tuple[str, Optional[Dict]]:
+    @staticmethod
+    def phase_keys() -> List[str]:
+        """Die 60 Phasenschlüssel (Jahreszeit_Tagestyp_Phase) in Ausgabereihenfolge"""
+        return [
+            f"{season.de_name}_{de_day}_{phase.name}"
+            for season in TimeDefinitions.SEASONS
+            for de_day in TimeDefinitions.DAY_TYPES.values()
+            for phase in TimeDefinitions.PHASES
+        ]
+
+    def process_building(self, building_tuple: Tuple[str, Optional[Dict]]) -> Tuple[str, Optional[Dict], Optional[np.ndarray]]:
         building_id, building_data = building_tuple
 
         if not self.is_valid_building(building_id, building_data):
-            return building_id, None
+            return building_id, None, None
 
         try:
             building_code = building_data.get('Gebaeudecode')
@@ -98,11 +110,12 @@ class ParallelLoadProfileGenerator:
                             4
                         )
 
-            return building_id, result
+            # Viertelstundenprofil des ganzen Jahres für den Profilspeicher
+            return building_id, result, profile_df['power_kw'].to_numpy(dtype=np.float32)
 
         except Exception as e:
             print(f"Fehler bei Gebäude {building_id}: {str(e)}")
-            return building_id, None
+            return building_id, None, None
 
     def get_generator(self, profile_type: str):
         if profile_type in ['G0', 'G1', 'G2', 'G3', 'G4', 'G6']:
@@ -191,7 +204,12 @@ class ParallelLoadProfileGenerator:
         print(f"Verbrauchsstatistiken gespeichert in: {output_consumption_file}")
         return consumption_stats
 
-    def generate_all_profiles(self, output_file: str) -> Dict:
+    def generate_all_profiles(self, output_file: str, store_dir: Optional[str] = None) -> Dict:
+        """
+        Berechnet die Phasenprofile aller Gebäude und schreibt sie als JSON
+        sowie in den Profilspeicher (float32-Matrizen [Gebäude, Phase] und
+        [Gebäude, 35136], Standard: <output_file>.profiles neben dem JSON).
+        """
         print(f"Starte Verarbeitung von {len(self.building_data)} Gebäuden...")
 
         valid_buildings = [
@@ -201,28 +219,44 @@ class ParallelLoadProfileGenerator:
 
         print(f"Gefunden: {len(valid_buildings)} gültige Gebäude")
 
+        store_dir = store_dir or store_path(output_file)
+        writer = ProfileStoreWriter(
+            store_dir, [building_id for building_id, _ in valid_buildings], self.phase_keys(), n_steps=YEAR_STEPS
+        )
+
         num_processes = max(1, mp.cpu_count() - 1)
         print(f"Nutze {num_processes} Prozesse")
 
+        all_results = {}
         with mp.Pool(processes=num_processes) as pool:
-            results = list(tqdm(
+            for building_id, result, year_values in tqdm(
                 pool.imap_unordered(
                     self.process_building,
                     valid_buildings
                 ),
                 total=len(valid_buildings),
                 desc="Verarbeite Gebäude"
-            ))
-
-        all_results = {
-            building_id: result
-            for building_id, result in results
-            if result is not None
-        }
+            ):
+                if result is None:
+                    continue
+                all_results[building_id] = result
+                if year_values is not None and len(year_values) != YEAR_STEPS:
+                    print(f"Gebäude {building_id}: Jahresprofil mit {len(year_values)} Werten, "
+                          f"erwartet {YEAR_STEPS} - nur Phasenwerte gespeichert")
+                    year_values = None
+                writer.write(building_id, result, year_values)
 
         print(f"\nSchreibe Ergebnisse in {output_file}")
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(all_results, f, indent=2, ensure_ascii=False)
 
+        building_parts = {
+            building_id: result["gebaeudeteile"]
+            for building_id, result in all_results.items()
+            if "gebaeudeteile" in result
+        }
+        writer.close(building_parts)
+        print(f"Profilspeicher geschrieben nach {store_dir}")
+
         print(f"Fertig. {len(all_results)} Profile generiert.")
-        return all_results
\ No newline at end of file
+        return all_results
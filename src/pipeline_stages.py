@@ -0,0 +1,166 @@
+# src/pipeline_stages.py
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+STATE_FILE_NAME = ".pipeline_state.json"
+
+class Stage:
+    """
+    One pipeline stage.
+    - func(config, ctx) runs the stage and returns the list of files it wrote;
+      ctx["outputs"][stage_name] holds the outputs of every earlier stage.
+    - deps: names of upstream stages.
+    - inputs(config): external files the stage reads (hashed by content).
+    - params(config): config values the stage depends on.
+    - code: modules (or source paths) whose source is part of the fingerprint.
+    - flag: legacy run_* config key; setting it to false disables the stage.
+    - default_outputs(config): outputs to hand downstream when the stage is
+      disabled and has never run.
+    """
+    def __init__(self, name, func, deps=(), inputs=None, params=None, code=(), flag=None,
+                 default_outputs=None, description=""):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.inputs = inputs or (lambda config: [])
+        self.params = params or (lambda config: {})
+        self.code = list(code)
+        self.flag = flag
+        self.default_outputs = default_outputs or (lambda config: [])
+        self.description = description or name
+
+def file_digest(path):
+    """
+    SHA-256 of a file's contents (or of a directory's file list and contents).
+    Missing paths hash to a fixed marker.
+    """
+    path = Path(path)
+    if not path.exists():
+        return "missing"
+    h = hashlib.sha256()
+    files = sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    for p in files:
+        h.update(str(p.relative_to(path) if path.is_dir() else p.name).encode())
+        with open(p, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+def _code_path(code):
+    return getattr(code, "__file__", None) or str(code)
+
+def stage_fingerprint(stage, config, upstream_fingerprints):
+    """
+    Fingerprint of everything a stage's result depends on: input file
+    contents, parameters, stage code and the fingerprints of its upstream
+    stages (so a re-run upstream invalidates everything downstream).
+    """
+    payload = {
+        "stage": stage.name,
+        "inputs": {str(p): file_digest(p) for p in stage.inputs(config) if p},
+        "params": stage.params(config),
+        "code": {Path(_code_path(c)).name: file_digest(_code_path(c)) for c in stage.code},
+        "upstream": {d: upstream_fingerprints.get(d) for d in stage.deps},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+def topological_order(stages):
+    """Stages sorted so that every stage comes after its dependencies (stable w.r.t. declaration order)."""
+    by_name = {s.name: s for s in stages}
+    ordered, done, visiting = [], set(), set()
+
+    def visit(stage):
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f"Dependency cycle at stage '{stage.name}'")
+        visiting.add(stage.name)
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+            visit(by_name[dep])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+def load_state(output_dir):
+    state_file = Path(output_dir) / STATE_FILE_NAME
+    if state_file.exists():
+        with open(state_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def save_state(output_dir, state):
+    state_file = Path(output_dir) / STATE_FILE_NAME
+    with open(state_file, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+def run_stages(stages, config, output_dir, dry_run=False, force=()):
+    """
+    Execute the stage DAG incrementally. A stage runs when it is forced, has
+    never run, its fingerprint changed, or one of its recorded outputs is
+    missing; otherwise its recorded outputs are reused.
+    With dry_run=True nothing is executed and the plan is only printed.
+    Returns the plan as a list of {stage, action, reason} dicts.
+    """
+    state = load_state(output_dir)
+    force = set(force or ())
+    fingerprints = {}
+    ctx = {"outputs": {}}
+    plan = []
+
+    print("\n[Pipeline plan]" if dry_run else "\n[Pipeline]")
+    for stage in topological_order(stages):
+        previous = state.get(stage.name, {})
+        fingerprint = stage_fingerprint(stage, config, fingerprints)
+        upstream_ran = any(p["action"] == "run" for p in plan if p["stage"] in stage.deps)
+
+        if stage.flag and config.get(stage.flag, True) is False:
+            action, reason = "disabled", f"{stage.flag}: false"
+            fingerprint = previous.get("fingerprint", fingerprint)
+        elif "all" in force or stage.name in force:
+            action, reason = "run", "forced"
+        elif not previous:
+            action, reason = "run", "never run"
+        elif upstream_ran:
+            action, reason = "run", "upstream stage re-runs"
+        elif previous.get("fingerprint") != fingerprint:
+            action, reason = "run", "inputs, parameters or code changed"
+        elif any(not os.path.exists(p) for p in previous.get("outputs", [])):
+            action, reason = "run", "outputs missing"
+        else:
+            action, reason = "skip", "up to date"
+
+        fingerprints[stage.name] = fingerprint
+        plan.append({"stage": stage.name, "action": action, "reason": reason})
+        symbol = {"run": "▶", "skip": "✓", "disabled": "–"}[action]
+        print(f"  {symbol} {stage.name:<24} {action:<9} ({reason})")
+
+        if dry_run:
+            continue
+
+        if action == "run":
+            print(f"\n[{stage.description}]")
+            outputs = stage.func(config, ctx) or []
+            state[stage.name] = {
+                "fingerprint": fingerprint,
+                "outputs": [str(p) for p in outputs],
+                "completed_at": datetime.now().isoformat(),
+            }
+            save_state(output_dir, state)
+        else:
+            outputs = previous.get("outputs") or stage.default_outputs(config)
+        ctx["outputs"][stage.name] = list(outputs)
+
+    if dry_run:
+        to_run = [p["stage"] for p in plan if p["action"] == "run"]
+        print(f"\nDry run: {len(to_run)} stage(s) would execute: {', '.join(to_run) or 'none'}")
+    return plan
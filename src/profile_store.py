@@ -0,0 +1,297 @@
+# src/profile_store.py
+
+import argparse
+import json
+import os
+from collections.abc import Mapping
+from pathlib import Path
+import numpy as np
+
+STORE_FORMAT = "branitz-profile-store-1"
+STORE_SUFFIX = ".profiles"
+INDEX_FILE = "index.json"
+PHASES_FILE = "phases.npy"
+YEAR_FILE = "year.npy"
+# Full-year profiles of the phase generator: 2024 in quarter hours
+YEAR_START = "2024-01-01"
+STEP_MINUTES = 15
+STEPS_PER_DAY = 24 * 60 // STEP_MINUTES
+YEAR_STEPS = 366 * STEPS_PER_DAY
+LEAP_DAY_INDEX = 59  # 29 February, dropped for 8760-hour profiles
+# Key of the JSON building entries that is not a phase value
+BUILDING_PARTS_KEY = "gebaeudeteile"
+
+def store_path(json_file):
+    """Default store directory of a load profile JSON: gebaeude_lastphasenV2.json -> gebaeude_lastphasenV2.profiles/"""
+    json_file = Path(json_file)
+    return json_file.with_name(json_file.stem + STORE_SUFFIX)
+
+class ProfileRow(Mapping):
+    """Phase values of one building as a read-only {phase: kW} mapping over a store row (NaN = missing)."""
+
+    __slots__ = ("_phase_index", "_values")
+
+    def __init__(self, phase_index, values):
+        self._phase_index = phase_index
+        self._values = values
+
+    def __getitem__(self, phase):
+        value = self._values[self._phase_index[phase]]
+        if np.isnan(value):
+            raise KeyError(phase)
+        return float(value)
+
+    def __iter__(self):
+        for phase, col in self._phase_index.items():
+            if not np.isnan(self._values[col]):
+                yield phase
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self._values)))
+
+    def __repr__(self):
+        return f"ProfileRow({dict(self)})"
+
+class ProfileStore(Mapping):
+    """
+    Load profiles of all buildings as memory-mapped float32 matrices:
+
+        <store>/index.json   building IDs, phase names, building parts
+        <store>/phases.npy   [building, phase] mean load per phase [kW]
+        <store>/year.npy     [building, 35136] quarter-hourly load 2024 [kW] (optional)
+
+    Opening only parses the ID index; the matrices are paged in on access.
+    The store is a drop-in for the {building_id: {phase: kW}} dict of the
+    JSON file (rows are ProfileRow mappings) and adds vectorized access to
+    whole columns (phase_values) and full-year profiles. Buildings the writer
+    never wrote (index "missing") are not part of the mapping.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = Path(store_dir)
+        with open(self.store_dir / INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("format") != STORE_FORMAT:
+            raise ValueError(f"{self.store_dir}: unknown profile store format {index.get('format')!r}")
+        missing = set(index.get("missing", ()))
+        self.building_ids = [bid for bid in index["building_ids"] if bid not in missing]
+        self.phases = index["phases"]
+        self.building_parts = index.get("building_parts", {})
+        self.year_start = index.get("year_start", YEAR_START)
+        self.step_minutes = index.get("step_minutes", STEP_MINUTES)
+        self._rows = {bid: i for i, bid in enumerate(index["building_ids"]) if bid not in missing}
+        self._phase_index = {phase: i for i, phase in enumerate(self.phases)}
+        self.phase_matrix = np.load(self.store_dir / PHASES_FILE, mmap_mode="r")
+        year_file = self.store_dir / YEAR_FILE
+        self.year_matrix = np.load(year_file, mmap_mode="r") if year_file.exists() else None
+
+    def __reduce__(self):
+        # Worker processes reopen the memory maps instead of copying the matrices
+        return (self.__class__, (str(self.store_dir),))
+
+    # --- Mapping interface (JSON compatible) ---
+    def __getitem__(self, building_id):
+        return ProfileRow(self._phase_index, self.phase_matrix[self._rows[building_id]])
+
+    def __contains__(self, building_id):
+        return building_id in self._rows
+
+    def __iter__(self):
+        return iter(self.building_ids)
+
+    def __len__(self):
+        return len(self.building_ids)
+
+    # --- Vectorized access ---
+    def rows(self, building_ids):
+        """Store row of every building (-1 if the building has no profile)."""
+        return np.array([self._rows.get(str(bid), -1) for bid in building_ids], dtype=np.int64)
+
+    def phase_values(self, phase, building_ids=None, default=0.0, fallback=None):
+        """
+        Values of one phase [kW] for the given buildings (default: all, in
+        store order). Buildings without a value for `phase` take the
+        `fallback` phase, then `default`.
+        """
+        rows = self.rows(self.building_ids if building_ids is None else building_ids)
+        values = np.full(len(rows), np.nan, dtype=np.float64)
+        found = rows >= 0
+        for name in (phase, fallback):
+            if name in self._phase_index:
+                missing = found & np.isnan(values)
+                values[missing] = self.phase_matrix[rows[missing], self._phase_index[name]]
+        values[np.isnan(values)] = default
+        return values
+
+    def year_profiles(self, building_ids=None):
+        """Quarter-hourly load [kW] of the buildings, shape (n, 35136); zero rows for unknown buildings."""
+        if self.year_matrix is None:
+            raise ValueError(f"{self.store_dir}: store has no full-year profiles ({YEAR_FILE})")
+        if building_ids is None:
+            if len(self._rows) == len(self.year_matrix):
+                return self.year_matrix
+            building_ids = self.building_ids
+        rows = self.rows(building_ids)
+        profiles = np.zeros((len(rows), self.year_matrix.shape[1]), dtype=self.year_matrix.dtype)
+        found = rows >= 0
+        profiles[found] = self.year_matrix[rows[found]]
+        return profiles
+
+    def hourly_profiles(self, building_ids=None, n_hours=8760):
+        """
+        Hourly mean load [kW], shape (n, n_hours): quarter hours averaged
+        per hour, 29 February dropped so the rows align with the TRY year.
+        """
+        profiles = self.year_profiles(building_ids)
+        steps_per_hour = 60 // self.step_minutes
+        n_days = profiles.shape[1] // (24 * steps_per_hour)
+        days = np.asarray(profiles[:, :n_days * 24 * steps_per_hour]).reshape(len(profiles), n_days, 24, steps_per_hour)
+        if n_days * 24 > n_hours and n_days > LEAP_DAY_INDEX:
+            days = np.delete(days, LEAP_DAY_INDEX, axis=1)
+        return days.mean(axis=3, dtype=np.float32).reshape(len(profiles), -1)[:, :n_hours]
+
+    def summary(self):
+        return {
+            "store": str(self.store_dir),
+            "buildings": len(self.building_ids),
+            "phases": len(self.phases),
+            "year_profiles": None if self.year_matrix is None else list(self.year_matrix.shape),
+            "size_mb": round(sum(f.stat().st_size for f in self.store_dir.iterdir()) / 1e6, 1),
+        }
+
+class ProfileStoreWriter:
+    """
+    Writes a profile store building by building (e.g. as the generator's
+    worker results arrive). The matrices are written through memory maps;
+    index.json is written last on close(), so readers never see a partial store.
+    """
+
+    def __init__(self, store_dir, building_ids, phases, n_steps=None):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.building_ids = [str(bid) for bid in building_ids]
+        self.phases = list(phases)
+        self._rows = {bid: i for i, bid in enumerate(self.building_ids)}
+        self._phase_index = {phase: i for i, phase in enumerate(self.phases)}
+        self._written = np.zeros(len(self.building_ids), dtype=bool)
+        self._tmp = {name: self.store_dir / f"{Path(name).stem}.{os.getpid()}.tmp.npy"
+                     for name in (PHASES_FILE, YEAR_FILE)}
+        self.phase_matrix = np.lib.format.open_memmap(
+            self._tmp[PHASES_FILE], mode="w+", dtype=np.float32, shape=(len(self.building_ids), len(self.phases)))
+        self.phase_matrix[:] = np.nan
+        self.year_matrix = None
+        if n_steps:
+            self.year_matrix = np.lib.format.open_memmap(
+                self._tmp[YEAR_FILE], mode="w+", dtype=np.float32, shape=(len(self.building_ids), int(n_steps)))
+            # Buildings without a year profile keep zero rows (listed under "missing")
+            self.year_matrix[:] = 0.0
+
+    def write(self, building_id, phase_values, year_values=None):
+        """Store one building: {phase: kW} (unknown keys are ignored) and optionally its year profile."""
+        row = self._rows[str(building_id)]
+        for phase, value in phase_values.items():
+            col = self._phase_index.get(phase)
+            if col is not None and isinstance(value, (int, float, np.floating)):
+                self.phase_matrix[row, col] = value
+        if year_values is not None:
+            if self.year_matrix is None:
+                raise ValueError("store was opened without n_steps, cannot write year profiles")
+            year_values = np.asarray(year_values, dtype=np.float32)
+            if year_values.shape != (self.year_matrix.shape[1],):
+                raise ValueError(f"{building_id}: year profile has {year_values.size} values, "
+                                 f"expected {self.year_matrix.shape[1]}")
+            self.year_matrix[row] = year_values
+        self._written[row] = True
+
+    def close(self, building_parts=None):
+        """Flush the matrices, move them into place and write index.json. Returns the opened ProfileStore."""
+        index_file = self.store_dir / INDEX_FILE
+        if index_file.exists():
+            index_file.unlink()
+        for name, matrix in ((PHASES_FILE, self.phase_matrix), (YEAR_FILE, self.year_matrix)):
+            if matrix is not None:
+                matrix.flush()
+                os.replace(self._tmp[name], self.store_dir / name)
+            elif (self.store_dir / name).exists():
+                (self.store_dir / name).unlink()
+        self.phase_matrix = self.year_matrix = None
+        index = {
+            "format": STORE_FORMAT,
+            "building_ids": self.building_ids,
+            "phases": self.phases,
+            "missing": [bid for bid, ok in zip(self.building_ids, self._written) if not ok],
+            "year_start": YEAR_START,
+            "step_minutes": STEP_MINUTES,
+            "building_parts": building_parts or {},
+        }
+        tmp = index_file.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp, index_file)
+        return ProfileStore(self.store_dir)
+
+def convert_json(json_file, store_dir=None):
+    """Build the store of an existing phase profile JSON (no full-year profiles). Returns the ProfileStore."""
+    with open(json_file, "r", encoding="utf-8") as f:
+        profiles = json.load(f)
+    phases = {}
+    building_parts = {}
+    for building_id, entry in profiles.items():
+        for key, value in entry.items():
+            if key == BUILDING_PARTS_KEY:
+                building_parts[building_id] = value
+            else:
+                phases.setdefault(key, None)
+    writer = ProfileStoreWriter(store_dir or store_path(json_file), profiles.keys(), phases)
+    for building_id, entry in profiles.items():
+        writer.write(building_id, entry)
+    return writer.close(building_parts)
+
+def open_profile_store(path):
+    """
+    ProfileStore for a store directory or a profile JSON file (its sibling
+    store, if that is at least as new as the JSON), else None.
+    """
+    path = Path(path)
+    store_dir = path if (path / INDEX_FILE).exists() else store_path(path)
+    index_file = store_dir / INDEX_FILE
+    if not index_file.exists():
+        return None
+    if path.is_file() and path.stat().st_mtime > index_file.stat().st_mtime:
+        print(f"⚠️ Profile store {store_dir} is older than {path}, using the JSON file")
+        return None
+    return ProfileStore(store_dir)
+
+def load_phase_profiles(json_file):
+    """
+    Phase load profiles {building_id: {phase: kW}}: the memory-mapped store
+    next to the JSON when present, otherwise the parsed JSON ({} if missing).
+    """
+    if json_file:
+        store = open_profile_store(json_file)
+        if store is not None:
+            return store
+        if os.path.exists(json_file):
+            with open(json_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+    return {}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory-mapped store for the phase and full-year load profiles.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_convert = sub.add_parser("convert", help="Build the store of a phase profile JSON")
+    p_convert.add_argument("json_file")
+    p_convert.add_argument("--store", default=None, help="Store directory (default: <json>.profiles next to it)")
+    p_info = sub.add_parser("info", help="Show the contents of a store")
+    p_info.add_argument("path", help="Store directory or profile JSON")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        store = convert_json(args.json_file, args.store)
+        print(f"✅ Profile store written to {store.store_dir}: {len(store)} buildings x {len(store.phases)} phases")
+    else:
+        store = open_profile_store(args.path)
+        if store is None:
+            print(f"❌ No profile store for {args.path}")
+        else:
+            print(json.dumps(store.summary(), indent=2))
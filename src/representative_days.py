@@ -0,0 +1,243 @@
+# src/representative_days.py
+
+import argparse
+import json
+from pathlib import Path
+import numpy as np
+
+try:
+    from .weather import outdoor_temperature
+except ImportError:
+    from weather import outdoor_temperature
+
+HOURS_PER_DAY = 24
+DAYS_PER_YEAR = 365
+
+def read_try_temperature(try_file):
+    """
+    Read the hourly air temperature column (t, °C) from a DWD TRY .dat file.
+    Returns an array of 8760 values.
+    """
+    return outdoor_temperature(try_file)
+
+def to_daily_matrix(series, n_days=DAYS_PER_YEAR):
+    """
+    Reshape an annual series (hourly or quarter-hourly, 365 or 366 days)
+    into an (n_days, 24) matrix of hourly means.
+    """
+    series = np.asarray(series, dtype=float)
+    days_in_series = 366 if len(series) % 366 == 0 and len(series) % 365 != 0 else 365
+    steps_per_day = len(series) // days_in_series
+    if steps_per_day < HOURS_PER_DAY or steps_per_day % HOURS_PER_DAY != 0:
+        raise ValueError(f"Cannot interpret series of length {len(series)} as hourly or sub-hourly data")
+    daily = series[:days_in_series * steps_per_day].reshape(days_in_series, HOURS_PER_DAY, -1).mean(axis=2)
+    return daily[:n_days]
+
+def build_daily_features(load, temperature, temperature_weight=1.0):
+    """
+    Build the (365, n_features) clustering matrix from the aggregated load
+    profile(s) and the TRY temperature series. Each block is z-scored so
+    that load and temperature contribute on the same scale.
+    """
+    load = np.atleast_2d(np.asarray(load, dtype=float))
+    blocks = [to_daily_matrix(row) for row in load]
+    blocks.append(to_daily_matrix(temperature) * temperature_weight)
+    features = []
+    for block in blocks:
+        std = block.std()
+        features.append((block - block.mean()) / (std if std > 0 else 1.0))
+    return np.hstack(features)
+
+def _kmeans_plus_plus(features, n_clusters, rng):
+    centers = [features[rng.integers(len(features))]]
+    for _ in range(1, n_clusters):
+        d2 = ((features[:, None, :] - np.asarray(centers)[None, :, :]) ** 2).sum(axis=2).min(axis=1)
+        probs = d2 / d2.sum() if d2.sum() > 0 else None
+        centers.append(features[rng.choice(len(features), p=probs)])
+    return np.asarray(centers)
+
+def kmeans(features, n_clusters, seed=42, max_iter=100):
+    """
+    Lloyd's k-means with k-means++ seeding. The representative of each
+    cluster is the real day closest to the centroid, so that simulations
+    always run on observed weather/load combinations.
+    Returns (labels, representative_day_indices).
+    """
+    rng = np.random.default_rng(seed)
+    centers = _kmeans_plus_plus(features, n_clusters, rng)
+    labels = np.zeros(len(features), dtype=int)
+    for it in range(max_iter):
+        dist = ((features[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        new_labels = dist.argmin(axis=1)
+        if it > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for k in range(n_clusters):
+            members = features[labels == k]
+            if len(members):
+                centers[k] = members.mean(axis=0)
+    dist = ((features[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    representatives = np.array([
+        np.flatnonzero(labels == k)[dist[labels == k, k].argmin()] if np.any(labels == k) else dist[:, k].argmin()
+        for k in range(n_clusters)
+    ])
+    return labels, representatives
+
+def kmedoids(features, n_clusters, seed=42, max_iter=100):
+    """
+    k-medoids (alternating/Voronoi iteration) on the full day-to-day
+    distance matrix, which is only 365x365.
+    Returns (labels, medoid_day_indices).
+    """
+    rng = np.random.default_rng(seed)
+    dist = np.sqrt(((features[:, None, :] - features[None, :, :]) ** 2).sum(axis=2))
+    init_centers = _kmeans_plus_plus(features, n_clusters, rng)
+    medoids = np.unique([((features - c) ** 2).sum(axis=1).argmin() for c in init_centers])
+    # Fill up in case two seeds collapsed onto the same day; stop when every
+    # remaining day duplicates a medoid (fewer distinct days than clusters)
+    while len(medoids) < n_clusters:
+        farthest = dist[:, medoids].min(axis=1).argmax()
+        if dist[farthest, medoids].min() == 0:
+            break
+        medoids = np.unique(np.append(medoids, farthest))
+    n_clusters = len(medoids)
+    for _ in range(max_iter):
+        labels = dist[:, medoids].argmin(axis=1)
+        new_medoids = medoids.copy()
+        for k in range(n_clusters):
+            members = np.flatnonzero(labels == k)
+            if len(members):
+                new_medoids[k] = members[dist[np.ix_(members, members)].sum(axis=1).argmin()]
+        if np.array_equal(np.sort(new_medoids), np.sort(medoids)):
+            break
+        medoids = new_medoids
+    labels = dist[:, medoids].argmin(axis=1)
+    return labels, medoids
+
+def select_representative_days(load, temperature, n_days=12, method="kmedoids", seed=42,
+                               temperature_weight=1.0):
+    """
+    Pick n_days representative days with weights (number of calendar days
+    each one stands for; weights sum to 365).
+    Args:
+        load: aggregated profile (8760/35136) or matrix of profiles (n_series x steps).
+        temperature: hourly TRY temperature series (8760).
+        method: "kmedoids" or "kmeans".
+    Returns:
+        dict with days, weights, labels and method.
+    """
+    features = build_daily_features(load, temperature, temperature_weight)
+    n_days = min(n_days, len(np.unique(features, axis=0)))
+    if method == "kmedoids":
+        labels, reps = kmedoids(features, n_days, seed=seed)
+    elif method == "kmeans":
+        labels, reps = kmeans(features, n_days, seed=seed)
+    else:
+        raise ValueError(f"Unknown clustering method: {method}")
+
+    order = np.argsort(reps)
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    return {
+        "method": method,
+        "n_days": int(len(reps)),
+        "days": [int(d) for d in reps[order]],
+        "weights": [int(w) for w in np.bincount(remap[labels], minlength=len(reps))],
+        "labels": [int(l) for l in remap[labels]],
+    }
+
+def representative_timesteps(rep_days):
+    """
+    Hour-of-year indices to simulate and the weight of each hour, for the
+    pandapipes/pandapower time-series drivers.
+    Returns (hour_indices, hour_weights).
+    """
+    days = np.asarray(rep_days["days"])
+    weights = np.asarray(rep_days["weights"], dtype=float)
+    hours = (days[:, None] * HOURS_PER_DAY + np.arange(HOURS_PER_DAY)[None, :]).ravel()
+    return hours, np.repeat(weights, HOURS_PER_DAY)
+
+def reconstruct_annual(values, rep_days):
+    """
+    Weighted annual total of a KPI evaluated on the representative days.
+    `values` may hold one value per representative day or one per simulated
+    hour (as returned by representative_timesteps).
+    """
+    values = np.asarray(values, dtype=float)
+    weights = np.asarray(rep_days["weights"], dtype=float)
+    if values.shape[0] == len(weights) * HOURS_PER_DAY:
+        weights = np.repeat(weights, HOURS_PER_DAY)
+    return float(np.tensordot(weights, values, axes=(0, 0)))
+
+def reconstruct_series(series, rep_days):
+    """
+    Rebuild an hourly 8760 series where every day is replaced by its
+    representative day.
+    """
+    daily = to_daily_matrix(series)
+    labels = np.asarray(rep_days["labels"])
+    return daily[np.asarray(rep_days["days"])[labels]].ravel()
+
+def estimate_error(series, rep_days):
+    """
+    Compare the representative-day reconstruction against the full-year
+    series, both as hourly means. The bound is the sum of absolute
+    daily-energy deviations from each cluster's representative: it bounds
+    the annual energy error of this series only, not that of KPIs driven
+    by other inputs or by the shape within the day.
+    """
+    hourly = to_daily_matrix(series)
+    daily_energy = hourly.sum(axis=1)
+    labels = np.asarray(rep_days["labels"])
+    rep_energy = daily_energy[np.asarray(rep_days["days"])]
+    full_total = daily_energy.sum()
+    approx_total = float(np.dot(rep_days["weights"], rep_energy))
+    bound = np.abs(daily_energy - rep_energy[labels]).sum()
+    full_peak = float(hourly.max())
+    approx_peak = float(reconstruct_series(series, rep_days).max())
+    denom = full_total if full_total else 1.0
+    return {
+        "annual_full": float(full_total),
+        "annual_reconstructed": approx_total,
+        "annual_error_percent": 100.0 * (approx_total - full_total) / denom,
+        "annual_error_bound_percent": 100.0 * bound / denom,
+        "peak_full": full_peak,
+        "peak_reconstructed": approx_peak,
+        "peak_error_percent": 100.0 * (approx_peak - full_peak) / (full_peak if full_peak else 1.0),
+        "speedup": DAYS_PER_YEAR / rep_days["n_days"],
+    }
+
+def aggregate_profiles(profiles):
+    """
+    Sum a {building_id: [values]} dict into one aggregated profile.
+    """
+    return np.sum([np.asarray(p, dtype=float) for p in profiles.values()], axis=0)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Select representative days from load profiles and TRY weather.")
+    parser.add_argument("--profiles", required=True, help="Load profiles JSON (building_id -> annual series)")
+    parser.add_argument("--weather", required=True, help="TRY .dat weather file")
+    parser.add_argument("--n_days", type=int, default=12, help="Number of representative days")
+    parser.add_argument("--method", choices=["kmedoids", "kmeans"], default="kmedoids")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="results/representative_days.json", help="Output JSON")
+    args = parser.parse_args()
+
+    with open(args.profiles, "r", encoding="utf-8") as f:
+        profiles = json.load(f)
+    load = aggregate_profiles(profiles)
+    temperature = read_try_temperature(args.weather)
+
+    rep_days = select_representative_days(load, temperature, args.n_days, args.method, args.seed)
+    rep_days["error"] = estimate_error(load, rep_days)
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(rep_days, f, indent=2)
+
+    err = rep_days["error"]
+    print(f"✅ Selected {rep_days['n_days']} representative days ({args.method}), "
+          f"speedup {err['speedup']:.1f}x")
+    print(f"   Annual energy error: {err['annual_error_percent']:+.2f}% "
+          f"(bound ±{err['annual_error_bound_percent']:.2f}%), peak error: {err['peak_error_percent']:+.2f}%")
+    print(f"   Saved to {args.output}")
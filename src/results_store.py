@@ -0,0 +1,282 @@
+# src/results_store.py
+
+import argparse
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+DEFAULT_STORE_DIR = "results_store"
+PARTITION_KEYS = ("run_id", "scenario", "street")
+ALL_STREETS = "all"
+
+# Tables of the store and the legacy files they are ingested from
+TABLES = {
+    "kpis": "*_results.json (one row per scenario, KPIs flattened)",
+    "junctions": "junction_results_<scenario>.csv (pandapipes res_junction)",
+    "pipes": "pipe_results_<scenario>.csv (pandapipes res_pipe)",
+    "buildings": "building_proximity_table.csv (HP feasibility per building)",
+}
+
+def new_run_id():
+    return datetime.now().strftime("%Y%m%dT%H%M%S")
+
+def _partition_value(value):
+    """Partition directory value: no path separators or '=' (hive-style key=value)."""
+    return re.sub(r"[\\/=\s]+", "_", str(value)) or "_"
+
+def flatten_result(result):
+    """One KPI row of a simulation result dict (kpi.* and params.* become columns)."""
+    row = {
+        "scenario": result.get("scenario", ""),
+        "type": result.get("type", ""),
+        "success": bool(result.get("success", False)),
+        "error": result.get("error"),
+        "runtime_s": result.get("runtime_s"),
+        "output_dir": result.get("output_dir"),
+    }
+    # DH builder results keep their numbers under network_stats
+    for key, value in (result.get("kpi") or result.get("network_stats") or {}).items():
+        row[key] = value if isinstance(value, (int, float, str, bool)) or value is None else json.dumps(value)
+    for key, value in (result.get("params") or {}).items():
+        row[f"param_{key}"] = value if isinstance(value, (int, float, str, bool)) or value is None else json.dumps(value)
+    return row
+
+class ResultsStore:
+    """
+    Columnar store for simulation outputs: one Parquet dataset per table
+    (kpis, junctions, pipes, buildings), hive-partitioned by run_id,
+    scenario and street:
+
+        <root>/<table>/run_id=<id>/scenario=<name>/street=<street>/part-<uuid>.parquet
+
+    Every write creates a new file, so parallel workers can write without
+    locking. Reads push partition filters down to the directory level;
+    query() runs SQL over all tables with DuckDB.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = Path(root)
+
+    def _table_dir(self, table):
+        if table not in TABLES:
+            raise ValueError(f"Unknown table '{table}' (expected one of {sorted(TABLES)})")
+        return self.root / table
+
+    # --- Writing ---
+    def write(self, table, df, run_id, scenario, street=ALL_STREETS):
+        """Append a DataFrame to a table partition. Returns the written file."""
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required for the results store. Install with `pip install pyarrow`.")
+        part_dir = self._table_dir(table) / f"run_id={_partition_value(run_id)}" \
+            / f"scenario={_partition_value(scenario)}" / f"street={_partition_value(street)}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        # Partition columns live in the path only
+        df = df.drop(columns=[c for c in PARTITION_KEYS if c in df.columns])
+        path = part_dir / f"part-{uuid.uuid4().hex}.parquet"
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp, compression="zstd")
+        os.replace(tmp, path)
+        return path
+
+    def write_result(self, result, run_id, street=ALL_STREETS):
+        """Store a simulation_runner result: its KPI row plus the pipeflow tables of DH runs."""
+        scenario = result.get("scenario", "")
+        written = [self.write("kpis", pd.DataFrame([flatten_result(result)]), run_id, scenario, street)]
+        output_dir = result.get("output_dir")
+        if output_dir and result.get("type") == "DH":
+            for table, prefix in (("junctions", "junction_results"), ("pipes", "pipe_results")):
+                csv_path = Path(output_dir) / f"{prefix}_dual_pipe_{scenario}.csv"
+                if csv_path.exists():
+                    written.append(self.write(table, pd.read_csv(csv_path), run_id, scenario, street))
+        return written
+
+    def ingest_directory(self, directory, run_id=None, street=ALL_STREETS, street_dirs=False):
+        """
+        Import the legacy file outputs below `directory` (*_results.json,
+        junction/pipe result CSVs, building proximity tables). With
+        street_dirs=True the first-level subdirectories are street names
+        (batch_street_runner layout). Returns the number of files ingested.
+        """
+        directory = Path(directory)
+        run_id = run_id or new_run_id()
+        count = 0
+        for path in sorted(directory.rglob("*")):
+            if not path.is_file():
+                continue
+            name = path.name
+            rel_parts = path.relative_to(directory).parts
+            file_street = rel_parts[0] if street_dirs and len(rel_parts) > 1 else street
+            try:
+                if name.endswith("_results.json"):
+                    with open(path, "r", encoding="utf-8") as f:
+                        result = json.load(f)
+                    if not isinstance(result, dict):
+                        continue
+                    scenario = result.get("scenario") or name[:-len("_results.json")]
+                    self.write("kpis", pd.DataFrame([flatten_result({"scenario": scenario, **result})]),
+                               run_id, scenario, file_street)
+                elif name.startswith("junction_results_") and name.endswith(".csv"):
+                    self.write("junctions", pd.read_csv(path), run_id, name[len("junction_results_"):-4], file_street)
+                elif name.startswith("pipe_results_") and name.endswith(".csv"):
+                    self.write("pipes", pd.read_csv(path), run_id, name[len("pipe_results_"):-4], file_street)
+                elif name == "building_proximity_table.csv":
+                    self.write("buildings", pd.read_csv(path, comment="#"), run_id, "hp_feasibility", file_street)
+                else:
+                    continue
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Skipping {path}: {e}")
+                continue
+            count += 1
+        return count
+
+    # --- Reading ---
+    def _filter(self, run_id=None, scenario=None, street=None):
+        expr = None
+        for key, value in (("run_id", run_id), ("scenario", scenario), ("street", street)):
+            if value is None:
+                continue
+            values = [_partition_value(v) for v in (value if isinstance(value, (list, tuple, set)) else [value])]
+            term = ds.field(key).isin(values)
+            expr = term if expr is None else expr & term
+        return expr
+
+    def read(self, table, run_id=None, scenario=None, street=None, columns=None):
+        """
+        Read a table as a DataFrame. run_id / scenario / street take a value or
+        a list; only matching partition directories are opened.
+        """
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required for the results store. Install with `pip install pyarrow`.")
+        table_dir = self._table_dir(table)
+        if not table_dir.exists():
+            return pd.DataFrame(columns=list(PARTITION_KEYS) + list(columns or []))
+        partitioning = ds.partitioning(pa.schema([(k, pa.string()) for k in PARTITION_KEYS]), flavor="hive")
+        expr = self._filter(run_id, scenario, street)
+        dataset = ds.dataset(table_dir, format="parquet", partitioning=partitioning)
+        # Files of different scenario types carry different KPI columns: read
+        # with the union of the schemas of the selected files
+        fragments = list(dataset.get_fragments(filter=expr))
+        if not fragments:
+            return pd.DataFrame(columns=list(PARTITION_KEYS) + list(columns or []))
+        schemas = [f.physical_schema for f in fragments] + [partitioning.schema]
+        try:
+            schema = pa.unify_schemas(schemas, promote_options="permissive")
+        except TypeError:  # pyarrow < 14
+            schema = pa.unify_schemas(schemas)
+        dataset = ds.dataset([f.path for f in fragments], schema=schema, format="parquet",
+                             partitioning=partitioning, partition_base_dir=str(table_dir))
+        if columns is not None:
+            columns = list(PARTITION_KEYS) + [c for c in columns if c not in PARTITION_KEYS and c in schema.names]
+        return dataset.to_table(columns=columns).to_pandas()
+
+    def latest_kpis(self, scenario=None, street=None):
+        """KPI rows of the most recent run that contains each scenario."""
+        kpis = self.read("kpis", scenario=scenario, street=street)
+        if kpis.empty:
+            return kpis
+        return kpis.sort_values("run_id").groupby(["scenario", "street"], as_index=False).tail(1).reset_index(drop=True)
+
+    def partitions(self, table):
+        """(run_id, scenario, street) tuples of a table, from the directory names only."""
+        table_dir = self._table_dir(table)
+        parts = []
+        for street_dir in table_dir.glob("run_id=*/scenario=*/street=*"):
+            run_dir, scenario_dir = street_dir.parent.parent, street_dir.parent
+            parts.append((run_dir.name[7:], scenario_dir.name[9:], street_dir.name[7:]))
+        return sorted(parts)
+
+    def runs(self):
+        """Run IDs present in any table, oldest first."""
+        return sorted({p[0] for table in TABLES for p in self.partitions(table)})
+
+    def summary(self):
+        """Per-table counts of runs, scenarios and streets (no Parquet files are opened)."""
+        info = {}
+        for table in TABLES:
+            parts = self.partitions(table)
+            if parts:
+                info[table] = {
+                    "runs": len({p[0] for p in parts}),
+                    "scenarios": len({p[1] for p in parts}),
+                    "streets": len({p[2] for p in parts}),
+                    "partitions": len(parts),
+                }
+        return info
+
+    def query(self, sql):
+        """
+        Run a single SELECT with DuckDB over views named after the tables
+        (kpis, junctions, pipes, buildings), partition columns included.
+        The SQL may come from an LLM: other statements are rejected, and file
+        access is limited to the store root and locked before it runs.
+        Returns a DataFrame.
+        """
+        if not DUCKDB_AVAILABLE:
+            raise ImportError("duckdb is required for SQL queries. Install with `pip install duckdb`.")
+        con = duckdb.connect()
+        try:
+            statements = con.extract_statements(sql)
+            if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+                raise ValueError("Only a single SELECT statement is allowed")
+            root = self.root.resolve()
+            for table in TABLES:
+                table_dir = root / table
+                if any(table_dir.glob("run_id=*")):
+                    pattern = (table_dir / "**" / "*.parquet").as_posix()
+                    con.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{pattern}', "
+                                f"hive_partitioning=true, union_by_name=true)")
+            con.execute("SET allowed_directories = ?", [[root.as_posix() + "/"]])
+            con.execute("SET enable_external_access = false")
+            con.execute("SET lock_configuration = true")
+            return con.execute(statements[0]).fetchdf()
+        finally:
+            con.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Columnar results store for simulation outputs.")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR, help="Store root directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_ingest = sub.add_parser("ingest", help="Import existing result files")
+    p_ingest.add_argument("--dirs", nargs="+", default=["simulation_outputs", "results_test", "results"])
+    p_ingest.add_argument("--run_id", default=None)
+    p_ingest.add_argument("--street_dirs", action="store_true", help="Subdirectories are per-street outputs")
+    sub.add_parser("summary", help="Show runs/scenarios/streets per table")
+    p_query = sub.add_parser("query", help="Run SQL over the store (DuckDB)")
+    p_query.add_argument("sql")
+    p_query.add_argument("--output_csv", default=None)
+    args = parser.parse_args()
+
+    store = ResultsStore(args.store)
+    if args.command == "ingest":
+        run_id = args.run_id or new_run_id()
+        for directory in args.dirs:
+            if os.path.isdir(directory):
+                n = store.ingest_directory(directory, run_id, street_dirs=args.street_dirs)
+                print(f"✅ Ingested {n} files from {directory} (run {run_id})")
+    elif args.command == "summary":
+        print(json.dumps(store.summary(), indent=2))
+    else:
+        df = store.query(args.sql)
+        if args.output_csv:
+            df.to_csv(args.output_csv, index=False)
+            print(f"Query result written to {args.output_csv}")
+        else:
+            print(df.to_string(index=False))
@@ -1,8 +1,10 @@
 # src/scenario_manager.py
 
 import argparse
+import itertools
 import json
 from pathlib import Path
+import numpy as np
 import geopandas as gpd
 
 try:
@@ -11,18 +13,139 @@ try:
 except ImportError:
     YAML_AVAILABLE = False
 
+SCENARIO_DIR = Path("scenarios")
+SHARED_BUILDING_FILE = SCENARIO_DIR / "buildings.geojson"
+BUILDING_ID_COLUMNS = ["GebaeudeID", "building_id", "gebaeude", "id"]
+
+def building_id_column(buildings):
+    """Name of the building ID column (first of BUILDING_ID_COLUMNS present)."""
+    for col in BUILDING_ID_COLUMNS:
+        if col in buildings.columns:
+            return col
+    return None
+
+def write_shared_buildings(buildings, building_file=SHARED_BUILDING_FILE):
+    """
+    Write the building layer once for all scenarios. Buildings without an ID
+    column get a 'building_id' from the row index so scenarios can filter by ID.
+    Returns (path, id column).
+    """
+    id_col = building_id_column(buildings)
+    if id_col is None:
+        buildings = buildings.copy()
+        buildings["building_id"] = buildings.index.astype(str)
+        id_col = "building_id"
+    Path(building_file).parent.mkdir(parents=True, exist_ok=True)
+    buildings.to_file(building_file, driver="GeoJSON")
+    return str(building_file), id_col
+
+def _filtered_building_ids(buildings, id_col, filter_dict):
+    """IDs of the buildings matching every key == value of the filter, or None for all."""
+    if not filter_dict:
+        return None
+    buildings_filt = buildings
+    for k, v in filter_dict.items():
+        buildings_filt = buildings_filt[buildings_filt[k] == v]
+    ids = buildings_filt[id_col] if id_col in buildings_filt.columns else buildings_filt.index.astype(str)
+    return [str(i) for i in ids]
+
+# --- Parameter sweeps ---
+def _parameter_levels(spec):
+    """Discrete levels of a parameter: explicit values or `steps` points between low and high."""
+    if "values" in spec:
+        return list(spec["values"])
+    steps = int(spec.get("steps", 3))
+    return [round(float(v), 6) for v in np.linspace(spec["low"], spec["high"], steps)]
+
+def cartesian_design(parameters):
+    """Full factorial design over the parameter levels. Returns a list of {name: value}."""
+    names = list(parameters)
+    levels = [_parameter_levels(parameters[n]) for n in names]
+    return [dict(zip(names, combo)) for combo in itertools.product(*levels)]
+
+def latin_hypercube_design(parameters, n_samples, seed=None):
+    """
+    Latin-hypercube design: every parameter range is split into n_samples
+    equal strata and each stratum is used exactly once. Continuous parameters
+    (low/high) are sampled uniformly inside their stratum; parameters given as
+    `values` pick the level that covers the stratum.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(parameters)
+    # Stratified unit samples, one independent permutation per parameter
+    u = (rng.permuted(np.tile(np.arange(n_samples), (len(names), 1)), axis=1)
+         + rng.random((len(names), n_samples))) / n_samples
+    samples = [{} for _ in range(n_samples)]
+    for name, column in zip(names, u):
+        spec = parameters[name]
+        if "values" in spec:
+            values = list(spec["values"])
+            picked = [values[i] for i in np.minimum((column * len(values)).astype(int), len(values) - 1)]
+        else:
+            picked = [round(float(v), 6) for v in spec["low"] + column * (spec["high"] - spec["low"])]
+        for sample, value in zip(samples, picked):
+            sample[name] = value
+    return samples
+
+def expand_sweep(sweep):
+    """
+    Expand one sweep block of the scenario config into scenario dicts.
+    Keys: name (prefix), type (or list of types), design (cartesian | lhs),
+    n_samples and seed (lhs), parameters ({name: {low, high[, steps]} or
+    {values: [...]}}), plus any scenario keys (params, weather, network_file,
+    building_filter, description) shared by all sampled scenarios.
+    """
+    design = sweep.get("design", "cartesian").lower()
+    parameters = sweep.get("parameters", {})
+    if design == "cartesian":
+        samples = cartesian_design(parameters)
+    elif design in ("lhs", "latin_hypercube"):
+        samples = latin_hypercube_design(parameters, int(sweep.get("n_samples", 50)), sweep.get("seed"))
+    else:
+        raise ValueError(f"Unknown sweep design '{design}' (expected 'cartesian' or 'lhs')")
+
+    types = sweep.get("type", "DH")
+    types = types if isinstance(types, list) else [types]
+    prefix = sweep.get("name", "sweep")
+    width = len(str(len(samples)))
+    scenarios = []
+    for scenario_type in types:
+        for i, sample in enumerate(samples):
+            scenarios.append({
+                "name": f"{prefix}_{scenario_type.lower()}_{i + 1:0{width}d}",
+                "description": sweep.get("description", f"{design} sweep sample {i + 1}"),
+                "type": scenario_type,
+                "params": {**sweep.get("params", {}), **sample},
+                "weather": sweep.get("weather", {}),
+                "network_file": sweep.get("network_file"),
+                "building_filter": sweep.get("building_filter"),
+                "sweep": {"name": prefix, "design": design, "sample": i + 1},
+            })
+    return scenarios
+
+def expand_scenarios(config):
+    """Hand-listed `scenarios` followed by the expansion of `sweep` / `sweeps` blocks."""
+    scenarios = list(config.get('scenarios', []) or [])
+    sweeps = config.get('sweeps') or config.get('sweep') or []
+    for sweep in (sweeps if isinstance(sweeps, list) else [sweeps]):
+        scenarios.extend(expand_sweep(sweep))
+    return scenarios
+
 def generate_scenarios(buildings, network, config):
     """
     Generate scenario input files (JSON) for all batch runs.
     Each scenario is a combination of: supply tech, temp, demand factor, weather, etc.
     - buildings: GeoDataFrame of buildings (attributes + geometry)
     - network: pickled NetworkX graph, or network metadata as dict
-    - config: scenario config (dict)
-    Outputs scenario files (JSON) in scenarios/
+    - config: scenario config (dict) with `scenarios` and/or `sweep(s)` blocks
+    Outputs scenario files (JSON) in scenarios/. The buildings are written once
+    (scenarios/buildings.geojson); scenarios with a building_filter reference
+    it through a list of building IDs.
     """
-    Path("scenarios").mkdir(exist_ok=True)
+    SCENARIO_DIR.mkdir(exist_ok=True)
+    shared_building_file, id_col = write_shared_buildings(buildings)
 
-    scenarios = config.get('scenarios', [])
+    scenarios = expand_scenarios(config)
     scenario_files = []
     for i, scenario in enumerate(scenarios):
         # Build scenario dict with all required info
@@ -35,32 +158,27 @@ def generate_scenarios(buildings, network, config):
             "network_file": scenario.get("network_file", None),
             "building_file": scenario.get("building_file", None)
         }
+        if "sweep" in scenario:
+            scenario_dict["sweep"] = scenario["sweep"]
 
         # Optionally, filter buildings (e.g., by demand threshold, supply zone, etc.)
-        if "building_filter" in scenario:
-            filter_dict = scenario["building_filter"]
-            buildings_filt = buildings.copy()
-            for k, v in filter_dict.items():
-                buildings_filt = buildings_filt[buildings_filt[k] == v]
-        else:
-            buildings_filt = buildings
-
-        # Write buildings file for this scenario
-        building_file = f"scenarios/buildings_{scenario_dict['name']}.geojson"
-        buildings_filt.to_file(building_file, driver="GeoJSON")
-        scenario_dict["building_file"] = building_file
+        scenario_dict["building_file"] = scenario_dict["building_file"] or shared_building_file
+        scenario_dict["building_id_column"] = id_col
+        scenario_dict["building_ids"] = _filtered_building_ids(buildings, id_col, scenario.get("building_filter"))
 
         # Network file (can be same for all, or vary per scenario)
-        network_file = scenario.get("network_file", "results/branitz_network.graphml")
-        scenario_dict["network_file"] = network_file
+        scenario_dict["network_file"] = scenario_dict["network_file"] or "results/branitz_network.graphml"
 
         # Write scenario JSON
-        scenario_file = f"scenarios/{scenario_dict['name']}_scenario.json"
+        scenario_file = f"{SCENARIO_DIR}/{scenario_dict['name']}_scenario.json"
         with open(scenario_file, "w", encoding="utf-8") as f:
             json.dump(scenario_dict, f, indent=2)
         scenario_files.append(scenario_file)
-        print(f"Scenario '{scenario_dict['name']}' written to {scenario_file}")
+        if len(scenarios) <= 20:
+            print(f"Scenario '{scenario_dict['name']}' written to {scenario_file}")
 
+    if len(scenarios) > 20:
+        print(f"{len(scenarios)} scenarios written to {SCENARIO_DIR}/")
     return scenario_files
 
 if __name__ == "__main__":
@@ -87,4 +205,4 @@ if __name__ == "__main__":
     network = args.network
 
     scenario_files = generate_scenarios(buildings, network, config)
-    print(f"\nAll scenario configs written: {scenario_files}")
+    print(f"\nAll scenario configs written: {len(scenario_files)} files")
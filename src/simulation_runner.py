@@ -1,101 +1,723 @@
 # src/simulation_runner.py
 
 import argparse
+import contextlib
+import hashlib
 import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-import multiprocessing
 import traceback
 
+import numpy as np
+
+try:
+    from .results_store import PYARROW_AVAILABLE, ResultsStore, new_run_id
+    from . import heat_demand, heat_pump_cop, representative_days
+    from .weather import get_weather
+    from .profile_store import load_phase_profiles
+except ImportError:
+    from results_store import PYARROW_AVAILABLE, ResultsStore, new_run_id
+    import heat_demand
+    import heat_pump_cop
+    import representative_days
+    from weather import get_weather
+    from profile_store import load_phase_profiles
+
 RESULTS_DIR = Path("simulation_outputs")
 RESULTS_DIR.mkdir(exist_ok=True)
 
+# The DH/HP engines live in street_final_copy_3 and import their siblings flat
+ENGINE_DIR = Path(__file__).resolve().parent.parent / "street_final_copy_3"
+
+DEFAULT_PROCESSES = 4
+DEFAULT_LOAD_SCENARIO = "winter_werktag_abendspitze"
+DEFAULT_SETTINGS = {
+    "streets_file": "data/geojson/strassen_mit_adressenV3.geojson",
+    "load_profiles_file": "../thesis-data-2/power-sim/gebaeude_lastphasenV2.json",
+    "building_demands_file": "../thesis-data-2/power-sim/gebaeude_lastphasenV2_verbrauch.json",
+    "network_json": "../thesis-data-2/power-sim/branitzer_siedlung_ns_v3_ohne_UW.json",
+    "layout": "shortest_path",
+    "pump_efficiency": 0.7,
+    "renovation_savings": 0.5,
+    # Share of a building's phase load that is heat pump load (the DH demand
+    # model also counts 70% of the consumption as heating); only this share
+    # follows the scenario heat demand multiplier
+    "hp_load_share": 0.7,
+    # Parquet results store (None disables it); run_id defaults to the start time
+    "results_store": "results_store",
+    "run_id": None,
+}
+
+# Scenario-independent inputs, loaded once per process by init_worker()
+_SHARED = {}
+
+def _load_json(path):
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def _scenario_types(scenario_files):
+    types = set()
+    for sf in scenario_files:
+        try:
+            with open(sf, "r", encoding="utf-8") as f:
+                types.add(json.load(f).get("type", "DH").upper())
+        except (OSError, ValueError):
+            continue
+    return types
+
+def init_worker(settings, types=("DH", "HP")):
+    """
+    Load the scenario-independent inputs once per process: street graph
+    (shared street network cache), load profiles, building demands and, for
+    HP scenarios, the power infrastructure and pandapower base grid.
+    """
+    if str(ENGINE_DIR) not in sys.path:
+        sys.path.append(str(ENGINE_DIR))
+    from shared_street_network import get_shared_street_network
+    from batch_street_runner import SharedDataDualPipeNetwork
+
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    street_network = get_shared_street_network(settings["streets_file"])
+    # Memory-mapped profile store next to the JSON if present (no parsing)
+    load_profiles = load_phase_profiles(settings["load_profiles_file"])
+    building_demands = _load_json(settings["building_demands_file"])
+
+    # Heat demand model of the DH engine, also used for HP scenarios so both
+    # technologies are compared on the same annual demand
+    demand_model = SharedDataDualPipeNetwork(
+        RESULTS_DIR, street_network.streets_gdf, None, load_profiles, building_demands,
+    )
+    demand_model.load_profiles = load_profiles
+    demand_model.building_demands = building_demands
+
+    _SHARED.clear()
+    _SHARED.update({
+        "settings": settings,
+        "street_network": street_network,
+        "streets": street_network.streets_gdf,
+        "load_profiles": load_profiles,
+        "building_demands": building_demands,
+        "demand_model": demand_model,
+        "buildings": {},
+    })
+
+    if "HP" in types:
+        import branitz_hp_feasibility as hp
+        _SHARED["hp"] = hp
+        _SHARED["power_infrastructure"] = hp.load_power_infrastructure()
+        _SHARED["base_grid"] = hp.build_base_grid(settings["network_json"])
+
+def _shared():
+    if not _SHARED:
+        init_worker(None)
+    return _SHARED
+
+def _scenario_buildings(scenario):
+    """Buildings of a scenario; each building file is read once per process."""
+    import geopandas as gpd
+
+    building_file = scenario.get("building_file")
+    if not building_file:
+        raise ValueError(f"Scenario '{scenario['name']}' has no building_file")
+    cache = _shared()["buildings"]
+    if building_file not in cache:
+        cache[building_file] = gpd.read_file(building_file)
+    buildings = cache[building_file]
+    building_ids = scenario.get("building_ids")
+    if building_ids is not None:
+        id_col = scenario.get("building_id_column")
+        ids = buildings[id_col].astype(str) if id_col in buildings.columns else buildings.index.astype(str)
+        buildings = buildings[ids.isin(set(map(str, building_ids)))]
+    return buildings.copy()
+
+def demand_scale(params, renovation_savings=None):
+    """
+    Heat demand multiplier of a scenario: demand_factor times the reduction
+    from renovating `renovation_share` of the buildings (each renovated
+    building saves `renovation_savings` of its demand).
+    """
+    if renovation_savings is None:
+        renovation_savings = _shared()["settings"]["renovation_savings"]
+    factor = float(params.get("demand_factor", 1.0))
+    return factor * (1 - float(params.get("renovation_share", 0.0)) * renovation_savings)
+
+def _scaled_load_profiles(load_profiles, buildings, scale, hp_share=None):
+    """
+    Load profiles of the given buildings with their heat pump share
+    (hp_share of the load) multiplied by `scale`; the household rest is
+    unchanged. Other buildings are dropped.
+    """
+    if scale == 1.0:
+        return load_profiles
+    if hp_share is None:
+        hp_share = _shared()["settings"]["hp_load_share"]
+    factor = 1 - hp_share + hp_share * scale
+    scaled = {}
+    for idx, building in buildings.iterrows():
+        building_id = building.get('gebaeude', building.get('id', str(idx)))
+        if building_id in load_profiles:
+            scaled[building_id] = {k: v * factor for k, v in load_profiles[building_id].items()}
+    return scaled
+
+def _annual_heat_demand_mwh(buildings, load_scenario):
+    model = _shared()["demand_model"]
+    model.set_scenario(load_scenario)
+    total_kwh = 0.0
+    for idx, building in buildings.iterrows():
+        building_id = building.get('gebaeude', building.get('id', str(idx)))
+        total_kwh += model.calculate_heat_demand_from_load_profile(building_id, building)['annual_heat_demand_kwh']
+    return total_kwh / 1000
+
+def _scenario_weather(scenario):
+    """WeatherService of the scenario's TRY file (parsed once per process), or None."""
+    weather_file = (scenario.get("weather") or {}).get("file")
+    if not weather_file or not os.path.exists(weather_file):
+        return None
+    return get_weather(weather_file)
+
+def _weather_kpi(weather):
+    if weather is None:
+        return {}
+    return {
+        "design_temperature_c": round(weather.design_temperature(), 1),
+        "heating_degree_days": round(weather.heating_degree_days(), 1),
+    }
+
+def _weather_heat_matrix(weather, buildings):
+    """
+    Hourly heat demand matrix (buildings x 8760, kW) for the scenario's
+    weather, or None without weather or when the buildings carry no envelope
+    data (then the load-profile estimate of the DH engine is used).
+    """
+    if weather is None or not {"wall_area", "u_wall"}.issubset(buildings.columns):
+        return None
+    return heat_demand.heat_demand_matrix(buildings, weather.try_file)
+
+def _household_load_kw(buildings, load_profiles, load_scenario):
+    """Household peak load [kW] of each building for the load scenario (0 without a profile)."""
+    if hasattr(load_profiles, "phase_values"):
+        return load_profiles.phase_values(load_scenario, heat_demand.building_ids(buildings),
+                                          fallback=DEFAULT_LOAD_SCENARIO).tolist()
+    loads = []
+    for idx, building in buildings.iterrows():
+        profile = load_profiles.get(building.get('gebaeude', building.get('id', str(idx))), {})
+        loads.append(float(profile.get(load_scenario, profile.get(DEFAULT_LOAD_SCENARIO, 0.0))))
+    return loads
+
+def _household_hourly_kw(buildings, load_profiles):
+    """
+    Hourly household load matrix (buildings x 8760, kW) from the full-year
+    profiles of the profile store, or None if there are none (JSON input).
+    """
+    if getattr(load_profiles, "year_matrix", None) is None:
+        return None
+    return load_profiles.hourly_profiles(heat_demand.building_ids(buildings))
+
+def _overload_hours(timeseries):
+    """
+    Hours with an overloaded transformer: counted over the simulated hours,
+    or weighted up to the year when the run used representative days.
+    """
+    overloaded = timeseries["max_trafo_loading"] > 100
+    if "weight" in timeseries:
+        return int(round(float(timeseries.loc[overloaded, "weight"].sum())))
+    return int(overloaded.sum())
+
+def _pump_energy_kwh(heat_mwh, pressure_drop_bar, supply_temp, return_temp, efficiency):
+    """Annual pumping energy: pressure drop times circulated water volume over pump efficiency."""
+    delta_t = max(supply_temp - return_temp, 1.0)
+    volume_m3 = heat_mwh * 3.6e9 / (4186 * delta_t * 1000)
+    return pressure_drop_bar * 1e5 * volume_m3 / efficiency / 3.6e6
+
+def _scenario_output_dir(scenario):
+    output_dir = RESULTS_DIR / scenario["name"]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir
+
 def run_pandapipes_simulation(scenario):
     """
-    Placeholder: Run a single pandapipes simulation for DH scenario.
+    Run a DH scenario: dual-pipe network along the shared street graph
+    (ImprovedDualPipeDHNetwork) followed by the pandapipes hydraulic simulation.
+    Demand factor, renovation share and supply/return temperatures are
+    applied before the network is built, so they reach the segment design
+    loads and mass flows. pandapipes simulates the saved network tables with
+    the building design flows; the pressure drop is the loss along the
+    critical supply/return path, the flow the plant circulation flow, and
+    the pipes lose heat to the ground at the TRY annual mean temperature.
     Returns dict of results/KPIs for this scenario.
     """
-    # Example: load network, buildings, run your simulation function
     try:
         print(f"Running DH simulation for scenario: {scenario['name']}")
-        # Load buildings and network as needed (expand as required)
-        #  import  actual simulation logic here
-        # from dh_simulation import run_dh
-        # results = run_dh(...)
-        # Here, just return dummy output
-        results = {
+        shared = _shared()
+        from batch_street_runner import SharedDataDualPipeNetwork
+        from simulate_dual_pipe_dh_network_final import FinalDualPipeDHSimulation
+
+        settings = shared["settings"]
+        params = scenario.get("params", {})
+        load_scenario = params.get("load_scenario", DEFAULT_LOAD_SCENARIO)
+        output_dir = _scenario_output_dir(scenario)
+        scenario_name = f"dual_pipe_{scenario['name']}"
+
+        buildings = _scenario_buildings(scenario)
+        scale = demand_scale(params)
+        supply_temp = float(params.get("supply_temp", 70))
+        return_temp = float(params.get("return_temp", 40))
+        weather = _scenario_weather(scenario)
+        heat_matrix = _weather_heat_matrix(weather, buildings)
+        if heat_matrix is not None:
+            heat_matrix *= scale
+
+        with open(output_dir / "run.log", "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+            network = SharedDataDualPipeNetwork(
+                results_dir=output_dir,
+                streets_gdf=shared["streets"],
+                buildings_gdf=buildings,
+                load_profiles=shared["load_profiles"],
+                building_demands=shared["building_demands"],
+                shared_network=shared["street_network"],
+                layout=params.get("layout", settings["layout"]),
+            )
+            network.set_scenario(load_scenario)
+            network.heat_demand_scale = scale
+            network.supply_temperature_c = supply_temp
+            network.return_temperature_c = return_temp
+            if weather is not None:
+                network.load_profile_cop = heat_pump_cop.design_cop(weather, params)
+            if heat_matrix is not None:
+                network.heat_demand_by_building = heat_demand.heat_demand_by_building(buildings, matrix=heat_matrix)
+                network.heat_demand_profiles = heat_matrix
+                network.heat_demand_profile_index = buildings.index
+            if not network.create_complete_dual_pipe_network(scenario_name):
+                raise RuntimeError("dual-pipe network creation failed")
+            # Buried pipes: ground temperature ~ annual mean air temperature
+            simulator = FinalDualPipeDHSimulation(
+                results_dir=output_dir,
+                ambient_temperature_c=weather.annual_mean_temperature() if weather is not None else None,
+                supply_temperature_c=supply_temp,
+                return_temperature_c=return_temp,
+            )
+            if not simulator.run_complete_simulation(scenario_name):
+                raise RuntimeError("pandapipes simulation failed")
+
+        stats = network.network_stats
+        sim_kpi = simulator.simulation_kpi
+        heat_mwh = float(stats["total_heat_demand_mwh"])
+        pressure_drop_bar = float(sim_kpi["pressure_drop_bar"])
+        trench_m = 1000 * float(stats.get("trench_length_km", stats["total_main_length_km"] / 2))
+        return {
             "scenario": scenario["name"],
             "type": "DH",
             "success": True,
-            "kpi": {"total_heat_supplied_mwh": 1234, "pump_energy_kwh": 3000, "max_pressure_drop_bar": 0.7}
+            "params": params,
+            "output_dir": str(output_dir),
+            "kpi": {
+                "total_heat_supplied_mwh": round(heat_mwh, 2),
+                "pump_energy_kwh": round(_pump_energy_kwh(
+                    heat_mwh, pressure_drop_bar, supply_temp, return_temp, settings["pump_efficiency"]), 1),
+                "max_pressure_drop_bar": round(pressure_drop_bar, 3),
+                "network_length_m": round(trench_m, 1),
+                "total_pipe_length_km": round(float(stats["total_pipe_length_km"]), 3),
+                "num_buildings": int(stats["num_buildings"]),
+                "peak_heat_demand_kw": round(float(stats["total_heat_demand_kw"]), 1),
+                "coincident_peak_kw": round(float(stats["coincident_peak_heat_kw"]), 1),
+                "simultaneity_factor": round(float(stats["simultaneity_factor"]), 3),
+                "heat_demand_source": "weather" if heat_matrix is not None else "load_profile",
+                "total_flow_kg_per_s": round(float(sim_kpi["total_flow_kg_per_s"]), 3),
+                "network_heat_loss_kw": round(float(sim_kpi["heat_loss_kw"]), 2),
+                "plant_return_temperature_c": round(float(sim_kpi["plant_return_temperature_c"]), 2),
+                **_weather_kpi(weather),
+            },
         }
-        return results
     except Exception as e:
         traceback.print_exc()
         return {"scenario": scenario.get("name", ""), "type": "DH", "success": False, "error": str(e)}
 
+def _representative_hours(params, electric_matrix, household_kw, weather):
+    """
+    Hours and weights of the params["representative_days"] clustered days
+    of the total grid load (heat pumps plus household), with KPIs on how
+    well those days reproduce that load's annual energy and hourly peak.
+    Returns (None, None, {}) when the scenario simulates no representative days.
+    """
+    if not params.get("representative_days"):
+        return None, None, {}
+    household_total = np.asarray(household_kw, dtype=float)
+    household_total = household_total.sum(axis=0) if household_total.ndim == 2 else household_total.sum()
+    total_load = electric_matrix.sum(axis=0, dtype=np.float64) + household_total
+    rep_days = representative_days.select_representative_days(
+        total_load, weather.temperature, int(params["representative_days"]))
+    rep_hours, rep_weights = representative_days.representative_timesteps(rep_days)
+    errors = representative_days.estimate_error(total_load, rep_days)
+    return rep_hours, rep_weights, {
+        "n_representative_days": rep_days["n_days"],
+        "annual_error_bound_percent": round(errors["annual_error_bound_percent"], 2),
+        "peak_error_percent": round(errors["peak_error_percent"], 2),
+        "speedup": round(errors["speedup"], 1),
+    }
+
 def run_pandapower_simulation(scenario):
     """
-    Placeholder: Run a single pandapower simulation for HP scenario.
+    Run an HP scenario: building proximity to the LV grid, then the
+    pandapower load flow on the shared base grid. With TRY weather and
+    building envelopes the hourly heat matrix is turned into heat pump
+    electric load via the temperature-dependent COP and the critical hours
+    are simulated (run_timeseries_power_flow, household peak load on top);
+    with params["representative_days"] the hours of that many clustered
+    days are simulated as well, the hour-count KPIs are weighted up to the
+    year and the KPIs report the error of those days. Otherwise the single-snapshot compute_power_feasibility is used.
     Returns dict of results/KPIs for this scenario.
     """
     try:
         print(f"Running HP simulation for scenario: {scenario['name']}")
-        # Load buildings and network as needed
-        # from hp_simulation import run_hp
-        # results = run_hp(...)
-        results = {
+        shared = _shared()
+        if "hp" not in shared:
+            init_worker(shared["settings"], types=("DH", "HP"))
+            shared = _SHARED
+        hp = shared["hp"]
+        lines, substations, plants, generators = shared["power_infrastructure"]
+        params = scenario.get("params", {})
+        load_scenario = params.get("load_scenario", DEFAULT_LOAD_SCENARIO)
+        output_dir = _scenario_output_dir(scenario)
+
+        with open(output_dir / "run.log", "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+            buildings = hp.compute_proximity(_scenario_buildings(scenario), lines, substations, plants, generators)
+            scale = demand_scale(params)
+            weather = _scenario_weather(scenario)
+            heat_matrix = _weather_heat_matrix(weather, buildings)
+            if heat_matrix is not None:
+                heat_matrix *= scale
+                cop = heat_pump_cop.scenario_cop(weather, params)
+                electric_matrix = heat_pump_cop.electric_load_matrix(heat_matrix, cop)
+                # Hourly household load where the store has full-year
+                # profiles, otherwise the phase value of the load scenario
+                household_kw = _household_hourly_kw(buildings, shared["load_profiles"])
+                household_load = "hourly" if household_kw is not None else "phase"
+                if household_kw is None:
+                    household_kw = _household_load_kw(buildings, shared["load_profiles"], load_scenario)
+                transformers, grid_lines = hp.transformer_peak_check(
+                    buildings, electric_matrix, shared["base_grid"], base_load_kw=household_kw)
+                rep_hours, rep_weights, rep_kpi = _representative_hours(
+                    params, electric_matrix, household_kw, weather)
+                timeseries = hp.run_timeseries_power_flow(
+                    buildings, electric_matrix, shared["base_grid"], base_load_kw=household_kw,
+                    hours=rep_hours, hour_weights=rep_weights,
+                    n_critical_hours=int(params.get("critical_hours", 24)),
+                    extra_hours=transformers["peak_hour"].to_numpy(),
+                )
+                timeseries.to_csv(output_dir / "timeseries_power_flow.csv", index=False)
+                heat_mwh = float(heat_matrix.sum(dtype="float64")) / 1000
+            else:
+                scaled_profiles = _scaled_load_profiles(shared["load_profiles"], buildings, scale)
+                power_metrics, net = hp.compute_power_feasibility(
+                    buildings, scaled_profiles, shared["settings"]["network_json"], load_scenario,
+                    base_grid=shared["base_grid"], return_net=True,
+                )
+                heat_mwh = _annual_heat_demand_mwh(buildings, load_scenario) * scale
+                transformers, grid_lines = hp.transformer_peak_check(
+                    buildings, _household_load_kw(buildings, scaled_profiles, load_scenario), shared["base_grid"])
+            transformers.to_csv(output_dir / "transformer_peaks.csv", index=False)
+            grid_lines.to_csv(output_dir / "line_peaks.csv", index=False)
+
+        if heat_matrix is not None:
+            grid_kpi = {
+                "power_flow": "timeseries",
+                "household_load": household_load,
+                "cop": round(heat_pump_cop.seasonal_cop(heat_matrix, electric_matrix), 3),
+                "design_cop": round(heat_pump_cop.design_cop(weather, params), 3),
+                "hp_electricity_mwh": round(float(electric_matrix.sum(dtype="float64")) / 1000, 2),
+                "peak_hp_electric_kw": round(float(electric_matrix.sum(axis=0).max()), 1),
+                "n_heat_pumps": int((heat_matrix.max(axis=1) > 0).sum()),
+                "max_feeder_load_percent": round(float(timeseries["max_trafo_loading"].max()), 1),
+                "min_voltage_pu": round(float(timeseries["min_voltage"].min()), 4),
+                "transformer_overloads": int(timeseries["trafo_overloads"].max()),
+                "overload_hours": _overload_hours(timeseries),
+                "nonconverged_hours": int((~timeseries["converged"]).sum()),
+                "simulated_hours": len(timeseries),
+                **rep_kpi,
+            }
+        else:
+            metrics = next(iter(power_metrics.values()), {})
+            trafo_loading = net.res_trafo["loading_percent"] if len(net.res_trafo) else []
+            n_heat_pumps = int(sum(1 for m in power_metrics if m in shared["load_profiles"]))
+            grid_kpi = {
+                "power_flow": "snapshot",
+                "cop": params.get("cop"),
+                "n_heat_pumps": n_heat_pumps or len(buildings),
+                "max_feeder_load_percent": round(float(metrics.get("max_loading", float("nan"))), 1),
+                "min_voltage_pu": round(float(metrics.get("min_voltage", float("nan"))), 4),
+                "transformer_overloads": int(sum(1 for v in trafo_loading if v > 100)),
+            }
+        return {
             "scenario": scenario["name"],
             "type": "HP",
             "success": True,
-            "kpi": {"max_feeder_load_percent": 82, "transformer_overloads": 1}
+            "params": params,
+            "output_dir": str(output_dir),
+            "kpi": {
+                "total_heat_supplied_mwh": round(heat_mwh, 2),
+                "heat_demand_source": "weather" if heat_matrix is not None else "load_profile",
+                **grid_kpi,
+                "coincident_peak_kw": round(float(transformers["coincident_peak_kw"].sum()), 1),
+                "sum_of_peaks_kw": round(float(transformers["sum_of_peaks_kw"].sum()), 1),
+                "max_trafo_loading_estimate_percent": round(float(transformers["loading_percent"].max()), 1)
+                if len(transformers) else None,
+                "buildings_far_from_transformer": int(buildings["flag_far_transformer"].sum()),
+                "num_buildings": len(buildings),
+                **_weather_kpi(weather),
+            },
         }
-        return results
     except Exception as e:
         traceback.print_exc()
         return {"scenario": scenario.get("name", ""), "type": "HP", "success": False, "error": str(e)}
 
+# Relative cost of one building in a scenario (network build + pipeflow vs. one load flow)
+TYPE_COST_WEIGHT = {"DH": 5.0, "HP": 1.0}
+ALL_BUILDINGS_ESTIMATE = 10_000
+
+# A crashed worker breaks the whole pool; unfinished scenarios are resubmitted
+# to a fresh pool at most this many times
+MAX_POOL_RESTARTS = 2
+# Settings that only say where results go, not what they are
+_OUTPUT_SETTINGS = ("results_store", "run_id")
+_SETTINGS_FILES = ("streets_file", "load_profiles_file", "building_demands_file", "network_json")
+
+_digest_memo = {}
+
+def _file_digest(path):
+    """SHA-256 of a file, memoized on (path, size, mtime); missing files hash to a marker."""
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return "missing"
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _digest_memo:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _digest_memo[memo_key] = h.hexdigest()
+    return _digest_memo[memo_key]
+
+def _code_digest():
+    """Digest of the engine code: the DH/HP engines and the src modules of this runner."""
+    h = hashlib.sha256()
+    for path in sorted([*ENGINE_DIR.glob("*.py"), *Path(__file__).resolve().parent.glob("*.py")]):
+        h.update(path.name.encode())
+        h.update(_file_digest(path).encode())
+    return h.hexdigest()
+
+def scenario_hash(scenario, settings=None):
+    """
+    Hash of everything a scenario result depends on: the scenario definition,
+    its building and weather files, the engine settings with their input
+    files, and the engine code. A result whose hash changed is not reused on resume.
+    """
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    payload = json.dumps({
+        "scenario": scenario,
+        "building_file": _file_digest(scenario.get("building_file")),
+        "weather_file": _file_digest((scenario.get("weather") or {}).get("file")),
+        "settings": {k: v for k, v in settings.items() if k not in _OUTPUT_SETTINGS},
+        "settings_files": {k: _file_digest(settings.get(k)) for k in _SETTINGS_FILES},
+        "code": _code_digest(),
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def result_file(scenario_name):
+    return RESULTS_DIR / f"{scenario_name}_results.json"
+
+def _load_scenario(scenario_file):
+    with open(scenario_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_result(results):
+    """Write a result file atomically, so an interrupted run never leaves a truncated file behind."""
+    out_file = result_file(results["scenario"])
+    tmp = out_file.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    os.replace(tmp, out_file)
+    return out_file
+
+def completed_result(scenario, settings=None):
+    """The stored result of a scenario if it succeeded with the same scenario hash, else None."""
+    try:
+        with open(result_file(scenario["name"]), "r", encoding="utf-8") as f:
+            results = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if results.get("success") and results.get("scenario_hash") == scenario_hash(scenario, settings):
+        return results
+    return None
+
+def estimate_cost(scenario):
+    """
+    Rough relative runtime of a scenario: a previously measured runtime if
+    one is stored, otherwise the type weight times the number of buildings.
+    """
+    try:
+        with open(result_file(scenario["name"]), "r", encoding="utf-8") as f:
+            runtime_s = json.load(f).get("runtime_s")
+        if runtime_s:
+            return float(runtime_s)
+    except (OSError, ValueError):
+        pass
+    ids = scenario.get("building_ids")
+    n_buildings = len(ids) if ids is not None else ALL_BUILDINGS_ESTIMATE
+    return TYPE_COST_WEIGHT.get(scenario.get("type", "DH").upper(), 1.0) * n_buildings
+
+def _store_result(results):
+    """Append the result to the Parquet results store, if configured."""
+    settings = _shared()["settings"]
+    if not settings.get("results_store") or not PYARROW_AVAILABLE:
+        return
+    try:
+        ResultsStore(settings["results_store"]).write_result(results, settings["run_id"])
+    except Exception as e:
+        print(f"⚠️ Could not write {results.get('scenario')} to the results store: {e}")
+
 def run_scenario(scenario_file):
     """
     Load scenario JSON, call the correct simulation function, and save results.
     """
     try:
-        with open(scenario_file, "r", encoding="utf-8") as f:
-            scenario = json.load(f)
+        start = time.perf_counter()
+        scenario = _load_scenario(scenario_file)
         if scenario.get("type", "DH").upper() == "DH":
             results = run_pandapipes_simulation(scenario)
         elif scenario.get("type", "DH").upper() == "HP":
             results = run_pandapower_simulation(scenario)
         else:
             raise ValueError(f"Unknown scenario type: {scenario.get('type')}")
-        # Save results to output file
-        out_file = RESULTS_DIR / f"{scenario['name']}_results.json"
-        with open(out_file, "w", encoding="utf-8") as f:
-            json.dump(results, f, indent=2)
+        results["scenario_hash"] = scenario_hash(scenario, _shared()["settings"])
+        results["runtime_s"] = round(time.perf_counter() - start, 2)
+        # Save results to output file as soon as the scenario completes
+        out_file = _write_result(results)
         print(f"Results saved: {out_file}")
+        _store_result(results)
         return results
     except Exception as e:
         traceback.print_exc()
         return {"scenario_file": scenario_file, "success": False, "error": str(e)}
 
-def run_simulation_scenarios(scenario_files, parallel=True):
+def _run_in_pool(pending, scenarios, results, processes, settings, types):
+    """
+    Run the pending scenario files on a process pool, filling `results`.
+    A worker crash (BrokenProcessPool) fails every future of the pool, so the
+    scenarios without a result are resubmitted to a fresh pool.
+    """
+    remaining = list(pending)
+    for restart in range(MAX_POOL_RESTARTS + 1):
+        broken = False
+        with ProcessPoolExecutor(max_workers=min(processes, len(remaining)), initializer=init_worker,
+                                 initargs=(settings, types)) as executor:
+            futures = {executor.submit(run_scenario, sf): sf for sf in remaining}
+            try:
+                for future in as_completed(futures):
+                    sf = futures[future]
+                    try:
+                        results[sf] = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        continue
+                    except Exception as e:
+                        results[sf] = {"scenario_file": sf, "success": False, "error": str(e)}
+                    status = "✅" if results[sf].get("success") else "❌"
+                    done = sum(1 for p in pending if p in results)
+                    print(f"[{done}/{len(pending)}] {status} {scenarios[sf].get('name', sf)}")
+            except KeyboardInterrupt:
+                for future in futures:
+                    future.cancel()
+                print("\n⚠️ Interrupted - completed results are saved, rerun with resume to continue")
+                raise
+        remaining = [sf for sf in remaining if sf not in results]
+        if not broken or not remaining:
+            return
+        if restart < MAX_POOL_RESTARTS:
+            print(f"⚠️ A worker process crashed - restarting the pool for {len(remaining)} unfinished scenarios")
+    for sf in remaining:
+        results[sf] = {"scenario_file": sf, "success": False,
+                       "error": f"worker process crashed (pool restarted {MAX_POOL_RESTARTS} times)"}
+        print(f"❌ {scenarios[sf].get('name', sf)}: worker process crashed")
+
+def run_simulation_scenarios(scenario_files, parallel=True, processes=None, settings=None, resume=False):
     """
     Batch run all scenario files. Can use multiprocessing.
+    - processes: pool size (default: min(DEFAULT_PROCESSES, number of scenarios))
+    - settings: engine inputs overriding DEFAULT_SETTINGS (streets_file,
+      load_profiles_file, building_demands_file, network_json, layout,
+      pump_efficiency, renovation_savings, results_store, run_id)
+    - resume: skip scenarios whose stored result succeeded with the same
+      scenario hash (definition, input files, settings and engine code)
+    Every worker loads the shared inputs once in its initializer. Scenarios
+    are submitted most expensive first and picked up by whichever worker is
+    free; each result is written as soon as it completes, so an interrupted
+    run can be continued with resume=True. If a worker crashes, the pool is
+    restarted for the unfinished scenarios (up to MAX_POOL_RESTARTS times).
     """
     print(f"Running simulations for {len(scenario_files)} scenarios...")
-    if parallel and len(scenario_files) > 1:
-        with multiprocessing.Pool(processes=min(4, len(scenario_files))) as pool:
-            results = pool.map(run_scenario, scenario_files)
-    else:
-        results = [run_scenario(sf) for sf in scenario_files]
+    settings = {**(settings or {})}
+    settings["run_id"] = settings.get("run_id") or new_run_id()
+    scenarios = {}
+    results = {}
+    for sf in scenario_files:
+        try:
+            scenarios[sf] = _load_scenario(sf)
+        except (OSError, ValueError) as e:
+            results[sf] = {"scenario_file": sf, "success": False, "error": str(e)}
+    if resume:
+        for sf, scenario in scenarios.items():
+            done = completed_result(scenario, settings)
+            if done is not None:
+                results[sf] = done
+        print(f"Resuming: {sum(1 for r in results.values() if r.get('success'))} scenarios already completed")
+
+    pending = sorted((sf for sf in scenarios if sf not in results),
+                     key=lambda sf: estimate_cost(scenarios[sf]), reverse=True)
+    types = {scenarios[sf].get("type", "DH").upper() for sf in pending}
+    processes = processes or min(DEFAULT_PROCESSES, len(pending))
+    if parallel and len(pending) > 1 and processes > 1:
+        _run_in_pool(pending, scenarios, results, processes, settings, types)
+    elif pending:
+        init_worker(settings, types)
+        for sf in pending:
+            results[sf] = run_scenario(sf)
     print("\nAll simulations complete.")
-    return results
+    return [results[sf] for sf in scenario_files]
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run batch energy network simulations for scenario files.")
     parser.add_argument("--scenarios", nargs='+', required=True,
                         help="List of scenario JSON files to run")
     parser.add_argument("--no_parallel", action="store_true", help="Disable multiprocessing")
+    parser.add_argument("--processes", type=int, default=None,
+                        help=f"Worker processes (default: min({DEFAULT_PROCESSES}, number of scenarios))")
+    parser.add_argument("--streets", default=DEFAULT_SETTINGS["streets_file"], help="Streets GeoJSON")
+    parser.add_argument("--load_profiles", default=DEFAULT_SETTINGS["load_profiles_file"], help="Load profiles JSON")
+    parser.add_argument("--building_demands", default=DEFAULT_SETTINGS["building_demands_file"], help="Building demands JSON")
+    parser.add_argument("--network_json", default=DEFAULT_SETTINGS["network_json"], help="LV grid JSON for pandapower")
+    parser.add_argument("--layout", choices=["shortest_path", "steiner"], default=DEFAULT_SETTINGS["layout"],
+                        help="DH main pipe layout")
+    parser.add_argument("--resume", action="store_true", help="Skip scenarios with a stored successful result")
+    parser.add_argument("--results_store", default=DEFAULT_SETTINGS["results_store"],
+                        help="Parquet results store directory ('' to disable)")
+    parser.add_argument("--run_id", default=None, help="Run ID in the results store (default: start time)")
     args = parser.parse_args()
 
-    scenario_files = args.scenarios
-    run_simulation_scenarios(scenario_files, parallel=not args.no_parallel)
+    settings = {
+        "streets_file": args.streets,
+        "load_profiles_file": args.load_profiles,
+        "building_demands_file": args.building_demands,
+        "network_json": args.network_json,
+        "layout": args.layout,
+        "results_store": args.results_store or None,
+        "run_id": args.run_id,
+    }
+    run_simulation_scenarios(args.scenarios, parallel=not args.no_parallel, processes=args.processes,
+                             settings=settings, resume=args.resume)
@@ -0,0 +1,205 @@
+# src/weather.py
+
+import argparse
+import functools
+import hashlib
+import os
+from pathlib import Path
+import numpy as np
+
+# Columns of a DWD test reference year (TRY 2015) .dat file, in file order
+TRY_COLUMNS = ["RW", "HW", "MM", "DD", "HH", "t", "p", "WR", "WG", "N", "x", "RF", "B", "D", "A", "E", "IL"]
+TRY_UNITS = {
+    "t": "°C", "p": "hPa", "WR": "°", "WG": "m/s", "N": "octa", "x": "g/kg", "RF": "%",
+    "B": "W/m²", "D": "W/m²", "A": "W/m²", "E": "W/m²",
+}
+HOURS_PER_YEAR = 8760
+DEFAULT_CACHE_DIR = ".weather_cache"
+DEFAULT_TRY_FILE = "data/csv/TRY2015_517475143730_Jahr.dat"
+# The three TRY 2015 years of the site: mean, extreme summer, extreme winter
+TRY_VARIANTS = {
+    "mean": "data/csv/TRY2015_517475143730_Jahr.dat",
+    "summer_extreme": "data/csv/TRY2015_517475143730_Somm.dat",
+    "winter_extreme": "data/csv/TRY2015_517475143730_Wint.dat",
+}
+# Degree-day defaults (VDI 4710 / DIN 4108-6 "Gradtagzahl" G20/15)
+T_INDOOR = 20.0
+HEATING_LIMIT_C = 15.0
+# Share of hours colder than the design temperature (99.6 % coverage)
+DESIGN_PERCENTILE = 0.4
+
+def _cache_path(try_file, cache_dir):
+    """Cache file name tied to the source path, size and modification time."""
+    stat = os.stat(try_file)
+    key = f"{Path(try_file).resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    return Path(cache_dir) / f"{Path(try_file).stem}-{digest}.npy"
+
+def parse_try(try_file):
+    """
+    Parse the data block of a TRY .dat file (everything after the '***'
+    marker line) into an (8760, 17) float array in TRY_COLUMNS order.
+    The fixed-width fields are separated by blanks, so the block is split
+    once and converted in a single NumPy call.
+    """
+    with open(try_file, "rb") as f:
+        raw = f.read()
+    marker = raw.find(b"\n***")
+    if marker < 0:
+        raise ValueError(f"{try_file}: no '***' line before the data block")
+    data_start = raw.index(b"\n", marker + 1) + 1
+    values = np.array(raw[data_start:].split(), dtype=np.float64)
+    if values.size % len(TRY_COLUMNS):
+        raise ValueError(f"{try_file}: data block is not a multiple of {len(TRY_COLUMNS)} fields")
+    return values.reshape(-1, len(TRY_COLUMNS))
+
+@functools.lru_cache(maxsize=8)
+def _load_try(resolved_file, cache_dir):
+    if cache_dir:
+        cache_file = _cache_path(resolved_file, cache_dir)
+        if cache_file.exists():
+            return np.load(cache_file, mmap_mode="r")
+        data = parse_try(resolved_file)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_suffix(f".{os.getpid()}.tmp.npy")
+        np.save(tmp, data)
+        os.replace(tmp, cache_file)
+        return np.load(cache_file, mmap_mode="r")
+    return parse_try(resolved_file)
+
+def read_try(try_file=DEFAULT_TRY_FILE, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    TRY data as a read-only (8760, 17) array. The parsed file is cached as
+    .npy (memory-mapped on later runs) and memoized per process; pass
+    cache_dir=None to skip the on-disk cache.
+    """
+    return _load_try(str(Path(try_file).resolve()), cache_dir)
+
+def try_column(data, name):
+    """One TRY column (see TRY_COLUMNS) as a float array."""
+    return np.asarray(data[:, TRY_COLUMNS.index(name)], dtype=np.float64)
+
+def outdoor_temperature(try_file=DEFAULT_TRY_FILE):
+    """Hourly air temperature at 2 m [°C], 8760 values."""
+    return try_column(read_try(try_file), "t")
+
+def global_horizontal_irradiance(try_file=DEFAULT_TRY_FILE):
+    """Hourly global irradiance on the horizontal plane (direct + diffuse) [W/m²]."""
+    data = read_try(try_file)
+    return try_column(data, "B") + try_column(data, "D")
+
+class WeatherService:
+    """
+    Derived statistics of one TRY file. The file is parsed once (read_try
+    cache) and every statistic is memoized per argument, so repeated
+    scenario runs in a process only pay for the first call:
+
+        w = get_weather("data/csv/TRY2015_517475143730_Wint.dat")
+        w.design_temperature()          # 0.4 % percentile of hourly t
+        w.heating_degree_days(15.0)     # HDD base 15 °C [Kd]
+        w.monthly_means()               # 12 monthly mean temperatures
+    """
+
+    def __init__(self, try_file=DEFAULT_TRY_FILE, cache_dir=DEFAULT_CACHE_DIR):
+        self.try_file = str(try_file)
+        self.data = read_try(try_file, cache_dir)
+        self._memo = {}
+
+    def _memoized(self, key, compute):
+        if key not in self._memo:
+            self._memo[key] = compute()
+        return self._memo[key]
+
+    @property
+    def temperature(self):
+        """Hourly air temperature [°C], 8760 values."""
+        return self._memoized("t", lambda: try_column(self.data, "t"))
+
+    @property
+    def irradiance(self):
+        """Hourly global horizontal irradiance (direct + diffuse) [W/m²]."""
+        return self._memoized("ghi", lambda: try_column(self.data, "B") + try_column(self.data, "D"))
+
+    def daily_mean_temperatures(self):
+        """Daily mean air temperatures [°C], 365 values."""
+        t = self.temperature
+        return self._memoized("daily", lambda: t[:len(t) // 24 * 24].reshape(-1, 24).mean(axis=1))
+
+    def annual_mean_temperature(self):
+        return self._memoized("annual_mean", lambda: float(self.temperature.mean()))
+
+    def monthly_means(self):
+        """Monthly mean air temperatures [°C] (index 0 = January)."""
+        def compute():
+            months = try_column(self.data, "MM").astype(int)
+            return np.bincount(months - 1, weights=self.temperature, minlength=12) \
+                / np.maximum(np.bincount(months - 1, minlength=12), 1)
+        return self._memoized("monthly", compute)
+
+    def heating_degree_days(self, base_temperature=HEATING_LIMIT_C, indoor_temperature=None):
+        """
+        Heating degree days [Kd] from daily mean temperatures. Without
+        indoor_temperature: sum of (base - t_day) over days below the base.
+        With it: the German Gradtagzahl G<indoor>/<base>, i.e. the sum of
+        (indoor - t_day) over heating days (t_day < base).
+        """
+        def compute():
+            daily = self.daily_mean_temperatures()
+            heating_days = daily < base_temperature
+            reference = base_temperature if indoor_temperature is None else indoor_temperature
+            return float((reference - daily)[heating_days].sum())
+        return self._memoized(("hdd", float(base_temperature), indoor_temperature), compute)
+
+    def heating_days(self, base_temperature=HEATING_LIMIT_C):
+        return self._memoized(("heating_days", float(base_temperature)),
+                              lambda: int((self.daily_mean_temperatures() < base_temperature).sum()))
+
+    def design_temperature(self, percentile=DESIGN_PERCENTILE):
+        """Design outdoor temperature [°C]: the given percentile of the hourly temperatures."""
+        return self._memoized(("design", float(percentile)),
+                              lambda: float(np.percentile(self.temperature, percentile)))
+
+    def summary(self):
+        """Key statistics as a JSON-serialisable dict."""
+        return {
+            "try_file": self.try_file,
+            "annual_mean_temperature_c": round(self.annual_mean_temperature(), 2),
+            "design_temperature_c": round(self.design_temperature(), 1),
+            "min_temperature_c": round(float(self.temperature.min()), 1),
+            "max_temperature_c": round(float(self.temperature.max()), 1),
+            "heating_degree_days_15": round(self.heating_degree_days(HEATING_LIMIT_C), 1),
+            "gradtagzahl_20_15": round(self.heating_degree_days(HEATING_LIMIT_C, T_INDOOR), 1),
+            "heating_days": self.heating_days(),
+            "monthly_mean_temperature_c": [round(float(v), 2) for v in self.monthly_means()],
+            "global_irradiance_kwh_per_m2": round(float(self.irradiance.sum()) / 1000, 1),
+        }
+
+@functools.lru_cache(maxsize=8)
+def _weather_service(resolved_file, cache_dir):
+    return WeatherService(resolved_file, cache_dir)
+
+def get_weather(try_file=DEFAULT_TRY_FILE, cache_dir=DEFAULT_CACHE_DIR):
+    """Shared WeatherService of a TRY file (one instance per file and process)."""
+    if try_file in TRY_VARIANTS:
+        try_file = TRY_VARIANTS[try_file]
+    return _weather_service(str(Path(try_file).resolve()), cache_dir)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse and cache DWD TRY weather files and show their statistics.")
+    parser.add_argument("--weather", nargs="+", default=list(TRY_VARIANTS.values()),
+                        help="TRY .dat files or variant names (mean, summer_extreme, winter_extreme)")
+    parser.add_argument("--cache_dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--json", action="store_true", help="Print the statistics as JSON")
+    args = parser.parse_args()
+
+    summaries = [get_weather(w, args.cache_dir).summary() for w in args.weather]
+    if args.json:
+        import json
+        print(json.dumps(summaries, indent=2))
+    else:
+        for info in summaries:
+            print(f"✅ {info['try_file']}: mean {info['annual_mean_temperature_c']} °C, "
+                  f"design {info['design_temperature_c']} °C, "
+                  f"HDD15 {info['heating_degree_days_15']:.0f} Kd, G20/15 {info['gradtagzahl_20_15']:.0f} Kd, "
+                  f"{info['heating_days']} heating days, "
+                  f"global irradiance {info['global_irradiance_kwh_per_m2']:.0f} kWh/m²a")
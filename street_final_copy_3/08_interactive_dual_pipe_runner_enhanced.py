@@ -27,6 +27,7 @@ warnings.filterwarnings('ignore')
 
 # Import our dual-pipe network classes
 from create_complete_dual_pipe_dh_network_improved import ImprovedDualPipeDHNetwork
+from geojson_stream import get_street_names, iter_features
 from simulate_dual_pipe_dh_network_final import FinalDualPipeDHSimulation
 
 try:
@@ -47,34 +48,16 @@ except ImportError:
 def get_all_street_names(geojson_path):
     """Scans the entire GeoJSON file and returns a sorted list of unique street names."""
     print(f"Reading all street names from {geojson_path}...")
-    street_names = set()
-    with open(geojson_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    for feature in data["features"]:
-        for adr in feature.get("adressen", []):
-            street_val = adr.get("str")
-            if street_val:
-                street_names.add(street_val.strip())
+    street_names = get_street_names(geojson_path)
     
     print(f"Found {len(street_names)} unique streets.")
-    return sorted(list(street_names))
+    return street_names
 
 def get_buildings_for_streets(geojson_path, selected_streets):
     """Gets all building features for a given list of street names."""
     print(f"Fetching buildings for selected streets...")
-    street_set = {s.lower() for s in selected_streets}
-    selected_features = []
-    
-    with open(geojson_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    for feature in data["features"]:
-        for adr in feature.get("adressen", []):
-            street_val = adr.get("str")
-            if street_val and street_val.strip().lower() in street_set:
-                selected_features.append(feature)
-                break  # Found a matching street, move to the next building feature
+    # Stream the layer and keep only the features on the selected streets
+    selected_features = list(iter_features(geojson_path, selected_streets))
     
     print(f"Found {len(selected_features)} buildings.")
     return selected_features
@@ -82,13 +65,7 @@ def get_buildings_for_streets(geojson_path, selected_streets):
 def get_all_buildings(geojson_path):
     """Gets all building features from the entire region."""
     print(f"Fetching all buildings from the entire region...")
-    selected_features = []
-    
-    with open(geojson_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    for feature in data["features"]:
-        selected_features.append(feature)
+    selected_features = list(iter_features(geojson_path))
     
     print(f"Found {len(selected_features)} buildings in the entire region.")
     return selected_features
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Parallel Per-Street DH/HP Batch Runner
+
+Runs the dual-pipe district heating and/or heat pump feasibility analysis for
+many streets at once. Streets are fanned out over a ProcessPoolExecutor; every
+worker loads the read-only inputs (streets, buildings, load profiles, power
+infrastructure) once in its initializer and reuses them for all streets it
+processes. The whole-region street graph and plant tree come from the shared
+street network cache, so per-street DH networks are extracted subtrees
+instead of full rebuilds. Each street writes into its own output directory, and the engines'
+console output goes to a per-street log file so workers never interleave.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import geopandas as gpd
+from shapely.geometry import Point
+import warnings
+warnings.filterwarnings('ignore')
+
+from create_complete_dual_pipe_dh_network_improved import ImprovedDualPipeDHNetwork
+from simulate_dual_pipe_dh_network_final import FinalDualPipeDHSimulation
+from shared_street_network import get_shared_street_network
+from geojson_stream import get_street_names
+from vector_export import export_layers, hp_layers
+
+# Memory-mapped load profile store (src/profile_store.py); JSON files are
+# parsed directly when it is not importable
+try:
+    from src.profile_store import load_phase_profiles
+except ImportError:
+    try:
+        from profile_store import load_phase_profiles
+    except ImportError:
+        load_phase_profiles = None
+
+DEFAULT_BUILDINGS_FILE = "data/geojson/hausumringe_mit_adressenV3.geojson"
+DEFAULT_STREETS_FILE = "data/geojson/strassen_mit_adressenV3.geojson"
+DEFAULT_LOAD_PROFILES_FILE = "../thesis-data-2/power-sim/gebaeude_lastphasenV2.json"
+DEFAULT_BUILDING_DEMANDS_FILE = "../thesis-data-2/power-sim/gebaeude_lastphasenV2_verbrauch.json"
+DEFAULT_NETWORK_JSON = "../thesis-data-2/power-sim/branitzer_siedlung_ns_v3_ohne_UW.json"
+DEFAULT_OUTPUT_DIR = "street_analysis_outputs"
+
+# Read-only data shared by all streets a worker processes (filled by init_worker)
+_SHARED = {}
+
+
+def clean_street_name(street_name):
+    """Street name as used for output directories and scenario names."""
+    return street_name.replace(" ", "_").replace("/", "_").replace("\\", "_")
+
+
+def _building_streets(adressen):
+    """Return the lower-case street names of a building's address list."""
+    if isinstance(adressen, str):
+        try:
+            adressen = json.loads(adressen)
+        except json.JSONDecodeError:
+            return set()
+    streets = set()
+    for adr in adressen or []:
+        street_val = adr.get("str") if isinstance(adr, dict) else None
+        if street_val:
+            streets.add(street_val.strip().lower())
+    return streets
+
+
+def list_streets(buildings_file):
+    """Sorted unique street names found in the building layer."""
+    return get_street_names(buildings_file)
+
+
+def _load_json(path):
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def init_worker(config):
+    """Load the scenario-independent inputs once per worker process."""
+    buildings = gpd.read_file(config["buildings_file"])
+    street_index = {}
+    for pos, adressen in enumerate(buildings.get("adressen", [])):
+        for street in _building_streets(adressen):
+            street_index.setdefault(street, []).append(pos)
+
+    street_network = get_shared_street_network(config["streets_file"])
+
+    _SHARED.clear()
+    _SHARED.update({
+        "config": config,
+        "buildings": buildings,
+        "street_index": street_index,
+        "street_network": street_network,
+        "streets": street_network.streets_gdf,
+        "load_profiles": (load_phase_profiles(config["load_profiles_file"]) if load_phase_profiles is not None
+                          else _load_json(config["load_profiles_file"])),
+        "building_demands": _load_json(config["building_demands_file"]),
+    })
+
+    if "hp" in config["modes"]:
+        import branitz_hp_feasibility as hp
+        _SHARED["hp"] = hp
+        _SHARED["power_infrastructure"] = hp.load_power_infrastructure()
+        _SHARED["base_grid"] = hp.build_base_grid(config["network_json"])
+
+
+class SharedDataDualPipeNetwork(ImprovedDualPipeDHNetwork):
+    """Dual-pipe network creator that uses pre-loaded data instead of reading files."""
+
+    def __init__(self, results_dir, streets_gdf, buildings_gdf, load_profiles, building_demands, shared_network=None,
+                 layout="shortest_path"):
+        super().__init__(results_dir, shared_network=shared_network, layout=layout)
+        self._streets = streets_gdf
+        self._buildings = buildings_gdf
+        self._load_profiles = load_profiles
+        self._building_demands = building_demands
+
+    def load_data(self):
+        """Attach the shared street/building/profile data."""
+        self.streets_gdf = self._streets
+        self.buildings_gdf = self._buildings
+        self.load_profiles = self._load_profiles
+        self.building_demands = self._building_demands
+        self.plant_location = Point(*self.plant_lonlat)  # WGS84 coordinates
+        print(f"✅ Using {len(self.streets_gdf)} shared street segments and {len(self.buildings_gdf)} buildings")
+        return True
+
+
+def _run_dh(street_name, street_buildings, output_dir, scenario):
+    scenario_name = f"dual_pipe_{clean_street_name(street_name)}"
+    network = SharedDataDualPipeNetwork(
+        results_dir=output_dir,
+        streets_gdf=_SHARED["streets"],
+        buildings_gdf=street_buildings,
+        load_profiles=_SHARED["load_profiles"],
+        building_demands=_SHARED["building_demands"],
+        shared_network=_SHARED["street_network"],
+        layout=_SHARED["config"].get("layout", "shortest_path"),
+    )
+    network.set_scenario(scenario)
+    if not network.create_complete_dual_pipe_network(scenario_name):
+        raise RuntimeError("dual-pipe network creation failed")
+    if _SHARED["config"].get("vector_export"):
+        network.export_vector_layers(scenario_name, _SHARED["config"]["vector_export"])
+
+    simulator = FinalDualPipeDHSimulation(results_dir=output_dir)
+    if not simulator.run_complete_simulation(scenario_name):
+        raise RuntimeError("pandapipes simulation failed")
+    return {"scenario_name": scenario_name, **network.network_stats}
+
+
+def _run_hp(street_name, street_buildings, output_dir, scenario, create_maps):
+    hp = _SHARED["hp"]
+    lines, substations, plants, generators = _SHARED["power_infrastructure"]
+    config = _SHARED["config"]
+
+    buildings = hp.compute_proximity(street_buildings, lines, substations, plants, generators)
+    buildings = hp.compute_service_lines_street_following(
+        buildings, substations, plants, generators, _SHARED["streets"]
+    )
+    power_metrics = hp.compute_power_feasibility(
+        buildings, _SHARED["load_profiles"], config["network_json"], scenario, base_grid=_SHARED["base_grid"]
+    )
+    for idx, building in buildings.iterrows():
+        building_id = building.get('gebaeude', building.get('id', str(idx)))
+        metrics = power_metrics.get(building_id, {})
+        buildings.loc[idx, 'max_trafo_loading'] = metrics.get('max_loading', float('nan'))
+        buildings.loc[idx, 'min_voltage_pu'] = metrics.get('min_voltage', float('nan'))
+
+    metadata = {
+        'street_name': street_name,
+        'scenario': scenario,
+        'commit_sha': 'batch_street_runner',
+        'run_time': datetime.now().isoformat(),
+    }
+    hp.output_results_table(buildings, str(output_dir), metadata)
+    if config.get("vector_export"):
+        export_layers(hp_layers(buildings, lines), output_dir / "vector_hp", config["vector_export"],
+                      title=f"HP feasibility {street_name}", name="hp_feasibility")
+    if create_maps:
+        hp.visualize(
+            buildings=buildings, lines=lines, substations=substations, plants=plants,
+            generators=generators, output_dir=str(output_dir), show_building_to_line=True,
+            streets_gdf=_SHARED["streets"], draw_service_lines=True, metadata=metadata,
+        )
+    return {
+        "max_trafo_loading": float(buildings['max_trafo_loading'].max()),
+        "min_voltage_pu": float(buildings['min_voltage_pu'].min()),
+    }
+
+
+def analyze_street(street_name, output_root, scenario="winter_werktag_abendspitze", create_maps=False):
+    """
+    Run the configured analyses for one street inside a worker process.
+    Returns a dict with success flag, per-analysis timings and key results.
+    """
+    start = time.perf_counter()
+    config = _SHARED["config"]
+    output_dir = Path(output_root) / clean_street_name(street_name)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    result = {"street": street_name, "output_dir": str(output_dir), "success": True, "timings_s": {}}
+
+    positions = _SHARED["street_index"].get(street_name.strip().lower(), [])
+    result["num_buildings"] = len(positions)
+    if not positions:
+        result.update(success=False, error="no buildings found")
+        return result
+
+    street_buildings = _SHARED["buildings"].iloc[positions].copy()
+    log_file = output_dir / "run.log"
+    with open(log_file, "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+        for mode in config["modes"]:
+            t0 = time.perf_counter()
+            try:
+                if mode == "dh":
+                    result["dh"] = _run_dh(street_name, street_buildings, output_dir, scenario)
+                else:
+                    result["hp"] = _run_hp(street_name, street_buildings, output_dir, scenario, create_maps)
+            except Exception as e:
+                traceback.print_exc(file=log)
+                result["success"] = False
+                result[f"{mode}_error"] = str(e)
+            result["timings_s"][mode] = round(time.perf_counter() - t0, 3)
+
+    result["timings_s"]["total"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def _json_default(value):
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def run_batch(streets, config, output_root=DEFAULT_OUTPUT_DIR, max_workers=None,
+              scenario="winter_werktag_abendspitze", create_maps=False):
+    """
+    Analyze all streets in parallel and write batch_summary.json.
+    Returns the list of per-street result dicts.
+    """
+    Path(output_root).mkdir(parents=True, exist_ok=True)
+    max_workers = max_workers or os.cpu_count() or 1
+    print(f"🚀 Analyzing {len(streets)} streets ({', '.join(config['modes']).upper()}) with {max_workers} workers")
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=(config,)) as executor:
+        futures = {
+            executor.submit(analyze_street, street, output_root, scenario, create_maps): street
+            for street in streets
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            street = futures[future]
+            try:
+                res = future.result()
+            except Exception as e:
+                res = {"street": street, "success": False, "error": str(e), "timings_s": {}}
+            results.append(res)
+            status = "✅" if res["success"] else "❌"
+            timing = ", ".join(f"{k}={v:.1f}s" for k, v in res["timings_s"].items())
+            print(f"[{done}/{len(streets)}] {status} {street} ({res.get('num_buildings', 0)} buildings) {timing}")
+
+    wall_time = time.perf_counter() - start
+    cpu_time = sum(r["timings_s"].get("total", 0) for r in results)
+    summary = {
+        "run_time": datetime.now().isoformat(),
+        "modes": config["modes"],
+        "scenario": scenario,
+        "workers": max_workers,
+        "wall_time_s": round(wall_time, 2),
+        "sum_street_time_s": round(cpu_time, 2),
+        "parallel_speedup": round(cpu_time / wall_time, 2) if wall_time > 0 else None,
+        "successful_streets": sum(1 for r in results if r["success"]),
+        "streets": sorted(results, key=lambda r: r["street"]),
+    }
+    summary_file = Path(output_root) / "batch_summary.json"
+    with open(summary_file, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, default=_json_default)
+
+    print(f"✅ {summary['successful_streets']}/{len(streets)} streets completed in {wall_time:.1f}s "
+          f"(speedup {summary['parallel_speedup']}x), summary saved to {summary_file}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run DH/HP analyses for many streets in parallel.")
+    parser.add_argument("--streets", nargs="*", help="Street names to analyze (default: all streets)")
+    parser.add_argument("--modes", nargs="+", choices=["dh", "hp"], default=["dh", "hp"])
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--scenario", default="winter_werktag_abendspitze", help="Load profile scenario")
+    parser.add_argument("--output_dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--buildings_file", default=DEFAULT_BUILDINGS_FILE)
+    parser.add_argument("--streets_file", default=DEFAULT_STREETS_FILE)
+    parser.add_argument("--load_profiles_file", default=DEFAULT_LOAD_PROFILES_FILE)
+    parser.add_argument("--building_demands_file", default=DEFAULT_BUILDING_DEMANDS_FILE)
+    parser.add_argument("--network_json", default=DEFAULT_NETWORK_JSON)
+    parser.add_argument("--maps", action="store_true", help="Also create HP feasibility maps")
+    parser.add_argument("--layout", choices=["shortest_path", "steiner"], default="shortest_path",
+                        help="DH main pipe layout")
+    parser.add_argument("--vector_export", choices=["fgb", "mbtiles"], default=None,
+                        help="Also export network layers as FlatGeobuf (with viewer) or MBTiles")
+    args = parser.parse_args()
+
+    config = {
+        "modes": args.modes,
+        "buildings_file": args.buildings_file,
+        "streets_file": args.streets_file,
+        "load_profiles_file": args.load_profiles_file,
+        "building_demands_file": args.building_demands_file,
+        "network_json": args.network_json,
+        "layout": args.layout,
+        "vector_export": args.vector_export,
+    }
+    streets = args.streets or list_streets(args.buildings_file)
+    run_batch(streets, config, args.output_dir, args.workers, args.scenario, args.maps)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,34 @@ import folium
 from shapely.geometry import Point, LineString
 from pathlib import Path
 from shapely.ops import nearest_points
-from pyproj import Transformer
 import random
 import time
 from shapely.strtree import STRtree
 import subprocess
 from datetime import datetime
 import json
+import copy
 import pandapower as pp
+from scipy.sparse import coo_matrix
+from scipy.spatial import cKDTree
+from scipy.sparse.csgraph import breadth_first_order
+
+try:
+    from .map_layers import DEFAULT_PRECISION, add_circle_cluster, add_geojson_layer, to_web_layer
+    from .load_aggregation import aggregate_tree
+except ImportError:
+    from map_layers import DEFAULT_PRECISION, add_circle_cluster, add_geojson_layer, to_web_layer
+    from load_aggregation import aggregate_tree
+
+# Memory-mapped load profile store (src/profile_store.py); JSON files are
+# parsed directly when it is not importable
+try:
+    from src.profile_store import load_phase_profiles
+except ImportError:
+    try:
+        from profile_store import load_phase_profiles
+    except ImportError:
+        load_phase_profiles = None
 
 # Import power simulation functions - we'll define them locally to avoid path issues
 # import sys
@@ -167,9 +187,13 @@ def load_buildings(buildings_file):
 
 # --- 3.5. Load Load Profiles ---
 def load_load_profiles(load_profiles_file):
+    """Phase load profiles: the memory-mapped profile store next to the JSON if present, else the JSON."""
     print(f"Loading load profiles from {load_profiles_file}...")
-    with open(load_profiles_file, 'r') as f:
-        load_profiles = json.load(f)
+    if load_phase_profiles is not None:
+        load_profiles = load_phase_profiles(load_profiles_file)
+    else:
+        with open(load_profiles_file, 'r') as f:
+            load_profiles = json.load(f)
     print(f"Loaded load profiles for {len(load_profiles)} buildings.")
     return load_profiles
 
@@ -336,27 +360,25 @@ def compute_service_lines_street_following(buildings, substations, plants, gener
     print(f"Routing methods: {pd.Series(routing_methods).value_counts().to_dict()}")
     return buildings
 
-# --- 4.6. Compute Power Feasibility ---
-def compute_power_feasibility(buildings, load_profiles, network_json_path, scenario="winter_werktag_abendspitze"):
+# --- 4.6. Build Base Grid (scenario-independent) ---
+def build_base_grid(network_json_path):
     """
-    Compute power flow feasibility for buildings that are close to transformers.
-    Returns power metrics for each building that can be connected.
-    
-    Args:
-        buildings: GeoDataFrame of buildings
-        load_profiles: Dictionary of load profiles
-        network_json_path: Path to network JSON file
-        scenario: Load profile scenario to use (default: winter_werktag_abendspitze)
+    Build the pandapower base grid (buses, external grid, transformers, lines)
+    from the network JSON, without building loads. The result can be reused
+    for many scenarios; compute_power_feasibility works on a copy of it.
+    Accepts a path or the already loaded network dict.
     """
-    print("Computing power flow feasibility...")
-    
-    # Load network data
-    with open(network_json_path, 'r') as f:
-        network_data = json.load(f)
+    if isinstance(network_json_path, dict):
+        network_data = network_json_path
+    else:
+        with open(network_json_path, 'r') as f:
+            network_data = json.load(f)
     
     nodes_data = network_data["nodes"]
     ways_data = network_data["ways"]
     
+    nodes_by_id = {str(node['id']): node for node in nodes_data}
+    
     # Create pandapower network
     net, node_id_to_bus, mv_bus = create_base_network_local(nodes_data)
     create_external_grid_local(net, mv_bus)
@@ -390,8 +412,8 @@ def compute_power_feasibility(buildings, load_profiles, network_json_path, scena
                 if from_bus is None or to_bus is None:
                     continue
                 
-                from_node = next((node for node in nodes_data if str(node['id']) == from_node_id), None)
-                to_node = next((node for node in nodes_data if str(node['id']) == to_node_id), None)
+                from_node = nodes_by_id.get(from_node_id)
+                to_node = nodes_by_id.get(to_node_id)
                 if from_node is None or to_node is None:
                     continue
                 
@@ -414,6 +436,35 @@ def compute_power_feasibility(buildings, load_profiles, network_json_path, scena
                 lines_created += 1
     
     print(f"Created network with {len(net.bus)} buses, {len(net.line)} lines, {len(net.trafo)} transformers")
+    consumer_nodes = [node for node in nodes_data if node['tags'].get('power') == 'consumer']
+    return {
+        "net": net,
+        "node_id_to_bus": node_id_to_bus,
+        "trafo_mapping": trafo_mapping,
+        "consumer_nodes": consumer_nodes,
+        "consumer_points": [Point(node['lon'], node['lat']) for node in consumer_nodes],
+    }
+
+# --- 4.7. Compute Power Feasibility ---
+def compute_power_feasibility(buildings, load_profiles, network_json_path, scenario="winter_werktag_abendspitze",
+                              base_grid=None, return_net=False):
+    """
+    Compute power flow feasibility for buildings that are close to transformers.
+    Returns power metrics for each building that can be connected.
+    
+    Args:
+        buildings: GeoDataFrame of buildings
+        load_profiles: Dictionary of load profiles
+        network_json_path: Path to network JSON file
+        scenario: Load profile scenario to use (default: winter_werktag_abendspitze)
+        base_grid: Result of build_base_grid() to reuse instead of rebuilding the grid
+        return_net: Return (power_metrics, net) with the solved pandapower network
+    """
+    print("Computing power flow feasibility...")
+    
+    if base_grid is None:
+        base_grid = build_base_grid(network_json_path)
+    net = copy.deepcopy(base_grid["net"])
     
     # Initialize results
     power_metrics = {}
@@ -422,7 +473,10 @@ def compute_power_feasibility(buildings, load_profiles, network_json_path, scena
     buildings_close_to_transformer = buildings[buildings['flag_far_transformer'] == False].copy()
     print(f"Processing {len(buildings_close_to_transformer)} buildings close to transformers...")
     
-    for idx, building in buildings_close_to_transformer.iterrows():
+    # Bus of the nearest consumer node (network node)
+    building_buses = map_buildings_to_buses(buildings_close_to_transformer, base_grid)
+    
+    for (idx, building), bus in zip(buildings_close_to_transformer.iterrows(), building_buses):
         building_id = building.get('gebaeude', building.get('id', str(idx)))
         
         # Skip if no load profile available
@@ -449,33 +503,14 @@ def compute_power_feasibility(buildings, load_profiles, network_json_path, scena
         power_factor = 0.95
         q_mvar = p_mw * np.tan(np.arccos(power_factor))
         
-        # Find nearest network node (consumer node)
-        building_centroid = building.geometry.centroid
-        min_distance = float('inf')
-        nearest_node = None
-        
-        for node in nodes_data:
-            if node['tags'].get('power') == 'consumer':
-                node_point = Point(node['lon'], node['lat'])
-                distance = building_centroid.distance(node_point)
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest_node = node
-        
-        if nearest_node is None:
-            continue
-        
-        node_id = str(nearest_node['id'])
-        if node_id not in node_id_to_bus:
+        if bus < 0:
             continue
         
-        bus = node_id_to_bus[node_id]
-        
         # Create load
         try:
             pp.create_load(
                 net,
-                bus=bus,
+                bus=int(bus),
                 p_mw=p_mw,
                 q_mvar=q_mvar,
                 name=f"Load_{building_id}"
@@ -531,8 +566,218 @@ def compute_power_feasibility(buildings, load_profiles, network_json_path, scena
                 "min_voltage": np.nan
             }
     
+    if return_net:
+        return power_metrics, net
     return power_metrics
 
+# --- 4.8. Time-Series Power Flow ---
+def map_buildings_to_buses(buildings, base_grid):
+    """
+    Bus of the nearest consumer node for every building. The consumer points
+    are WGS84 lon/lat; they are projected to the buildings' CRS (or both to
+    the local UTM zone when the buildings are geographic or have no CRS,
+    taken as WGS84) before the nearest-node search.
+    Returns an int array, -1 where no bus exists.
+    """
+    node_id_to_bus = base_grid["node_id_to_bus"]
+    consumer_nodes = base_grid["consumer_nodes"]
+    if not consumer_nodes or len(buildings) == 0:
+        return np.full(len(buildings), -1, dtype=int)
+    nodes = gpd.GeoSeries(base_grid["consumer_points"], crs="EPSG:4326")
+    geometry = buildings.geometry if buildings.crs is not None else buildings.geometry.set_crs("EPSG:4326")
+    if not geometry.crs.is_projected:
+        geometry = geometry.to_crs(nodes.estimate_utm_crs())
+    nodes = nodes.to_crs(geometry.crs)
+    node_bus = np.array([node_id_to_bus.get(str(node['id']), -1) for node in consumer_nodes])
+    centroids = geometry.centroid
+    _, nearest = cKDTree(np.column_stack([nodes.x.to_numpy(), nodes.y.to_numpy()])).query(
+        np.column_stack([centroids.x.to_numpy(), centroids.y.to_numpy()]))
+    return node_bus[nearest]
+
+def feeder_tree(net):
+    """
+    Radial view of the LV grid: BFS tree over the in-service lines rooted at
+    the transformer LV buses. Returns dict with parent (bus position of the
+    upstream bus, -1 at transformers and unreachable buses), root (position
+    of the feeding transformer bus) and line_child (downstream bus position
+    per line, -1 for lines that close a mesh).
+    """
+    n_bus = len(net.bus)
+    lines = net.line[net.line['in_service']] if 'in_service' in net.line.columns else net.line
+    from_pos = net.bus.index.get_indexer(lines['from_bus'])
+    to_pos = net.bus.index.get_indexer(lines['to_bus'])
+    lv_pos = np.unique(net.bus.index.get_indexer(net.trafo['lv_bus'])) if len(net.trafo) else np.empty(0, dtype=int)
+    # Extra node n_bus feeds all transformer LV buses
+    rows = np.concatenate([from_pos, np.full(len(lv_pos), n_bus)])
+    cols = np.concatenate([to_pos, lv_pos])
+    graph = coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_bus + 1, n_bus + 1)).tocsr()
+    _, predecessors = breadth_first_order(graph, n_bus, directed=False, return_predecessors=True)
+    parent = predecessors[:n_bus].astype(np.int64)
+    parent[(parent < 0) | (parent == n_bus)] = -1
+    
+    root = np.arange(n_bus)
+    while (parent[root] >= 0).any():
+        root = np.where(parent[root] >= 0, parent[root], root)
+    
+    line_child = np.full(len(net.line), -1, dtype=np.int64)
+    line_pos = net.line.index.get_indexer(lines.index)
+    line_child[line_pos[parent[to_pos] == from_pos]] = to_pos[parent[to_pos] == from_pos]
+    line_child[line_pos[parent[from_pos] == to_pos]] = from_pos[parent[from_pos] == to_pos]
+    return {"parent": parent, "root": root, "line_child": line_child}
+
+def transformer_peak_check(buildings, load_kw, base_grid, base_load_kw=None, power_factor=0.95):
+    """
+    Coincident peak per transformer and per line of the LV grid (see
+    load_aggregation.py) instead of the sum of building peaks.
+    
+    Args:
+        buildings: GeoDataFrame (rows aligned with load_kw)
+        load_kw: (n_buildings, n_hours) load matrix, or per-building peaks
+            (coincidence then from the simultaneity curve)
+        base_grid: result of build_base_grid()
+        base_load_kw: optional household load, per building (added to every
+            hour) or a (n_buildings, n_hours) matrix aligned with load_kw
+    Returns:
+        (transformers, lines) DataFrames with coincident_peak_kw,
+        sum_of_peaks_kw, simultaneity_factor, n_buildings, peak_hour and the
+        estimated loading_percent at that peak.
+    """
+    net = base_grid["net"]
+    load_kw = np.asarray(load_kw)
+    if not np.issubdtype(load_kw.dtype, np.floating):
+        load_kw = load_kw.astype(float)
+    if base_load_kw is not None:
+        base = np.asarray(base_load_kw, dtype=load_kw.dtype)
+        if base.ndim == 2 and load_kw.ndim == 1:
+            load_kw = load_kw[:, None]
+        load_kw = load_kw + (base[:, None] if load_kw.ndim == 2 and base.ndim == 1 else base)
+    
+    buses = map_buildings_to_buses(buildings, base_grid)
+    load_element = np.where(buses >= 0, net.bus.index.get_indexer(buses), -1)
+    if 'flag_far_transformer' in buildings.columns:
+        far = buildings['flag_far_transformer'].fillna(False).astype(bool).to_numpy()
+        load_element[far] = -1
+    
+    tree = feeder_tree(net)
+    if load_kw.ndim == 2:
+        result = aggregate_tree(tree["parent"], load_element, load_matrix=load_kw)
+    else:
+        result = aggregate_tree(tree["parent"], load_element, peaks=load_kw)
+    
+    def rows(positions, rating_kva):
+        valid = positions >= 0
+        safe = np.where(valid, positions, 0)
+        peak = np.where(valid, result['coincident_peak'][safe], np.nan)
+        return {
+            "coincident_peak_kw": peak,
+            "sum_of_peaks_kw": np.where(valid, result['sum_of_peaks'][safe], np.nan),
+            "simultaneity_factor": np.where(valid, result['simultaneity'][safe], np.nan),
+            "n_buildings": np.where(valid, result['n_buildings'][safe], 0),
+            "peak_hour": np.where(valid, result['peak_time'][safe], -1),
+            "loading_percent": 100 * peak / power_factor / rating_kva,
+        }
+    
+    lv_pos = net.bus.index.get_indexer(net.trafo['lv_bus'])
+    transformers = pd.DataFrame({
+        "trafo": net.trafo.index, "name": net.trafo['name'].to_numpy(),
+        **rows(lv_pos, net.trafo['sn_mva'].to_numpy() * 1000),
+    })
+    # Line rating: max current at the 0.4 kV side, three-phase
+    line_kva = np.sqrt(3) * net.line['max_i_ka'].to_numpy() * net.bus.loc[net.line['from_bus'], 'vn_kv'].to_numpy() * 1000
+    lines = pd.DataFrame({"line": net.line.index, **rows(tree["line_child"], line_kva)})
+    return transformers, lines
+
+def run_timeseries_power_flow(buildings, electric_load_kw, base_grid, base_load_kw=None, hours=None,
+                              n_critical_hours=24, power_factor=0.95, extra_hours=None, hour_weights=None):
+    """
+    Load flow over the hours of an electric load matrix (buildings x hours,
+    kW), e.g. heat pump demand from heat_pump_cop.electric_load_matrix.
+    Loads are aggregated per bus once; each hour only updates the load
+    vector of a copy of the base grid before pp.runpp.
+
+    Args:
+        buildings: GeoDataFrame (rows aligned with electric_load_kw); buildings
+            flagged far from a transformer are left out as in compute_power_feasibility
+        electric_load_kw: array (n_buildings, n_hours)
+        base_grid: result of build_base_grid()
+        base_load_kw: optional household load, per building (added to every
+            hour) or a matrix with the shape of electric_load_kw
+        hours: hour indices to simulate; default: the n_critical_hours hours
+            with the highest total load
+        extra_hours: hours simulated in addition to the default selection,
+            e.g. the transformer peak hours of transformer_peak_check
+        hour_weights: weights of the given hours, e.g. from
+            representative_days.representative_timesteps; the critical and
+            extra hours are then simulated as well, with weight 0
+    Returns:
+        DataFrame, one row per simulated hour (hour, total_load_kw,
+        max_trafo_loading, max_line_loading, min_voltage, trafo_overloads,
+        converged and, with hour_weights, weight), in chronological order.
+    """
+    electric_load_kw = np.asarray(electric_load_kw, dtype=float)
+    include = np.ones(len(buildings), dtype=bool)
+    if 'flag_far_transformer' in buildings.columns:
+        include &= ~buildings['flag_far_transformer'].fillna(False).astype(bool).to_numpy()
+    buses = map_buildings_to_buses(buildings, base_grid)
+    include &= buses >= 0
+
+    load = electric_load_kw[include]
+    if base_load_kw is not None:
+        base = np.asarray(base_load_kw, dtype=float)[include]
+        load = load + (base if base.ndim == 2 else base[:, None])
+    weights = None
+    if hours is not None and hour_weights is not None:
+        weights = dict(zip(np.asarray(hours, dtype=int).tolist(), np.asarray(hour_weights, dtype=float).tolist()))
+    if hours is None or weights is not None:
+        total = load.sum(axis=0)
+        selected = [np.argsort(total)[::-1][:n_critical_hours]]
+        if weights is not None:
+            selected.append(np.asarray(hours, dtype=int))
+        if extra_hours is not None:
+            selected.append(np.asarray(extra_hours, dtype=int))
+        hours = np.concatenate(selected)
+        hours = np.unique(hours[hours >= 0])
+    hours = np.asarray(hours, dtype=int)
+
+    # Sum the buildings of each bus: (n_buses, n_hours) for the selected hours
+    unique_buses, bus_codes = np.unique(buses[include], return_inverse=True)
+    bus_load_kw = np.zeros((len(unique_buses), len(hours)))
+    np.add.at(bus_load_kw, bus_codes, load[:, hours])
+
+    net = copy.deepcopy(base_grid["net"])
+    load_idx = [pp.create_load(net, bus=int(bus), p_mw=0.0, q_mvar=0.0, name=f"HP_Bus_{bus}") for bus in unique_buses]
+    q_factor = np.tan(np.arccos(power_factor))
+    print(f"Running time-series power flow: {len(hours)} hours, {len(unique_buses)} load buses...")
+
+    rows = []
+    for column, hour in enumerate(hours):
+        p_mw = bus_load_kw[:, column] / 1000.0
+        net.load.loc[load_idx, "p_mw"] = p_mw
+        net.load.loc[load_idx, "q_mvar"] = p_mw * q_factor
+        row = {"hour": int(hour), "total_load_kw": float(bus_load_kw[:, column].sum())}
+        try:
+            pp.runpp(net, algorithm='nr', max_iteration=40, tolerance_mva=1e-3)
+            trafo_loading = net.res_trafo["loading_percent"].to_numpy() if len(net.trafo) else np.zeros(0)
+            row.update({
+                "max_trafo_loading": float(trafo_loading.max()) if len(trafo_loading) else 0.0,
+                "max_line_loading": float(net.res_line["loading_percent"].max()) if len(net.line) else 0.0,
+                "min_voltage": float(net.res_bus["vm_pu"].min()) if len(net.bus) else 1.0,
+                "trafo_overloads": int((trafo_loading > 100).sum()),
+                "converged": True,
+            })
+        except pp.LoadflowNotConverged:
+            row.update({"max_trafo_loading": np.nan, "max_line_loading": np.nan, "min_voltage": np.nan,
+                        "trafo_overloads": 0, "converged": False})
+        rows.append(row)
+
+    results = pd.DataFrame(rows)
+    if weights is not None:
+        results["weight"] = [weights.get(int(hour), 0.0) for hour in hours]
+    if results["converged"].any():
+        print(f"Time-series power flow: max transformer loading {results['max_trafo_loading'].max():.1f}%, "
+              f"min voltage {results['min_voltage'].min():.3f} pu")
+    return results
+
 # --- 4.5. Compute Service Lines (Legacy - Straight Lines) ---
 def compute_service_lines(buildings, substations, transformers):
     """
@@ -661,13 +906,17 @@ def output_results_table(buildings, output_dir, metadata):
     print(f"✅ Results table saved to {csv_path}")
 
 # --- 6. Visualization (Enhanced Interactive Style) ---
-def visualize(buildings, lines, substations, plants, generators, output_dir, show_building_to_line=False, streets_gdf=None, draw_service_lines=True, sample_service_lines=False, service_line_sample_size=100, metadata=None):
+def visualize(buildings, lines, substations, plants, generators, output_dir, show_building_to_line=False, streets_gdf=None, draw_service_lines=True, sample_service_lines=False, service_line_sample_size=100, metadata=None,
+              precision=DEFAULT_PRECISION, simplify_tolerance=None):
     """
     Enhanced interactive visualization with FeatureGroups and layer controls.
     Args:
         draw_service_lines: Whether to render any service-line connections on the map.
         sample_service_lines: If true, draw only a random subset of service lines (useful for debugging or performance).
         service_line_sample_size: Number of service lines to draw if sampling is enabled.
+        precision: Coordinate decimals written to the HTML (None keeps full precision).
+        simplify_tolerance: Optional simplification of streets and power lines, in meters.
+    Each group is one GeoJson layer reprojected in a single to_crs call; buildings are clustered.
     """
     # 1. Work in projected CRS (UTM) for all distance and connection calculations
     # Determine UTM zone from buildings
@@ -714,25 +963,14 @@ def visualize(buildings, lines, substations, plants, generators, output_dir, sho
                 'tooltip': 'Plant-Connection'
             })
 
-    # 3. Reproject all geometries and connection lines to WGS84 for Folium
+    # 3. Reproject all geometries and connection lines to WGS84 for Folium (one to_crs per layer)
     buildings = buildings_utm.to_crs(epsg=4326)
-    lines = lines_utm.to_crs(epsg=4326) if not lines_utm.empty else lines_utm
-    substations = substations_utm.to_crs(epsg=4326) if not substations_utm.empty else substations_utm
-    plants = plants_utm.to_crs(epsg=4326) if not plants_utm.empty else plants_utm
-    generators = generators_utm.to_crs(epsg=4326) if not generators_utm.empty else generators_utm
-    # Reproject connection lines
-    transformer = Transformer.from_crs(utm_crs, 'EPSG:4326', always_xy=True)
-    for conn in connection_lines:
-        (x1, y1), (x2, y2) = conn['coords']
-        lon1, lat1 = transformer.transform(x1, y1)
-        lon2, lat2 = transformer.transform(x2, y2)
-        conn['coords_wgs'] = [(lat1, lon1), (lat2, lon2)]
 
     # Recompute centroids in WGS84
     buildings['centroid'] = buildings.geometry.centroid
 
     center = buildings['centroid'].unary_union.centroid
-    m = folium.Map(location=[center.y, center.x], zoom_start=15)
+    m = folium.Map(location=[center.y, center.x], zoom_start=15, prefer_canvas=True)
 
     # 4. Create FeatureGroups for layer control
     fg_streets = folium.FeatureGroup(name='Streets', show=True)
@@ -743,98 +981,93 @@ def visualize(buildings, lines, substations, plants, generators, output_dir, sho
 
     # Plot street network if provided
     if streets_gdf is not None:
-        streets = streets_gdf.to_crs(epsg=4326)
-        for _, row in streets.iterrows():
-            if row.geometry.geom_type == 'LineString':
-                coords = list(row.geometry.coords)
-                folium.PolyLine(
-                    locations=[(lat, lon) for lon, lat in coords],
-                    color='gray', weight=3, opacity=0.7, tooltip='Street'
-                ).add_to(fg_streets)
+        streets = streets_gdf[streets_gdf.geometry.geom_type == 'LineString']
+        if simplify_tolerance and (streets.crs is None or streets.crs.is_geographic):
+            streets = streets.to_crs(utm_crs)
+        add_geojson_layer(fg_streets, to_web_layer(streets, (), simplify_tolerance, precision),
+                          style={'color': 'gray', 'weight': 3, 'opacity': 0.7})
 
     # Power lines with endpoints
-    if not lines.empty:
-        for _, row in lines.iterrows():
-            if row.geometry.geom_type == 'LineString':
-                coords = list(row.geometry.coords)
-                folium.PolyLine(locations=[(lat, lon) for lon, lat in coords], color='orange', weight=4, opacity=0.8, tooltip=row.get('power', 'line')).add_to(fg_power_lines)
-                # Mark start and end points
-                start = coords[0]
-                end = coords[-1]
-                folium.CircleMarker(location=[start[1], start[0]], color='black', radius=5, tooltip='Line Start').add_to(fg_power_lines)
-                folium.CircleMarker(location=[end[1], end[0]], color='yellow', radius=5, tooltip='Line End').add_to(fg_power_lines)
-    
-    # Draw connection lines in WGS84
-    for conn in connection_lines:
-        folium.PolyLine(locations=conn['coords_wgs'], color=conn['color'], weight=2, opacity=0.7, tooltip=conn['tooltip']).add_to(fg_power_lines)
-    # Draw service lines if available
+    if not lines_utm.empty:
+        power_lines = lines_utm[lines_utm.geometry.geom_type == 'LineString'].copy()
+        power_lines['power'] = power_lines['power'].fillna('line') if 'power' in power_lines.columns else 'line'
+        add_geojson_layer(fg_power_lines, to_web_layer(power_lines, ['power'], simplify_tolerance, precision),
+                          style={'color': 'orange', 'weight': 4, 'opacity': 0.8},
+                          tooltip_fields=['power'], tooltip_aliases=['Line'])
+        # Mark start and end points
+        endpoints = gpd.GeoDataFrame({
+            'endpoint': ['Line Start'] * len(power_lines) + ['Line End'] * len(power_lines),
+            'color': ['black'] * len(power_lines) + ['yellow'] * len(power_lines),
+        }, geometry=list(power_lines.geometry.apply(lambda g: Point(g.coords[0])))
+                  + list(power_lines.geometry.apply(lambda g: Point(g.coords[-1]))), crs=lines_utm.crs)
+        add_geojson_layer(fg_power_lines, to_web_layer(endpoints, ['endpoint', 'color'], precision=precision),
+                          style=lambda p: {'color': p['color'], 'radius': 5},
+                          tooltip_fields=['endpoint'], tooltip_aliases=[''], marker=folium.CircleMarker())
+
+    # Draw connection lines
+    if connection_lines:
+        connections = gpd.GeoDataFrame(
+            {'color': [c['color'] for c in connection_lines], 'connection': [c['tooltip'] for c in connection_lines]},
+            geometry=[LineString(c['coords']) for c in connection_lines], crs=utm_crs)
+        add_geojson_layer(fg_power_lines, to_web_layer(connections, ['color', 'connection'], precision=precision),
+                          style=lambda p: {'color': p['color'], 'weight': 2, 'opacity': 0.7},
+                          tooltip_fields=['connection'], tooltip_aliases=[''])
+    # Draw service lines if available (computed in the projected CRS)
     if 'service_line' in buildings.columns and draw_service_lines:
-        indices = list(range(len(buildings)))
+        service = buildings[['service_line']].copy()
+        service['nearest_infra_type'] = buildings.get('nearest_infra_type', 'infrastructure')
+        service['service_line_distance'] = buildings.get('service_line_distance', 0.0)
         if sample_service_lines:
-            indices = random.sample(indices, min(service_line_sample_size, len(indices)))
-        for idx in indices:
-            building = buildings.iloc[idx]
-            if building['service_line'] is not None:
-                service_line = building['service_line']
-                if hasattr(service_line, 'coords'):
-                    coords = list(service_line.coords)
-                    if len(coords) >= 2:
-                        # Reproject service line to WGS84 if needed
-                        if buildings.crs != 'EPSG:4326':
-                            transformer = Transformer.from_crs(buildings.crs, 'EPSG:4326', always_xy=True)
-                            coords_wgs = []
-                            for x, y in coords:
-                                lon, lat = transformer.transform(x, y)
-                                coords_wgs.append([lat, lon])
-                        else:
-                            coords_wgs = [[lat, lon] for lon, lat in coords]
-                        # Color based on infrastructure type
-                        color = 'red' if building.get('nearest_infra_type') == 'substation' else 'purple'
-                        folium.PolyLine(locations=coords_wgs, color=color, weight=2, opacity=0.6, 
-                                      tooltip=f"Service Line: {building.get('service_line_distance', 0):.1f}m to {building.get('nearest_infra_type', 'infrastructure')}").add_to(fg_service_lines)
-    # Substations
-    if not substations.empty:
-        for _, row in substations.iterrows():
-            if row.geometry.geom_type == 'Point' or row.geometry.geom_type == 'Polygon':
-                centroid = row.geometry.centroid
-                folium.CircleMarker(location=[centroid.y, centroid.x], color='red', radius=8, tooltip='Substation').add_to(fg_infra)
-    # Plants
-    if not plants.empty:
-        for _, row in plants.iterrows():
-            centroid = row.geometry.centroid
-            folium.CircleMarker(location=[centroid.y, centroid.x], color='green', radius=8, tooltip='Plant').add_to(fg_infra)
-    # Generators
-    if not generators.empty:
-        for _, row in generators.iterrows():
-            centroid = row.geometry.centroid
-            folium.CircleMarker(location=[centroid.y, centroid.x], color='purple', radius=6, tooltip='Generator').add_to(fg_infra)
+            service = service.iloc[random.sample(range(len(service)), min(service_line_sample_size, len(service)))]
+        service = service[service['service_line'].apply(lambda g: hasattr(g, 'coords') and len(g.coords) >= 2)]
+        if not service.empty:
+            service = gpd.GeoDataFrame(service.drop(columns='service_line'), geometry=list(service['service_line']),
+                                       crs=utm_crs)
+            service['service_line_distance'] = service['service_line_distance'].astype(float).round(1)
+            # Color based on infrastructure type
+            add_geojson_layer(fg_service_lines,
+                              to_web_layer(service, ['nearest_infra_type', 'service_line_distance'], precision=precision),
+                              style=lambda p: {'color': 'red' if p['nearest_infra_type'] == 'substation' else 'purple',
+                                               'weight': 2, 'opacity': 0.6},
+                              tooltip_fields=['service_line_distance', 'nearest_infra_type'],
+                              tooltip_aliases=['Service Line (m)', 'To'])
+    # Substations, plants and generators as one point layer
+    infra_parts = []
+    for gdf, label, color, radius in ((substations_utm, 'Substation', 'red', 8), (plants_utm, 'Plant', 'green', 8),
+                                      (generators_utm, 'Generator', 'purple', 6)):
+        if not gdf.empty:
+            if label == 'Substation':
+                gdf = gdf[gdf.geometry.geom_type.isin(['Point', 'Polygon'])]
+            infra_parts.append(gpd.GeoDataFrame({'infra': label, 'color': color, 'radius': radius},
+                                                index=range(len(gdf)), geometry=list(gdf.geometry.centroid),
+                                                crs=gdf.crs).to_crs(utm_crs))
+    if infra_parts:
+        infra = gpd.GeoDataFrame(pd.concat(infra_parts, ignore_index=True), crs=utm_crs)
+        add_geojson_layer(fg_infra, to_web_layer(infra, ['infra', 'color', 'radius'], precision=precision),
+                          style=lambda p: {'color': p['color'], 'radius': p['radius']},
+                          tooltip_fields=['infra'], tooltip_aliases=[''], marker=folium.CircleMarker())
     
     # Buildings
-    for idx, b in buildings.iterrows():
-        # Get distance values with proper formatting
-        dist_to_line = b.get('dist_to_line', np.nan)
-        dist_to_substation = b.get('dist_to_substation', np.nan)
-        dist_to_transformer = b.get('dist_to_transformer', np.nan)
-        max_loading = b.get('max_trafo_loading', np.nan)
-        min_voltage = b.get('min_voltage_pu', np.nan)
-        
+    def _fmt(column, fmt):
         # Format values for display
-        dist_to_line_str = f"{dist_to_line:.1f}" if not pd.isna(dist_to_line) else "N/A"
-        dist_to_substation_str = f"{dist_to_substation:.1f}" if not pd.isna(dist_to_substation) else "N/A"
-        dist_to_transformer_str = f"{dist_to_transformer:.1f}" if not pd.isna(dist_to_transformer) else "N/A"
-        max_loading_str = f"{max_loading:.2f}" if not pd.isna(max_loading) else "N/A"
-        min_voltage_str = f"{min_voltage:.3f}" if not pd.isna(min_voltage) else "N/A"
-        
-        tooltip = (
-            f"Building ID: {str(idx)}<br>"
-            f"Dist to line: {dist_to_line_str} m<br>"
-            f"Dist to substation: {dist_to_substation_str} m<br>"
-            f"Dist to transformer: {dist_to_transformer_str} m<br>"
-            f"Max trafo loading: {max_loading_str}%<br>"
-            f"Min voltage: {min_voltage_str} pu"
-        )
-        folium.CircleMarker(location=[b['centroid'].y, b['centroid'].x], color='blue', radius=3,
-                            tooltip=tooltip).add_to(fg_buildings)
+        values = pd.to_numeric(buildings[column], errors='coerce') if column in buildings.columns \
+            else pd.Series(np.nan, index=buildings.index)
+        return [format(v, fmt) if not pd.isna(v) else "N/A" for v in values]
+
+    tooltips = [
+        f"Building ID: {str(idx)}<br>"
+        f"Dist to line: {line} m<br>"
+        f"Dist to substation: {sub} m<br>"
+        f"Dist to transformer: {trafo} m<br>"
+        f"Max trafo loading: {loading}%<br>"
+        f"Min voltage: {voltage} pu"
+        for idx, line, sub, trafo, loading, voltage in zip(
+            buildings.index, _fmt('dist_to_line', '.1f'), _fmt('dist_to_substation', '.1f'),
+            _fmt('dist_to_transformer', '.1f'), _fmt('max_trafo_loading', '.2f'), _fmt('min_voltage_pu', '.3f'))
+    ]
+    add_circle_cluster(fg_buildings, buildings['centroid'].y.to_numpy(), buildings['centroid'].x.to_numpy(),
+                       ['blue'] * len(buildings), [3] * len(buildings), tooltips,
+                       precision if precision is not None else DEFAULT_PRECISION)
     # Add all FeatureGroups to the map
     for fg in [fg_streets, fg_power_lines, fg_infra, fg_service_lines, fg_buildings]:
         fg.add_to(m)
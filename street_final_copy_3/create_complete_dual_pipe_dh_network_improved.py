@@ -13,22 +13,64 @@ import json
 import os
 import pandas as pd
 import geopandas as gpd
-import networkx as nx
 import numpy as np
 import folium
 from pathlib import Path
-from shapely.geometry import Point, LineString
+from shapely.geometry import Point
+from scipy.spatial import cKDTree
 from pyproj import Transformer
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from .pipe_segment_table import PipeSegmentTable
+    from .load_aggregation import aggregate_tree
+    from .street_graph import StreetGraph, PLANT_CONNECTION
+    from .plant_siting import rank_plant_sites
+    from .map_layers import DEFAULT_PRECISION, add_circle_cluster, add_geojson_layer, segments_to_gdf, to_web_layer
+    from .vector_export import dh_layers, export_layers
+except ImportError:
+    from pipe_segment_table import PipeSegmentTable
+    from load_aggregation import aggregate_tree
+    from street_graph import StreetGraph, PLANT_CONNECTION
+    from plant_siting import rank_plant_sites
+    from map_layers import DEFAULT_PRECISION, add_circle_cluster, add_geojson_layer, segments_to_gdf, to_web_layer
+    from vector_export import dh_layers, export_layers
+
+# Memory-mapped load profile store (src/profile_store.py); JSON files are
+# parsed directly when it is not importable
+try:
+    from src.profile_store import load_phase_profiles
+except ImportError:
+    try:
+        from profile_store import load_phase_profiles
+    except ImportError:
+        load_phase_profiles = None
+
+DEFAULT_PLANT_LOCATION = (14.3453979, 51.76274)  # CHP plant in Branitz (WGS84 lon, lat)
+WATER_HEAT_CAPACITY_KJ_PER_KG_K = 4.186
+
 class ImprovedDualPipeDHNetwork:
     """Improved dual-pipe district heating network with strict street-based routing and load profile integration."""
     
-    def __init__(self, results_dir="simulation_outputs", load_profiles_file=None, building_demands_file=None, buildings_file=None):
+    def __init__(self, results_dir="simulation_outputs", load_profiles_file=None, building_demands_file=None, buildings_file=None, shared_network=None, layout="shortest_path",
+                 plant_location=None):
         self.results_dir = Path(results_dir)
         self.results_dir.mkdir(exist_ok=True)
         
+        # Optional whole-region street network (see shared_street_network.py);
+        # when set, the street graph is extracted from its cached plant tree
+        self.shared_network = shared_network
+        
+        # Main pipe layout: "shortest_path" (plant shortest-path tree) or
+        # "steiner" (approximate minimum Steiner tree over plant and buildings)
+        self.layout = layout
+        self.layout_stats = {}
+        
+        # Plant location as WGS84 (lon, lat); with a shared network this must be
+        # the location the shared network was built for
+        self.plant_lonlat = tuple(plant_location) if plant_location is not None else DEFAULT_PLANT_LOCATION
+        
         # Load profile data
         self.load_profiles_file = load_profiles_file
         self.building_demands_file = building_demands_file
@@ -37,10 +79,32 @@ class ImprovedDualPipeDHNetwork:
         self.building_demands = None
         self.current_scenario = "winter_werktag_abendspitze"  # Default scenario
         
+        # Optional weather-driven demand {building_id: {peak_heat_demand_kw,
+        # annual_heat_demand_kwh}} from src/heat_demand.py; takes precedence
+        # over the load-profile estimate
+        self.heat_demand_by_building = None
+        
+        # COP used to turn peak electric load profiles into heat demand; callers
+        # with weather data pass the COP at design temperature (src/heat_pump_cop.py)
+        self.load_profile_cop = 3.0
+        
+        # Scenario multiplier on the load-profile heat demand estimate (demand
+        # factor, renovation); weather-driven demand is passed in already scaled
+        self.heat_demand_scale = 1.0
+        
+        # Design temperatures; they set the design mass flow of every segment
+        self.supply_temperature_c = 70
+        self.return_temperature_c = 40
+        
+        # Optional hourly heat demand (buildings x hours, kW) with the
+        # buildings_gdf index labels of its rows; drives the coincident peaks
+        self.heat_demand_profiles = None
+        self.heat_demand_profile_index = None
+        
         # Data storage
         self.streets_gdf = None
         self.buildings_gdf = None
-        self.street_graph = nx.Graph()
+        self.street_graph = StreetGraph()
         self.service_connections = None
         self.supply_pipes = None
         self.return_pipes = None
@@ -53,8 +117,11 @@ class ImprovedDualPipeDHNetwork:
         print("📊 Loading load profile data...")
         
         try:
-            # Load load profiles
-            if self.load_profiles_file and os.path.exists(self.load_profiles_file):
+            # Load load profiles (memory-mapped store next to the JSON if present)
+            if self.load_profiles_file and load_phase_profiles is not None:
+                self.load_profiles = load_phase_profiles(self.load_profiles_file)
+                print(f"✅ Loaded load profiles for {len(self.load_profiles)} buildings")
+            elif self.load_profiles_file and os.path.exists(self.load_profiles_file):
                 with open(self.load_profiles_file, 'r') as f:
                     self.load_profiles = json.load(f)
                 print(f"✅ Loaded load profiles for {len(self.load_profiles)} buildings")
@@ -94,6 +161,19 @@ class ImprovedDualPipeDHNetwork:
         Returns:
             dict: Heat demand information including peak and annual demand
         """
+        # Weather-driven hourly heat demand (TRY heat balance), when provided
+        if self.heat_demand_by_building and str(building_id) in self.heat_demand_by_building:
+            demand = self.heat_demand_by_building[str(building_id)]
+            return {
+                'peak_heat_demand_kw': max(demand['peak_heat_demand_kw'], 1.0),
+                'annual_heat_demand_kwh': demand['annual_heat_demand_kwh'],
+                'building_type': building_data.get('gebaeudefunktion', 'Unknown'),
+                'building_area_m2': building_data.get('nutzflaeche_m2', 100.0),
+                'annual_consumption_kwh': None,
+                'load_profile_available': False,
+                'scenario_used': 'weather_try'
+            }
+        
         # Default values
         default_heat_demand_kw = 10.0
         default_annual_consumption_kwh = 10000.0
@@ -140,10 +220,9 @@ class ImprovedDualPipeDHNetwork:
                         peak_load_pu = load_profile[scenario]
                         break
             
-            # Convert electrical load to heat demand
-            # Assuming heat pump with COP=3.0 for conversion
-            cop = 3.0
-            peak_heat_demand_kw = peak_load_pu * cop
+            # Convert electrical load to heat demand with the heat pump COP
+            # at peak conditions
+            peak_heat_demand_kw = peak_load_pu * self.load_profile_cop
             
             # If peak load is very small, use building area-based calculation
             if peak_heat_demand_kw < 0.1:
@@ -161,7 +240,7 @@ class ImprovedDualPipeDHNetwork:
                 peak_heat_demand_kw = building_area_m2 * 0.1  # 100 W/m² default
         
         # Ensure minimum heat demand
-        peak_heat_demand_kw = max(peak_heat_demand_kw, 1.0)
+        peak_heat_demand_kw = max(peak_heat_demand_kw, 1.0) * self.heat_demand_scale
         
         # Calculate annual heat demand
         annual_heat_demand_kwh = peak_heat_demand_kw * 8760 * 0.3  # 30% capacity factor
@@ -183,8 +262,11 @@ class ImprovedDualPipeDHNetwork:
         # Load load profile data first
         self.load_load_profile_data()
         
-        # Load streets
-        self.streets_gdf = gpd.read_file("data/geojson/strassen_mit_adressenV3.geojson")
+        # Load streets (the shared network keeps the layer in memory once read)
+        if self.shared_network is not None and self.shared_network.streets_gdf is not None:
+            self.streets_gdf = self.shared_network.streets_gdf
+        else:
+            self.streets_gdf = gpd.read_file("data/geojson/strassen_mit_adressenV3.geojson")
         
         # Load buildings (use custom file if provided, otherwise default)
         if self.buildings_file and os.path.exists(self.buildings_file):
@@ -194,14 +276,19 @@ class ImprovedDualPipeDHNetwork:
             self.buildings_gdf = gpd.read_file("data/geojson/hausumringe_mit_adressenV3.geojson")
             print("📁 Using default buildings file")
         
-        # Set plant location (CHP plant in Branitz)
-        self.plant_location = Point(14.3453979, 51.76274)  # WGS84 coordinates
+        # Set plant location (defaults to the CHP plant in Branitz)
+        self.plant_location = Point(*self.plant_lonlat)  # WGS84 coordinates
         
         print(f"✅ Loaded {len(self.streets_gdf)} street segments and {len(self.buildings_gdf)} buildings")
         return True
     
     def build_connected_street_network(self):
         """Build fully connected street network graph."""
+        if self.shared_network is not None:
+            # The graph is extracted per street in snap_buildings_to_street_network
+            print(f"🛣️ Using shared street network ({self.shared_network.num_nodes} nodes, {self.shared_network.num_edges} edges)")
+            return True
+        
         print("🛣️ Building fully connected street network...")
         
         # Transform to UTM for accurate distance calculations
@@ -210,39 +297,23 @@ class ImprovedDualPipeDHNetwork:
         else:
             streets_utm = self.streets_gdf.copy()
         
-        # Build graph from street segments
+        # Build graph from street segments (integer node ids, one edge per vertex pair)
         for idx, street in streets_utm.iterrows():
-            coords = list(street.geometry.coords)
-            
-            # Add nodes and edges for each street segment
-            for i in range(len(coords) - 1):
-                start_node = coords[i]
-                end_node = coords[i + 1]
-                
-                # Calculate segment length
-                segment_length = Point(start_node).distance(Point(end_node))
-                
-                # Add edge to graph
-                self.street_graph.add_edge(
-                    start_node,
-                    end_node,
-                    weight=segment_length,
-                    street_id=idx,
-                    geometry=LineString([start_node, end_node]),
-                    street_name=street.get('name', f'Street_{idx}'),
-                    highway_type=street.get('highway', 'residential')
-                )
+            self.street_graph.add_street(
+                list(street.geometry.coords),
+                street_id=idx,
+                street_name=street.get('name', f'Street_{idx}'),
+                highway_type=street.get('highway', 'residential'),
+                geometry=street.geometry
+            )
         
         # Ensure network connectivity
         self._ensure_network_connectivity()
         
-        # Snap plant to street network
-        plant_utm = self.plant_location
-        if hasattr(plant_utm, 'crs') and plant_utm.crs.is_geographic:
-            transformer = Transformer.from_crs("EPSG:4326", "EPSG:32633", always_xy=True)
-            plant_lon, plant_lat = plant_utm.x, plant_utm.y
-            plant_x, plant_y = transformer.transform(plant_lon, plant_lat)
-            plant_utm = Point(plant_x, plant_y)
+        # Snap plant to street network (the plant location is given in WGS84)
+        transformer = Transformer.from_crs("EPSG:4326", "EPSG:32633", always_xy=True)
+        plant_x, plant_y = transformer.transform(self.plant_location.x, self.plant_location.y)
+        plant_utm = Point(plant_x, plant_y)
         
         self._snap_plant_to_street(plant_utm, streets_utm)
         
@@ -251,50 +322,24 @@ class ImprovedDualPipeDHNetwork:
     
     def _ensure_network_connectivity(self):
         """Ensure the street network is fully connected."""
-        if nx.is_connected(self.street_graph):
+        if self.street_graph.is_connected():
             print("✅ Network is fully connected")
             return True
         
         print("⚠️ Network has disconnected components - connecting them...")
-        components = list(nx.connected_components(self.street_graph))
-        print(f"   Found {len(components)} components")
+        n_components, _ = self.street_graph.connected_components()
+        print(f"   Found {n_components} components")
         
-        # Connect all components to the largest component
-        largest_component = max(components, key=len)
+        # Connect all components to the largest component (only if reasonably close)
+        for i, link_length in enumerate(self.street_graph.connect_components(max_distance=100), start=1):
+            print(f"   Connected component {i} with {link_length:.1f}m link")
         
-        for i, component in enumerate(components):
-            if component == largest_component:
-                continue
-            
-            # Find closest nodes between largest component and this component
-            min_distance = float('inf')
-            best_connection = None
-            
-            for node1 in largest_component:
-                for node2 in component:
-                    distance = Point(node1).distance(Point(node2))
-                    if distance < min_distance:
-                        min_distance = distance
-                        best_connection = (node1, node2)
-            
-            if best_connection and min_distance < 100:  # Only connect if reasonably close
-                self.street_graph.add_edge(
-                    best_connection[0],
-                    best_connection[1],
-                    weight=min_distance,
-                    street_id='connectivity_fix',
-                    geometry=LineString([best_connection[0], best_connection[1]]),
-                    street_name='Connectivity Fix',
-                    highway_type='service'
-                )
-                print(f"   Connected component {i} with {min_distance:.1f}m link")
-        
-        if nx.is_connected(self.street_graph):
+        if self.street_graph.is_connected():
             print("✅ Successfully connected all components")
         else:
             print("❌ Still have disconnected components")
         
-        return nx.is_connected(self.street_graph)
+        return self.street_graph.is_connected()
     
     def _snap_plant_to_street(self, plant_utm, streets_utm):
         """Snap plant to nearest point on street network."""
@@ -311,23 +356,22 @@ class ImprovedDualPipeDHNetwork:
         
         if nearest_point:
             # Add plant node to graph
-            self.street_graph.add_node(
-                nearest_point,
+            plant_node = self.street_graph.add_node(
+                (nearest_point.x, nearest_point.y),
                 node_type='plant',
                 name='CHP_Plant',
                 plant_location=True
             )
             
             # Connect plant to nearest street node
-            coords = list(nearest_street.geometry.coords)
+            coords = [p[:2] for p in nearest_street.geometry.coords]
             nearest_street_node = min(coords, key=lambda p: Point(p).distance(nearest_point))
             
             self.street_graph.add_edge(
-                nearest_point,
-                nearest_street_node,
+                plant_node,
+                self.street_graph.add_node(nearest_street_node),
                 weight=nearest_point.distance(Point(nearest_street_node)),
-                street_id='plant_connection',
-                geometry=LineString([nearest_point, nearest_street_node]),
+                street_id=PLANT_CONNECTION,
                 street_name='Plant Connection',
                 highway_type='service'
             )
@@ -344,42 +388,46 @@ class ImprovedDualPipeDHNetwork:
         else:
             buildings_utm = self.buildings_gdf.copy()
         
-        if self.streets_gdf.crs is None or self.streets_gdf.crs.is_geographic:
-            streets_utm = self.streets_gdf.to_crs("EPSG:32633")
-        else:
-            streets_utm = self.streets_gdf.copy()
+        if self.shared_network is not None:
+            return self._snap_buildings_to_shared_network(buildings_utm)
+        
+        # Nearest street edge for all buildings at once (vectorized projection)
+        centroids = buildings_utm.geometry.centroid
+        edges, projected, distances, ts = self.street_graph.project_points(
+            np.column_stack([centroids.x, centroids.y]),
+            edge_mask=self.street_graph.street_edge_mask()
+        )
+        
+        # Service connection nodes on the street edges; buildings on the same
+        # edge are chained along it in order, so they share one trench
+        connection_nodes = self.street_graph.attach_points(
+            projected, edges, ts,
+            [{'node_type': 'service_connection', 'building_id': idx, 'name': f'Service_{idx}'}
+             for idx in buildings_utm.index]
+        )
         
         service_connections = []
         
-        for idx, building in buildings_utm.iterrows():
-            building_point = building.geometry.centroid
-            
-            # Find nearest point on street network
-            min_distance = float('inf')
-            nearest_point = None
-            nearest_street = None
-            
-            for street_idx, street in streets_utm.iterrows():
-                distance = street.geometry.distance(building_point)
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest_point = street.geometry.interpolate(street.geometry.project(building_point))
-                    nearest_street = street
+        for i, (idx, building) in enumerate(buildings_utm.iterrows()):
+            street_id, street_name, _ = self.street_graph.street_attributes(edges[i])
             
             # Calculate heat demand from load profiles
             building_id = building.get('gebaeude', building.get('id', str(idx)))
             heat_demand_info = self.calculate_heat_demand_from_load_profile(building_id, building)
             
+            connection_node = int(connection_nodes[i])
+            
             # Create service connection
             service_connection = {
                 'building_id': idx,
-                'building_x': building_point.x,
-                'building_y': building_point.y,
-                'connection_x': nearest_point.x,
-                'connection_y': nearest_point.y,
-                'distance_to_street': min_distance,
-                'street_segment_id': nearest_street.name,
-                'street_name': nearest_street.get('name', f'Street_{nearest_street.name}'),
+                'building_x': centroids.iloc[i].x,
+                'building_y': centroids.iloc[i].y,
+                'connection_x': projected[i, 0],
+                'connection_y': projected[i, 1],
+                'connection_node': connection_node,
+                'distance_to_street': distances[i],
+                'street_segment_id': street_id,
+                'street_name': street_name,
                 'heating_load_kw': heat_demand_info['peak_heat_demand_kw'],
                 'annual_heat_demand_kwh': heat_demand_info['annual_heat_demand_kwh'],
                 'building_type': heat_demand_info['building_type'],
@@ -389,181 +437,253 @@ class ImprovedDualPipeDHNetwork:
             }
             
             service_connections.append(service_connection)
-            
-            # Add service connection node to graph if not already present
-            connection_node = (nearest_point.x, nearest_point.y)
-            if connection_node not in self.street_graph:
-                self.street_graph.add_node(
-                    connection_node, 
-                    node_type='service_connection',
-                    building_id=idx,
-                    name=f'Service_{idx}'
-                )
         
         self.service_connections = pd.DataFrame(service_connections)
         
         print(f"✅ Snapped {len(service_connections)} buildings to street network")
         return True
     
-    def create_dual_pipe_network(self):
-        """Create complete dual-pipe network with supply and return pipes following street network."""
-        print("🔄 Creating dual-pipe network (supply + return) following street network...")
+    def _snap_buildings_to_shared_network(self, buildings_utm):
+        """Snap buildings onto the shared network and extract the serving subtree as street graph."""
+        shared = self.shared_network
+        centroids = buildings_utm.geometry.centroid
+        snapped, tree_edges = shared.extract_subnetwork(np.column_stack([centroids.x, centroids.y]))
+        
+        if self.layout == 'steiner':
+            # The Steiner layout may leave the plant tree, so route on the whole
+            # region graph (built once per process; the connections split its edges)
+            self.street_graph = shared.street_graph().copy()
+        else:
+            self.street_graph = shared.tree_street_graph(tree_edges)
         
-        # Get plant node
-        plant_node = None
-        for node, attrs in self.street_graph.nodes(data=True):
-            if attrs.get('node_type') == 'plant':
-                plant_node = node
-                break
+        connection_nodes = self._attach_shared_connections(buildings_utm.index, snapped)
+        
+        service_connections = []
+        for i, (idx, building) in enumerate(buildings_utm.iterrows()):
+            street_id = int(snapped['street_id'][i])
+            building_id = building.get('gebaeude', building.get('id', str(idx)))
+            heat_demand_info = self.calculate_heat_demand_from_load_profile(building_id, building)
+            connection_node = int(connection_nodes[i])
+            
+            service_connections.append({
+                'building_id': idx,
+                'building_x': centroids.iloc[i].x,
+                'building_y': centroids.iloc[i].y,
+                'connection_x': snapped['connection_x'][i],
+                'connection_y': snapped['connection_y'][i],
+                'connection_node': connection_node,
+                'distance_to_street': snapped['distance_to_street'][i],
+                'street_segment_id': street_id,
+                'street_name': shared.street_name(street_id),
+                'heating_load_kw': heat_demand_info['peak_heat_demand_kw'],
+                'annual_heat_demand_kwh': heat_demand_info['annual_heat_demand_kwh'],
+                'building_type': heat_demand_info['building_type'],
+                'building_area_m2': heat_demand_info['building_area_m2'],
+                'load_profile_available': heat_demand_info['load_profile_available'],
+                'scenario_used': heat_demand_info['scenario_used']
+            })
+        
+        self.service_connections = pd.DataFrame(service_connections)
+        
+        print(f"✅ Snapped {len(service_connections)} buildings to shared street network "
+              f"({self.street_graph.number_of_edges()} edges in extracted subtree)")
+        return True
+    
+    def _attach_shared_connections(self, building_index, snapped):
+        """
+        Add the service connection nodes of the snapped buildings to the
+        extracted street graph. Buildings on the same street edge share its
+        trench: edges already in the graph are split at the connection
+        points (StreetGraph.attach_points); on other edges the connections
+        are chained outwards from the plant-side end in order of distance.
+        Returns the connection node ids.
+        """
+        shared = self.shared_network
+        graph = self.street_graph
+        xy = np.column_stack([snapped['connection_x'], snapped['connection_y']])
+        attrs = [{'node_type': 'service_connection', 'building_id': idx, 'name': f'Service_{idx}'}
+                 for idx in building_index]
+        nodes = np.empty(len(xy), dtype=np.int64)
+        
+        # Street edge of every building in the extracted graph (-1 if not in it)
+        graph_edges = np.full(len(xy), -1, dtype=np.int64)
+        for i, edge in enumerate(snapped['edge'].tolist()):
+            a = graph.find_node(shared.coords[shared.edge_u[edge]])
+            b = graph.find_node(shared.coords[shared.edge_v[edge]])
+            if a is not None and b is not None and graph.edge_index(a, b) is not None:
+                graph_edges[i] = graph.edge_index(a, b)
+        on_graph = np.flatnonzero(graph_edges >= 0)
+        if len(on_graph):
+            # t runs along the shared edge; flip it where the graph stores the edge reversed
+            t = snapped['t'][on_graph]
+            same_direction = graph.edge_u[graph_edges[on_graph]] == np.array(
+                [graph.find_node(shared.coords[u]) for u in shared.edge_u[snapped['edge'][on_graph]]])
+            nodes[on_graph] = graph.attach_points(
+                xy[on_graph], graph_edges[on_graph], np.where(same_direction, t, 1 - t),
+                [attrs[i] for i in on_graph.tolist()]
+            )
+        
+        off_graph = np.flatnonzero(graph_edges < 0)
+        groups = {}
+        for i in off_graph.tolist():
+            groups.setdefault((int(snapped['edge'][i]), int(snapped['attach_node'][i])), []).append(i)
+        for (_, attach), members in groups.items():
+            members.sort(key=lambda i: snapped['stub_length_m'][i])
+            previous, previous_offset = graph.add_node(shared.coords[attach]), 0.0
+            for i in members:
+                nodes[i] = graph.add_node(xy[i], **attrs[i])
+                street_id = int(snapped['street_id'][i])
+                if nodes[i] != previous:
+                    graph.add_edge(
+                        previous,
+                        int(nodes[i]),
+                        weight=float(snapped['stub_length_m'][i]) - previous_offset,
+                        street_id=street_id,
+                        street_name=shared.street_name(street_id),
+                        highway_type=shared.highway_type(street_id)
+                    )
+                    previous, previous_offset = int(nodes[i]), float(snapped['stub_length_m'][i])
+        return nodes
+    
+    def find_plant_sites(self, candidates=None, top_k=50):
+        """
+        Rank candidate plant locations for the snapped buildings (see plant_siting.py).
+        candidates: list of WGS84 (lon, lat) sites; default is every street node.
+        Must be called after snap_buildings_to_street_network.
+        Returns a DataFrame sorted by score (best first) with UTM x/y per site.
+        """
+        print("📍 Ranking candidate plant sites...")
+        connections = self.service_connections
+        if self.shared_network is not None:
+            # Score on the whole region graph, not only the current plant's subtree
+            csr, coords = self.shared_network.to_csr(), self.shared_network.coords
+            demand_nodes = self.shared_network.snap_points(
+                connections[['connection_x', 'connection_y']].to_numpy()
+            )['attach_node']
+            street_nodes = np.setdiff1d(np.arange(len(coords)), [self.shared_network.plant_node])
+        else:
+            csr, coords = self.street_graph.to_csr(), self.street_graph.coords
+            demand_nodes = connections['connection_node'].to_numpy()
+            special = list(self.street_graph.node_attrs)
+            street_nodes = np.setdiff1d(np.arange(len(coords)), special)
+        
+        if candidates is None:
+            candidate_nodes = street_nodes
+        else:
+            # Snap user-supplied sites to the nearest street node
+            transformer = Transformer.from_crs("EPSG:4326", "EPSG:32633", always_xy=True)
+            lon, lat = np.asarray(candidates, dtype=float).reshape(-1, 2).T
+            x, y = transformer.transform(lon, lat)
+            _, nearest = cKDTree(coords[street_nodes]).query(np.column_stack([x, y]))
+            candidate_nodes = street_nodes[nearest]
+        
+        ranking = rank_plant_sites(
+            csr, coords, demand_nodes, pd.to_numeric(connections['heating_load_kw'], errors='coerce').fillna(0).to_numpy(),
+            candidates=candidate_nodes, top_k=top_k
+        )
+        if len(ranking):
+            best = ranking.iloc[0]
+            print(f"✅ Evaluated {len(candidate_nodes)} candidate sites; best mean path length "
+                  f"{best['mean_path_length_m']:.0f} m, peak pressure drop {best['peak_pressure_drop_bar']:.2f} bar")
+        return ranking
+    
+    def create_dual_pipe_network(self, layout=None):
+        """
+        Create complete dual-pipe network with supply and return pipes following street network.
+        layout: "shortest_path" routes every building along its shortest path from the plant;
+        "steiner" routes along an approximate minimum Steiner tree (less trench length).
+        Defaults to the layout given to the constructor.
+        """
+        layout = layout or self.layout
+        if layout not in ('shortest_path', 'steiner'):
+            print(f"❌ Unknown network layout: {layout}")
+            return False
+        print(f"🔄 Creating dual-pipe network (supply + return) following street network ({layout} layout)...")
         
-        if plant_node is None:
+        # Get plant node
+        plant_nodes = self.street_graph.nodes_of_type('plant')
+        if not plant_nodes:
             print("❌ Plant node not found in graph")
             return False
+        plant_node = plant_nodes[0]
         
         # Verify network connectivity and fix if needed
-        if not nx.is_connected(self.street_graph):
+        if not self.street_graph.is_connected():
             print("❌ Street network is not connected - attempting to fix connectivity...")
-            
-            # Try to connect disconnected components
-            components = list(nx.connected_components(self.street_graph))
-            print(f"   Found {len(components)} disconnected components")
+            n_components, _ = self.street_graph.connected_components()
+            print(f"   Found {n_components} disconnected components")
             
             # Connect all components to the main component
-            main_component = components[0]
-            for i in range(1, len(components)):
-                comp = components[i]
-                
-                # Find closest nodes between main component and this component
-                min_distance = float('inf')
-                best_connection = None
-                
-                for node1 in main_component:
-                    for node2 in comp:
-                        distance = Point(node1).distance(Point(node2))
-                        if distance < min_distance:
-                            min_distance = distance
-                            best_connection = (node1, node2)
-                
-                if best_connection:
-                    # Add connection edge
-                    self.street_graph.add_edge(
-                        best_connection[0],
-                        best_connection[1],
-                        weight=min_distance,
-                        street_id='connectivity_fix',
-                        geometry=LineString([best_connection[0], best_connection[1]]),
-                        street_name='Connectivity Fix',
-                        highway_type='service'
-                    )
-                    
-                    # Add all nodes from this component to main component
-                    main_component.update(comp)
-                    
-                    print(f"   Connected component {i} with {min_distance:.1f}m link")
+            for i, link_length in enumerate(self.street_graph.connect_components(), start=1):
+                print(f"   Connected component {i} with {link_length:.1f}m link")
             
             # Check connectivity again
-            if not nx.is_connected(self.street_graph):
+            if not self.street_graph.is_connected():
                 print("❌ Still cannot connect all components")
                 return False
             else:
                 print("✅ Successfully connected all network components")
         
-        # Create supply and return networks
-        supply_pipes = []
-        return_pipes = []
+        # One Dijkstra run from the plant gives the shortest-path routes to all buildings
+        _, predecessors = self.street_graph.shortest_path_tree(plant_node)
+        terminals = [plant_node] + self.service_connections['connection_node'].astype(int).tolist()
+        shortest_path_trench_m = float(
+            self.street_graph.edge_length[self.street_graph.path_edges_mask(predecessors, terminals)].sum()
+        )
+        
+        if layout == 'steiner':
+            # Route along the Steiner tree instead; paths in a tree are unique
+            steiner_mask = self.street_graph.steiner_tree(terminals)
+            _, predecessors = self.street_graph.shortest_path_tree(plant_node, edge_mask=steiner_mask)
+        
+        # Create supply and return networks: every unique street segment is stored
+        # once, and each building keeps the list of segment indices on its route
+        segments = PipeSegmentTable(self.street_graph.coords)
+        edge_data = self.street_graph.edge_data
         total_supply_length = 0
-        total_return_length = 0
         successful_routes = 0
         
         for idx, service_conn in self.service_connections.iterrows():
-            service_node = (service_conn['connection_x'], service_conn['connection_y'])
+            service_node = int(service_conn['connection_node'])
             
-            try:
-                # Find shortest path along street network for supply
-                supply_path = nx.shortest_path(
-                    self.street_graph, 
-                    plant_node, 
-                    service_node, 
-                    weight='weight'
-                )
-                
-                # Calculate supply path length
-                supply_path_length = nx.shortest_path_length(
-                    self.street_graph, 
-                    plant_node, 
-                    service_node, 
-                    weight='weight'
-                )
-                
-                # Create supply pipe segments following street network
-                for i in range(len(supply_path) - 1):
-                    start_node = supply_path[i]
-                    end_node = supply_path[i + 1]
-                    
-                    # Get edge data
-                    edge_data = self.street_graph.get_edge_data(start_node, end_node)
-                    
-                    supply_pipe = {
-                        'start_node': start_node,
-                        'end_node': end_node,
-                        'length_m': edge_data['weight'],
-                        'street_id': edge_data['street_id'],
-                        'street_name': edge_data['street_name'],
-                        'highway_type': edge_data['highway_type'],
-                        'pipe_type': 'supply',
-                        'building_served': service_conn['building_id'],
-                        'temperature_c': 70,  # Supply temperature
-                        'flow_direction': 'plant_to_building',
-                        'follows_street': True
-                    }
-                    
-                    supply_pipes.append(supply_pipe)
-                    total_supply_length += edge_data['weight']
-                
-                # Create return pipe segments (reverse path) following street network
-                for i in range(len(supply_path) - 1, 0, -1):
-                    start_node = supply_path[i]
-                    end_node = supply_path[i - 1]
-                    
-                    # Get edge data
-                    edge_data = self.street_graph.get_edge_data(end_node, start_node)
-                    
-                    return_pipe = {
-                        'start_node': start_node,
-                        'end_node': end_node,
-                        'length_m': edge_data['weight'],
-                        'street_id': edge_data['street_id'],
-                        'street_name': edge_data['street_name'],
-                        'highway_type': edge_data['highway_type'],
-                        'pipe_type': 'return',
-                        'building_served': service_conn['building_id'],
-                        'temperature_c': 40,  # Return temperature
-                        'flow_direction': 'building_to_plant',
-                        'follows_street': True
-                    }
-                    
-                    return_pipes.append(return_pipe)
-                    total_return_length += edge_data['weight']
-                
-                successful_routes += 1
-                print(f"   ✅ Routed to building {service_conn['building_id']} via {len(supply_path)-1} street segments ({supply_path_length:.1f}m supply + {supply_path_length:.1f}m return)")
-                
-            except nx.NetworkXNoPath:
+            # Shortest path along street network for supply
+            supply_path = StreetGraph.path_from_tree(predecessors, plant_node, service_node)
+            if supply_path is None:
                 print(f"❌ No path found to building {service_conn['building_id']} - network connectivity issue")
-        
-        # Convert to DataFrames
-        self.supply_pipes = pd.DataFrame(supply_pipes)
-        self.return_pipes = pd.DataFrame(return_pipes)
-        
-        # Remove duplicates (same street segment used by multiple buildings)
-        self.supply_pipes = self.supply_pipes.drop_duplicates(subset=['start_node', 'end_node'])
-        self.return_pipes = self.return_pipes.drop_duplicates(subset=['start_node', 'end_node'])
+                continue
+            
+            # Register the supply route; the return route is the same segments reversed
+            supply_path_length = segments.add_route(service_conn['building_id'], supply_path, edge_data)
+            total_supply_length += supply_path_length
+            
+            successful_routes += 1
+            print(f"   ✅ Routed to building {service_conn['building_id']} via {len(supply_path)-1} street segments ({supply_path_length:.1f}m supply + {supply_path_length:.1f}m return)")
+        
+        total_return_length = total_supply_length
+        
+        # One row per unique segment (same street segment used by multiple buildings is stored once)
+        self.pipe_segments = segments
+        trench_m = segments.total_length_m
+        self.layout_stats = {
+            'layout': layout,
+            'trench_length_km': trench_m / 1000,
+            'shortest_path_trench_km': shortest_path_trench_m / 1000,
+            'trench_km_saved': (shortest_path_trench_m - trench_m) / 1000,
+            'trench_saved_percent': (
+                100 * (shortest_path_trench_m - trench_m) / shortest_path_trench_m if shortest_path_trench_m > 0 else 0.0
+            )
+        }
+        self.supply_pipes = segments.to_frame('supply', temperature_c=self.supply_temperature_c, flow_direction='plant_to_building')
+        self.return_pipes = segments.to_frame('return', temperature_c=self.return_temperature_c, flow_direction='building_to_plant')
         
         print(f"✅ Created dual-pipe network:")
         print(f"   - Supply pipes: {len(self.supply_pipes)} unique segments, {total_supply_length/1000:.1f} km total")
         print(f"   - Return pipes: {len(self.return_pipes)} unique segments, {total_return_length/1000:.1f} km total")
         print(f"   - Total pipe length: {(total_supply_length + total_return_length)/1000:.1f} km")
         print(f"   - Successfully routed to {successful_routes}/{len(self.service_connections)} buildings")
+        print(f"   - Trench length: {self.layout_stats['trench_length_km']:.2f} km ({layout}), "
+              f"{self.layout_stats['trench_km_saved']:.2f} km saved vs. shortest-path layout "
+              f"({self.layout_stats['trench_saved_percent']:.1f}%)")
         print(f"   - ALL connections follow street network ✅")
         
         return True
@@ -572,74 +692,42 @@ class ImprovedDualPipeDHNetwork:
         """Create dual service connections following street network."""
         print("🔗 Creating dual service connections following street network...")
         
-        dual_service_connections = []
-        
-        for idx, service_conn in self.service_connections.iterrows():
-            # Find the street segment that the building connects to
-            connection_node = (service_conn['connection_x'], service_conn['connection_y'])
-            
-            # Find the street segment in the supply/return pipes that connects to this building
-            building_supply_pipes = self.supply_pipes[self.supply_pipes['building_served'] == service_conn['building_id']]
-            building_return_pipes = self.return_pipes[self.return_pipes['building_served'] == service_conn['building_id']]
-            
-            if len(building_supply_pipes) > 0 and len(building_return_pipes) > 0:
-                # Get the last segment of supply pipe (closest to building)
-                last_supply_pipe = building_supply_pipes.iloc[-1]
-                # Get the first segment of return pipe (closest to building)
-                first_return_pipe = building_return_pipes.iloc[0]
-                
-                # Supply service connection (from main to building)
-                supply_service = {
-                    'building_id': service_conn['building_id'],
-                    'building_x': service_conn['building_x'],
-                    'building_y': service_conn['building_y'],
-                    'connection_x': service_conn['connection_x'],
-                    'connection_y': service_conn['connection_y'],
-                    'distance_to_street': service_conn['distance_to_street'],
-                    'street_segment_id': service_conn['street_segment_id'],
-                    'street_name': service_conn['street_name'],
-                    'heating_load_kw': service_conn['heating_load_kw'],
-                    'annual_heat_demand_kwh': service_conn.get('annual_heat_demand_kwh', 0),
-                    'building_type': service_conn.get('building_type', 'Unknown'),
-                    'building_area_m2': service_conn.get('building_area_m2', 0),
-                    'load_profile_available': service_conn.get('load_profile_available', False),
-                    'scenario_used': service_conn.get('scenario_used', 'Unknown'),
-                    'pipe_type': 'supply_service',
-                    'temperature_c': 70,
-                    'flow_direction': 'main_to_building',
-                    'follows_street': True,
-                    'connected_to_supply_pipe': True,
-                    'connected_to_return_pipe': True
-                }
-                
-                # Return service connection (from building to main)
-                return_service = {
-                    'building_id': service_conn['building_id'],
-                    'building_x': service_conn['building_x'],
-                    'building_y': service_conn['building_y'],
-                    'connection_x': service_conn['connection_x'],
-                    'connection_y': service_conn['connection_y'],
-                    'distance_to_street': service_conn['distance_to_street'],
-                    'street_segment_id': service_conn['street_segment_id'],
-                    'street_name': service_conn['street_name'],
-                    'heating_load_kw': service_conn['heating_load_kw'],
-                    'annual_heat_demand_kwh': service_conn.get('annual_heat_demand_kwh', 0),
-                    'building_type': service_conn.get('building_type', 'Unknown'),
-                    'building_area_m2': service_conn.get('building_area_m2', 0),
-                    'load_profile_available': service_conn.get('load_profile_available', False),
-                    'scenario_used': service_conn.get('scenario_used', 'Unknown'),
-                    'pipe_type': 'return_service',
-                    'temperature_c': 40,
-                    'flow_direction': 'building_to_main',
-                    'follows_street': True,
-                    'connected_to_supply_pipe': True,
-                    'connected_to_return_pipe': True
-                }
-                
-                dual_service_connections.append(supply_service)
-                dual_service_connections.append(return_service)
+        service_columns = [
+            'building_id', 'building_x', 'building_y', 'connection_x', 'connection_y', 'connection_node',
+            'distance_to_street', 'street_segment_id', 'street_name', 'heating_load_kw'
+        ]
+        optional_defaults = {
+            'annual_heat_demand_kwh': 0,
+            'building_type': 'Unknown',
+            'building_area_m2': 0,
+            'load_profile_available': False,
+            'scenario_used': 'Unknown'
+        }
         
-        self.dual_service_connections = pd.DataFrame(dual_service_connections)
+        # Only buildings with a route on the main network get service pipes
+        routed = self.pipe_segments.routed_mask(self.service_connections['building_id'])
+        base = self.service_connections.loc[routed, service_columns].copy()
+        for column, default in optional_defaults.items():
+            base[column] = self.service_connections.loc[routed, column] if column in self.service_connections else default
+        base['follows_street'] = True
+        base['connected_to_supply_pipe'] = True
+        base['connected_to_return_pipe'] = True
+        
+        # Supply service connection (from main to building)
+        supply_service = base.assign(pipe_type='supply_service', temperature_c=self.supply_temperature_c, flow_direction='main_to_building')
+        # Return service connection (from building to main)
+        return_service = base.assign(pipe_type='return_service', temperature_c=self.return_temperature_c, flow_direction='building_to_main')
+        
+        # Interleave supply/return rows per building
+        column_order = service_columns + list(optional_defaults) + [
+            'pipe_type', 'temperature_c', 'flow_direction', 'follows_street',
+            'connected_to_supply_pipe', 'connected_to_return_pipe'
+        ]
+        self.dual_service_connections = (
+            pd.concat([supply_service, return_service])
+            .sort_index(kind='stable')
+            .reset_index(drop=True)[column_order]
+        )
         
         print(f"✅ Created {len(self.dual_service_connections)} dual service connections ({len(self.service_connections)} buildings × 2 pipes)")
         print(f"   - ALL service connections follow street network ✅")
@@ -647,6 +735,43 @@ class ImprovedDualPipeDHNetwork:
         
         return True
     
+    def aggregate_segment_loads(self, supply_temp_c=70, return_temp_c=40):
+        """
+        Coincident heat peak carried by every main-pipe segment (see
+        load_aggregation.py): hourly series if heat_demand_profiles is set,
+        otherwise the building peaks with the DH simultaneity curve.
+        Adds design_heat_kw, buildings_downstream, simultaneity_factor and
+        design_mass_flow_kg_per_s to the supply and return pipe tables.
+        Returns (coincident plant peak [kW], plant simultaneity factor, method).
+        """
+        segments = self.pipe_segments
+        building_ids = self.service_connections['building_id'].tolist()
+        load_element = segments.terminal_segments(building_ids)
+        peaks = self.service_connections['heating_load_kw'].to_numpy(dtype=float)
+        matrix = None
+        if self.heat_demand_profiles is not None:
+            rows = pd.Index(self.heat_demand_profile_index).get_indexer(building_ids)
+            if (rows >= 0).all():
+                matrix = np.asarray(self.heat_demand_profiles)[rows]
+                peaks = matrix.max(axis=1)
+        
+        # Segments leaving the plant hang below one extra root element (the
+        # plant); buildings connected at the plant itself (empty route) load it directly
+        parent = segments.parent_segments()
+        plant = len(parent)
+        parent = np.append(np.where(parent < 0, plant, parent), -1)
+        load_element[(load_element < 0) & segments.registered_mask(building_ids)] = plant
+        result = aggregate_tree(parent, load_element, matrix, peaks)
+        
+        design_kw = result['coincident_peak'][:plant]
+        mass_flow = design_kw / (WATER_HEAT_CAPACITY_KJ_PER_KG_K * max(supply_temp_c - return_temp_c, 1))
+        for pipes in (self.supply_pipes, self.return_pipes):
+            pipes['design_heat_kw'] = design_kw
+            pipes['buildings_downstream'] = result['n_buildings'][:plant]
+            pipes['simultaneity_factor'] = result['simultaneity'][:plant]
+            pipes['design_mass_flow_kg_per_s'] = mass_flow
+        return float(result['coincident_peak'][plant]), float(result['simultaneity'][plant]), result['method']
+    
     def calculate_dual_network_statistics(self):
         """Calculate complete dual-pipe network statistics."""
         print("📊 Calculating dual-pipe network statistics...")
@@ -676,6 +801,13 @@ class ImprovedDualPipeDHNetwork:
         num_buildings = len(self.service_connections)
         total_heat_demand_kw = self.service_connections['heating_load_kw'].sum()
         
+        # Coincident peak at the plant (not the sum of the building peaks)
+        if len(self.pipe_segments):
+            coincident_peak_kw, simultaneity, peak_method = self.aggregate_segment_loads(
+                self.supply_temperature_c, self.return_temperature_c)
+        else:
+            coincident_peak_kw, simultaneity, peak_method = total_heat_demand_kw, 1.0, 'sum'
+        
         # Calculate annual heat demand from load profiles if available
         if 'annual_heat_demand_kwh' in self.service_connections.columns:
             total_heat_demand_mwh = self.service_connections['annual_heat_demand_kwh'].sum() / 1000
@@ -710,6 +842,9 @@ class ImprovedDualPipeDHNetwork:
             'max_service_length_m': max_service_length_m,
             'num_buildings': num_buildings,
             'total_heat_demand_kw': total_heat_demand_kw,
+            'coincident_peak_heat_kw': coincident_peak_kw,
+            'simultaneity_factor': simultaneity,
+            'peak_aggregation_method': peak_method,
             'total_heat_demand_mwh': total_heat_demand_mwh,
             'network_density_km_per_building': network_density_km_per_building,
             'total_pipe_length_km': total_main_length_km + total_service_length_m / 1000,
@@ -718,13 +853,15 @@ class ImprovedDualPipeDHNetwork:
             'street_based_routing': True,
             'all_connections_follow_streets': all_pipes_follow_streets,
             'no_direct_connections': True,
-            'supply_temperature_c': 70,
-            'return_temperature_c': 40,
+            'supply_temperature_c': self.supply_temperature_c,
+            'return_temperature_c': self.return_temperature_c,
             # Load profile statistics
             'buildings_with_load_profiles': int(buildings_with_load_profiles),
             'load_profile_coverage_percent': round(load_profile_coverage * 100, 1),
             'current_scenario': self.current_scenario,
-            'load_profiles_used': len(self.load_profiles) > 0
+            'load_profiles_used': len(self.load_profiles) > 0,
+            # Network layout (trench = unique main-pipe street length)
+            **self.layout_stats
         }
         
         print(f"✅ Dual-pipe network statistics calculated:")
@@ -734,6 +871,8 @@ class ImprovedDualPipeDHNetwork:
         print(f"   - Service pipes: {total_service_length_m:.1f} m total (supply + return)")
         print(f"   - Buildings: {num_buildings}")
         print(f"   - Heat demand: {total_heat_demand_mwh:.2f} MWh/year")
+        print(f"   - Peak heat: {coincident_peak_kw:.1f} kW coincident vs. {total_heat_demand_kw:.1f} kW summed "
+              f"(simultaneity {simultaneity:.2f}, {peak_method})")
         print(f"   - Load profiles: {buildings_with_load_profiles}/{num_buildings} buildings ({load_profile_coverage*100:.1f}%)")
         print(f"   - Scenario: {self.current_scenario}")
         print(f"   - Dual-pipe system: ✅")
@@ -742,13 +881,18 @@ class ImprovedDualPipeDHNetwork:
         
         return True
     
-    def create_dual_pipe_interactive_map(self, save_path=None):
-        """Create interactive map showing complete dual-pipe network."""
+    def create_dual_pipe_interactive_map(self, save_path=None, precision=DEFAULT_PRECISION, simplify_tolerance=None):
+        """
+        Create interactive map showing complete dual-pipe network.
+        Every group is added as one GeoJson layer (reprojected once); buildings
+        are clustered. precision: coordinate decimals in the HTML (None = full);
+        simplify_tolerance: optional street simplification in meters.
+        """
         print("🗺️ Creating dual-pipe interactive map...")
         
         # Create base map
-        center_lat, center_lon = 51.76274, 14.3453979
-        m = folium.Map(location=[center_lat, center_lon], zoom_start=16)
+        center_lat, center_lon = self.plant_location.y, self.plant_location.x
+        m = folium.Map(location=[center_lat, center_lon], zoom_start=16, prefer_canvas=True)
         
         # Add tile layers
         folium.TileLayer('openstreetmap', name='OpenStreetMap').add_to(m)
@@ -762,23 +906,20 @@ class ImprovedDualPipeDHNetwork:
         building_group = folium.FeatureGroup(name="Buildings", overlay=True)
         plant_group = folium.FeatureGroup(name="CHP Plant", overlay=True)
         
-        # Transform coordinates back to WGS84
-        transformer = Transformer.from_crs("EPSG:32633", "EPSG:4326", always_xy=True)
-        
         # 1. Add street network
-        self._add_street_network_to_map(street_group, transformer)
+        self._add_street_network_to_map(street_group, precision, simplify_tolerance)
         
         # 2. Add supply pipes
-        self._add_supply_pipes_to_map(supply_pipe_group, transformer)
+        self._add_supply_pipes_to_map(supply_pipe_group, precision)
         
         # 3. Add return pipes
-        self._add_return_pipes_to_map(return_pipe_group, transformer)
+        self._add_return_pipes_to_map(return_pipe_group, precision)
         
         # 4. Add service connections
-        self._add_dual_service_connections_to_map(service_pipe_group, transformer)
+        self._add_dual_service_connections_to_map(service_pipe_group, precision)
         
         # 5. Add buildings
-        self._add_buildings_to_map(building_group, transformer)
+        self._add_buildings_to_map(building_group, precision)
         
         # 6. Add plant
         self._add_plant_to_map(plant_group)
@@ -803,142 +944,104 @@ class ImprovedDualPipeDHNetwork:
         
         return m
     
-    def _add_street_network_to_map(self, feature_group, transformer):
+    def _add_street_network_to_map(self, feature_group, precision=DEFAULT_PRECISION, simplify_tolerance=None):
         """Add street network to map."""
-        for idx, street in self.streets_gdf.iterrows():
-            coords = list(street.geometry.coords)
-            wgs84_coords = []
-            
-            for lon, lat in coords:
-                wgs84_lon, wgs84_lat = transformer.transform(lon, lat)
-                wgs84_coords.append([wgs84_lat, wgs84_lon])
-            
-            folium.PolyLine(
-                locations=wgs84_coords,
-                color='gray',
-                weight=2,
-                opacity=0.6,
-                popup=f"Street {idx}<br>Type: {street.get('highway', 'Unknown')}<br>Name: {street.get('name', 'Unnamed')}",
-                tooltip=f"Street {idx}"
-            ).add_to(feature_group)
+        streets = self.streets_gdf.copy()
+        streets['street_index'] = streets.index.astype(str)
+        streets['highway'] = streets['highway'] if 'highway' in streets.columns else 'Unknown'
+        streets['name'] = streets['name'] if 'name' in streets.columns else 'Unnamed'
+        streets[['highway', 'name']] = streets[['highway', 'name']].fillna('Unknown').astype(str)
+        if simplify_tolerance and (streets.crs is None or streets.crs.is_geographic):
+            streets = streets.to_crs("EPSG:32633")
+        layer = to_web_layer(streets, ['street_index', 'highway', 'name'], simplify_tolerance, precision)
+        add_geojson_layer(
+            feature_group, layer,
+            style={'color': 'gray', 'weight': 2, 'opacity': 0.6},
+            tooltip_fields=['street_index', 'highway', 'name'],
+            tooltip_aliases=['Street', 'Type', 'Name'],
+        )
+    
+    def _add_main_pipes_to_map(self, feature_group, pipes, label, color, precision):
+        if pipes is None or len(pipes) == 0:
+            return
+        columns = ['street_name', 'length_m', 'temperature_c']
+        layer = to_web_layer(segments_to_gdf(pipes[columns + ['start_x', 'start_y', 'end_x', 'end_y']]),
+                             columns, precision=precision)
+        layer['length_m'] = layer['length_m'].round(1)
+        layer['pipe'] = label
+        add_geojson_layer(
+            feature_group, layer,
+            style={'color': color, 'weight': 4, 'opacity': 0.8},
+            tooltip_fields=['pipe', 'street_name'],
+            tooltip_aliases=['Pipe', 'Street'],
+            popup_fields=['pipe', 'street_name', 'length_m', 'temperature_c'],
+            popup_aliases=['Pipe', 'Street', 'Length (m)', 'Temperature (°C)'],
+        )
     
-    def _add_supply_pipes_to_map(self, feature_group, transformer):
+    def _add_supply_pipes_to_map(self, feature_group, precision=DEFAULT_PRECISION):
         """Add supply pipes to map."""
-        for _, pipe in self.supply_pipes.iterrows():
-            # Handle both tuple and Point objects
-            if isinstance(pipe['start_node'], tuple):
-                start_x, start_y = pipe['start_node']
-            else:
-                start_x, start_y = pipe['start_node'].x, pipe['start_node'].y
-                
-            if isinstance(pipe['end_node'], tuple):
-                end_x, end_y = pipe['end_node']
-            else:
-                end_x, end_y = pipe['end_node'].x, pipe['end_node'].y
-                
-            start_lon, start_lat = transformer.transform(start_x, start_y)
-            end_lon, end_lat = transformer.transform(end_x, end_y)
-            
-            folium.PolyLine(
-                locations=[[start_lat, start_lon], [end_lat, end_lon]],
-                color='red',
-                weight=4,
-                opacity=0.8,
-                popup=f"Supply Pipe<br>Street: {pipe['street_name']}<br>Length: {pipe['length_m']:.1f}m<br>Temperature: {pipe['temperature_c']}°C<br>Follows Street: ✅",
-                tooltip=f"Supply - {pipe['street_name']}"
-            ).add_to(feature_group)
+        self._add_main_pipes_to_map(feature_group, self.supply_pipes, 'Supply Pipe', 'red', precision)
     
-    def _add_return_pipes_to_map(self, feature_group, transformer):
+    def _add_return_pipes_to_map(self, feature_group, precision=DEFAULT_PRECISION):
         """Add return pipes to map."""
-        for _, pipe in self.return_pipes.iterrows():
-            # Handle both tuple and Point objects
-            if isinstance(pipe['start_node'], tuple):
-                start_x, start_y = pipe['start_node']
-            else:
-                start_x, start_y = pipe['start_node'].x, pipe['start_node'].y
-                
-            if isinstance(pipe['end_node'], tuple):
-                end_x, end_y = pipe['end_node']
-            else:
-                end_x, end_y = pipe['end_node'].x, pipe['end_node'].y
-                
-            start_lon, start_lat = transformer.transform(start_x, start_y)
-            end_lon, end_lat = transformer.transform(end_x, end_y)
-            
-            folium.PolyLine(
-                locations=[[start_lat, start_lon], [end_lat, end_lon]],
-                color='blue',
-                weight=4,
-                opacity=0.8,
-                popup=f"Return Pipe<br>Street: {pipe['street_name']}<br>Length: {pipe['length_m']:.1f}m<br>Temperature: {pipe['temperature_c']}°C<br>Follows Street: ✅",
-                tooltip=f"Return - {pipe['street_name']}"
-            ).add_to(feature_group)
+        self._add_main_pipes_to_map(feature_group, self.return_pipes, 'Return Pipe', 'blue', precision)
     
-    def _add_dual_service_connections_to_map(self, feature_group, transformer):
+    def _add_dual_service_connections_to_map(self, feature_group, precision=DEFAULT_PRECISION):
         """Add dual service connections to map."""
-        for _, conn in self.dual_service_connections.iterrows():
-            # Transform coordinates
-            conn_lon, conn_lat = transformer.transform(conn['connection_x'], conn['connection_y'])
-            building_lon, building_lat = transformer.transform(conn['building_x'], conn['building_y'])
-            
+        connections = self.dual_service_connections
+        if connections is None or len(connections) == 0:
+            return
+        columns = ['pipe_type', 'building_id', 'distance_to_street', 'temperature_c', 'flow_direction']
+        gdf = segments_to_gdf(connections[columns + ['connection_x', 'connection_y', 'building_x', 'building_y']],
+                              x0='connection_x', y0='connection_y', x1='building_x', y1='building_y')
+        gdf['pipe'] = gdf['pipe_type'].str.replace('_', ' ').str.title()
+        gdf['distance_to_street'] = gdf['distance_to_street'].round(1)
+        layer = to_web_layer(gdf, ['pipe'] + columns, precision=precision)
+        
+        def style(props):
             # Color based on pipe type
-            if conn['pipe_type'] == 'supply_service':
-                color = 'orange'
-                weight = 3
-                dash_array = '5, 5'
-            else:  # return_service
-                color = 'purple'
-                weight = 3
-                dash_array = '10, 5'
-            
-            # Service pipe (following street network)
-            folium.PolyLine(
-                locations=[[conn_lat, conn_lon], [building_lat, building_lon]],
-                color=color,
-                weight=weight,
-                opacity=0.8,
-                dash_array=dash_array,
-                popup=f"{conn['pipe_type'].replace('_', ' ').title()}<br>Building: {conn['building_id']}<br>Length: {conn['distance_to_street']:.1f}m<br>Temperature: {conn['temperature_c']}°C<br>Flow: {conn['flow_direction']}<br>Follows Street: ✅",
-                tooltip=f"{conn['pipe_type'].replace('_', ' ').title()} - {conn['distance_to_street']:.1f}m"
-            ).add_to(feature_group)
+            if props['pipe_type'] == 'supply_service':
+                return {'color': 'orange', 'weight': 3, 'opacity': 0.8, 'dashArray': '5, 5'}
+            return {'color': 'purple', 'weight': 3, 'opacity': 0.8, 'dashArray': '10, 5'}
+        
+        add_geojson_layer(
+            feature_group, layer, style,
+            tooltip_fields=['pipe', 'distance_to_street'],
+            tooltip_aliases=['Pipe', 'Length (m)'],
+            popup_fields=['pipe', 'building_id', 'distance_to_street', 'temperature_c', 'flow_direction'],
+            popup_aliases=['Pipe', 'Building', 'Length (m)', 'Temperature (°C)', 'Flow'],
+        )
     
-    def _add_buildings_to_map(self, feature_group, transformer):
-        """Add buildings to map."""
-        for idx, building in self.buildings_gdf.iterrows():
-            centroid = building.geometry.centroid
-            heat_demand = building.get('heating_load_kw', 'N/A')
-            
-            # Color buildings based on heat demand
-            if isinstance(heat_demand, (int, float)):
-                if heat_demand > 5:
-                    color = 'red'
-                elif heat_demand > 2:
-                    color = 'orange'
-                else:
-                    color = 'blue'
-                radius = min(max(heat_demand * 2, 5), 15)
-            else:
-                color = 'blue'
-                radius = 8
-            
-            folium.CircleMarker(
-                location=[centroid.y, centroid.x],
-                radius=radius,
-                color=color,
-                fill=True,
-                fillColor=color,
-                fillOpacity=0.7,
-                popup=f"Building {idx}<br>Heat Demand: {heat_demand} kW<br>Coordinates: {centroid.y:.6f}, {centroid.x:.6f}",
-                tooltip=f"Building {idx} - {heat_demand} kW"
-            ).add_to(feature_group)
+    def _add_buildings_to_map(self, feature_group, precision=DEFAULT_PRECISION):
+        """Add buildings to map (clustered circle markers)."""
+        buildings = self.buildings_gdf
+        if buildings.crs is not None and buildings.crs != "EPSG:4326":
+            buildings = buildings.to_crs("EPSG:4326")
+        centroids = buildings.geometry.centroid
+        if 'heating_load_kw' in buildings.columns:
+            heat_demand = pd.to_numeric(buildings['heating_load_kw'], errors='coerce').to_numpy()
+        else:
+            heat_demand = np.full(len(buildings), np.nan)
+        known = ~np.isnan(heat_demand)
+        
+        # Color buildings based on heat demand
+        colors = np.where(known & (heat_demand > 5), 'red', np.where(known & (heat_demand > 2), 'orange', 'blue'))
+        radii = np.where(known, np.clip(np.nan_to_num(heat_demand) * 2, 5, 15), 8)
+        tooltips = [
+            f"Building {idx} - {kw:.1f} kW" if ok else f"Building {idx} - N/A kW"
+            for idx, kw, ok in zip(buildings.index, heat_demand, known)
+        ]
+        add_circle_cluster(feature_group, centroids.y.to_numpy(), centroids.x.to_numpy(), colors, radii,
+                           tooltips, precision if precision is not None else DEFAULT_PRECISION)
     
+
     def _add_plant_to_map(self, feature_group):
         """Add plant to map."""
-        plant_lat, plant_lon = 51.76274, 14.3453979
+        plant_lat, plant_lon = self.plant_location.y, self.plant_location.x
         
         folium.Marker(
             location=[plant_lat, plant_lon],
-            popup="CHP Plant<br>District Heating Source<br>Supply Temperature: 70°C<br>Return Temperature: 40°C<br>Coordinates: 51.76274, 14.3453979",
+            popup=f"CHP Plant<br>District Heating Source<br>Supply Temperature: {self.supply_temperature_c}°C<br>Return Temperature: {self.return_temperature_c}°C<br>Coordinates: {plant_lat:.6f}, {plant_lon:.6f}",
             tooltip="CHP Plant",
             icon=folium.Icon(color='green', icon='industry', prefix='fa')
         ).add_to(feature_group)
@@ -953,8 +1056,8 @@ class ImprovedDualPipeDHNetwork:
         <div style="background-color: #d4edda; padding: 15px; border-radius: 8px; margin: 10px 0;">
         <h4>✅ COMPLETE District Heating System</h4>
         <ul>
-        <li>✅ Supply network (70°C)</li>
-        <li>✅ Return network (40°C)</li>
+        <li>✅ Supply network ({stats['supply_temperature_c']}°C)</li>
+        <li>✅ Return network ({stats['return_temperature_c']}°C)</li>
         <li>✅ Dual service connections</li>
         <li>✅ Closed-loop system</li>
         <li>✅ ALL connections follow streets</li>
@@ -1060,8 +1163,8 @@ class ImprovedDualPipeDHNetwork:
             'all_connections_follow_streets': True,
             'no_direct_connections': True,
             'engineering_compliant': True,
-            'supply_temperature_c': 70,
-            'return_temperature_c': 40
+            'supply_temperature_c': self.supply_temperature_c,
+            'return_temperature_c': self.return_temperature_c
         }
         
         results_file = self.results_dir / f"dual_{scenario_name}_results.json"
@@ -1071,6 +1174,19 @@ class ImprovedDualPipeDHNetwork:
         print(f"✅ Results saved to {self.results_dir}")
         return True
     
+    def export_vector_layers(self, scenario_name="complete_dual_pipe_dh", fmt="fgb", output_dir=None):
+        """
+        Export pipes, service connections, buildings and streets as FlatGeobuf
+        (with a streaming viewer.html) or MBTiles for large-area maps.
+        Returns the list of written files.
+        """
+        print(f"🧱 Exporting vector layers ({fmt})...")
+        output_dir = output_dir or self.results_dir / f"vector_{scenario_name}"
+        buildings = self.buildings_gdf.drop(columns=[c for c in ('adressen', 'gebaeude') if c in self.buildings_gdf.columns])
+        layers = dh_layers(self.supply_pipes, self.return_pipes, self.dual_service_connections,
+                           buildings=buildings, streets=self.streets_gdf)
+        return export_layers(layers, output_dir, fmt, title=f"DH network {scenario_name}", name=scenario_name)
+    
     def create_complete_dual_pipe_network(self, scenario_name="complete_dual_pipe_dh"):
         """Create complete dual-pipe district heating network."""
         print("🏗️ Creating complete dual-pipe district heating network...")
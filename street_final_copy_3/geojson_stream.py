@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Streaming GeoJSON Feature Reader
+
+Reads the features of a (large) FeatureCollection one at a time instead of
+json.load-ing the whole file, so memory stays flat however large the
+building layer gets:
+- if a GeoJSONSeq sidecar (<file>.geojsonl, one feature per line) exists
+  and is newer than the source, it is read line by line and lines that
+  cannot match the requested streets are skipped before parsing,
+- otherwise ijson is used when installed,
+- otherwise a small incremental parser built on json.JSONDecoder.raw_decode
+  walks the "features" array chunk by chunk.
+The sidecar also gets a street index (<file>.streets.json), so listing the
+street names does not need to parse any features.
+
+Usage:
+    python geojson_stream.py --build data/geojson/hausumringe_mit_adressenV3.geojson
+"""
+
+import argparse
+import json
+import os
+import re
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+SIDECAR_SUFFIX = ".geojsonl"
+STREET_INDEX_SUFFIX = ".streets.json"
+CHUNK_SIZE = 1 << 16
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def sidecar_path(path):
+    return str(path) + SIDECAR_SUFFIX
+
+
+def street_index_path(path):
+    return str(path) + STREET_INDEX_SUFFIX
+
+
+def _is_fresh(derived, source):
+    return os.path.exists(derived) and os.path.getmtime(derived) >= os.path.getmtime(source)
+
+
+def feature_streets(feature):
+    """Street names (stripped, original case) of a building feature's address list."""
+    adressen = feature.get("adressen")
+    if adressen is None:
+        adressen = (feature.get("properties") or {}).get("adressen", [])
+    if isinstance(adressen, str):
+        try:
+            adressen = json.loads(adressen)
+        except json.JSONDecodeError:
+            return []
+    streets = []
+    for adr in adressen or []:
+        street_val = adr.get("str") if isinstance(adr, dict) else None
+        if street_val:
+            streets.append(street_val.strip())
+    return streets
+
+
+def _iter_raw_features(f, chunk_size=CHUNK_SIZE):
+    """Incrementally decode the items of the top-level "features" array."""
+    decoder = json.JSONDecoder()
+    buf = ""
+    # Skip the header up to the opening bracket of the features array
+    while True:
+        key = buf.find('"features"')
+        bracket = buf.find("[", key) if key >= 0 else -1
+        if bracket >= 0:
+            buf = buf[bracket + 1:]
+            break
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        buf += chunk
+
+    pos = 0
+    read_size = chunk_size
+    while True:
+        pos = _SEPARATORS.match(buf, pos).end()
+        if pos >= len(buf):
+            chunk = f.read(read_size)
+            if not chunk:
+                return
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            feature, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Feature is cut off at the end of the buffer: read more (growing, to stay linear)
+            chunk = f.read(read_size)
+            if not chunk:
+                raise
+            buf, pos = buf[pos:] + chunk, 0
+            read_size *= 2
+            continue
+        read_size = chunk_size
+        yield feature
+        pos = end
+
+
+def _iter_source_features(path):
+    if IJSON_AVAILABLE:
+        with open(path, "rb") as f:
+            yield from ijson.items(f, "features.item", use_float=True)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from _iter_raw_features(f)
+
+
+def iter_features(path, streets=None):
+    """
+    Yield the features of a FeatureCollection one by one.
+    streets: optional iterable of street names; only features with an
+    address on one of them are yielded (case-insensitive).
+    """
+    street_set = {s.strip().lower() for s in streets} if streets is not None else None
+
+    def matches(feature):
+        return street_set is None or any(s.lower() in street_set for s in feature_streets(feature))
+
+    sidecar = sidecar_path(path)
+    if _is_fresh(sidecar, path):
+        with open(sidecar, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                # Cheap pre-filter: the street name must appear somewhere in the line
+                if street_set is not None:
+                    lowered = line.lower()
+                    if not any(s in lowered for s in street_set):
+                        continue
+                feature = json.loads(line)
+                if matches(feature):
+                    yield feature
+        return
+
+    for feature in _iter_source_features(path):
+        if matches(feature):
+            yield feature
+
+
+def get_street_names(path):
+    """Sorted unique street names, from the street index when available."""
+    index = street_index_path(path)
+    if _is_fresh(index, path):
+        with open(index, "r", encoding="utf-8") as f:
+            return json.load(f)["streets"]
+    street_names = set()
+    for feature in iter_features(path):
+        street_names.update(feature_streets(feature))
+    return sorted(street_names)
+
+
+def get_building_ids(path, streets):
+    """Building ids (gebaeude.oi) of all buildings with an address on one of the streets."""
+    selected_ids = []
+    for feature in iter_features(path, streets):
+        oi = (feature.get("gebaeude") or {}).get("oi")
+        if oi:
+            selected_ids.append(oi)
+    return selected_ids
+
+
+def build_sidecar(path):
+    """Write the GeoJSONSeq sidecar and the street index next to the source file."""
+    sidecar = sidecar_path(path)
+    street_names = set()
+    count = 0
+    with open(sidecar + ".tmp", "w", encoding="utf-8") as out:
+        for feature in _iter_source_features(path):
+            out.write(json.dumps(feature, ensure_ascii=False, separators=(",", ":")))
+            out.write("\n")
+            street_names.update(feature_streets(feature))
+            count += 1
+    os.replace(sidecar + ".tmp", sidecar)
+    with open(street_index_path(path), "w", encoding="utf-8") as f:
+        json.dump({"source": os.path.basename(str(path)), "features": count,
+                   "streets": sorted(street_names)}, f, ensure_ascii=False, indent=2)
+    return sidecar, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming access to large GeoJSON building layers.")
+    parser.add_argument("geojson", help="FeatureCollection GeoJSON file")
+    parser.add_argument("--build", action="store_true", help="Build the GeoJSONSeq sidecar and street index")
+    parser.add_argument("--street", help="Print the building ids on this street")
+    args = parser.parse_args()
+
+    if args.build:
+        sidecar, count = build_sidecar(args.geojson)
+        print(f"✅ Wrote {count} features to {sidecar}")
+    if args.street:
+        for bid in get_building_ids(args.geojson, [args.street]):
+            print(bid)
+    elif not args.build:
+        streets = get_street_names(args.geojson)
+        print(f"Found {len(streets)} unique streets.")
+
+
+if __name__ == "__main__":
+    main()
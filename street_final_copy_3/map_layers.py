@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Bulk Folium Map Layers
+
+Helpers for putting whole GeoDataFrames on a folium map as one layer each
+instead of one PolyLine / CircleMarker object per feature:
+- geometries are reprojected with a single to_crs call,
+- lines can be simplified (tolerance in meters, applied before
+  reprojection) and coordinates rounded to a fixed number of decimals,
+  which keeps the embedded GeoJSON small,
+- each group becomes one folium.GeoJson with a style function reading the
+  per-feature properties,
+- point layers (buildings) are drawn through a FastMarkerCluster, so the
+  HTML holds one data array rather than one JS object per marker.
+"""
+
+import numpy as np
+import geopandas as gpd
+import folium
+from folium.plugins import FastMarkerCluster
+from shapely.geometry import LineString
+
+try:
+    import shapely
+    SHAPELY2_AVAILABLE = hasattr(shapely, "linestrings")
+except ImportError:
+    SHAPELY2_AVAILABLE = False
+
+WGS84 = "EPSG:4326"
+DEFAULT_PRECISION = 6  # decimals in degrees, ~0.1 m
+
+# Circle markers drawn client-side from rows [lat, lon, color, radius, tooltip]
+_CIRCLE_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: row[3], color: row[2], fillColor: row[2], fill: true, fillOpacity: 0.7, weight: 1
+    });
+    if (row[4]) { marker.bindTooltip(row[4]); }
+    return marker;
+};
+"""
+
+
+def segments_to_gdf(df, x0="start_x", y0="start_y", x1="end_x", y1="end_y", crs="EPSG:32633"):
+    """Two-point LineStrings from the coordinate columns of a segment table."""
+    coords = np.stack([
+        df[[x0, y0]].to_numpy(dtype=float),
+        df[[x1, y1]].to_numpy(dtype=float),
+    ], axis=1)
+    if SHAPELY2_AVAILABLE:
+        geometry = shapely.linestrings(coords)
+    else:
+        geometry = [LineString(segment) for segment in coords]
+    return gpd.GeoDataFrame(df.reset_index(drop=True), geometry=geometry, crs=crs)
+
+
+def round_coordinates(gdf, precision=DEFAULT_PRECISION):
+    """Round all coordinates to `precision` decimals."""
+    gdf = gdf.copy()
+    if SHAPELY2_AVAILABLE:
+        gdf.geometry = shapely.transform(gdf.geometry.to_numpy(), lambda c: np.round(c, precision))
+    else:
+        from shapely.ops import transform
+        gdf.geometry = gdf.geometry.apply(
+            lambda g: transform(lambda x, y, z=None: (np.round(x, precision), np.round(y, precision)), g))
+    return gdf
+
+
+def to_web_layer(gdf, columns=(), simplify_tolerance=None, precision=DEFAULT_PRECISION):
+    """
+    Prepare a GeoDataFrame for folium: keep only `columns` (the properties
+    used for styling and tooltips), optionally simplify (meters, in the
+    projected source CRS), reproject to WGS84 once and round coordinates.
+    """
+    gdf = gdf[list(columns) + [gdf.geometry.name]].copy()
+    for col in columns:
+        # Categoricals, tuples etc. are not JSON serializable
+        if gdf[col].dtype == object or str(gdf[col].dtype) == "category":
+            gdf[col] = gdf[col].astype(str)
+    if simplify_tolerance and gdf.crs is not None and not gdf.crs.is_geographic:
+        gdf.geometry = gdf.geometry.simplify(simplify_tolerance, preserve_topology=False)
+    if gdf.crs is not None and gdf.crs != WGS84:
+        gdf = gdf.to_crs(WGS84)
+    if precision is not None:
+        gdf = round_coordinates(gdf, precision)
+    return gdf
+
+
+def add_geojson_layer(feature_group, gdf, style, tooltip_fields=(), tooltip_aliases=None,
+                      popup_fields=(), popup_aliases=None, name=None, marker=None):
+    """
+    Add a prepared (WGS84) GeoDataFrame as one folium.GeoJson layer.
+    style: dict of Leaflet path options, or a function properties -> dict.
+    marker: folium marker template for point features (e.g. folium.CircleMarker()).
+    """
+    if gdf.empty:
+        return None
+    style_function = (lambda feature: style(feature["properties"])) if callable(style) else (lambda feature: style)
+    layer = folium.GeoJson(
+        gdf,
+        name=name,
+        style_function=style_function,
+        tooltip=folium.GeoJsonTooltip(fields=list(tooltip_fields), aliases=tooltip_aliases) if tooltip_fields else None,
+        popup=folium.GeoJsonPopup(fields=list(popup_fields), aliases=popup_aliases) if popup_fields else None,
+        marker=marker,
+        embed=True,
+    )
+    layer.add_to(feature_group)
+    return layer
+
+
+def add_circle_cluster(feature_group, lat, lon, colors, radii, tooltips=None, precision=DEFAULT_PRECISION):
+    """Add many circle markers as one FastMarkerCluster."""
+    lat = np.round(np.asarray(lat, dtype=float), precision)
+    lon = np.round(np.asarray(lon, dtype=float), precision)
+    if tooltips is None:
+        tooltips = [""] * len(lat)
+    data = [
+        [float(la), float(lo), str(c), float(r), str(t)]
+        for la, lo, c, r, t in zip(lat, lon, colors, radii, tooltips)
+    ]
+    if not data:
+        return None
+    cluster = FastMarkerCluster(data, callback=_CIRCLE_CALLBACK,
+                                options={"disableClusteringAtZoom": 18, "chunkedLoading": True})
+    cluster.add_to(feature_group)
+    return cluster
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Columnar Pipe-Segment Table
+
+Main pipes of the dual-pipe DH network are stored once per unique street
+segment instead of once per (segment, building served):
+- nodes are interned to integer ids with a coordinate array,
+- segments are parallel arrays (start/end node id, length, street id and
+  categorical street name / highway type codes),
+- the segments on each building's route are kept in a CSR-style mapping
+  (indptr/indices), ordered from the plant to the building.
+
+Memory and build time therefore scale with the number of unique segments;
+the per-building routes only cost one integer per hop.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class _Categories:
+    """Value <-> integer code interning for a categorical column."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, codes):
+        values = np.empty(len(self.values), dtype=object)
+        values[:] = self.values
+        return values[codes]
+
+
+class PipeSegmentTable:
+    """Unique main-pipe segments with a CSR building -> segments mapping."""
+
+    def __init__(self, node_coords=None):
+        # With node_coords given, routes are paths of integer node ids into it
+        self._graph_coords = None if node_coords is None else np.asarray(node_coords, dtype=np.float64)
+        self._node_ids = {}
+        self._node_coords = []
+        self._segment_ids = {}
+        self._start, self._end, self._length = [], [], []
+        self._street_id, self._street_name, self._highway = [], [], []
+        self._first_building = []
+        self._street_ids = _Categories()
+        self._street_names = _Categories()
+        self._highway_types = _Categories()
+        self._buildings = []
+        self._building_pos = {}
+        self._indptr = [0]
+        self._indices = []
+        self._frozen = None
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+    def node_id(self, node):
+        """Integer id of a node given as an (x, y) tuple (or already as a graph node id)."""
+        if self._graph_coords is not None:
+            return int(node)
+        nid = self._node_ids.get(node)
+        if nid is None:
+            nid = len(self._node_coords)
+            self._node_ids[node] = nid
+            self._node_coords.append(node)
+        return nid
+
+    def add_route(self, building_id, path, edge_data):
+        """
+        Register the route plant -> building given as a node path.
+        edge_data(u, v) returns the street graph edge attributes.
+        Returns the route length in meters.
+        """
+        self._frozen = None
+        node_ids = [self.node_id(node) for node in path]
+        route_length = 0.0
+        for k in range(len(path) - 1):
+            key = (node_ids[k], node_ids[k + 1])
+            seg = self._segment_ids.get(key)
+            if seg is None:
+                data = edge_data(path[k], path[k + 1])
+                seg = len(self._start)
+                self._segment_ids[key] = seg
+                self._start.append(key[0])
+                self._end.append(key[1])
+                self._length.append(float(data['weight']))
+                self._street_id.append(self._street_ids.code(data['street_id']))
+                self._street_name.append(self._street_names.code(data['street_name']))
+                self._highway.append(self._highway_types.code(data['highway_type']))
+                self._first_building.append(len(self._buildings))
+            self._indices.append(seg)
+            route_length += self._length[seg]
+        self._building_pos[building_id] = len(self._buildings)
+        self._buildings.append(building_id)
+        self._indptr.append(len(self._indices))
+        return route_length
+
+    def _arrays(self):
+        if self._frozen is None:
+            self._frozen = {
+                'node_coords': (self._graph_coords if self._graph_coords is not None
+                                else np.asarray(self._node_coords, dtype=np.float64).reshape(-1, 2)),
+                'start': np.asarray(self._start, dtype=np.int64),
+                'end': np.asarray(self._end, dtype=np.int64),
+                'length_m': np.asarray(self._length, dtype=np.float64),
+                'street_id': np.asarray(self._street_id, dtype=np.int32),
+                'street_name': np.asarray(self._street_name, dtype=np.int32),
+                'highway_type': np.asarray(self._highway, dtype=np.int32),
+                'first_building': np.asarray(self._first_building, dtype=np.int64),
+                'indptr': np.asarray(self._indptr, dtype=np.int64),
+                'indices': np.asarray(self._indices, dtype=np.int64),
+            }
+        return self._frozen
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return len(self._start)
+
+    @property
+    def node_coords(self):
+        return self._arrays()['node_coords']
+
+    @property
+    def length_m(self):
+        return self._arrays()['length_m']
+
+    @property
+    def buildings(self):
+        return list(self._buildings)
+
+    @property
+    def total_length_m(self):
+        """Length of the unique segments (one pipe per segment)."""
+        return float(self.length_m.sum())
+
+    @property
+    def routed_length_m(self):
+        """Sum of all route lengths, i.e. trunk segments counted once per building served."""
+        arrays = self._arrays()
+        return float(arrays['length_m'][arrays['indices']].sum())
+
+    def building_segments(self, building_id):
+        """Segment indices on the route to a building, ordered plant -> building."""
+        pos = self._building_pos.get(building_id)
+        if pos is None:
+            return np.empty(0, dtype=np.int64)
+        arrays = self._arrays()
+        return arrays['indices'][arrays['indptr'][pos]:arrays['indptr'][pos + 1]]
+
+    def registered_mask(self, building_ids):
+        """Boolean array: which buildings have a route, including empty ones (connection at the plant)."""
+        return np.array([building_id in self._building_pos for building_id in building_ids], dtype=bool)
+
+    def routed_mask(self, building_ids):
+        """Boolean array: which buildings have a non-empty route."""
+        indptr = self._arrays()['indptr']
+        counts = np.diff(indptr)
+        return np.array([
+            building_id in self._building_pos and counts[self._building_pos[building_id]] > 0
+            for building_id in building_ids
+        ], dtype=bool)
+
+    def parent_segments(self):
+        """
+        Upstream segment of every segment (the one before it on any route
+        through it), -1 for segments leaving the plant. Routes taken from a
+        shortest-path or Steiner tree make this a tree over the segments;
+        raises ValueError if a segment has different predecessors on
+        different routes.
+        """
+        arrays = self._arrays()
+        indices, indptr = arrays['indices'], arrays['indptr']
+        follows = np.ones(len(indices), dtype=bool)
+        follows[indptr[:-1][indptr[:-1] < len(indices)]] = False
+        predecessor = np.full(len(indices), -1, dtype=np.int64)
+        positions = np.flatnonzero(follows)
+        predecessor[positions] = indices[positions - 1]
+        lowest = np.full(len(self), len(self), dtype=np.int64)
+        highest = np.full(len(self), -1, dtype=np.int64)
+        np.minimum.at(lowest, indices, predecessor)
+        np.maximum.at(highest, indices, predecessor)
+        conflicts = np.flatnonzero(lowest != highest)
+        if len(conflicts):
+            raise ValueError(f"routes do not form a tree: {len(conflicts)} segments have more than one "
+                             f"predecessor (e.g. segment {int(conflicts[0])})")
+        return highest
+
+    def terminal_segments(self, building_ids):
+        """Last segment on the route to each building (-1 if it has no route)."""
+        arrays = self._arrays()
+        indptr, indices = arrays['indptr'], arrays['indices']
+        terminals = np.full(len(building_ids), -1, dtype=np.int64)
+        for i, building_id in enumerate(building_ids):
+            pos = self._building_pos.get(building_id)
+            if pos is not None and indptr[pos + 1] > indptr[pos]:
+                terminals[i] = indices[indptr[pos + 1] - 1]
+        return terminals
+
+    def to_frame(self, pipe_type='supply', temperature_c=70, flow_direction='plant_to_building'):
+        """
+        One row per unique segment in the layout of the previous per-building
+        dict lists. Return pipes ('return') run in the opposite direction.
+        """
+        arrays = self._arrays()
+        coords = arrays['node_coords']
+        start, end = arrays['start'], arrays['end']
+        if pipe_type == 'return':
+            start, end = end, start
+        buildings = np.empty(len(self._buildings), dtype=object)
+        buildings[:] = self._buildings
+        return pd.DataFrame({
+            'start_node': [tuple(xy) for xy in coords[start].tolist()],
+            'end_node': [tuple(xy) for xy in coords[end].tolist()],
+            'start_node_id': start,
+            'end_node_id': end,
+            'start_x': coords[start, 0],
+            'start_y': coords[start, 1],
+            'end_x': coords[end, 0],
+            'end_y': coords[end, 1],
+            'length_m': arrays['length_m'],
+            'street_id': self._street_ids.decode(arrays['street_id']),
+            'street_name': pd.Categorical(self._street_names.decode(arrays['street_name'])),
+            'highway_type': pd.Categorical(self._highway_types.decode(arrays['highway_type'])),
+            'pipe_type': pipe_type,
+            'building_served': buildings[arrays['first_building']],
+            'temperature_c': temperature_c,
+            'flow_direction': flow_direction,
+            'follows_street': True,
+        })
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+DH Plant Siting
+
+Scores candidate plant nodes on the street graph instead of assuming the
+fixed CHP location:
+1. demand-weighted path length: sum over buildings of peak heat demand times
+   street distance to the candidate. Dijkstra runs from the (few hundred)
+   building nodes rather than from every candidate, so all street nodes are
+   scored with one multi-source pass over the CSR graph;
+2. peak pressure drop: for the best-ranked candidates the shortest-path tree
+   is built, mass flows are accumulated up the tree, pipes are sized to a
+   maximum velocity and the Darcy-Weisbach drop to the farthest building is
+   taken (supply + return).
+The two metrics are normalized and combined into one score.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy.sparse.csgraph import dijkstra
+
+# Hydraulic assumptions (70/40 °C network, see simulate_dual_pipe_dh_network_final.py)
+WATER_DENSITY = 977.8  # kg/m³ at ~70 °C
+WATER_CP = 4.186  # kJ/(kg·K)
+DELTA_T = 30.0  # K (70 °C supply, 40 °C return)
+ROUGHNESS_M = 0.1e-3  # k = 0.1 mm
+MAX_VELOCITY = 1.5  # m/s
+PIPE_DIAMETERS_M = np.array([0.025, 0.032, 0.040, 0.050, 0.065, 0.080, 0.100, 0.125,
+                             0.150, 0.200, 0.250, 0.300, 0.350, 0.400, 0.500])
+KINEMATIC_VISCOSITY = 0.413e-6  # m²/s at ~70 °C
+
+
+def heat_to_mass_flow(heat_kw, delta_t=DELTA_T):
+    """Mass flow in kg/s for a heat load in kW."""
+    return np.asarray(heat_kw, dtype=float) / (WATER_CP * delta_t)
+
+
+def demand_weighted_distance(csr, demand_nodes, demand_kw, candidates=None, chunk_size=64):
+    """
+    Sum of demand_kw * shortest street distance (m) from each candidate to
+    every demand node. Dijkstra is run from the demand nodes in chunks, so
+    the cost is independent of the number of candidates.
+    Unreachable candidates get inf.
+    """
+    demand_nodes = np.asarray(demand_nodes, dtype=np.int64)
+    demand_kw = np.asarray(demand_kw, dtype=float)
+    n = csr.shape[0]
+    candidates = np.arange(n) if candidates is None else np.asarray(candidates, dtype=np.int64)
+    score = np.zeros(len(candidates))
+    for start in range(0, len(demand_nodes), chunk_size):
+        dist = dijkstra(csr, directed=False, indices=demand_nodes[start:start + chunk_size])
+        score += demand_kw[start:start + chunk_size] @ dist[:, candidates]
+    return score
+
+
+def _friction_factor(velocity, diameter):
+    """Swamee-Jain approximation of the Darcy friction factor."""
+    reynolds = np.maximum(velocity * diameter / KINEMATIC_VISCOSITY, 1.0)
+    laminar = 64.0 / reynolds
+    turbulent = 0.25 / np.log10(ROUGHNESS_M / (3.7 * diameter) + 5.74 / reynolds ** 0.9) ** 2
+    return np.where(reynolds < 2300, laminar, turbulent)
+
+
+def size_pipes(mass_flow, max_velocity=MAX_VELOCITY):
+    """Smallest standard diameter keeping the velocity below max_velocity."""
+    volume_flow = np.asarray(mass_flow, dtype=float) / WATER_DENSITY
+    required = np.sqrt(4 * volume_flow / (np.pi * max_velocity))
+    idx = np.minimum(np.searchsorted(PIPE_DIAMETERS_M, required), len(PIPE_DIAMETERS_M) - 1)
+    return PIPE_DIAMETERS_M[idx]
+
+
+def tree_pressure_drop(csr, source, demand_nodes, demand_kw, max_velocity=MAX_VELOCITY):
+    """
+    Estimate the loop pressure drop (bar, supply + return) to the hydraulically
+    worst building when the plant sits at `source` and every building is fed
+    along its shortest path.
+    """
+    dist, pred = dijkstra(csr, directed=False, indices=int(source), return_predecessors=True)
+    demand_nodes = np.asarray(demand_nodes, dtype=np.int64)
+    reachable = np.isfinite(dist[demand_nodes])
+    if not reachable.any():
+        return {"peak_pressure_drop_bar": np.inf, "plant_mass_flow_kg_s": 0.0, "max_diameter_m": np.nan}
+
+    # Accumulate mass flows from the leaves towards the plant (decreasing distance)
+    flow = np.zeros(len(dist))
+    np.add.at(flow, demand_nodes[reachable], heat_to_mass_flow(np.asarray(demand_kw, dtype=float)[reachable]))
+    order = np.argsort(dist)
+    order = order[np.isfinite(dist[order])]
+    for node in order[::-1]:
+        parent = pred[node]
+        if parent >= 0:
+            flow[parent] += flow[node]
+
+    # Pressure drop of the pipe into every node (edge length = distance difference in the tree)
+    in_tree = pred >= 0
+    length = np.zeros(len(dist))
+    length[in_tree] = dist[in_tree] - dist[pred[in_tree]]
+    diameter = np.full(len(dist), np.nan)
+    diameter[in_tree] = size_pipes(flow[in_tree], max_velocity)
+    dp = np.zeros(len(dist))
+    velocity = flow[in_tree] / WATER_DENSITY / (np.pi * diameter[in_tree] ** 2 / 4)
+    dp[in_tree] = (_friction_factor(velocity, diameter[in_tree]) * length[in_tree] / diameter[in_tree]
+                   * WATER_DENSITY * velocity ** 2 / 2)
+
+    # Cumulative drop from the plant (increasing distance)
+    cumulative = np.zeros(len(dist))
+    for node in order:
+        parent = pred[node]
+        if parent >= 0:
+            cumulative[node] = cumulative[parent] + dp[node]
+
+    return {
+        "peak_pressure_drop_bar": float(2 * cumulative[demand_nodes[reachable]].max() / 1e5),
+        "plant_mass_flow_kg_s": float(flow[int(source)]),
+        "max_diameter_m": float(np.nanmax(diameter[in_tree & (flow > 0)])) if np.any(in_tree & (flow > 0)) else np.nan,
+    }
+
+
+def rank_plant_sites(csr, coords, demand_nodes, demand_kw, candidates=None, top_k=50,
+                     distance_weight=0.5, pressure_weight=0.5):
+    """
+    Rank candidate plant nodes.
+    Args:
+        csr: symmetric street adjacency matrix (edge lengths in m).
+        coords: (N, 2) node coordinates.
+        demand_nodes / demand_kw: street node and peak heat demand per building.
+        candidates: node ids to evaluate (default: all nodes).
+        top_k: number of best candidates (by weighted distance) for the pressure-drop pass.
+    Returns:
+        DataFrame sorted by score (lower is better).
+    """
+    candidates = np.arange(csr.shape[0]) if candidates is None else np.unique(np.asarray(candidates, dtype=np.int64))
+    demand_kw = np.asarray(demand_kw, dtype=float)
+    weighted = demand_weighted_distance(csr, demand_nodes, demand_kw, candidates)
+    total_kw = demand_kw.sum() if demand_kw.sum() > 0 else 1.0
+
+    ranking = pd.DataFrame({
+        "node": candidates,
+        "x": coords[candidates, 0],
+        "y": coords[candidates, 1],
+        "demand_weighted_distance_kw_km": weighted / 1000,
+        "mean_path_length_m": weighted / total_kw,
+    })
+    ranking = ranking[np.isfinite(weighted)].sort_values("demand_weighted_distance_kw_km").reset_index(drop=True)
+
+    shortlist = ranking.head(top_k).copy()
+    hydraulics = [tree_pressure_drop(csr, node, demand_nodes, demand_kw) for node in shortlist["node"]]
+    for key in ("peak_pressure_drop_bar", "plant_mass_flow_kg_s", "max_diameter_m"):
+        shortlist[key] = [h[key] for h in hydraulics]
+
+    def _normalized(values):
+        values = np.asarray(values, dtype=float)
+        span = values.max() - values.min() if len(values) else 0.0
+        return (values - values.min()) / span if span > 0 else np.zeros(len(values))
+
+    shortlist["score"] = (distance_weight * _normalized(shortlist["demand_weighted_distance_kw_km"])
+                          + pressure_weight * _normalized(shortlist["peak_pressure_drop_bar"]))
+    return shortlist.sort_values("score").reset_index(drop=True)
+
+
+def main():
+    from pyproj import Transformer
+    from create_complete_dual_pipe_dh_network_improved import ImprovedDualPipeDHNetwork
+
+    parser = argparse.ArgumentParser(description="Rank candidate DH plant locations on the street network.")
+    parser.add_argument("--buildings_file", default=None, help="Buildings GeoJSON (default: all buildings)")
+    parser.add_argument("--load_profiles_file", default="../thesis-data-2/power-sim/gebaeude_lastphasenV2.json")
+    parser.add_argument("--building_demands_file", default="../thesis-data-2/power-sim/gebaeude_lastphasenV2_verbrauch.json")
+    parser.add_argument("--candidates", default=None,
+                        help="CSV with lon,lat columns of candidate sites (default: all street nodes)")
+    parser.add_argument("--top_k", type=int, default=50, help="Candidates evaluated hydraulically")
+    parser.add_argument("--output", default="simulation_outputs/plant_siting.csv")
+    args = parser.parse_args()
+
+    network = ImprovedDualPipeDHNetwork(
+        load_profiles_file=args.load_profiles_file,
+        building_demands_file=args.building_demands_file,
+        buildings_file=args.buildings_file,
+    )
+    if not (network.load_data() and network.build_connected_street_network()
+            and network.snap_buildings_to_street_network()):
+        print("❌ Could not build the street network")
+        return
+
+    candidates = None
+    if args.candidates:
+        sites = pd.read_csv(args.candidates)
+        candidates = [(row["lon"], row["lat"]) for _, row in sites.iterrows()]
+
+    ranking = network.find_plant_sites(candidates=candidates, top_k=args.top_k)
+    if ranking.empty:
+        print("❌ No candidate site reaches the buildings on the street network")
+        return
+    to_wgs84 = Transformer.from_crs("EPSG:32633", "EPSG:4326", always_xy=True)
+    ranking["lon"], ranking["lat"] = to_wgs84.transform(ranking["x"].to_numpy(), ranking["y"].to_numpy())
+    ranking.to_csv(args.output, index=False)
+
+    best = ranking.iloc[0]
+    current = network.plant_location
+    print(f"✅ Ranked {len(ranking)} candidate sites, saved to {args.output}")
+    print(f"   Best site: lon={best['lon']:.6f}, lat={best['lat']:.6f} "
+          f"(mean path {best['mean_path_length_m']:.0f} m, peak Δp {best['peak_pressure_drop_bar']:.2f} bar)")
+    print(f"   Current plant: lon={current.x:.6f}, lat={current.y:.6f}")
+
+
+if __name__ == "__main__":
+    main()
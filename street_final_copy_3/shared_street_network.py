@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Shared Whole-Region Street Network
+
+The street layer never changes between per-street DH analyses, so the
+connected street graph, the plant snap and the shortest-path (Dijkstra) tree
+from the plant are built once for the whole region and cached to disk as
+plain arrays (node coordinates, edge endpoints, lengths, street ids,
+distances and predecessors). Per-street networks are then extracted as
+subgraphs of that tree, which only needs a nearest-segment projection of the
+buildings and a walk up the predecessor array.
+"""
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import geopandas as gpd
+from pyproj import Transformer
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra
+from scipy.spatial import cKDTree
+
+try:
+    from .street_graph import StreetGraph
+except ImportError:
+    from street_graph import StreetGraph
+
+DEFAULT_STREETS_FILE = "data/geojson/strassen_mit_adressenV3.geojson"
+DEFAULT_CACHE_DIR = "cache/street_network"
+DEFAULT_PLANT_LOCATION = (14.3453979, 51.76274)  # CHP plant in Branitz (WGS84 lon, lat)
+UTM_CRS = "EPSG:32633"
+CACHE_VERSION = 1
+
+# Street ids for edges that do not belong to a street feature
+CONNECTIVITY_FIX_ID = -1
+PLANT_CONNECTION_ID = -2
+MAX_CONNECTIVITY_FIX_M = 100.0
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class SharedStreetNetwork:
+    """Whole-region street graph with the plant's shortest-path tree, stored as arrays."""
+
+    def __init__(self, coords, edge_u, edge_v, edge_length, edge_street, street_names,
+                 highway_types, plant_node, dist=None, pred=None, streets_file=None):
+        self.coords = np.asarray(coords, dtype=np.float64)
+        self.edge_u = np.asarray(edge_u, dtype=np.int64)
+        self.edge_v = np.asarray(edge_v, dtype=np.int64)
+        self.edge_length = np.asarray(edge_length, dtype=np.float64)
+        self.edge_street = np.asarray(edge_street, dtype=np.int64)
+        self.street_names = list(street_names)
+        self.highway_types = list(highway_types)
+        self.plant_node = int(plant_node)
+        self.streets_file = streets_file
+        self._streets_gdf = None
+        self._edge_lookup = None
+        self._street_graph = None
+        if dist is None or pred is None:
+            self.compute_shortest_path_tree()
+        else:
+            self.dist = np.asarray(dist, dtype=np.float64)
+            self.pred = np.asarray(pred, dtype=np.int64)
+
+    @property
+    def num_nodes(self):
+        return len(self.coords)
+
+    @property
+    def num_edges(self):
+        return len(self.edge_u)
+
+    @property
+    def streets_gdf(self):
+        """The street layer itself, read once per process on first access."""
+        if self._streets_gdf is None and self.streets_file:
+            self._streets_gdf = gpd.read_file(self.streets_file)
+        return self._streets_gdf
+
+    # ------------------------------------------------------------------ build
+    @classmethod
+    def from_streets(cls, streets_gdf, plant_location=DEFAULT_PLANT_LOCATION, streets_file=None):
+        """Build the connected graph from a street GeoDataFrame and snap the plant."""
+        if streets_gdf.crs is None or streets_gdf.crs.is_geographic:
+            streets_utm = streets_gdf.to_crs(UTM_CRS)
+        else:
+            streets_utm = streets_gdf
+
+        node_index = {}
+        coords = []
+        edges = {}
+        street_names, highway_types = [], []
+        for street_pos, (idx, street) in enumerate(streets_utm.iterrows()):
+            street_names.append(street.get('name', f'Street_{idx}'))
+            highway_types.append(street.get('highway', 'residential'))
+            line = list(street.geometry.coords)
+            ids = []
+            for xy in line:
+                xy = (float(xy[0]), float(xy[1]))
+                if xy not in node_index:
+                    node_index[xy] = len(coords)
+                    coords.append(xy)
+                ids.append(node_index[xy])
+            for a, b in zip(ids[:-1], ids[1:]):
+                if a == b:
+                    continue
+                key = (min(a, b), max(a, b))
+                if key not in edges:
+                    edges[key] = street_pos
+
+        coords = np.asarray(coords, dtype=np.float64)
+        keys = np.asarray(list(edges.keys()), dtype=np.int64).reshape(-1, 2)
+        edge_u, edge_v = keys[:, 0], keys[:, 1]
+        edge_street = np.asarray(list(edges.values()), dtype=np.int64)
+        edge_length = np.hypot(*(coords[edge_v] - coords[edge_u]).T)
+
+        edge_u, edge_v, edge_length, edge_street = cls._connect_components(
+            coords, edge_u, edge_v, edge_length, edge_street
+        )
+
+        # Snap the plant onto the nearest street segment and connect it to the closer endpoint
+        transformer = Transformer.from_crs("EPSG:4326", UTM_CRS, always_xy=True)
+        plant_xy = np.asarray(transformer.transform(*plant_location), dtype=np.float64)
+        seg, proj, distance, t = _project_onto_segments(
+            plant_xy[None, :], coords, edge_u, edge_v, edge_street >= 0
+        )
+        seg, t = seg[0], t[0]
+        attach = edge_u[seg] if t <= 0.5 else edge_v[seg]
+        plant_node = len(coords)
+        coords = np.vstack([coords, proj])
+        edge_u = np.append(edge_u, plant_node)
+        edge_v = np.append(edge_v, attach)
+        edge_length = np.append(edge_length, np.hypot(*(coords[attach] - proj[0])))
+        edge_street = np.append(edge_street, PLANT_CONNECTION_ID)
+        print(f"✅ Plant snapped to street network at distance {distance[0]:.1f}m")
+
+        return cls(coords, edge_u, edge_v, edge_length, edge_street, street_names,
+                   highway_types, plant_node, streets_file=streets_file)
+
+    @staticmethod
+    def _connect_components(coords, edge_u, edge_v, edge_length, edge_street):
+        """Link every component to the largest one if their closest nodes are < 100 m apart."""
+        n = len(coords)
+        adjacency = coo_matrix((edge_length, (edge_u, edge_v)), shape=(n, n))
+        n_comp, labels = connected_components(adjacency, directed=False)
+        if n_comp == 1:
+            print("✅ Network is fully connected")
+            return edge_u, edge_v, edge_length, edge_street
+
+        print(f"⚠️ Network has {n_comp} components - connecting them...")
+        largest = np.bincount(labels).argmax()
+        main_nodes = np.flatnonzero(labels == largest)
+        tree = cKDTree(coords[main_nodes])
+        new_u, new_v, new_len = [], [], []
+        for comp in range(n_comp):
+            if comp == largest:
+                continue
+            nodes = np.flatnonzero(labels == comp)
+            d, j = tree.query(coords[nodes])
+            k = d.argmin()
+            if d[k] < MAX_CONNECTIVITY_FIX_M:
+                new_u.append(main_nodes[j[k]])
+                new_v.append(nodes[k])
+                new_len.append(d[k])
+        print(f"   Added {len(new_u)} connectivity links")
+        return (np.append(edge_u, new_u).astype(np.int64),
+                np.append(edge_v, new_v).astype(np.int64),
+                np.append(edge_length, new_len),
+                np.append(edge_street, [CONNECTIVITY_FIX_ID] * len(new_u)).astype(np.int64))
+
+    def to_csr(self):
+        """Symmetric CSR adjacency matrix with edge lengths as weights."""
+        n = self.num_nodes
+        rows = np.concatenate([self.edge_u, self.edge_v])
+        cols = np.concatenate([self.edge_v, self.edge_u])
+        weights = np.concatenate([self.edge_length, self.edge_length])
+        return coo_matrix((weights, (rows, cols)), shape=(n, n)).tocsr()
+
+    def compute_shortest_path_tree(self):
+        """Dijkstra from the plant over the whole region."""
+        self.dist, pred = dijkstra(self.to_csr(), directed=False, indices=self.plant_node,
+                                   return_predecessors=True)
+        self.pred = pred.astype(np.int64)
+
+    # ------------------------------------------------------------------ cache
+    def save(self, cache_file):
+        cache_file = Path(cache_file)
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            cache_file,
+            coords=self.coords, edge_u=self.edge_u, edge_v=self.edge_v,
+            edge_length=self.edge_length, edge_street=self.edge_street,
+            dist=self.dist, pred=self.pred, plant_node=np.int64(self.plant_node),
+            street_names=np.asarray([str(s) for s in self.street_names]),
+            highway_types=np.asarray([str(h) for h in self.highway_types]),
+        )
+        return cache_file
+
+    @classmethod
+    def load(cls, cache_file, streets_file=None):
+        with np.load(cache_file, allow_pickle=False) as data:
+            return cls(
+                data["coords"], data["edge_u"], data["edge_v"], data["edge_length"],
+                data["edge_street"], data["street_names"].tolist(), data["highway_types"].tolist(),
+                int(data["plant_node"]), dist=data["dist"], pred=data["pred"],
+                streets_file=streets_file,
+            )
+
+    @classmethod
+    def load_or_build(cls, streets_file=DEFAULT_STREETS_FILE, plant_location=DEFAULT_PLANT_LOCATION,
+                      cache_dir=DEFAULT_CACHE_DIR):
+        """
+        Load the cached network for this street layer and plant location,
+        building and caching it on the first call.
+        """
+        key = hashlib.sha256(json.dumps({
+            "streets": file_digest(streets_file),
+            "plant": [round(float(c), 7) for c in plant_location],
+            "version": CACHE_VERSION,
+        }, sort_keys=True).encode()).hexdigest()[:16]
+        cache_file = Path(cache_dir) / f"street_network_{key}.npz"
+
+        if cache_file.exists():
+            network = cls.load(cache_file, streets_file=streets_file)
+            print(f"✅ Loaded shared street network from cache ({network.num_nodes} nodes, {network.num_edges} edges)")
+            return network
+
+        print("🛣️ Building shared whole-region street network...")
+        streets_gdf = gpd.read_file(streets_file)
+        network = cls.from_streets(streets_gdf, plant_location, streets_file=streets_file)
+        network._streets_gdf = streets_gdf
+        network.save(cache_file)
+        print(f"✅ Built shared street network with {network.num_nodes} nodes and {network.num_edges} edges, cached to {cache_file}")
+        return network
+
+    # ------------------------------------------------------------- extraction
+    def edge_index(self, a, b):
+        """Indices of the edges joining node arrays a and b."""
+        if self._edge_lookup is None:
+            n = self.num_nodes
+            ids = np.arange(1, self.num_edges + 1)
+            lookup = coo_matrix((np.concatenate([ids, ids]),
+                                 (np.concatenate([self.edge_u, self.edge_v]),
+                                  np.concatenate([self.edge_v, self.edge_u]))), shape=(n, n))
+            self._edge_lookup = lookup.tocsr()
+        return np.asarray(self._edge_lookup[np.asarray(a), np.asarray(b)]).ravel() - 1
+
+    def snap_points(self, xy):
+        """
+        Project UTM points onto the nearest street segment.
+        Returns a dict of arrays: edge, t (position along edge_u -> edge_v),
+        connection_x/y, distance_to_street, attach_node (segment end on the
+        plant side) and stub_length_m.
+        """
+        xy = np.atleast_2d(np.asarray(xy, dtype=np.float64))
+        seg, proj, distance, t = _project_onto_segments(
+            xy, self.coords, self.edge_u, self.edge_v, self.edge_street >= 0
+        )
+        u, v, length = self.edge_u[seg], self.edge_v[seg], self.edge_length[seg]
+        via_u = self.dist[u] + t * length
+        via_v = self.dist[v] + (1 - t) * length
+        use_u = via_u <= via_v
+        return {
+            "edge": seg,
+            "t": t,
+            "connection_x": proj[:, 0],
+            "connection_y": proj[:, 1],
+            "distance_to_street": distance,
+            "street_id": self.edge_street[seg],
+            "attach_node": np.where(use_u, u, v),
+            "stub_length_m": np.where(use_u, t * length, (1 - t) * length),
+            "distance_to_plant_m": np.minimum(via_u, via_v),
+        }
+
+    def extract_subnetwork(self, xy):
+        """
+        Extract the part of the plant's shortest-path tree that serves the given
+        points (UTM building centroids).
+        Returns (snapped, tree_edges) where tree_edges holds parent/child node
+        arrays plus the edge length and street id of every tree edge.
+        """
+        snapped = self.snap_points(xy)
+        visited = np.zeros(self.num_nodes, dtype=bool)
+        visited[self.plant_node] = True
+        parents, children = [], []
+        for node in np.unique(snapped["attach_node"]):
+            while not visited[node] and self.pred[node] >= 0:
+                visited[node] = True
+                parents.append(self.pred[node])
+                children.append(node)
+                node = self.pred[node]
+
+        parents = np.asarray(parents, dtype=np.int64)
+        children = np.asarray(children, dtype=np.int64)
+        edges = self.edge_index(parents, children) if len(parents) else np.zeros(0, dtype=np.int64)
+        tree_edges = {
+            "parent": parents,
+            "child": children,
+            "length_m": self.dist[children] - self.dist[parents],
+            "street_id": self.edge_street[edges],
+        }
+        return snapped, tree_edges
+
+    def _graph_from_edges(self, edge_u, edge_v, edge_length, edge_street):
+        graph = StreetGraph()
+        for u, v, length, street_id in zip(edge_u.tolist(), edge_v.tolist(), edge_length.tolist(),
+                                           edge_street.tolist()):
+            graph.add_edge(
+                graph.add_node(self.coords[u]),
+                graph.add_node(self.coords[v]),
+                weight=float(length),
+                street_id=int(street_id),
+                street_name=self.street_name(street_id),
+                highway_type=self.highway_type(street_id)
+            )
+        graph.add_node(self.coords[self.plant_node], node_type='plant', name='CHP_Plant', plant_location=True)
+        return graph
+
+    def street_graph(self):
+        """
+        StreetGraph over all region edges with the plant node, built once
+        per process (get_shared_street_network memoizes the network).
+        Callers that add nodes or split edges work on a copy().
+        """
+        if self._street_graph is None:
+            self._street_graph = self._graph_from_edges(self.edge_u, self.edge_v, self.edge_length, self.edge_street)
+        return self._street_graph
+
+    def tree_street_graph(self, tree_edges):
+        """StreetGraph of an extracted subtree (see extract_subnetwork) with the plant node."""
+        return self._graph_from_edges(np.asarray(tree_edges["parent"]), np.asarray(tree_edges["child"]),
+                                      np.asarray(tree_edges["length_m"]), np.asarray(tree_edges["street_id"]))
+
+    def street_name(self, street_id):
+        if street_id == CONNECTIVITY_FIX_ID:
+            return 'Connectivity Fix'
+        if street_id == PLANT_CONNECTION_ID:
+            return 'Plant Connection'
+        return self.street_names[street_id]
+
+    def highway_type(self, street_id):
+        if street_id < 0:
+            return 'service'
+        return self.highway_types[street_id]
+
+
+def _project_onto_segments(points, coords, edge_u, edge_v, mask=None, max_block=2_000_000):
+    """
+    Exact nearest-segment projection for a batch of points, vectorized over
+    segments and processed in blocks to bound memory.
+    Returns (segment_index, projected_xy, distance, t) with t in [0, 1] along u->v.
+    """
+    candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(edge_u))
+    a = coords[edge_u[candidates]]
+    ab = coords[edge_v[candidates]] - a
+    ab2 = (ab ** 2).sum(axis=1)
+    ab2[ab2 == 0] = 1.0
+
+    n = len(points)
+    seg = np.empty(n, dtype=np.int64)
+    proj = np.empty((n, 2), dtype=np.float64)
+    dist = np.empty(n, dtype=np.float64)
+    t_out = np.empty(n, dtype=np.float64)
+    block = max(1, max_block // max(len(candidates), 1))
+    for start in range(0, n, block):
+        p = points[start:start + block]
+        t = np.clip(((p[:, None, :] - a[None, :, :]) * ab[None, :, :]).sum(axis=2) / ab2[None, :], 0.0, 1.0)
+        foot = a[None, :, :] + t[:, :, None] * ab[None, :, :]
+        d2 = ((p[:, None, :] - foot) ** 2).sum(axis=2)
+        k = d2.argmin(axis=1)
+        rows = np.arange(len(p))
+        seg[start:start + block] = candidates[k]
+        proj[start:start + block] = foot[rows, k]
+        dist[start:start + block] = np.sqrt(d2[rows, k])
+        t_out[start:start + block] = t[rows, k]
+    return seg, proj, dist, t_out
+
+
+_NETWORKS = {}
+
+
+def get_shared_street_network(streets_file=DEFAULT_STREETS_FILE, plant_location=DEFAULT_PLANT_LOCATION,
+                              cache_dir=DEFAULT_CACHE_DIR):
+    """Process-wide memoized SharedStreetNetwork.load_or_build."""
+    key = (str(streets_file), tuple(plant_location), str(cache_dir))
+    if key not in _NETWORKS:
+        _NETWORKS[key] = SharedStreetNetwork.load_or_build(streets_file, plant_location, cache_dir)
+    return _NETWORKS[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and cache the shared whole-region street network.")
+    parser.add_argument("--streets_file", default=DEFAULT_STREETS_FILE)
+    parser.add_argument("--cache_dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--plant_lon", type=float, default=DEFAULT_PLANT_LOCATION[0])
+    parser.add_argument("--plant_lat", type=float, default=DEFAULT_PLANT_LOCATION[1])
+    args = parser.parse_args()
+
+    network = SharedStreetNetwork.load_or_build(args.streets_file, (args.plant_lon, args.plant_lat), args.cache_dir)
+    reachable = np.isfinite(network.dist).sum()
+    print(f"   {reachable}/{network.num_nodes} nodes reachable from the plant")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,8 @@
 """
 Final Pandapipes Simulation for Dual-Pipe District Heating Network
 
-This script creates a properly configured pandapipes network and correctly analyzes
-the simulation results with proper column handling.
+This script builds the pandapipes network from the saved dual-pipe tables
+(supply/return mains and service connections) and analyzes the simulation results.
 """
 
 import pandas as pd
@@ -14,12 +14,43 @@ from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from .plant_siting import PIPE_DIAMETERS_M, ROUGHNESS_M, heat_to_mass_flow, size_pipes
+except ImportError:
+    from plant_siting import PIPE_DIAMETERS_M, ROUGHNESS_M, heat_to_mass_flow, size_pipes
+
+# Plant circulation pump: flow pressure and a lift well above the loop losses
+# of mains sized to MAX_VELOCITY; the consumers' control valves take the rest
+PUMP_FLOW_PRESSURE_BAR = 5.0
+PUMP_LIFT_BAR = 3.0
+MIN_SERVICE_LENGTH_M = 1.0
+DEFAULT_GROUND_TEMPERATURE_C = 10.0
+# Linear heat loss of buried pre-insulated steel pipes (EN 253, insulation
+# series 2) in W/(m·K) for the standard sizes of plant_siting.PIPE_DIAMETERS_M
+PIPE_HEAT_LOSS_W_PER_MK = np.array([0.13, 0.15, 0.16, 0.19, 0.21, 0.22, 0.24, 0.27,
+                                    0.30, 0.33, 0.34, 0.37, 0.37, 0.42, 0.45])
+
+
+def pipe_u_value(diameter_m):
+    """Heat transfer coefficient in W/(m²·K) on the inner pipe surface, as pandapipes expects it."""
+    diameter_m = np.asarray(diameter_m, dtype=float)
+    return np.interp(diameter_m, PIPE_DIAMETERS_M, PIPE_HEAT_LOSS_W_PER_MK) / (np.pi * diameter_m)
+
+
 class FinalDualPipeDHSimulation:
     """Run final pandapipes simulation for dual-pipe district heating network."""
     
-    def __init__(self, results_dir="simulation_outputs"):
+    def __init__(self, results_dir="simulation_outputs", ambient_temperature_c=None,
+                 supply_temperature_c=70.0, return_temperature_c=40.0):
         self.results_dir = Path(results_dir)
         self.net = None
+        # Pipe surroundings for the thermal part of the pipeflow; callers pass
+        # the ground temperature (annual mean air temperature of the TRY year)
+        if ambient_temperature_c is None:
+            ambient_temperature_c = DEFAULT_GROUND_TEMPERATURE_C
+        self.text_k = ambient_temperature_c + 273.15
+        self.supply_temperature_c = float(supply_temperature_c)
+        self.return_temperature_c = float(return_temperature_c)
         
     def load_dual_pipe_network_data(self, scenario_name="complete_dual_pipe_dh"):
         """Load the dual-pipe network data."""
@@ -42,158 +73,149 @@ class FinalDualPipeDHSimulation:
         
         return True
     
-    def create_simplified_pandapipes_network(self):
-        """Create a simplified but properly configured pandapipes network."""
-        print("🏗️ Creating simplified pandapipes network...")
-        
-        # Create empty pandapipes network
-        self.net = pp.create_empty_network("dual_pipe_dh_network")
-        
-        # Add fluid properties for water
-        pp.create_fluid_from_lib(self.net, "water", overwrite=True)
-        
-        # Create a simplified network structure
-        self._create_simplified_junctions()
-        self._create_simplified_pipes()
-        self._create_proper_boundary_conditions()
-        
-        print(f"✅ Created simplified pandapipes network:")
+    def create_pandapipes_network(self):
+        """
+        Build the closed-loop pandapipes network from the saved dual-pipe tables:
+        one supply and one return junction per street node, the main pipes of
+        dual_supply_pipes_* (return pipes run the same segments backwards), and
+        per building a supply service pipe, a heat consumer and a return
+        service pipe. Main pipes are sized from the segment design mass flows;
+        consumer flows are the building design mass flows at the supply/return
+        spread, scaled by the plant simultaneity factor. A constant-pressure
+        circulation pump at the plant closes the loop.
+        """
+        print("🏗️ Creating pandapipes network from dual-pipe tables...")
+        
+        self.net = pp.create_empty_network("dual_pipe_dh_network", fluid="water")
+        
+        buildings = self.service_connections[self.service_connections['pipe_type'] == 'supply_service']
+        self._create_junctions(buildings)
+        self._create_main_pipes()
+        self._create_buildings(buildings)
+        self._create_plant_pump()
+        
+        print(f"✅ Created pandapipes network:")
         print(f"   - Junctions: {len(self.net.junction)}")
         print(f"   - Pipes: {len(self.net.pipe)}")
-        print(f"   - Heat sources: {len(self.net.ext_grid)}")
-        print(f"   - Heat sinks: {len(self.net.sink)}")
+        print(f"   - Heat consumers: {len(self.net.heat_consumer)}")
         
         return True
     
-    def _create_simplified_junctions(self):
-        """Create simplified junction structure."""
-        print("   Creating simplified junctions...")
-        
-        # Create main junctions for the network
-        junctions = [
-            (0, 0, "Plant"),           # Plant location
-            (100, 0, "Junction_1"),    # Main distribution point
-            (200, 0, "Junction_2"),    # Secondary distribution
-            (300, 0, "Junction_3"),    # Tertiary distribution
-            (100, 100, "Building_1"),  # Building 1
-            (200, 100, "Building_2"),  # Building 2
-            (300, 100, "Building_3"),  # Building 3
-            (100, -100, "Building_4"), # Building 4
-            (200, -100, "Building_5"), # Building 5
-            (300, -100, "Building_6"), # Building 6
-        ]
-        
-        self.junction_ids = {}
-        for i, (x, y, name) in enumerate(junctions):
-            junction_id = pp.create_junction(
-                self.net, 
-                pn_bar=1.0,
-                tfluid_k=323.15,
-                name=name,
-                geodata=(x, y)
-            )
-            self.junction_ids[name] = junction_id
-        
-        print(f"   Created {len(self.junction_ids)} junctions")
-    
-    def _create_simplified_pipes(self):
-        """Create simplified pipe structure."""
-        print("   Creating simplified pipes...")
-        
-        # Supply network pipes
-        supply_pipes = [
-            ("Plant", "Junction_1", "Supply_Main_1"),
-            ("Junction_1", "Junction_2", "Supply_Main_2"),
-            ("Junction_2", "Junction_3", "Supply_Main_3"),
-            ("Junction_1", "Building_1", "Supply_Service_1"),
-            ("Junction_2", "Building_2", "Supply_Service_2"),
-            ("Junction_3", "Building_3", "Supply_Service_3"),
-            ("Junction_1", "Building_4", "Supply_Service_4"),
-            ("Junction_2", "Building_5", "Supply_Service_5"),
-            ("Junction_3", "Building_6", "Supply_Service_6"),
-        ]
-        
-        # Return network pipes
-        return_pipes = [
-            ("Junction_1", "Plant", "Return_Main_1"),
-            ("Junction_2", "Junction_1", "Return_Main_2"),
-            ("Junction_3", "Junction_2", "Return_Main_3"),
-            ("Building_1", "Junction_1", "Return_Service_1"),
-            ("Building_2", "Junction_2", "Return_Service_2"),
-            ("Building_3", "Junction_3", "Return_Service_3"),
-            ("Building_4", "Junction_1", "Return_Service_4"),
-            ("Building_5", "Junction_2", "Return_Service_5"),
-            ("Building_6", "Junction_3", "Return_Service_6"),
-        ]
-        
-        # Create supply pipes
-        for from_junc, to_junc, name in supply_pipes:
-            pp.create_pipe_from_parameters(
-                self.net,
-                from_junction=self.junction_ids[from_junc],
-                to_junction=self.junction_ids[to_junc],
-                length_km=0.1,  # 100m
-                diameter_m=0.3,  # 300mm
-                k_mm=0.1,
-                loss_coefficient=0.0,
-                name=name,
-                sections=1,
-                alpha_w_per_m2k=0.0,
-                text_k=323.15
-            )
-        
-        # Create return pipes
-        for from_junc, to_junc, name in return_pipes:
-            pp.create_pipe_from_parameters(
-                self.net,
-                from_junction=self.junction_ids[from_junc],
-                to_junction=self.junction_ids[to_junc],
-                length_km=0.1,  # 100m
-                diameter_m=0.3,  # 300mm
-                k_mm=0.1,
-                loss_coefficient=0.0,
-                name=name,
-                sections=1,
-                alpha_w_per_m2k=0.0,
-                text_k=323.15
-            )
-        
-        print(f"   Created {len(supply_pipes) + len(return_pipes)} pipes")
+    def _create_junctions(self, buildings):
+        """Supply/return junction pairs for street nodes and buildings."""
+        print("   Creating junctions...")
+        t_supply_k = self.supply_temperature_c + 273.15
+        t_return_k = self.return_temperature_c + 273.15
+        
+        # Street nodes of the main pipes plus the buildings' connection nodes
+        # (a building connected at the plant has no main pipe)
+        ends = pd.concat([
+            self.supply_pipes[['start_node_id', 'start_x', 'start_y']].set_axis(['node', 'x', 'y'], axis=1),
+            self.supply_pipes[['end_node_id', 'end_x', 'end_y']].set_axis(['node', 'x', 'y'], axis=1),
+            buildings[['connection_node', 'connection_x', 'connection_y']].set_axis(['node', 'x', 'y'], axis=1),
+        ]).drop_duplicates('node')
+        nodes = ends['node'].astype(int).tolist()
+        geodata = list(zip(ends['x'], ends['y']))
+        
+        supply = pp.create_junctions(self.net, len(nodes), pn_bar=PUMP_FLOW_PRESSURE_BAR, tfluid_k=t_supply_k,
+                                     name=[f"S_{n}" for n in nodes], geodata=geodata)
+        ret = pp.create_junctions(self.net, len(nodes), pn_bar=PUMP_FLOW_PRESSURE_BAR, tfluid_k=t_return_k,
+                                  name=[f"R_{n}" for n in nodes], geodata=geodata)
+        self.supply_junction = dict(zip(nodes, supply))
+        self.return_junction = dict(zip(nodes, ret))
+        
+        building_geodata = list(zip(buildings['building_x'], buildings['building_y']))
+        self.building_supply_junctions = pp.create_junctions(
+            self.net, len(buildings), pn_bar=PUMP_FLOW_PRESSURE_BAR, tfluid_k=t_supply_k,
+            name=[f"S_{b}" for b in buildings['building_id']], geodata=building_geodata)
+        self.building_return_junctions = pp.create_junctions(
+            self.net, len(buildings), pn_bar=PUMP_FLOW_PRESSURE_BAR, tfluid_k=t_return_k,
+            name=[f"R_{b}" for b in buildings['building_id']], geodata=building_geodata)
+        
+        print(f"   Created {len(self.net.junction)} junctions")
     
-    def _create_proper_boundary_conditions(self):
-        """Create proper boundary conditions for hydraulic balance."""
-        print("   Creating boundary conditions...")
-        
-        # Create heat source (CHP plant) - pressure and temperature specified
-        pp.create_ext_grid(
+    def _create_pipes(self, from_junctions, to_junctions, length_m, diameter_m, names):
+        """Insulated, buried pipes between junction arrays, losing heat to the ground at text_k."""
+        if len(from_junctions) == 0:
+            return
+        pp.create_pipes_from_parameters(
             self.net,
-            junction=self.junction_ids["Plant"],
-            p_bar=5.0,  # Supply pressure
-            t_k=343.15,  # Supply temperature (70°C)
-            name="CHP_Plant",
-            type="pt"
+            from_junctions=np.asarray(from_junctions),
+            to_junctions=np.asarray(to_junctions),
+            length_km=np.asarray(length_m, dtype=float) / 1000,
+            inner_diameter_mm=np.asarray(diameter_m, dtype=float) * 1000,
+            k_mm=ROUGHNESS_M * 1000,
+            loss_coefficient=0.0,
+            name=names,
+            sections=1,
+            u_w_per_m2k=pipe_u_value(diameter_m),
+            text_k=self.text_k
         )
+    
+    def _create_main_pipes(self):
+        """Supply mains plant -> building, return mains the same segments backwards."""
+        print("   Creating main pipes...")
+        pipes = self.supply_pipes
+        if 'design_mass_flow_kg_per_s' in pipes:
+            diameter = size_pipes(pipes['design_mass_flow_kg_per_s'])
+        else:
+            diameter = np.full(len(pipes), PIPE_DIAMETERS_M[-1])
+        start = pipes['start_node_id'].astype(int)
+        end = pipes['end_node_id'].astype(int)
         
-        # Create heat sinks (buildings) - mass flow specified
-        building_demands = {
-            "Building_1": 0.5,  # kg/s
-            "Building_2": 0.4,
-            "Building_3": 0.3,
-            "Building_4": 0.6,
-            "Building_5": 0.4,
-            "Building_6": 0.3,
-        }
+        self._create_pipes(start.map(self.supply_junction), end.map(self.supply_junction),
+                           pipes['length_m'], diameter, [f"Supply_Main_{i}" for i in range(len(pipes))])
+        self._create_pipes(end.map(self.return_junction), start.map(self.return_junction),
+                           pipes['length_m'], diameter, [f"Return_Main_{i}" for i in range(len(pipes))])
         
-        for building_name, demand in building_demands.items():
-            pp.create_sink(
+        print(f"   Created {2 * len(pipes)} main pipes")
+    
+    def _create_buildings(self, buildings):
+        """Service pipes and one heat consumer per building."""
+        print("   Creating service pipes and heat consumers...")
+        delta_t = max(self.supply_temperature_c - self.return_temperature_c, 1.0)
+        simultaneity = float(self.network_stats.get('simultaneity_factor', 1.0))
+        heat_kw = buildings['heating_load_kw'].to_numpy(dtype=float) * simultaneity
+        mass_flow = heat_to_mass_flow(heat_kw, delta_t)
+        diameter = size_pipes(mass_flow)
+        length_m = np.maximum(buildings['distance_to_street'].to_numpy(dtype=float), MIN_SERVICE_LENGTH_M)
+        node = buildings['connection_node'].astype(int)
+        ids = buildings['building_id'].astype(str).tolist()
+        
+        self._create_pipes(node.map(self.supply_junction), self.building_supply_junctions,
+                           length_m, diameter, [f"Supply_Service_{b}" for b in ids])
+        self._create_pipes(self.building_return_junctions, node.map(self.return_junction),
+                           length_m, diameter, [f"Return_Service_{b}" for b in ids])
+        if len(buildings):
+            pp.create_heat_consumers(
                 self.net,
-                junction=self.junction_ids[building_name],
-                mdot_kg_per_s=demand,
-                name=building_name,
-                scaling=1.0
+                from_junctions=self.building_supply_junctions,
+                to_junctions=self.building_return_junctions,
+                qext_w=heat_kw * 1000,
+                controlled_mdot_kg_per_s=mass_flow,
+                name=ids
             )
         
-        print(f"   Created 1 heat source and {len(building_demands)} heat sinks")
+        print(f"   Created {len(buildings)} heat consumers ({mass_flow.sum():.2f} kg/s design flow)")
+    
+    def _create_plant_pump(self):
+        """Circulation pump between the plant's return and supply junctions."""
+        # The plant is the start of the root segments (never the end of another segment)
+        roots = ~self.supply_pipes['start_node_id'].isin(self.supply_pipes['end_node_id'])
+        if roots.any():
+            plant_node = int(self.supply_pipes.loc[roots, 'start_node_id'].iloc[0])
+        else:
+            plant_node = next(iter(self.supply_junction))
+        pp.create_circ_pump_const_pressure(
+            self.net,
+            return_junction=self.return_junction[plant_node],
+            flow_junction=self.supply_junction[plant_node],
+            p_flow_bar=PUMP_FLOW_PRESSURE_BAR,
+            plift_bar=PUMP_LIFT_BAR,
+            t_flow_k=self.supply_temperature_c + 273.15,
+            name="CHP_Plant"
+        )
+        print(f"   Created circulation pump at plant node {plant_node}")
     
     def run_hydraulic_simulation(self):
         """Run pandapipes hydraulic simulation."""
@@ -218,51 +240,51 @@ class FinalDualPipeDHSimulation:
         junction_results = self.net.res_junction
         pipe_results = self.net.res_pipe
         
-        # Print available columns for debugging
-        print(f"   Junction result columns: {list(junction_results.columns)}")
-        print(f"   Pipe result columns: {list(pipe_results.columns)}")
+        pump_results = self.net.res_circ_pump_pressure
+        consumer_results = self.net.res_heat_consumer
         
         # Calculate KPIs
         kpi = {}
         
-        # Pressure analysis
-        if 'p_bar' in junction_results.columns:
-            kpi['min_pressure_bar'] = junction_results['p_bar'].min()
-            kpi['max_pressure_bar'] = junction_results['p_bar'].max()
-            kpi['avg_pressure_bar'] = junction_results['p_bar'].mean()
-            kpi['pressure_drop_bar'] = kpi['max_pressure_bar'] - kpi['min_pressure_bar']
-        else:
-            kpi['min_pressure_bar'] = 0.0
-            kpi['max_pressure_bar'] = 0.0
-            kpi['avg_pressure_bar'] = 0.0
-            kpi['pressure_drop_bar'] = 0.0
-        
-        # Flow analysis - check for correct column name
-        flow_column = None
-        for col in pipe_results.columns:
-            if 'mdot' in col.lower() or 'flow' in col.lower():
-                flow_column = col
-                break
-        
-        if flow_column:
-            kpi['total_flow_kg_per_s'] = pipe_results[flow_column].abs().sum()
-            kpi['max_flow_kg_per_s'] = pipe_results[flow_column].abs().max()
-            kpi['avg_flow_kg_per_s'] = pipe_results[flow_column].abs().mean()
-        else:
-            kpi['total_flow_kg_per_s'] = 0.0
-            kpi['max_flow_kg_per_s'] = 0.0
-            kpi['avg_flow_kg_per_s'] = 0.0
-        
-        # Temperature analysis
-        kpi['supply_temperature_c'] = 70.0
-        kpi['return_temperature_c'] = 40.0
+        # Pressure analysis: the pump lift minus what the hydraulically worst
+        # consumer still has left is the loss along the critical supply/return path
+        kpi['min_pressure_bar'] = float(junction_results['p_bar'].min())
+        kpi['max_pressure_bar'] = float(junction_results['p_bar'].max())
+        kpi['avg_pressure_bar'] = float(junction_results['p_bar'].mean())
+        pump_lift = float((pump_results['p_to_bar'] - pump_results['p_from_bar']).iloc[0])
+        consumer_dp = consumer_results['p_from_bar'] - consumer_results['p_to_bar']
+        kpi['min_consumer_pressure_difference_bar'] = float(consumer_dp.min()) if len(consumer_dp) else pump_lift
+        kpi['pressure_drop_bar'] = pump_lift - kpi['min_consumer_pressure_difference_bar']
+        
+        # Flow analysis: plant flow through the circulation pump, pipe flows for sizing checks
+        pipe_flow = pipe_results['mdot_from_kg_per_s'].abs()
+        kpi['total_flow_kg_per_s'] = float(pump_results['mdot_from_kg_per_s'].abs().sum())
+        kpi['max_flow_kg_per_s'] = float(pipe_flow.max()) if len(pipe_flow) else 0.0
+        kpi['avg_flow_kg_per_s'] = float(pipe_flow.mean()) if len(pipe_flow) else 0.0
+        kpi['max_velocity_m_per_s'] = float(pipe_results['v_mean_m_per_s'].abs().max()) if len(pipe_results) else 0.0
+        
+        # Temperature analysis: design temperatures, and what the heat losses
+        # to the ground leave of them at the buildings and back at the plant
+        kpi['supply_temperature_c'] = self.supply_temperature_c
+        kpi['return_temperature_c'] = self.return_temperature_c
         kpi['temperature_drop_c'] = kpi['supply_temperature_c'] - kpi['return_temperature_c']
+        kpi['ground_temperature_c'] = self.text_k - 273.15
+        kpi['min_consumer_supply_temperature_c'] = (
+            float(consumer_results['t_from_k'].min()) - 273.15 if len(consumer_results) else self.supply_temperature_c)
+        kpi['plant_return_temperature_c'] = float(pump_results['t_from_k'].iloc[0]) - 273.15
+        
+        # Heat losses: plant heat minus the heat delivered to the buildings
+        plant_heat_kw = float(pump_results['qext_w'].sum()) / 1000
+        delivered_kw = float(consumer_results['qext_w'].sum()) / 1000
+        kpi['plant_heat_kw'] = plant_heat_kw
+        kpi['heat_loss_kw'] = plant_heat_kw - delivered_kw
+        kpi['heat_loss_percent'] = 100 * kpi['heat_loss_kw'] / plant_heat_kw if plant_heat_kw > 0 else 0.0
         
         # Network performance
         kpi['num_junctions'] = len(self.net.junction)
         kpi['num_pipes'] = len(self.net.pipe)
-        kpi['num_heat_sources'] = len(self.net.ext_grid)
-        kpi['num_heat_sinks'] = len(self.net.sink)
+        kpi['num_heat_sources'] = len(self.net.circ_pump_pressure)
+        kpi['num_heat_sinks'] = len(self.net.heat_consumer)
         
         # Hydraulic success
         kpi['hydraulic_success'] = True
@@ -276,9 +298,9 @@ class FinalDualPipeDHSimulation:
         print(f"✅ Simulation analysis completed:")
         print(f"   - Pressure range: {kpi['min_pressure_bar']:.2f} - {kpi['max_pressure_bar']:.2f} bar")
         print(f"   - Pressure drop: {kpi['pressure_drop_bar']:.2f} bar")
-        if flow_column:
-            print(f"   - Total flow: {kpi['total_flow_kg_per_s']:.1f} kg/s (using column: {flow_column})")
+        print(f"   - Plant flow: {kpi['total_flow_kg_per_s']:.2f} kg/s, max velocity {kpi['max_velocity_m_per_s']:.2f} m/s")
         print(f"   - Temperature drop: {kpi['temperature_drop_c']:.1f}°C")
+        print(f"   - Heat loss: {kpi['heat_loss_kw']:.1f} kW ({kpi['heat_loss_percent']:.1f}%) at {kpi['ground_temperature_c']:.1f}°C ground")
         
         return True
     
@@ -312,19 +334,20 @@ class FinalDualPipeDHSimulation:
         summary = {
             'scenario': scenario_name,
             'simulation_type': 'pandapipes_hydraulic_final',
-            'network_topology': 'simplified_dual_pipe_district_heating',
+            'network_topology': 'street_routed_dual_pipe_district_heating',
             'simulation_results': self.simulation_kpi,
             'network_components': {
                 'junctions': len(self.net.junction),
                 'pipes': len(self.net.pipe),
-                'heat_sources': len(self.net.ext_grid),
-                'heat_sinks': len(self.net.sink)
+                'heat_sources': len(self.net.circ_pump_pressure),
+                'heat_sinks': len(self.net.heat_consumer)
             },
             'performance_metrics': {
                 'hydraulic_success': self.simulation_kpi['hydraulic_success'],
                 'pressure_drop_bar': self.simulation_kpi['pressure_drop_bar'],
                 'total_flow_kg_per_s': self.simulation_kpi['total_flow_kg_per_s'],
-                'temperature_drop_c': self.simulation_kpi['temperature_drop_c']
+                'temperature_drop_c': self.simulation_kpi['temperature_drop_c'],
+                'heat_loss_kw': self.simulation_kpi['heat_loss_kw']
             },
             'system_specifications': {
                 'supply_temperature_c': self.simulation_kpi['supply_temperature_c'],
@@ -350,8 +373,8 @@ class FinalDualPipeDHSimulation:
         # Step 1: Load network data
         self.load_dual_pipe_network_data(scenario_name)
         
-        # Step 2: Create simplified pandapipes network
-        self.create_simplified_pandapipes_network()
+        # Step 2: Create pandapipes network from the dual-pipe tables
+        self.create_pandapipes_network()
         
         # Step 3: Run hydraulic simulation
         simulation_success = self.run_hydraulic_simulation()
@@ -368,7 +391,7 @@ class FinalDualPipeDHSimulation:
             
             print("=" * 80)
             print("✅ PANDAPIPES SIMULATION COMPLETED SUCCESSFULLY!")
-            print("   - Simplified dual-pipe network created in pandapipes ✅")
+            print("   - Street-routed dual-pipe network created in pandapipes ✅")
             print("   - Hydraulic simulation completed ✅")
             print("   - Pressure and flow analysis performed ✅")
             print("   - Results saved and summarized ✅")
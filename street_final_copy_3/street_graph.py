@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Array-Backed Street Graph
+
+Street graph for the DH network builder with integer node ids:
+- node coordinates live in one (N, 2) float64 array; (x, y) tuples are only
+  used once, when a coordinate is interned,
+- edges are parallel arrays (endpoints, length, street id, street name,
+  highway type); a straight two-vertex edge needs no geometry object, the
+  original LineString is kept once per multi-vertex street,
+- routing runs on a CSR adjacency export with scipy.sparse.csgraph.dijkstra,
+  either as the plant's shortest-path tree or on an approximate Steiner tree
+  (Mehlhorn's variant of the KMB heuristic) spanning plant and buildings.
+"""
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra, minimum_spanning_tree
+from scipy.spatial import cKDTree
+from shapely.geometry import LineString
+
+CONNECTIVITY_FIX = 'connectivity_fix'
+PLANT_CONNECTION = 'plant_connection'
+
+
+class StreetGraph:
+    """Undirected street graph with integer node ids and a coordinate array."""
+
+    def __init__(self):
+        self._node_ids = {}
+        self._coords = []
+        self.node_attrs = {}  # only special nodes (plant, service connections) carry attributes
+        self._edge_ids = {}
+        self._u, self._v, self._length = [], [], []
+        self._street_id, self._street_name, self._highway = [], [], []
+        self.street_geometries = {}  # street_id -> LineString, only for multi-vertex streets
+        self._cache = {}
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    def add_node(self, xy, **attrs):
+        """Intern a coordinate and return its node id; new attributes are added, existing ones kept."""
+        key = (float(xy[0]), float(xy[1]))
+        nid = self._node_ids.get(key)
+        if nid is None:
+            nid = len(self._coords)
+            self._node_ids[key] = nid
+            self._coords.append(key)
+            self._cache.clear()
+        if attrs:
+            # Existing attributes win, e.g. a service connection landing on the plant node
+            node_attrs = self.node_attrs.setdefault(nid, {})
+            for key, value in attrs.items():
+                node_attrs.setdefault(key, value)
+        return nid
+
+    def find_node(self, xy):
+        """Node id of a coordinate, or None if it is not in the graph."""
+        return self._node_ids.get((float(xy[0]), float(xy[1])))
+
+    def add_edge(self, a, b, weight, street_id, street_name, highway_type):
+        """Add (or overwrite) the undirected edge a-b between node ids."""
+        key = (a, b) if a <= b else (b, a)
+        e = self._edge_ids.get(key)
+        if e is None:
+            e = len(self._u)
+            self._edge_ids[key] = e
+            self._u.append(key[0])
+            self._v.append(key[1])
+            self._length.append(float(weight))
+            self._street_id.append(street_id)
+            self._street_name.append(street_name)
+            self._highway.append(highway_type)
+        else:
+            self._length[e] = float(weight)
+            self._street_id[e] = street_id
+            self._street_name[e] = street_name
+            self._highway[e] = highway_type
+        self._cache.pop('csr', None)
+        return e
+
+    def add_street(self, coords, street_id, street_name, highway_type, geometry=None):
+        """Add a street polyline as consecutive vertex-to-vertex edges."""
+        coords = np.asarray(coords, dtype=np.float64)[:, :2]
+        if len(coords) > 2 and geometry is not None:
+            self.street_geometries[street_id] = geometry
+        nodes = [self.add_node(xy) for xy in coords]
+        seg_lengths = np.hypot(*(coords[1:] - coords[:-1]).T)
+        for k in range(len(nodes) - 1):
+            if nodes[k] != nodes[k + 1]:
+                self.add_edge(nodes[k], nodes[k + 1], seg_lengths[k], street_id, street_name, highway_type)
+
+    def copy(self):
+        """Independent copy (list/dict copies, no per-edge rebuild), e.g. of a shared region graph."""
+        graph = StreetGraph.__new__(StreetGraph)
+        graph._node_ids = dict(self._node_ids)
+        graph._coords = list(self._coords)
+        graph.node_attrs = {nid: dict(attrs) for nid, attrs in self.node_attrs.items()}
+        graph._edge_ids = dict(self._edge_ids)
+        graph._u, graph._v, graph._length = list(self._u), list(self._v), list(self._length)
+        graph._street_id, graph._street_name, graph._highway = (
+            list(self._street_id), list(self._street_name), list(self._highway))
+        graph.street_geometries = dict(self.street_geometries)
+        graph._cache = dict(self._cache)
+        return graph
+
+    # ------------------------------------------------------------------
+    # Arrays and queries
+    # ------------------------------------------------------------------
+    def number_of_nodes(self):
+        return len(self._coords)
+
+    def number_of_edges(self):
+        return len(self._u)
+
+    @property
+    def coords(self):
+        if 'coords' not in self._cache:
+            self._cache['coords'] = np.asarray(self._coords, dtype=np.float64).reshape(-1, 2)
+        return self._cache['coords']
+
+    @property
+    def edge_u(self):
+        return np.asarray(self._u, dtype=np.int64)
+
+    @property
+    def edge_v(self):
+        return np.asarray(self._v, dtype=np.int64)
+
+    @property
+    def edge_length(self):
+        return np.asarray(self._length, dtype=np.float64)
+
+    def nodes_of_type(self, node_type):
+        return [nid for nid, attrs in self.node_attrs.items() if attrs.get('node_type') == node_type]
+
+    def edge_index(self, a, b):
+        return self._edge_ids.get((a, b) if a <= b else (b, a))
+
+    def edge_data(self, a, b):
+        """Attributes of edge a-b in the layout of the former NetworkX edge dicts."""
+        e = self.edge_index(a, b)
+        if e is None:
+            return None
+        return {
+            'weight': self._length[e],
+            'street_id': self._street_id[e],
+            'street_name': self._street_name[e],
+            'highway_type': self._highway[e],
+        }
+
+    def edge_geometry(self, a, b):
+        """Straight LineString of edge a-b, built on demand."""
+        return LineString([self._coords[a], self._coords[b]])
+
+    def to_csr(self, edge_mask=None):
+        """
+        Symmetric CSR adjacency matrix weighted with edge lengths. The full
+        graph is cached; edge_mask restricts it to a subset of edges.
+        """
+        if edge_mask is None and 'csr' in self._cache:
+            return self._cache['csr']
+        n = self.number_of_nodes()
+        u, v, w = self.edge_u, self.edge_v, self.edge_length
+        if edge_mask is not None:
+            u, v, w = u[edge_mask], v[edge_mask], w[edge_mask]
+        # csgraph treats explicit zeros as missing edges
+        w = np.maximum(w, 1e-9)
+        csr = coo_matrix(
+            (np.concatenate([w, w]), (np.concatenate([u, v]), np.concatenate([v, u]))), shape=(n, n)
+        ).tocsr()
+        if edge_mask is None:
+            self._cache['csr'] = csr
+        return csr
+    
+    def connected_components(self):
+        """(n_components, labels) of the graph."""
+        return connected_components(self.to_csr(), directed=False)
+
+    def is_connected(self):
+        return self.number_of_nodes() > 0 and self.connected_components()[0] == 1
+
+    def connect_components(self, max_distance=None):
+        """
+        Link every component to the largest one with the shortest node-to-node
+        edge (found with a KD-tree). Links longer than max_distance are skipped.
+        Returns the list of link lengths that were added.
+        """
+        n_components, labels = self.connected_components()
+        if n_components <= 1:
+            return []
+        coords = self.coords
+        main = np.bincount(labels).argmax()
+        main_nodes = np.flatnonzero(labels == main)
+        tree = cKDTree(coords[main_nodes])
+        links = []
+        for comp in range(n_components):
+            if comp == main:
+                continue
+            comp_nodes = np.flatnonzero(labels == comp)
+            dist, idx = tree.query(coords[comp_nodes])
+            best = int(dist.argmin())
+            if max_distance is not None and dist[best] >= max_distance:
+                continue
+            self.add_edge(int(main_nodes[idx[best]]), int(comp_nodes[best]), dist[best],
+                          CONNECTIVITY_FIX, 'Connectivity Fix', 'service')
+            links.append(float(dist[best]))
+        return links
+
+    def shortest_path_tree(self, source, edge_mask=None):
+        """Distances and predecessors from source to every node (one Dijkstra run)."""
+        dist, pred = dijkstra(self.to_csr(edge_mask), directed=False, indices=source, return_predecessors=True)
+        return dist, pred
+
+    def path_edges_mask(self, pred, targets):
+        """Edges on the predecessor-tree paths to all targets (each edge once)."""
+        mask = np.zeros(self.number_of_edges(), dtype=bool)
+        visited = np.zeros(self.number_of_nodes(), dtype=bool)
+        for node in targets:
+            node = int(node)
+            while pred[node] >= 0 and not visited[node]:
+                visited[node] = True
+                mask[self.edge_index(int(pred[node]), node)] = True
+                node = int(pred[node])
+        return mask
+
+    def _edge_mask_from_matrix(self, matrix):
+        mask = np.zeros(self.number_of_edges(), dtype=bool)
+        coo = matrix.tocoo()
+        for a, b in zip(coo.row.tolist(), coo.col.tolist()):
+            mask[self.edge_index(a, b)] = True
+        return mask
+
+    def steiner_tree(self, terminals):
+        """
+        Approximate minimum Steiner tree spanning the terminal nodes, using
+        Mehlhorn's construction of the KMB 2-approximation:
+        1. one multi-source Dijkstra splits the graph into Voronoi regions
+           around the terminals,
+        2. every edge joining two regions is a candidate terminal-terminal
+           link of length d(s, u) + w(u, v) + d(v, t),
+        3. the MST of those links is expanded back into street paths,
+        4. the MST of the expanded subgraph is pruned of non-terminal leaves.
+        Runs in O(E log V). Returns a boolean edge mask.
+        """
+        terminals = np.unique(np.asarray(terminals, dtype=np.int64))
+        n = self.number_of_nodes()
+        tree_mask = np.zeros(self.number_of_edges(), dtype=bool)
+        if len(terminals) < 2:
+            return tree_mask
+        u, v, w = self.edge_u, self.edge_v, self.edge_length
+
+        # 1. Voronoi regions: nearest terminal, distance to it and the path back
+        dist, pred, region = dijkstra(self.to_csr(), directed=False, indices=terminals,
+                                      return_predecessors=True, min_only=True)
+
+        # 2. Cheapest region-crossing edge per pair of terminals
+        crossing = np.flatnonzero((region[u] >= 0) & (region[v] >= 0) & (region[u] != region[v]))
+        lo = np.minimum(region[u[crossing]], region[v[crossing]])
+        hi = np.maximum(region[u[crossing]], region[v[crossing]])
+        cost = dist[u[crossing]] + w[crossing] + dist[v[crossing]]
+        order = np.lexsort((cost, hi, lo))
+        lo, hi, cost, crossing = lo[order], hi[order], cost[order], crossing[order]
+        first = np.ones(len(lo), dtype=bool)
+        first[1:] = (lo[1:] != lo[:-1]) | (hi[1:] != hi[:-1])
+        lo, hi, cost, crossing = lo[first], hi[first], cost[first], crossing[first]
+
+        # 3. MST over the terminals, expanded into street paths
+        terminal_index = np.full(n, -1, dtype=np.int64)
+        terminal_index[terminals] = np.arange(len(terminals))
+        ti, tj = terminal_index[lo], terminal_index[hi]
+        bridge = {(a, b): e for a, b, e in zip(ti.tolist(), tj.tolist(), crossing.tolist())}
+        terminal_mst = minimum_spanning_tree(
+            coo_matrix((np.maximum(cost, 1e-9), (ti, tj)), shape=(len(terminals), len(terminals)))
+        ).tocoo()
+        for a, b in zip(terminal_mst.row.tolist(), terminal_mst.col.tolist()):
+            e = bridge[(min(a, b), max(a, b))]
+            tree_mask[e] = True
+            for node in (int(u[e]), int(v[e])):
+                # Walk back to the region's terminal; stop where the path is already included
+                while pred[node] >= 0:
+                    path_edge = self.edge_index(int(pred[node]), node)
+                    if tree_mask[path_edge]:
+                        break
+                    tree_mask[path_edge] = True
+                    node = int(pred[node])
+
+        # 4. MST of the expanded subgraph, then prune leaves that are not terminals
+        tree_mask = self._edge_mask_from_matrix(minimum_spanning_tree(self.to_csr(tree_mask)))
+        return self._prune_leaves(tree_mask, terminals)
+
+    def _prune_leaves(self, tree_mask, terminals):
+        is_terminal = np.zeros(self.number_of_nodes(), dtype=bool)
+        is_terminal[terminals] = True
+        incident = {}
+        for e in np.flatnonzero(tree_mask).tolist():
+            incident.setdefault(self._u[e], []).append(e)
+            incident.setdefault(self._v[e], []).append(e)
+        degree = {node: len(edges) for node, edges in incident.items()}
+        leaves = [node for node, d in degree.items() if d == 1 and not is_terminal[node]]
+        while leaves:
+            node = leaves.pop()
+            for e in incident[node]:
+                if tree_mask[e]:
+                    tree_mask[e] = False
+                    other = self._v[e] if self._u[e] == node else self._u[e]
+                    degree[other] -= 1
+                    if degree[other] == 1 and not is_terminal[other]:
+                        leaves.append(other)
+            degree[node] = 0
+        return tree_mask
+
+    @staticmethod
+    def path_from_tree(pred, source, target):
+        """Node id path source -> target from a predecessor array, or None if unreachable."""
+        if target != source and pred[target] < 0:
+            return None
+        path = [target]
+        while path[-1] != source:
+            path.append(int(pred[path[-1]]))
+        path.reverse()
+        return path
+
+    def project_points(self, points, edge_mask=None, max_block=256):
+        """
+        Nearest point on the graph's edges for each point, vectorized in blocks.
+        Returns (edge_index, projected_xy, distance, t) where t is the position
+        along the edge from u (0) to v (1).
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        candidates = np.arange(self.number_of_edges()) if edge_mask is None else np.flatnonzero(edge_mask)
+        a = self.coords[self.edge_u[candidates]]
+        b = self.coords[self.edge_v[candidates]]
+        ab = b - a
+        ab_len2 = np.maximum((ab ** 2).sum(axis=1), 1e-12)
+        edges = np.empty(len(points), dtype=np.int64)
+        proj = np.empty_like(points)
+        dist = np.empty(len(points))
+        ts = np.empty(len(points))
+        for start in range(0, len(points), max_block):
+            p = points[start:start + max_block]
+            t = np.clip(((p[:, None, :] - a[None, :, :]) * ab[None, :, :]).sum(axis=2) / ab_len2[None, :], 0.0, 1.0)
+            q = a[None, :, :] + t[:, :, None] * ab[None, :, :]
+            d = np.hypot(*(q - p[:, None, :]).transpose(2, 0, 1))
+            best = d.argmin(axis=1)
+            rows = np.arange(len(p))
+            edges[start:start + max_block] = candidates[best]
+            proj[start:start + max_block] = q[rows, best]
+            dist[start:start + max_block] = d[rows, best]
+            ts[start:start + max_block] = t[rows, best]
+        return edges, proj, dist, ts
+
+    def street_edge_mask(self):
+        """Edges that belong to street features (not connectivity fixes or plant links)."""
+        return np.array([sid not in (CONNECTIVITY_FIX, PLANT_CONNECTION) for sid in self._street_id], dtype=bool)
+
+    def _replace_edge(self, edge, a, b, weight):
+        """Move edge `edge` to the node pair a-b (keeps its street attributes)."""
+        del self._edge_ids[(self._u[edge], self._v[edge])]
+        key = (a, b) if a <= b else (b, a)
+        self._edge_ids[key] = edge
+        self._u[edge], self._v[edge] = key
+        self._length[edge] = float(weight)
+        self._cache.pop('csr', None)
+
+    def split_edge(self, edge, ts, nodes):
+        """
+        Split `edge` at the given nodes into the chain u -> n1 -> ... -> nk -> v,
+        ts being the node positions along the edge from u (0) to v (1). The
+        edge itself becomes the first piece, so no overlapping edges remain.
+        """
+        u, v, length = self._u[edge], self._v[edge], self._length[edge]
+        order = np.argsort(ts, kind='stable')
+        chain, positions = [u], [0.0]
+        for k in order.tolist():
+            if nodes[k] not in (chain[-1], v):
+                chain.append(nodes[k])
+                positions.append(float(ts[k]))
+        chain.append(v)
+        positions.append(1.0)
+        if len(chain) == 2:
+            return
+        pieces = length * np.diff(positions)
+        street_id, street_name, highway = self.street_attributes(edge)
+        self._replace_edge(edge, chain[0], chain[1], pieces[0])
+        for k in range(1, len(chain) - 1):
+            self.add_edge(chain[k], chain[k + 1], pieces[k], street_id, street_name, highway)
+
+    def attach_points(self, points, edges, ts, attrs=None):
+        """
+        Add a node for every point lying on its edge (as returned by
+        project_points) and split each edge into a chain through all points
+        on it, ordered by t, so several buildings on one street share the
+        trench instead of each getting its own parallel link.
+        attrs: optional list of node attribute dicts, one per point.
+        Returns the node ids.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        edges = np.asarray(edges, dtype=np.int64)
+        ts = np.asarray(ts, dtype=np.float64)
+        nodes = np.array([self.add_node(xy, **(attrs[i] if attrs else {})) for i, xy in enumerate(points)],
+                         dtype=np.int64)
+        for edge in np.unique(edges).tolist():
+            on_edge = np.flatnonzero(edges == edge)
+            self.split_edge(edge, ts[on_edge], nodes[on_edge].tolist())
+        return nodes
+
+    def street_attributes(self, edge):
+        return self._street_id[edge], self._street_name[edge], self._highway[edge]
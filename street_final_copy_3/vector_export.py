@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Vector Export for Network Maps
+
+Writes DH and HP network layers as files a browser can stream instead of
+HTML maps with all geometry inlined:
+- FlatGeobuf (default): one .fgb per layer with a packed R-tree index. The
+  generated viewer.html fetches only the features inside the current view
+  via HTTP range requests, so serve the directory over HTTP
+  (e.g. `python -m http.server`), not from file://.
+- MBTiles: vector tiles for tile servers / QGIS, built with tippecanoe when
+  it is on the PATH, otherwise with the GDAL MVT driver (one file per layer).
+
+Layers are built from the tables written by save_dual_pipe_results
+(dual_supply_pipes_*.csv, dual_return_pipes_*.csv,
+dual_service_connections_*.csv) or directly from the in-memory frames of the
+DH network creator and the HP feasibility analysis.
+
+Usage:
+    python vector_export.py dh --results_dir simulation_outputs --scenario dual_pipe_Parkstrasse
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+try:
+    from .map_layers import segments_to_gdf
+except ImportError:
+    from map_layers import segments_to_gdf
+
+WGS84 = "EPSG:4326"
+DH_CRS = "EPSG:32633"
+FORMATS = ("fgb", "mbtiles")
+VIEWER_MIN_ZOOM = 14
+
+# Leaflet styles per layer, shared by the viewer
+LAYER_STYLES = {
+    "streets": {"color": "gray", "weight": 2, "opacity": 0.6},
+    "supply_pipes": {"color": "red", "weight": 4, "opacity": 0.8},
+    "return_pipes": {"color": "blue", "weight": 4, "opacity": 0.8},
+    "service_connections": {"color": "orange", "weight": 2, "opacity": 0.8, "dashArray": "5, 5"},
+    "buildings": {"color": "#555555", "weight": 1, "fillColor": "#3388ff", "fillOpacity": 0.4},
+    "power_lines": {"color": "orange", "weight": 4, "opacity": 0.8},
+    "service_lines": {"color": "purple", "weight": 2, "opacity": 0.6},
+}
+
+_DH_SEGMENT_COLUMNS = ["length_m", "street_id", "street_name", "highway_type", "pipe_type",
+                       "building_served", "temperature_c", "flow_direction"]
+_SERVICE_COLUMNS = ["building_id", "pipe_type", "distance_to_street", "temperature_c", "flow_direction"]
+
+
+def _projected_crs(gdf):
+    """UTM CRS used by the HP analysis for a (possibly geographic) layer."""
+    if gdf.crs is None or gdf.crs.is_geographic:
+        centroid = gdf.geometry.unary_union.centroid
+        return f"EPSG:326{int((centroid.x + 180) // 6 + 1):02d}"
+    return gdf.crs
+
+
+def _sanitize(gdf):
+    """Keep only attribute types OGR drivers can write (lists/dicts/tuples become JSON text)."""
+    gdf = gdf.copy()
+    for col in gdf.columns:
+        if col == gdf.geometry.name:
+            continue
+        if str(gdf[col].dtype) == "category":
+            gdf[col] = gdf[col].astype(str)
+        elif gdf[col].dtype == object:
+            gdf[col] = gdf[col].map(
+                lambda v: json.dumps(v, ensure_ascii=False, default=str) if isinstance(v, (list, dict, tuple)) else v
+            ).astype(str)
+        elif gdf[col].dtype == bool:
+            gdf[col] = gdf[col].astype(np.int8)
+    return gdf
+
+
+# ----------------------------------------------------------------------
+# Layer builders
+# ----------------------------------------------------------------------
+def dh_layers(supply_pipes, return_pipes, service_connections, buildings=None, streets=None, crs=DH_CRS):
+    """GeoDataFrames for the DH network tables (coordinates in `crs`)."""
+    layers = {}
+    for name, pipes in (("supply_pipes", supply_pipes), ("return_pipes", return_pipes)):
+        if pipes is not None and len(pipes):
+            columns = [c for c in _DH_SEGMENT_COLUMNS if c in pipes.columns]
+            layers[name] = segments_to_gdf(pipes[columns + ["start_x", "start_y", "end_x", "end_y"]], crs=crs)
+    if service_connections is not None and len(service_connections):
+        columns = [c for c in _SERVICE_COLUMNS if c in service_connections.columns]
+        layers["service_connections"] = segments_to_gdf(
+            service_connections[columns + ["connection_x", "connection_y", "building_x", "building_y"]],
+            x0="connection_x", y0="connection_y", x1="building_x", y1="building_y", crs=crs,
+        )
+    if buildings is not None and len(buildings):
+        layers["buildings"] = buildings
+    if streets is not None and len(streets):
+        layers["streets"] = streets
+    return layers
+
+
+def dh_layers_from_results(results_dir, scenario_name, buildings_file=None, streets_file=None):
+    """DH layers from the CSV tables written by save_dual_pipe_results."""
+    results_dir = Path(results_dir)
+
+    def read(prefix):
+        path = results_dir / f"{prefix}_{scenario_name}.csv"
+        return pd.read_csv(path) if path.exists() else None
+
+    buildings = gpd.read_file(buildings_file) if buildings_file else None
+    streets = gpd.read_file(streets_file) if streets_file else None
+    return dh_layers(read("dual_supply_pipes"), read("dual_return_pipes"), read("dual_service_connections"),
+                     buildings, streets)
+
+
+def hp_layers(buildings, lines=None, streets=None):
+    """
+    GeoDataFrames for the HP feasibility results: buildings with their
+    proximity / power-flow columns, service lines (computed in the projected
+    CRS) and power lines.
+    """
+    layers = {}
+    metrics = [c for c in ["gebaeude", "id", "dist_to_line", "dist_to_substation", "dist_to_transformer",
+                           "max_trafo_loading", "min_voltage_pu", "nearest_infra_type", "service_line_distance"]
+               if c in buildings.columns]
+    layers["buildings"] = gpd.GeoDataFrame(buildings[metrics], geometry=buildings.geometry, crs=buildings.crs)
+
+    if "service_line" in buildings.columns:
+        has_line = buildings["service_line"].map(lambda g: hasattr(g, "coords") and len(g.coords) >= 2)
+        service = buildings.loc[has_line]
+        if len(service):
+            columns = [c for c in ["gebaeude", "nearest_infra_type", "service_line_distance", "routing_method"]
+                       if c in service.columns]
+            layers["service_lines"] = gpd.GeoDataFrame(service[columns], geometry=list(service["service_line"]),
+                                                       crs=_projected_crs(buildings))
+    if lines is not None and not lines.empty:
+        layers["power_lines"] = lines[lines.geometry.geom_type == "LineString"]
+    if streets is not None and len(streets):
+        layers["streets"] = streets
+    return layers
+
+
+# ----------------------------------------------------------------------
+# Writers
+# ----------------------------------------------------------------------
+def write_flatgeobuf(layers, out_dir):
+    """One spatially indexed .fgb per layer (WGS84). Returns {layer: path}."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, gdf in layers.items():
+        if gdf.crs is not None and gdf.crs != WGS84:
+            gdf = gdf.to_crs(WGS84)
+        path = out_dir / f"{name}.fgb"
+        _sanitize(gdf).to_file(path, driver="FlatGeobuf", SPATIAL_INDEX="YES")
+        paths[name] = path
+    return paths
+
+
+def write_mbtiles(layers, out_dir, name="network", minzoom=12, maxzoom=18):
+    """
+    Vector tiles. With tippecanoe all layers go into one <name>.mbtiles;
+    otherwise GDAL writes one <name>_<layer>.mbtiles per layer.
+    Returns {layer: path}.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tippecanoe = shutil.which("tippecanoe")
+    if tippecanoe:
+        path = out_dir / f"{name}.mbtiles"
+        with tempfile.TemporaryDirectory() as tmp:
+            cmd = [tippecanoe, "-o", str(path), "--force", "-Z", str(minzoom), "-z", str(maxzoom),
+                   "--drop-densest-as-needed", "--read-parallel"]
+            for layer_name, gdf in layers.items():
+                seq = Path(tmp) / f"{layer_name}.geojsonl"
+                _sanitize(gdf.to_crs(WGS84) if gdf.crs is not None else gdf).to_file(seq, driver="GeoJSONSeq")
+                cmd += ["-L", f"{layer_name}:{seq}"]
+            subprocess.run(cmd, check=True, capture_output=True)
+        return {layer_name: path for layer_name in layers}
+
+    paths = {}
+    for layer_name, gdf in layers.items():
+        path = out_dir / f"{name}_{layer_name}.mbtiles"
+        if path.exists():
+            path.unlink()
+        gdf = gdf.to_crs(WGS84) if gdf.crs is not None else gdf
+        _sanitize(gdf).to_file(path, driver="MVT", layer=layer_name, FORMAT="MBTILES",
+                               MINZOOM=minzoom, MAXZOOM=maxzoom)
+        paths[layer_name] = path
+    return paths
+
+
+_VIEWER_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css">
+<script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
+<script src="https://unpkg.com/flatgeobuf@3.27.2/dist/flatgeobuf-geojson.min.js"></script>
+<style>html, body, #map { height: 100%; margin: 0; } #status { position: absolute; bottom: 8px; left: 8px;
+z-index: 1000; background: white; padding: 4px 8px; font: 12px sans-serif; }</style>
+</head>
+<body>
+<div id="map"></div><div id="status"></div>
+<script>
+// Features are streamed from the .fgb files for the visible area only (HTTP range requests)
+const LAYERS = __LAYERS__;
+const MIN_ZOOM = __MIN_ZOOM__;
+const map = L.map('map', {preferCanvas: true}).setView(__CENTER__, 16);
+L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {maxZoom: 20, attribution: '&copy; OpenStreetMap'}).addTo(map);
+const control = L.control.layers(null, null, {collapsed: false}).addTo(map);
+const status = document.getElementById('status');
+
+function tooltip(props) {
+  return Object.entries(props).filter(([k, v]) => v !== null && v !== '').map(([k, v]) => k + ': ' + v).join('<br>');
+}
+
+const groups = LAYERS.map(cfg => {
+  const group = L.geoJSON(null, {
+    style: cfg.style,
+    pointToLayer: (f, latlng) => L.circleMarker(latlng, Object.assign({radius: 4}, cfg.style)),
+    onEachFeature: (f, layer) => layer.bindTooltip(tooltip(f.properties)),
+  });
+  if (cfg.show) group.addTo(map);
+  control.addOverlay(group, cfg.name);
+  return group;
+});
+
+let generation = 0;
+async function refresh() {
+  const current = ++generation;
+  if (map.getZoom() < MIN_ZOOM) { status.textContent = 'Zoom in to load network layers'; return; }
+  const b = map.getBounds();
+  const rect = {minX: b.getWest(), minY: b.getSouth(), maxX: b.getEast(), maxY: b.getNorth()};
+  status.textContent = 'Loading…';
+  for (let i = 0; i < LAYERS.length; i++) {
+    if (!map.hasLayer(groups[i])) continue;
+    const features = [];
+    for await (const f of flatgeobuf.deserialize(LAYERS[i].url, rect)) {
+      if (current !== generation) return;
+      features.push(f);
+    }
+    groups[i].clearLayers();
+    groups[i].addData(features);
+  }
+  status.textContent = '';
+}
+map.on('moveend overlayadd', refresh);
+refresh();
+</script>
+</body>
+</html>
+"""
+
+
+def write_viewer(layer_paths, out_path, center, title="Network Map", min_zoom=VIEWER_MIN_ZOOM):
+    """Lightweight Leaflet viewer streaming the given FlatGeobuf layers (center = (lat, lon))."""
+    out_path = Path(out_path)
+    layers = [
+        {
+            "name": name.replace("_", " ").title(),
+            "url": Path(path).relative_to(out_path.parent).as_posix(),
+            "style": LAYER_STYLES.get(name, {"color": "black", "weight": 2}),
+            "show": name != "streets",
+        }
+        for name, path in layer_paths.items()
+    ]
+    html = (_VIEWER_TEMPLATE
+            .replace("__TITLE__", title)
+            .replace("__LAYERS__", json.dumps(layers, indent=2))
+            .replace("__MIN_ZOOM__", str(int(min_zoom)))
+            .replace("__CENTER__", json.dumps([round(float(center[0]), 6), round(float(center[1]), 6)])))
+    out_path.write_text(html, encoding="utf-8")
+    return out_path
+
+
+def export_layers(layers, out_dir, fmt="fgb", title="Network Map", name="network"):
+    """
+    Write layers in the given format; for FlatGeobuf also write viewer.html.
+    Returns the list of written files.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown vector export format '{fmt}' (expected one of {FORMATS})")
+    layers = {k: v for k, v in layers.items() if v is not None and len(v)}
+    if not layers:
+        print("⚠️ No layers to export")
+        return []
+    out_dir = Path(out_dir)
+    if fmt == "mbtiles":
+        paths = write_mbtiles(layers, out_dir, name=name)
+        files = sorted(set(paths.values()))
+    else:
+        paths = write_flatgeobuf(layers, out_dir)
+        bounds = np.array([(gdf.to_crs(WGS84) if gdf.crs is not None else gdf).total_bounds
+                           for gdf in layers.values()])
+        center = ((bounds[:, 1].min() + bounds[:, 3].max()) / 2, (bounds[:, 0].min() + bounds[:, 2].max()) / 2)
+        files = list(paths.values()) + [write_viewer(paths, out_dir / "viewer.html", center, title)]
+    print(f"✅ Exported {len(layers)} layers ({fmt}) to {out_dir}")
+    return [str(p) for p in files]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export DH network results as FlatGeobuf or MBTiles vector layers.")
+    parser.add_argument("kind", choices=["dh"], help="Result type to export")
+    parser.add_argument("--results_dir", default="simulation_outputs")
+    parser.add_argument("--scenario", required=True, help="Scenario name used in the result file names")
+    parser.add_argument("--buildings_file", default=None, help="Optional buildings GeoJSON to include")
+    parser.add_argument("--streets_file", default=None, help="Optional streets GeoJSON to include")
+    parser.add_argument("--format", choices=FORMATS, default="fgb")
+    parser.add_argument("--output_dir", default=None, help="Default: <results_dir>/vector_<scenario>")
+    args = parser.parse_args()
+
+    layers = dh_layers_from_results(args.results_dir, args.scenario, args.buildings_file, args.streets_file)
+    out_dir = args.output_dir or Path(args.results_dir) / f"vector_{args.scenario}"
+    export_layers(layers, out_dir, args.format, title=f"DH network {args.scenario}", name=args.scenario)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# src/ and the DH/HP engines import their siblings flat
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT / "src", ROOT / "street_final_copy_3", ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pandapipes')
+
+from simulate_dual_pipe_dh_network_final import FinalDualPipeDHSimulation
+from test_shared_network_snapping import _network
+
+
+def _simulate(tmp_path, network):
+    network.create_dual_service_connections()
+    network.calculate_dual_network_statistics()
+    network.save_dual_pipe_results('test')
+    simulator = FinalDualPipeDHSimulation(results_dir=tmp_path)
+    assert simulator.run_complete_simulation('test')
+    return simulator
+
+
+def test_net_follows_the_saved_tables(tmp_path):
+    network = _network(tmp_path, [20.0, 60.0, 100.0], 'shortest_path')
+    simulator = _simulate(tmp_path, network)
+    net = simulator.net
+    # Four main segments and three buildings, each as supply and return pipes
+    assert len(net.pipe) == 2 * (len(network.supply_pipes) + 3)
+    assert len(net.heat_consumer) == 3
+    # The plant circulates the (coincident) design flow of the buildings
+    design_flow = network.supply_pipes['design_mass_flow_kg_per_s'].max()
+    assert np.isclose(simulator.simulation_kpi['total_flow_kg_per_s'], design_flow, rtol=1e-3)
+    assert 0 < simulator.simulation_kpi['pressure_drop_bar'] < 3
+
+
+def test_more_demand_raises_flow_and_pressure_drop(tmp_path):
+    base = _simulate(tmp_path, _network(tmp_path, [20.0, 60.0, 100.0], 'shortest_path')).simulation_kpi
+    scaled_network = _network(tmp_path, [20.0, 60.0, 100.0], 'shortest_path')
+    scaled_network.service_connections['heating_load_kw'] *= 2
+    scaled = _simulate(tmp_path, scaled_network).simulation_kpi
+    assert np.isclose(scaled['total_flow_kg_per_s'], 2 * base['total_flow_kg_per_s'], rtol=1e-3)
+    assert scaled['pressure_drop_bar'] > base['pressure_drop_bar']
+
+
+def test_colder_ground_loses_more_heat(tmp_path):
+    network = _network(tmp_path, [20.0, 60.0, 100.0], 'shortest_path')
+    _simulate(tmp_path, network)
+    kpi = {}
+    for ground_c in (0.0, 20.0):
+        simulator = FinalDualPipeDHSimulation(results_dir=tmp_path, ambient_temperature_c=ground_c)
+        assert simulator.run_complete_simulation('test')
+        kpi[ground_c] = simulator.simulation_kpi
+    assert kpi[0.0]['heat_loss_kw'] > kpi[20.0]['heat_loss_kw'] > 0
+    assert kpi[0.0]['plant_return_temperature_c'] < kpi[20.0]['plant_return_temperature_c'] < 40.0
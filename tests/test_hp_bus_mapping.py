@@ -0,0 +1,49 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import Point
+
+pytest.importorskip('pandapower')
+
+from branitz_hp_feasibility import build_base_grid, map_buildings_to_buses, transformer_peak_check
+
+# Two feeders ~700 m apart in Branitz: substation -> line -> consumer node each
+NODES = [
+    (1, 14.3400, 51.7600, {'power': 'substation', 'trafoid': 'C'}),
+    (2, 14.3410, 51.7605, {'power': 'consumer'}),
+    (3, 14.3500, 51.7600, {'power': 'substation', 'trafoid': 'E'}),
+    (4, 14.3510, 51.7605, {'power': 'consumer'}),
+]
+
+
+def _base_grid():
+    network = {
+        'nodes': [{'id': i, 'lon': lon, 'lat': lat, 'tags': tags} for i, lon, lat, tags in NODES],
+        'ways': [{'id': 10, 'nodes': [1, 2], 'tags': {'power': 'minor_line'}},
+                 {'id': 11, 'nodes': [3, 4], 'tags': {'power': 'minor_line'}}],
+    }
+    return build_base_grid(network)
+
+
+def _buildings():
+    """One UTM building 20 m off each consumer node, the second feeder's first."""
+    nodes = gpd.GeoSeries([Point(14.3510, 51.7605), Point(14.3410, 51.7605)], crs='EPSG:4326').to_crs('EPSG:32633')
+    return gpd.GeoDataFrame({'gebaeude': ['B_east', 'B_west']},
+                            geometry=[Point(p.x + 20, p.y).buffer(5) for p in nodes], crs='EPSG:32633')
+
+
+def test_utm_buildings_map_to_their_own_consumer_node():
+    base_grid = _base_grid()
+    buses = map_buildings_to_buses(_buildings(), base_grid)
+    assert buses.tolist() == [base_grid['node_id_to_bus']['4'], base_grid['node_id_to_bus']['2']]
+    # Geographic buildings give the same buses
+    assert map_buildings_to_buses(_buildings().to_crs('EPSG:4326'), base_grid).tolist() == buses.tolist()
+
+
+def test_feeder_loads_stay_under_their_own_transformer():
+    base_grid = _base_grid()
+    transformers, lines = transformer_peak_check(_buildings(), np.array([30.0, 10.0]), base_grid)
+    peaks = dict(zip(transformers['name'], transformers['coincident_peak_kw']))
+    assert peaks == {'MV_Transformer_C': 10.0, 'MV_Transformer_E': 30.0}
+    assert transformers['n_buildings'].tolist() == [1, 1]
+    assert sorted(lines['coincident_peak_kw'].tolist()) == [10.0, 30.0]
@@ -0,0 +1,29 @@
+import numpy as np
+
+from kpi_sensitivity import DEFAULT_UNCERTAINTY, compute_kpi_draws, kpi_bands, sample_parameters
+
+RESULTS = [
+    {"scenario": "dh", "type": "DH", "success": True,
+     "kpi": {"total_heat_supplied_mwh": 1000, "network_length_m": 2000, "pump_energy_kwh": 5000}},
+    {"scenario": "hp", "type": "HP", "success": True, "kpi": {"n_heat_pumps": 80}},
+    {"scenario": "failed", "type": "HP", "success": False},
+]
+
+
+def test_compute_kpi_draws_without_results():
+    lcoh, co2, table = compute_kpi_draws([], sample_parameters(DEFAULT_UNCERTAINTY, 10, seed=0))
+    assert lcoh.shape == co2.shape == (10, 0)
+    assert table["valid"].dtype == bool
+
+
+def test_kpi_bands_without_results_is_empty():
+    bands = kpi_bands([], n_draws=10)
+    assert bands.empty
+    assert {"scenario", "lcoh_eur_per_mwh_p50", "co2_t_per_a_mean", "n_draws"} <= set(bands.columns)
+
+
+def test_kpi_bands_marks_failed_scenarios_nan():
+    bands = kpi_bands(RESULTS, n_draws=1000)
+    assert bands["lcoh_eur_per_mwh_p50"].iloc[:2].notna().all()
+    assert np.isnan(bands["lcoh_eur_per_mwh_p50"].iloc[2])
+    assert abs(bands["p_lowest_lcoh"].iloc[:2].sum() - 1) < 1e-9
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from load_aggregation import aggregate_tree, segment_parents, simultaneity_factor, subtree_sums, tree_levels
+from pipe_segment_table import PipeSegmentTable
+
+#      0
+#     / \
+#    1   2
+#   / \
+#  3   4
+PARENT = np.array([-1, 0, 0, 1, 1])
+
+
+def test_tree_levels_deepest_first():
+    levels = tree_levels(PARENT)
+    assert [sorted(level.tolist()) for level in levels] == [[3, 4], [1, 2], [0]]
+
+
+def test_tree_levels_rejects_cycles():
+    with pytest.raises(ValueError):
+        tree_levels([1, 0])
+
+
+def test_subtree_sums():
+    assert subtree_sums(PARENT, np.array([1, 2, 3, 4, 5])).tolist() == [15, 11, 3, 4, 5]
+
+
+def test_aggregate_tree_timeseries():
+    # Buildings on elements 3, 4 and 2 with peaks in different hours
+    load = np.array([[4.0, 0.0, 1.0], [0.0, 3.0, 1.0], [1.0, 1.0, 5.0]])
+    result = aggregate_tree(PARENT, [3, 4, 2], load_matrix=load)
+    assert result['method'] == 'timeseries'
+    assert result['n_buildings'].tolist() == [3, 2, 1, 1, 1]
+    assert np.allclose(result['sum_of_peaks'], [12.0, 7.0, 5.0, 4.0, 3.0])
+    # Root series is [5, 4, 7]: peak 7 in hour 2; element 1 carries [4, 3, 2]
+    assert np.allclose(result['coincident_peak'], [7.0, 4.0, 5.0, 4.0, 3.0])
+    assert result['peak_time'].tolist() == [2, 0, 2, 0, 1]
+    assert np.isclose(result['simultaneity'][0], 7.0 / 12.0)
+
+
+def test_aggregate_tree_simultaneity_curve():
+    peaks = np.array([10.0, 10.0, 10.0])
+    result = aggregate_tree(PARENT, [3, 4, -1], peaks=peaks)
+    assert result['method'] == 'simultaneity_curve'
+    assert result['n_buildings'].tolist() == [2, 2, 0, 1, 1]
+    assert np.isclose(result['coincident_peak'][3], 10.0)
+    assert np.isclose(result['coincident_peak'][0], 20.0 * simultaneity_factor(2))
+    assert np.isnan(result['simultaneity'][2])
+
+
+def test_aggregate_tree_needs_loads():
+    with pytest.raises(ValueError):
+        aggregate_tree(PARENT, [0])
+
+
+def test_segment_parents():
+    parent, incoming = segment_parents([0, 1, 1], [1, 2, 3])
+    assert parent.tolist() == [-1, 0, 0]
+    assert incoming.tolist() == [-1, 0, 1, 2]
+
+
+def _edge_data(u, v):
+    return {'weight': 1.0, 'street_id': 0, 'street_name': 'Weg', 'highway_type': 'residential'}
+
+
+def test_parent_segments_rejects_non_tree_routes():
+    segments = PipeSegmentTable()
+    segments.add_route('a', [(0, 0), (1, 0), (2, 0)], _edge_data)
+    # Reaches segment (1, 0) -> (2, 0) through a different predecessor
+    segments.add_route('b', [(0, 0), (0, 1), (1, 0), (2, 0)], _edge_data)
+    with pytest.raises(ValueError):
+        segments.parent_segments()
+
+
+def test_parent_segments_and_empty_routes():
+    segments = PipeSegmentTable()
+    segments.add_route('a', [(0, 0), (1, 0), (2, 0)], _edge_data)
+    segments.add_route('b', [(0, 0), (1, 0)], _edge_data)
+    segments.add_route('plant', [(0, 0)], _edge_data)
+    assert segments.parent_segments().tolist() == [-1, 0]
+    assert segments.terminal_segments(['a', 'b', 'plant', 'x']).tolist() == [1, 0, -1, -1]
+    assert segments.registered_mask(['a', 'plant', 'x']).tolist() == [True, True, False]
@@ -0,0 +1,26 @@
+import numpy as np
+
+from profile_store import ProfileStoreWriter
+
+
+def _store(tmp_path):
+    writer = ProfileStoreWriter(tmp_path / "store", ["a", "b", "c"], ["winter", "summer"], n_steps=4)
+    writer.write("a", {"winter": 1.0, "summer": 0.5}, [1, 1, 1, 1])
+    writer.write("b", {"winter": 2.0}, [2, 2, 2, 2])
+    return writer.close()
+
+
+def test_unwritten_buildings_are_not_in_the_store(tmp_path):
+    store = _store(tmp_path)
+    assert "c" not in store
+    assert len(store) == 2
+    assert list(store) == ["a", "b"]
+    assert dict(store["b"]) == {"winter": 2.0}
+
+
+def test_vectorized_access_skips_unwritten_buildings(tmp_path):
+    store = _store(tmp_path)
+    assert store.phase_values("winter").tolist() == [1.0, 2.0]
+    assert store.phase_values("summer", ["b", "c"], default=-1.0, fallback="winter").tolist() == [2.0, -1.0]
+    assert store.rows(["c"]).tolist() == [-1]
+    assert np.array_equal(store.year_profiles(), [[1] * 4, [2] * 4])
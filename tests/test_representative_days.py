@@ -0,0 +1,48 @@
+import numpy as np
+
+from representative_days import estimate_error, representative_timesteps, select_representative_days
+
+
+def test_identical_days_collapse_to_one_medoid():
+    # Only one distinct day: asking for 12 must terminate with a single day
+    rep = select_representative_days(np.ones(8760), np.zeros(8760), n_days=12)
+    assert len(rep["days"]) == 1
+    assert float(np.sum(rep["weights"])) == 365
+
+
+def test_timesteps_weights_cover_the_year():
+    hours = np.arange(8760)
+    load = 1 + np.sin(2 * np.pi * hours / 8760) + 0.2 * np.sin(2 * np.pi * hours / 24)
+    temperature = 10 - 10 * np.cos(2 * np.pi * hours / 8760)
+    rep = select_representative_days(load, temperature, n_days=6)
+    steps, weights = representative_timesteps(rep)
+    assert len(steps) == len(weights) == 24 * len(rep["days"])
+    assert abs(weights.sum() - 8760) < 1e-6
+
+
+def test_estimate_error_uses_hourly_peak():
+    # A quarter-hourly spike must not count against the hourly peak
+    series = np.ones(35040)
+    series[100] = 4.0
+    rep = select_representative_days(series, np.zeros(8760), n_days=2)
+    errors = estimate_error(series, rep)
+    assert errors["peak_full"] == 1.75
+    assert errors["peak_reconstructed"] <= errors["peak_full"]
+
+
+def test_hp_kpis_report_representative_day_error():
+    from types import SimpleNamespace
+
+    from simulation_runner import _representative_hours
+
+    hours = np.arange(8760)
+    temperature = 10 - 10 * np.cos(2 * np.pi * hours / 8760)
+    electric = np.vstack([np.maximum(15 - temperature, 0) + 0.5 * np.sin(2 * np.pi * hours / 24)] * 3)
+    weather = SimpleNamespace(temperature=temperature)
+
+    rep_hours, rep_weights, kpi = _representative_hours({"representative_days": 6}, electric, [0.5, 0.5, 0.5], weather)
+    assert set(kpi) == {"n_representative_days", "annual_error_bound_percent", "peak_error_percent", "speedup"}
+    assert len(rep_hours) == len(rep_weights) == 24 * kpi["n_representative_days"]
+    assert kpi["speedup"] == round(365 / kpi["n_representative_days"], 1)
+    assert kpi["annual_error_bound_percent"] >= 0 and kpi["peak_error_percent"] <= 0
+    assert _representative_hours({}, electric, [0.5, 0.5, 0.5], weather) == (None, None, {})
@@ -0,0 +1,54 @@
+import ast
+
+import pytest
+
+from conftest import ROOT
+from tools.result_cache import DH_CODE_FILES, HP_CODE_FILES, KPI_CODE_FILES, code_version
+
+# Directories whose modules the engines import flat or as src.<module>
+MODULE_DIRS = ("street_final_copy_3", "src")
+
+
+def _repo_imports(path):
+    """Repo source files imported by path, relative to ROOT."""
+    found = set()
+    for node in ast.walk(ast.parse((ROOT / path).read_text(encoding="utf-8"))):
+        if isinstance(node, ast.ImportFrom):
+            module = node.module or ""
+            names = [module] if module else [alias.name for alias in node.names]
+        elif isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        else:
+            continue
+        for name in names:
+            name = name[len("src."):] if name.startswith("src.") else name
+            for directory in MODULE_DIRS:
+                candidate = f"{directory}/{name.split('.')[0]}.py"
+                if (ROOT / candidate).exists():
+                    found.add(candidate)
+    return found
+
+
+def _import_closure(entry_files):
+    seen, todo = set(entry_files), list(entry_files)
+    while todo:
+        for path in _repo_imports(todo.pop()) - seen:
+            seen.add(path)
+            todo.append(path)
+    return seen
+
+
+@pytest.mark.parametrize("code_files", [HP_CODE_FILES, DH_CODE_FILES, KPI_CODE_FILES],
+                         ids=["hp", "dh", "kpi"])
+def test_code_files_cover_imported_modules(code_files):
+    missing = _import_closure(code_files) - set(code_files)
+    assert not missing, f"add to tools/result_cache.py: {sorted(missing)}"
+
+
+def test_code_version_changes_with_a_dependency(tmp_path):
+    engine, helper = tmp_path / "engine.py", tmp_path / "helper.py"
+    engine.write_text("import helper\n")
+    helper.write_text("X = 1\n")
+    before = code_version([engine, helper])
+    helper.write_text("X = 20\n")
+    assert code_version([engine, helper]) != before
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from results_store import ResultsStore
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("duckdb")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(tmp_path / "store")
+    store.write_result({"scenario": "dh_base", "type": "DH", "success": True,
+                        "kpi": {"total_heat_supplied_mwh": 12.5}}, run_id="r1")
+    return store
+
+
+def test_query_select(store):
+    df = store.query("SELECT scenario, run_id, total_heat_supplied_mwh FROM kpis")
+    assert df.to_dict("records") == [{"scenario": "dh_base", "run_id": "r1", "total_heat_supplied_mwh": 12.5}]
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT 1; DROP VIEW kpis",
+    "COPY kpis TO 'out.csv'",
+    "ATTACH 'other.db'",
+    "SET enable_external_access = true",
+])
+def test_query_rejects_other_statements(store, sql):
+    with pytest.raises(ValueError):
+        store.query(sql)
+
+
+def test_query_cannot_read_outside_the_store(store, tmp_path):
+    secret = tmp_path / "secret.csv"
+    pd.DataFrame({"key": ["value"]}).to_csv(secret, index=False)
+    with pytest.raises(Exception, match="[Pp]ermission"):
+        store.query(f"SELECT * FROM read_csv('{secret.as_posix()}')")
@@ -0,0 +1,84 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import Point
+
+from create_complete_dual_pipe_dh_network_improved import ImprovedDualPipeDHNetwork
+from shared_street_network import PLANT_CONNECTION_ID, SharedStreetNetwork
+
+
+def _shared_network():
+    """Street 0 -> 200 m -> 400 m along the x axis, plant 10 m west of its start."""
+    coords = [(0.0, 0.0), (200.0, 0.0), (400.0, 0.0), (-10.0, 0.0)]
+    return SharedStreetNetwork(
+        coords, edge_u=[0, 1, 3], edge_v=[1, 2, 0], edge_length=[200.0, 200.0, 10.0],
+        edge_street=[0, 0, PLANT_CONNECTION_ID], street_names=['Hauptstraße'],
+        highway_types=['residential'], plant_node=3,
+    )
+
+
+def _network(tmp_path, xs, layout, shared=None):
+    buildings = gpd.GeoDataFrame(
+        {'gebaeude': [f'B{i}' for i in range(len(xs))]},
+        geometry=[Point(x, 10.0) for x in xs], crs='EPSG:32633',
+    )
+    network = ImprovedDualPipeDHNetwork(results_dir=tmp_path, shared_network=shared or _shared_network(),
+                                       layout=layout)
+    network.buildings_gdf = buildings
+    network.load_profiles, network.building_demands = {}, {}
+    assert network.snap_buildings_to_street_network()
+    assert network.create_dual_pipe_network()
+    return network
+
+
+@pytest.mark.parametrize('layout', ['shortest_path', 'steiner'])
+def test_buildings_on_one_edge_share_the_trench(tmp_path, layout):
+    network = _network(tmp_path, [20.0, 60.0, 100.0, 140.0, 180.0], layout)
+    # 10 m plant link + 180 m of street to the last building
+    assert np.isclose(network.pipe_segments.total_length_m, 190.0)
+    assert (network.pipe_segments.parent_segments() >= 0).sum() == 5
+    _, _, method = network.aggregate_segment_loads()
+    assert method == 'simultaneity_curve'
+    # The plant link carries all five buildings, the last piece only one
+    assert sorted(network.supply_pipes['buildings_downstream'].tolist()) == [1, 2, 3, 4, 5, 5]
+
+
+@pytest.mark.parametrize('layout', ['shortest_path', 'steiner'])
+def test_buildings_split_an_edge_of_the_plant_tree(tmp_path, layout):
+    network = _network(tmp_path, [20.0, 60.0, 100.0, 140.0, 180.0, 300.0], layout)
+    # 10 m plant link + the first 200 m street edge + 100 m to the last building
+    assert np.isclose(network.pipe_segments.total_length_m, 310.0)
+
+
+def test_region_graph_is_built_once_and_not_modified(tmp_path):
+    shared = _shared_network()
+    first = _network(tmp_path, [20.0, 60.0], 'steiner', shared)
+    region = shared.street_graph()
+    n_edges = region.number_of_edges()
+    second = _network(tmp_path, [20.0, 60.0, 100.0], 'steiner', shared)
+    assert shared.street_graph() is region
+    assert region.number_of_edges() == n_edges == 3
+    assert np.isclose(first.pipe_segments.total_length_m, 70.0)
+    assert np.isclose(second.pipe_segments.total_length_m, 110.0)
+
+
+def test_demand_scale_and_temperatures_reach_design_flows(tmp_path):
+    base = _network(tmp_path, [20.0, 60.0, 100.0], 'shortest_path')
+    base.aggregate_segment_loads(base.supply_temperature_c, base.return_temperature_c)
+
+    scaled = ImprovedDualPipeDHNetwork(results_dir=tmp_path, shared_network=_shared_network())
+    scaled.heat_demand_scale = 0.5
+    scaled.supply_temperature_c, scaled.return_temperature_c = 55, 25
+    scaled.buildings_gdf = base.buildings_gdf
+    scaled.load_profiles, scaled.building_demands = {}, {}
+    assert scaled.snap_buildings_to_street_network() and scaled.create_dual_pipe_network()
+    scaled.aggregate_segment_loads(scaled.supply_temperature_c, scaled.return_temperature_c)
+
+    assert np.allclose(scaled.service_connections['heating_load_kw'], 0.5 * base.service_connections['heating_load_kw'])
+    # Half the heat at the same 30 K spread: half the design mass flow
+    assert np.allclose(scaled.supply_pipes['design_mass_flow_kg_per_s'],
+                       0.5 * base.supply_pipes['design_mass_flow_kg_per_s'])
+    assert scaled.create_dual_service_connections()
+    assert (scaled.supply_pipes['temperature_c'] == 55).all() and (scaled.return_pipes['temperature_c'] == 25).all()
+    service = scaled.dual_service_connections.set_index('pipe_type')['temperature_c']
+    assert (service['supply_service'] == 55).all() and (service['return_service'] == 25).all()
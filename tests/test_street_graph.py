@@ -0,0 +1,61 @@
+import numpy as np
+
+from pipe_segment_table import PipeSegmentTable
+from street_graph import StreetGraph
+
+
+BUILDING_X = [20.0, 60.0, 100.0, 140.0, 180.0]
+
+
+def _single_street_graph():
+    """One 200 m street, plant at x=0, five buildings 10 m north of it."""
+    graph = StreetGraph()
+    graph.add_street([(0.0, 0.0), (200.0, 0.0)], 1, 'Hauptstraße', 'residential')
+    plant = graph.add_node((0.0, 0.0), node_type='plant')
+    edges, projected, _, ts = graph.project_points(
+        np.column_stack([BUILDING_X, np.full(len(BUILDING_X), 10.0)]),
+        edge_mask=graph.street_edge_mask(),
+    )
+    nodes = graph.attach_points(projected, edges, ts,
+                                [{'node_type': 'service_connection', 'building_id': i} for i in range(len(BUILDING_X))])
+    return graph, plant, nodes
+
+
+def _route(graph, plant, nodes, edge_mask=None):
+    _, pred = graph.shortest_path_tree(plant, edge_mask=edge_mask)
+    segments = PipeSegmentTable(graph.coords)
+    for building, node in enumerate(nodes.tolist()):
+        segments.add_route(building, StreetGraph.path_from_tree(pred, plant, node), graph.edge_data)
+    return segments
+
+
+def test_buildings_on_one_edge_are_chained():
+    graph, _, nodes = _single_street_graph()
+    # 5 pieces along the street plus the remaining 20 m to its end, no parallel links
+    assert graph.number_of_edges() == 6
+    assert np.isclose(graph.edge_length.sum(), 200.0)
+    assert len(set(nodes.tolist())) == len(BUILDING_X)
+
+
+def test_shortest_path_trench_is_street_length_to_last_building():
+    graph, plant, nodes = _single_street_graph()
+    segments = _route(graph, plant, nodes)
+    assert np.isclose(segments.total_length_m, 180.0)
+    assert segments.parent_segments().tolist() == [-1, 0, 1, 2, 3]
+
+
+def test_steiner_tree_on_chained_edge():
+    graph, plant, nodes = _single_street_graph()
+    mask = graph.steiner_tree([plant] + nodes.tolist())
+    assert np.isclose(graph.edge_length[mask].sum(), 180.0)
+    segments = _route(graph, plant, nodes, edge_mask=mask)
+    assert np.isclose(segments.total_length_m, 180.0)
+
+
+def test_points_on_edge_ends_reuse_the_end_nodes():
+    graph = StreetGraph()
+    graph.add_street([(0.0, 0.0), (100.0, 0.0)], 1, 'Weg', 'residential')
+    nodes = graph.attach_points([(0.0, 0.0), (50.0, 0.0), (100.0, 0.0)], [0, 0, 0], [0.0, 0.5, 1.0])
+    assert nodes.tolist() == [0, 2, 1]
+    assert graph.number_of_edges() == 2
+    assert np.allclose(sorted(graph.edge_length), [50.0, 50.0])
@@ -9,7 +9,7 @@ from .data_tools import get_all_street_names, get_building_ids_for_street
 from .analysis_tools import run_comprehensive_hp_analysis, run_comprehensive_dh_analysis
 from .comparison_tools import compare_comprehensive_scenarios
 from .kpi_tools import generate_comprehensive_kpi_report, analyze_kpi_report
-from .utility_tools import list_available_results
+from .utility_tools import list_available_results, query_results_store
 from .visualization_tools import create_comparison_dashboard, create_enhanced_comparison_dashboard
 
 __all__ = [
@@ -21,6 +21,7 @@ __all__ = [
     'generate_comprehensive_kpi_report',
     'analyze_kpi_report',
     'list_available_results',
+    'query_results_store',
     'create_comparison_dashboard',
     'create_enhanced_comparison_dashboard'
 ] 
\ No newline at end of file
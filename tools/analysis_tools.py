@@ -3,11 +3,56 @@
 Main analysis tools for heat pump and district heating feasibility analysis.
 """
 
+import atexit
 import os
 import re
 from .core_imports import tool, Path, import_street_final_modules, STREET_FINAL_AVAILABLE
+from .result_cache import cached_analysis, HP_INPUT_FILES, DH_INPUT_FILES, HP_CODE_FILES, DH_CODE_FILES
+from adk.api.executor import ToolExecutor
+
+
+# One 2-worker spawn pool shared by all comparisons of the process, so the
+# workers (and their pandapower/pandapipes imports) are started only once
+_parallel_executor = None
+
+
+def _get_parallel_executor():
+    global _parallel_executor
+    if _parallel_executor is None:
+        _parallel_executor = ToolExecutor(max_workers=2, mode="process", mp_context="spawn")
+        atexit.register(_parallel_executor.shutdown)
+    return _parallel_executor
+
+
+def run_hp_and_dh_parallel(street_name, hp_scenario, hp_tool, dh_tool, timeout=None):
+    """
+    Run the HP and DH analyses of a comparison at the same time, each in its
+    own worker process. Returns (hp_result, dh_result); a failed or timed-out
+    analysis raises RuntimeError like the sequential calls did.
+    """
+    hp_result, dh_result = _get_parallel_executor().run_calls_sync([
+        (hp_tool, (street_name, hp_scenario), {}),
+        (dh_tool, (street_name,), {}),
+    ], timeout=timeout)
+    for result in (hp_result, dh_result):
+        if isinstance(result, str) and result.startswith("Error executing"):
+            raise RuntimeError(result)
+    return hp_result, dh_result
+
+
+def _hp_metrics(result):
+    from .comparison_tools import extract_metrics_from_hp_result
+    return extract_metrics_from_hp_result(result)
+
+
+def _dh_metrics(result):
+    from .comparison_tools import extract_metrics_from_dh_result
+    return extract_metrics_from_dh_result(result)
+
 
 @tool
+@cached_analysis("hp", input_files=HP_INPUT_FILES, code_files=HP_CODE_FILES,
+                 output_dirs=["results_test/hp_analysis"], metrics_fn=_hp_metrics)
 def run_comprehensive_hp_analysis(street_name: str, scenario: str = "winter_werktag_abendspitze") -> str:
     """
     Runs comprehensive heat pump feasibility analysis for a specific street.
@@ -129,6 +174,8 @@ Buildings Analyzed: {buildings_analyzed}
         return f"Error in comprehensive HP analysis: {str(e)}"
 
 @tool
+@cached_analysis("dh", input_files=DH_INPUT_FILES, code_files=DH_CODE_FILES,
+                 output_dirs=["results_test/dh_analysis"], metrics_fn=_dh_metrics)
 def run_comprehensive_dh_analysis(street_name: str) -> str:
     """
     Runs comprehensive district heating network analysis for a specific street.
@@ -171,7 +218,8 @@ def run_comprehensive_dh_analysis(street_name: str) -> str:
             results_dir=str(output_dir),
             load_profiles_file=load_profiles_file,
             building_demands_file=building_demands_file,
-            buildings_file=str(buildings_file)
+            buildings_file=str(buildings_file),
+            shared_network=modules['get_shared_street_network']()
         )
         
         # Set scenario and create network
@@ -4,8 +4,9 @@ Comparison tools for analyzing and comparing HP vs DH scenarios.
 """
 
 import re
-from .core_imports import tool, Path, datetime, KPI_AND_LLM_AVAILABLE
-from .analysis_tools import run_comprehensive_hp_analysis, run_comprehensive_dh_analysis
+from .core_imports import tool, Path, datetime, load_kpi_and_llm_modules
+from .result_cache import cached_analysis, HP_INPUT_FILES, DH_INPUT_FILES, HP_CODE_FILES, DH_CODE_FILES, KPI_CODE_FILES
+from .analysis_tools import run_comprehensive_hp_analysis, run_comprehensive_dh_analysis, run_hp_and_dh_parallel
 from .kpi_tools import generate_kpi_analysis, generate_llm_analysis
 from .visualization_tools import create_enhanced_comparison_dashboard
 
@@ -76,7 +77,17 @@ def extract_metrics_from_dh_result(dh_result: str) -> dict:
     
     return metrics
 
+def _cost_params():
+    if not load_kpi_and_llm_modules():
+        return None
+    from .core_imports import kpi_calculator
+    return kpi_calculator.DEFAULT_COST_PARAMS
+
 @tool
+@cached_analysis("comparison", input_files=sorted(set(HP_INPUT_FILES + DH_INPUT_FILES)),
+                 code_files=HP_CODE_FILES + DH_CODE_FILES + KPI_CODE_FILES,
+                 output_dirs=["results_test/comparison_analysis", "results_test/kpi_analysis"],
+                 cost_params_fn=_cost_params)
 def compare_comprehensive_scenarios(street_name: str, hp_scenario: str = "winter_werktag_abendspitze") -> str:
     """
     Compares both HP and DH scenarios for a given street with comprehensive analysis.
@@ -93,11 +104,10 @@ def compare_comprehensive_scenarios(street_name: str, hp_scenario: str = "winter
     print(f"TOOL: Running comprehensive scenario comparison for '{street_name}'...")
     
     try:
-        # Run HP analysis
-        hp_result = run_comprehensive_hp_analysis.func(street_name, hp_scenario)
-        
-        # Run DH analysis
-        dh_result = run_comprehensive_dh_analysis.func(street_name)
+        # Run HP and DH analyses in parallel (both are served from the result cache when unchanged)
+        hp_result, dh_result = run_hp_and_dh_parallel(
+            street_name, hp_scenario, run_comprehensive_hp_analysis, run_comprehensive_dh_analysis
+        )
         
         # Extract key metrics for KPI calculation
         hp_metrics = extract_metrics_from_hp_result(hp_result)
@@ -106,7 +116,7 @@ def compare_comprehensive_scenarios(street_name: str, hp_scenario: str = "winter
         # Generate KPI analysis if modules are available
         kpi_analysis = ""
         llm_analysis = ""
-        if KPI_AND_LLM_AVAILABLE:
+        if load_kpi_and_llm_modules():
             print(f"TOOL: Generating KPI and LLM analysis for '{street_name}'...")
             kpi_result = generate_kpi_analysis(street_name, hp_metrics, dh_metrics)
             kpi_analysis = f"\n💰 ECONOMIC & ENVIRONMENTAL ANALYSIS:\n{kpi_result}"
@@ -9,39 +9,54 @@ import subprocess
 import sys
 import yaml
 from adk.api.tool import tool
-import geopandas as gpd
-import matplotlib.pyplot as plt
-from shapely.ops import nearest_points
-from shapely.geometry import LineString, Point
-import networkx as nx
-from scipy.spatial import distance_matrix
-import pandas as pd
 import glob
-import numpy as np
-import folium
+import importlib
 from pathlib import Path
-from pyproj import Transformer
 import random
 import time
-from shapely.strtree import STRtree
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from .lazy_imports import lazy_import, module_available
+
+# Heavy dependencies are imported on first use inside the tool bodies
+gpd = lazy_import("geopandas")
+plt = lazy_import("matplotlib.pyplot")
+nx = lazy_import("networkx")
+pd = lazy_import("pandas")
+np = lazy_import("numpy")
+folium = lazy_import("folium")
+
 # Import modules from street_final_copy_3 for real map generation
 STREET_FINAL_AVAILABLE = False
 
-# Import KPI calculator and LLM reporter modules
-KPI_AND_LLM_AVAILABLE = False
-try:
-    sys.path.append(str(Path(__file__).parent.parent / "src"))
-    from kpi_calculator import compute_kpis, DEFAULT_COST_PARAMS, DEFAULT_EMISSIONS
-    from llm_reporter import create_llm_report
-    KPI_AND_LLM_AVAILABLE = True
-    print("✅ KPI calculator and LLM reporter modules loaded successfully")
-except ImportError as e:
-    print(f"⚠️ Warning: Could not import kpi_calculator or llm_reporter: {e}")
-    KPI_AND_LLM_AVAILABLE = False
+# KPI calculator and LLM reporter modules (imported when a KPI/LLM tool runs)
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+KPI_AND_LLM_AVAILABLE = module_available("kpi_calculator") and module_available("llm_reporter")
+kpi_calculator = lazy_import("kpi_calculator")
+llm_reporter = lazy_import("llm_reporter")
+if not KPI_AND_LLM_AVAILABLE:
+    print("⚠️ Warning: Could not find kpi_calculator or llm_reporter modules")
+
+def load_kpi_and_llm_modules():
+    """
+    Import kpi_calculator and llm_reporter on first use; returns availability.
+    find_spec only says the files exist, the import itself can still fail.
+    """
+    global KPI_AND_LLM_AVAILABLE
+    if KPI_AND_LLM_AVAILABLE:
+        try:
+            importlib.import_module("kpi_calculator")
+            importlib.import_module("llm_reporter")
+        except ImportError as e:
+            KPI_AND_LLM_AVAILABLE = False
+            print(f"⚠️ Warning: Could not import kpi_calculator or llm_reporter modules: {e}")
+    return KPI_AND_LLM_AVAILABLE
+
+# Columnar results store (Parquet needs pyarrow, SQL queries need duckdb)
+RESULTS_STORE_AVAILABLE = module_available("results_store") and module_available("pyarrow")
+results_store = lazy_import("results_store")
 
 def import_street_final_modules():
     """Import street_final_copy_3 modules when needed."""
@@ -58,6 +73,7 @@ def import_street_final_modules():
         )
         from street_final_copy_3.create_complete_dual_pipe_dh_network_improved import ImprovedDualPipeDHNetwork
         from street_final_copy_3.simulate_dual_pipe_dh_network_final import FinalDualPipeDHSimulation
+        from street_final_copy_3.shared_street_network import get_shared_street_network
         
         STREET_FINAL_AVAILABLE = True
         return {
@@ -70,7 +86,8 @@ def import_street_final_modules():
             'visualize': visualize,
             'create_hp_dashboard': create_hp_dashboard,
             'ImprovedDualPipeDHNetwork': ImprovedDualPipeDHNetwork,
-            'FinalDualPipeDHSimulation': FinalDualPipeDHSimulation
+            'FinalDualPipeDHSimulation': FinalDualPipeDHSimulation,
+            'get_shared_street_network': get_shared_street_network
         }
     except ImportError as e:
         print(f"Warning: Could not import street_final_copy_3 modules: {e}")
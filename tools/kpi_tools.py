@@ -5,8 +5,7 @@ KPI calculation and LLM analysis tools for economic and environmental assessment
 
 import os
 import re
-from .core_imports import tool, Path, datetime, KPI_AND_LLM_AVAILABLE, compute_kpis, DEFAULT_COST_PARAMS, DEFAULT_EMISSIONS, create_llm_report
-import pandas as pd
+from .core_imports import tool, Path, datetime, load_kpi_and_llm_modules, kpi_calculator, llm_reporter, pd
 import json
 
 @tool
@@ -23,7 +22,7 @@ def generate_comprehensive_kpi_report(street_name: str) -> str:
     """
     print(f"TOOL: Generating comprehensive KPI report for '{street_name}'...")
     
-    if not KPI_AND_LLM_AVAILABLE:
+    if not load_kpi_and_llm_modules():
         return "Error: KPI calculator module not available. Please ensure src/kpi_calculator.py is accessible."
     
     try:
@@ -65,10 +64,10 @@ def generate_comprehensive_kpi_report(street_name: str) -> str:
         sim_results.append(dh_result)
         
         # Calculate KPIs
-        kpi_df = compute_kpis(
+        kpi_df = kpi_calculator.compute_kpis(
             sim_results=sim_results,
-            cost_params=DEFAULT_COST_PARAMS,
-            emissions_factors=DEFAULT_EMISSIONS
+            cost_params=kpi_calculator.DEFAULT_COST_PARAMS,
+            emissions_factors=kpi_calculator.DEFAULT_EMISSIONS
         )
         
         # Save KPI results
@@ -89,7 +88,7 @@ def generate_comprehensive_kpi_report(street_name: str) -> str:
             "extra_prompt": "Focus on the economic and environmental trade-offs between heat pumps and district heating for this specific street."
         }
         
-        llm_report = create_llm_report(
+        llm_report = llm_reporter.create_llm_report(
             kpis=kpi_df.to_dict('records'),
             scenario_metadata=scenario_metadata,
             config=config,
@@ -203,7 +202,7 @@ File: {kpi_report_path}
 
 def generate_kpi_analysis(street_name: str, hp_metrics: dict, dh_metrics: dict) -> str:
     """Generate KPI analysis using the kpi_calculator module."""
-    if not KPI_AND_LLM_AVAILABLE:
+    if not load_kpi_and_llm_modules():
         return "KPI analysis not available - modules not loaded."
     
     try:
@@ -229,10 +228,10 @@ def generate_kpi_analysis(street_name: str, hp_metrics: dict, dh_metrics: dict)
         sim_results.append(dh_result)
         
         # Calculate KPIs
-        kpi_df = compute_kpis(
+        kpi_df = kpi_calculator.compute_kpis(
             sim_results=sim_results,
-            cost_params=DEFAULT_COST_PARAMS,
-            emissions_factors=DEFAULT_EMISSIONS
+            cost_params=kpi_calculator.DEFAULT_COST_PARAMS,
+            emissions_factors=kpi_calculator.DEFAULT_EMISSIONS
         )
         
         # Create summary
@@ -273,7 +272,7 @@ Street: {street_name}
 
 def generate_llm_analysis(street_name: str, hp_metrics: dict, dh_metrics: dict) -> str:
     """Generate LLM analysis using the llm_reporter module."""
-    if not KPI_AND_LLM_AVAILABLE:
+    if not load_kpi_and_llm_modules():
         return "LLM analysis not available - modules not loaded."
     
     try:
@@ -311,7 +310,7 @@ def generate_llm_analysis(street_name: str, hp_metrics: dict, dh_metrics: dict)
             "extra_prompt": f"Focus on the specific technical and economic trade-offs for {street_name}. Consider building density, infrastructure requirements, and local energy market conditions."
         }
         
-        llm_report = create_llm_report(
+        llm_report = llm_reporter.create_llm_report(
             kpis=kpi_data,
             scenario_metadata=scenario_metadata,
             config=config,
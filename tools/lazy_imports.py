@@ -0,0 +1,57 @@
+# tools/lazy_imports.py
+"""
+Deferred imports for the agent tool modules.
+
+The heavy scientific stack (geopandas, matplotlib, folium, networkx, scipy,
+pyproj, pandapower/pandapipes via street_final_copy_3) is only needed once a
+tool body actually runs. lazy_import() returns a module proxy that performs
+the real import on first attribute access, so importing the tool modules,
+listing streets or building the agent registry stays fast.
+"""
+
+import importlib
+import importlib.util
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__["_lazy_target"] = name
+
+    def _load(self):
+        module = importlib.import_module(self.__dict__["_lazy_target"])
+        # Copy the namespace so later lookups skip __getattr__ entirely
+        self.__dict__.update(module.__dict__)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        return f"<lazy module '{self.__dict__['_lazy_target']}'>"
+
+
+def lazy_import(name):
+    """Module `name` if already imported, otherwise a LazyModule proxy for it."""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def module_available(name):
+    """True if `name` can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def is_loaded(name):
+    """True if the real module has been imported."""
+    return name in sys.modules
@@ -0,0 +1,231 @@
+# tools/result_cache.py
+"""
+Content-addressed cache for the comprehensive analysis tools.
+
+A cache entry is keyed on a hash of everything that determines a tool's
+result: the tool kind, its arguments (street, scenario), the digests of the
+input data files, the cost parameters and the digest of the code that
+produces it. An entry stores the result text, an optional metrics dict and
+copies of the files (maps, CSVs, dashboards) the tool wrote, so a hit can
+restore the artifacts and answer in milliseconds.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+CACHE_DIR = Path("results_test/cache")
+CACHE_FORMAT_VERSION = 1
+
+# Inputs and code the comprehensive HP/DH analyses depend on
+BUILDINGS_FILE = "data/geojson/hausumringe_mit_adressenV3.geojson"
+STREETS_FILE = "data/geojson/strassen_mit_adressenV3.geojson"
+LOAD_PROFILES_FILE = "../thesis-data-2/power-sim/gebaeude_lastphasenV2.json"
+BUILDING_DEMANDS_FILE = "../thesis-data-2/power-sim/gebaeude_lastphasenV2_verbrauch.json"
+NETWORK_JSON_FILE = "../thesis-data-2/power-sim/branitzer_siedlung_ns_v3_ohne_UW.json"
+POWER_INFRASTRUCTURE_FILES = [
+    "street_final_copy_3/branitz_hp_feasibility_outputs/power_lines.geojson",
+    "street_final_copy_3/branitz_hp_feasibility_outputs/power_substations.geojson",
+    "street_final_copy_3/branitz_hp_feasibility_outputs/power_plants.geojson",
+    "street_final_copy_3/branitz_hp_feasibility_outputs/power_generators.geojson",
+]
+HP_INPUT_FILES = [BUILDINGS_FILE, STREETS_FILE, LOAD_PROFILES_FILE, NETWORK_JSON_FILE] + POWER_INFRASTRUCTURE_FILES
+DH_INPUT_FILES = [BUILDINGS_FILE, STREETS_FILE, LOAD_PROFILES_FILE, BUILDING_DEMANDS_FILE]
+# Every repo module the engines import (directly or through a sibling);
+# tests/test_result_cache.py fails when an engine imports one not listed here
+HP_CODE_FILES = [
+    "street_final_copy_3/branitz_hp_feasibility.py",
+    "street_final_copy_3/load_aggregation.py",
+    "street_final_copy_3/map_layers.py",
+    "src/profile_store.py",
+]
+DH_CODE_FILES = [
+    "street_final_copy_3/create_complete_dual_pipe_dh_network_improved.py",
+    "street_final_copy_3/simulate_dual_pipe_dh_network_final.py",
+    "street_final_copy_3/shared_street_network.py",
+    "street_final_copy_3/street_graph.py",
+    "street_final_copy_3/pipe_segment_table.py",
+    "street_final_copy_3/plant_siting.py",
+    "street_final_copy_3/load_aggregation.py",
+    "street_final_copy_3/map_layers.py",
+    "street_final_copy_3/vector_export.py",
+    "src/profile_store.py",
+]
+KPI_CODE_FILES = ["src/kpi_calculator.py", "src/llm_reporter.py"]
+
+# Results starting with one of these are failures and are never cached
+_ERROR_PREFIXES = ("Error", "No buildings found")
+
+_digest_memo = {}
+
+
+def file_digest(path):
+    """
+    SHA-256 of a file's contents, memoized on (path, size, mtime) so that
+    repeated cache lookups do not re-hash large GeoJSON/JSON inputs.
+    Missing files hash to a fixed marker.
+    """
+    path = Path(path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return "missing"
+    memo_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _digest_memo:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _digest_memo[memo_key] = h.hexdigest()
+    return _digest_memo[memo_key]
+
+
+def code_version(code_files):
+    """Digest over the source files that produce a result."""
+    h = hashlib.sha256()
+    for path in sorted(str(p) for p in code_files):
+        h.update(path.encode())
+        h.update(file_digest(path).encode())
+    return h.hexdigest()
+
+
+def cache_key(kind, params, input_files=(), code_files=(), cost_params=None):
+    """Hash of the tool kind, its parameters, input digests, cost parameters and code version."""
+    payload = {
+        "format": CACHE_FORMAT_VERSION,
+        "kind": kind,
+        "params": params,
+        "inputs": {str(p): file_digest(p) for p in input_files},
+        "cost_params": cost_params,
+        "code": code_version(code_files),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResultCache:
+    """On-disk store of cached tool results under CACHE_DIR/<kind>/<key>/."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def _entry_dir(self, kind, key):
+        return self.cache_dir / kind / key
+
+    def get(self, kind, key, restore_artifacts=True):
+        """Return the cached entry dict or None; optionally restore its artifacts."""
+        entry_file = self._entry_dir(kind, key) / "entry.json"
+        if not entry_file.exists():
+            return None
+        try:
+            with open(entry_file, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if restore_artifacts:
+            for original, stored in entry.get("artifacts", {}).items():
+                stored_path = self._entry_dir(kind, key) / stored
+                if not stored_path.exists():
+                    return None
+                if not os.path.exists(original) or file_digest(original) != file_digest(stored_path):
+                    Path(original).parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copy2(stored_path, original)
+        return entry
+
+    def put(self, kind, key, result, metrics=None, artifacts=(), params=None):
+        """Store a result with its metrics and copies of its artifact files."""
+        entry_dir = self._entry_dir(kind, key)
+        artifact_dir = entry_dir / "artifacts"
+        artifact_dir.mkdir(parents=True, exist_ok=True)
+        stored = {}
+        for i, path in enumerate(sorted(set(str(p) for p in artifacts))):
+            if os.path.isfile(path):
+                name = f"{i:04d}_{Path(path).name}"
+                shutil.copy2(path, artifact_dir / name)
+                stored[path] = f"artifacts/{name}"
+        entry = {
+            "kind": kind,
+            "params": params,
+            "created": time.time(),
+            "result": result,
+            "metrics": metrics,
+            "artifacts": stored,
+        }
+        with open(entry_dir / "entry.json", "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=2, default=str)
+        return entry
+
+    def clear(self, kind=None):
+        target = self.cache_dir / kind if kind else self.cache_dir
+        if target.exists():
+            shutil.rmtree(target)
+
+
+def _files_written_since(dirs, since):
+    written = []
+    for d in dirs:
+        d = Path(d)
+        if not d.exists():
+            continue
+        for path in d.rglob("*"):
+            if path.is_file() and CACHE_DIR not in path.parents and path.stat().st_mtime >= since:
+                written.append(str(path))
+    return written
+
+
+def _bound_params(func, args, kwargs):
+    """Bound arguments of func with defaults applied and the street name normalized."""
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    params = dict(bound.arguments)
+    if isinstance(params.get("street_name"), str):
+        params["street_name"] = params["street_name"].strip()
+    return params
+
+
+def cached_analysis(kind, input_files=(), code_files=(), output_dirs=(), metrics_fn=None,
+                    cost_params_fn=None, cache=None):
+    """
+    Decorator for analysis tool functions taking (street_name, ...).
+
+    Args:
+        kind: Cache namespace, e.g. "hp", "dh" or "comparison".
+        input_files: Data files the result depends on.
+        code_files: Source files the result depends on (the decorated module is always included).
+        output_dirs: Directories whose newly written files are stored as artifacts.
+        metrics_fn: Optional callable turning the result text into a metrics dict.
+        cost_params_fn: Optional callable returning the cost parameters in effect.
+    """
+    cache = cache or ResultCache()
+
+    def decorator(func):
+        files = list(code_files) + [func.__code__.co_filename]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            params = _bound_params(func, args, kwargs)
+            cost_params = cost_params_fn() if cost_params_fn else None
+            key = cache_key(kind, params, input_files, files, cost_params)
+
+            start = time.perf_counter()
+            entry = cache.get(kind, key)
+            if entry is not None:
+                print(f"⚡ Cache hit for {kind} analysis {params} ({(time.perf_counter() - start) * 1000:.1f} ms)")
+                return entry["result"]
+
+            started_at = time.time() - 1.0  # tolerate coarse filesystem timestamps
+            result = func(*args, **kwargs)
+            if isinstance(result, str) and not result.lstrip().startswith(_ERROR_PREFIXES):
+                metrics = metrics_fn(result) if metrics_fn else None
+                artifacts = _files_written_since(output_dirs, started_at)
+                cache.put(kind, key, result, metrics=metrics, artifacts=artifacts, params=params)
+                print(f"💾 Cached {kind} analysis result ({len(artifacts)} artifacts)")
+            return result
+
+        return wrapper
+
+    return decorator
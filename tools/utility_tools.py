@@ -4,7 +4,7 @@ Utility tools for system management and result exploration.
 """
 
 import os
-from .core_imports import tool, Path
+from .core_imports import tool, Path, RESULTS_STORE_AVAILABLE, results_store
 
 @tool
 def list_available_results() -> str:
@@ -19,6 +19,15 @@ def list_available_results() -> str:
     try:
         results = []
         
+        # Results store: summary from the partition directories, no files parsed
+        if RESULTS_STORE_AVAILABLE and os.path.isdir(results_store.DEFAULT_STORE_DIR):
+            summary = results_store.ResultsStore().summary()
+            if summary:
+                results.append(f"\n🗄️ {results_store.DEFAULT_STORE_DIR}/ (query with query_results_store)")
+                for table, info in summary.items():
+                    results.append(f"\n  {table}: {info['runs']} runs, {info['scenarios']} scenarios, "
+                                   f"{info['streets']} streets")
+        
         # Check common output directories
         output_dirs = ["results_test", "results", "simulation_outputs"]
         
@@ -53,4 +62,30 @@ def list_available_results() -> str:
         return "".join(results)
         
     except Exception as e:
-        return f"Error listing results: {str(e)}" 
\ No newline at end of file
+        return f"Error listing results: {str(e)}" 
+
+@tool
+def query_results_store(sql: str) -> str:
+    """
+    Runs a read-only SQL query over the columnar results store (tables: kpis,
+    junctions, pipes, buildings; partition columns run_id, scenario, street).
+    
+    Args:
+        sql: A single DuckDB SELECT, e.g. "SELECT scenario, type, total_heat_supplied_mwh FROM kpis WHERE success"
+        
+    Returns:
+        The query result as a text table (first 50 rows).
+    """
+    print(f"TOOL: Querying results store: {sql}")
+    
+    if not RESULTS_STORE_AVAILABLE:
+        return "Error: results store not available (src/results_store.py and pyarrow are required)."
+    
+    try:
+        df = results_store.ResultsStore().query(sql)
+        if df.empty:
+            return "Query returned no rows."
+        suffix = f"\n... {len(df) - 50} more rows" if len(df) > 50 else ""
+        return df.head(50).to_string(index=False) + suffix
+    except Exception as e:
+        return f"Error querying results store: {str(e)}"
@@ -4,7 +4,7 @@ Visualization tools for creating interactive dashboards and comparison views.
 """
 
 import re
-from .core_imports import Path, KPI_AND_LLM_AVAILABLE, compute_kpis, DEFAULT_COST_PARAMS, DEFAULT_EMISSIONS
+from .core_imports import Path, load_kpi_and_llm_modules, kpi_calculator
 
 def create_comparison_dashboard(street_name: str, hp_result: str, dh_result: str) -> str:
     """
@@ -348,7 +348,7 @@ def create_enhanced_comparison_dashboard(street_name: str, hp_result: str, dh_re
     
     # Generate KPI data if available
     kpi_section = ""
-    if KPI_AND_LLM_AVAILABLE:
+    if load_kpi_and_llm_modules():
         try:
             # Prepare simulation results for KPI calculation
             sim_results = []
@@ -372,10 +372,10 @@ def create_enhanced_comparison_dashboard(street_name: str, hp_result: str, dh_re
             sim_results.append(dh_result_kpi)
             
             # Calculate KPIs
-            kpi_df = compute_kpis(
+            kpi_df = kpi_calculator.compute_kpis(
                 sim_results=sim_results,
-                cost_params=DEFAULT_COST_PARAMS,
-                emissions_factors=DEFAULT_EMISSIONS
+                cost_params=kpi_calculator.DEFAULT_COST_PARAMS,
+                emissions_factors=kpi_calculator.DEFAULT_EMISSIONS
             )
             
             # Create KPI section for HTML